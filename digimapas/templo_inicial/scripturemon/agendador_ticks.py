@@ -0,0 +1,110 @@
+"""
+Agendador de ticks em taxa fixa para o Orquestrador Geral.
+
+Os prazos dos ticks ficam numa grade fixa sobre o relogio monotonico (inicio,
+inicio + periodo, inicio + 2*periodo...), em vez de "periodo depois do fim do
+ciclo". Assim o periodo real nao deriva para ``periodo + tempo_do_ciclo``.
+
+Quando um ciclo termina depois do prazo do tick seguinte, a politica decide o
+destino dos ticks atrasados:
+
+- ``"pular"``: o tick atrasado roda imediatamente e os demais ticks vencidos sao
+  descartados (o tempo do mundo nao avanca por eles);
+- ``"agrupar"``: o tick atrasado roda imediatamente e avanca o tempo do mundo por
+  todos os ticks vencidos de uma vez.
+
+Em ambos os casos a grade e mantida: o proximo prazo continua alinhado ao inicio.
+"""
+
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+POLITICAS_ATRASO = ("pular", "agrupar")
+
+
+class AgendadorTicks:
+    """Calcula quanto esperar ate cada tick e contabiliza atrasos e estouros."""
+
+    def __init__(self, periodo: float, politica: str = "pular",
+                 relogio: Callable[[], float] = time.monotonic, tolerancia: float = 0.001):
+        """
+        :param periodo: Intervalo nominal entre ticks (segundos).
+        :param politica: "pular" ou "agrupar" (ver docstring do modulo).
+        :param relogio: Funcao de tempo monotonico (injetavel para testes/replay).
+        :param tolerancia: Atraso (segundos) abaixo do qual o tick conta como pontual,
+            para nao contar a imprecisao do proprio ``sleep``.
+        """
+        if politica not in POLITICAS_ATRASO:
+            raise ValueError(f"Politica de atraso desconhecida: {politica}")
+        self.periodo = periodo
+        self.politica = politica
+        self.relogio = relogio
+        self.tolerancia = tolerancia
+        self.proximo_prazo: Optional[float] = None
+
+        self.ticks = 0
+        self.ticks_atrasados = 0
+        self.ticks_pulados = 0
+        self.ticks_agrupados = 0
+        self.estouros = 0
+        self.atraso_ultimo = 0.0
+        self.atraso_maximo = 0.0
+        self.atraso_total = 0.0
+
+    def iniciar(self) -> None:
+        """Ancora a grade no instante atual; o primeiro tick vence imediatamente."""
+        self.proximo_prazo = self.relogio()
+
+    def inicio_tick(self) -> float:
+        """
+        Marca o inicio de um tick e registra o quanto ele comecou atrasado.
+
+        :return: Instante (relogio monotonico) do inicio do tick.
+        """
+        if self.proximo_prazo is None:
+            self.iniciar()
+        agora = self.relogio()
+        atraso = max(0.0, agora - self.proximo_prazo)
+        self.ticks += 1
+        self.atraso_ultimo = atraso
+        self.atraso_total += atraso
+        self.atraso_maximo = max(self.atraso_maximo, atraso)
+        if atraso > self.tolerancia:
+            self.ticks_atrasados += 1
+        return agora
+
+    def fim_tick(self, inicio: float) -> Tuple[float, int]:
+        """
+        Encerra o tick e agenda o proximo conforme a politica.
+
+        :param inicio: Valor retornado por ``inicio_tick``.
+        :return: Tupla (segundos a esperar, passos de tempo do proximo tick).
+        """
+        agora = self.relogio()
+        if self.periodo > 0 and agora - inicio > self.periodo:
+            self.estouros += 1
+
+        self.proximo_prazo += self.periodo
+        if agora <= self.proximo_prazo or self.periodo <= 0:
+            return max(0.0, self.proximo_prazo - agora), 1
+
+        # Prazos vencidos alem do proximo tick (que roda ja, atrasado)
+        vencidos = int((agora - self.proximo_prazo) // self.periodo)
+        self.proximo_prazo += vencidos * self.periodo
+        if self.politica == "agrupar":
+            self.ticks_agrupados += vencidos
+            return 0.0, 1 + vencidos
+        self.ticks_pulados += vencidos
+        return 0.0, 1
+
+    def estatisticas(self) -> Dict[str, float]:
+        """Contadores de atraso e estouro, no formato de ``OrquestradorGeral.stats``."""
+        return {
+            'ticks_atrasados': self.ticks_atrasados,
+            'ticks_pulados': self.ticks_pulados,
+            'ticks_agrupados': self.ticks_agrupados,
+            'estouros_tick': self.estouros,
+            'atraso_ultimo_tick': self.atraso_ultimo,
+            'atraso_maximo_tick': self.atraso_maximo,
+            'atraso_medio_tick': self.atraso_total / self.ticks if self.ticks else 0.0,
+        }
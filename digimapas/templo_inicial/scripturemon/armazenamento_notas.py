@@ -0,0 +1,338 @@
+"""
+Backends de persistencia para as notas da Memoria Semantica.
+
+- ``ArmazenamentoArquivos``: layout original, um arquivo JSON por nota.
+- ``ArmazenamentoLog``: log de acrescimo segmentado, com registros prefixados
+  por tamanho e CRC, e um indice de offsets (id -> segmento, offset, tamanho).
+  Atualizacoes e remocoes acrescentam novos registros; ``compactar`` reescreve
+  apenas os registros vivos.
+"""
+
+import json
+import logging
+import os
+import re
+import struct
+import zlib
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cabecalho de cada registro: tamanho do payload e CRC32 do payload (big-endian)
+_CABECALHO = struct.Struct(">II")
+_PADRAO_SEGMENTO = re.compile(r"^notas_(\d{6})\.seg$")
+
+
+class ArmazenamentoArquivos:
+    """Persistencia original: um arquivo JSON indentado por nota dentro de ``diretorio``."""
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def salvar(self, nota_id: str, dados: Dict[str, Any]) -> None:
+        """Grava (ou sobrescreve) o arquivo da nota."""
+        path = os.path.join(self.diretorio, f"{nota_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+
+    def remover(self, nota_id: str) -> None:
+        """Apaga o arquivo da nota, se existir."""
+        path = os.path.join(self.diretorio, f"{nota_id}.json")
+        if os.path.exists(path):
+            os.remove(path)
+
+    def listar_ids(self) -> List[str]:
+        """Lista os IDs de todas as notas persistidas."""
+        return [nome[:-5] for nome in os.listdir(self.diretorio) if nome.endswith(".json")]
+
+    def carregar(self, nota_id: str) -> Dict[str, Any]:
+        """Le os dados de uma nota."""
+        with open(os.path.join(self.diretorio, f"{nota_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def fechar(self) -> None:
+        """Nada a fazer: cada escrita ja e um arquivo completo."""
+
+
+class ArmazenamentoLog:
+    """
+    Log de notas em segmentos de acrescimo com indice de offsets.
+
+    O indice e mantido em memoria e salvo como snapshot (``indice.json``) a cada
+    ``snapshot_a_cada`` escritas e no fechamento. Na abertura, o snapshot e lido e
+    os segmentos sao varridos apenas a partir da ultima posicao registrada, entao
+    escritas feitas depois do ultimo snapshot nao se perdem. Um registro final
+    truncado ou corrompido (queda durante a escrita) e descartado.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        tamanho_segmento: int = 32 * 1024 * 1024,
+        snapshot_a_cada: int = 1000,
+        fator_compactacao: float = 1.0,
+        sincronizar: bool = False,
+    ):
+        """
+        :param diretorio: Diretorio dos segmentos e do snapshot do indice.
+        :param tamanho_segmento: Tamanho (bytes) a partir do qual um novo segmento e aberto.
+        :param snapshot_a_cada: Numero de escritas entre snapshots do indice.
+        :param fator_compactacao: Compacta quando bytes mortos > fator * bytes vivos.
+        :param sincronizar: Se True, faz fsync a cada escrita.
+        """
+        self.diretorio = diretorio
+        self.tamanho_segmento = tamanho_segmento
+        self.snapshot_a_cada = snapshot_a_cada
+        self.fator_compactacao = fator_compactacao
+        self.sincronizar = sincronizar
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._caminho_indice = os.path.join(self.diretorio, "indice.json")
+
+        # id -> (numero do segmento, offset do registro, tamanho total do registro)
+        self.indice: Dict[str, Tuple[int, int, int]] = {}
+        self.bytes_mortos = 0
+        self.migrado_de_arquivos = False
+        self._lidos: Dict[int, int] = {}
+        self._escritas_desde_snapshot = 0
+        self._leitores: Dict[int, Any] = {}
+        self._abrir()
+
+    # === Abertura e recuperacao ===
+
+    def _segmentos(self) -> List[int]:
+        numeros = []
+        for nome in os.listdir(self.diretorio):
+            encontrado = _PADRAO_SEGMENTO.match(nome)
+            if encontrado:
+                numeros.append(int(encontrado.group(1)))
+        return sorted(numeros)
+
+    def _caminho_segmento(self, numero: int) -> str:
+        return os.path.join(self.diretorio, f"notas_{numero:06d}.seg")
+
+    def _abrir(self) -> None:
+        if os.path.exists(self._caminho_indice):
+            with open(self._caminho_indice, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.indice = {nid: tuple(pos) for nid, pos in snapshot.get("notas", {}).items()}
+            self.bytes_mortos = snapshot.get("bytes_mortos", 0)
+            self.migrado_de_arquivos = snapshot.get("migrado_de_arquivos", False)
+            self._lidos = {int(seg): pos for seg, pos in snapshot.get("segmentos", {}).items()}
+
+        segmentos = self._segmentos()
+        if self._lidos:
+            # Segmentos anteriores aos do snapshot sobraram de uma compactacao ja concluida
+            for numero in [n for n in segmentos if n < min(self._lidos) and n not in self._lidos]:
+                os.remove(self._caminho_segmento(numero))
+                segmentos.remove(numero)
+        # Entradas de segmentos que ja nao existem (ex.: queda no meio de uma compactacao)
+        existentes = set(segmentos)
+        self.indice = {nid: pos for nid, pos in self.indice.items() if pos[0] in existentes}
+        for numero in segmentos:
+            self._varrer_segmento(numero, self._lidos.get(numero, 0))
+        self._ativo = segmentos[-1] if segmentos else 1
+
+    def _varrer_segmento(self, numero: int, inicio: int) -> None:
+        """Aplica ao indice os registros do segmento a partir de ``inicio``."""
+        caminho = self._caminho_segmento(numero)
+        with open(caminho, "rb") as f:
+            f.seek(inicio)
+            offset = inicio
+            while True:
+                cabecalho = f.read(_CABECALHO.size)
+                if len(cabecalho) < _CABECALHO.size:
+                    break
+                tamanho, crc = _CABECALHO.unpack(cabecalho)
+                payload = f.read(tamanho)
+                if len(payload) < tamanho or zlib.crc32(payload) != crc:
+                    break
+                registro = json.loads(payload.decode("utf-8"))
+                total = _CABECALHO.size + tamanho
+                self._aplicar(registro, (numero, offset, total))
+                offset += total
+        if offset < os.path.getsize(caminho):
+            logger.warning(f"Descartando final corrompido do segmento {caminho} a partir de {offset}")
+            with open(caminho, "r+b") as f:
+                f.truncate(offset)
+        self._lidos[numero] = offset
+
+    def _aplicar(self, registro: Dict[str, Any], posicao: Tuple[int, int, int]) -> None:
+        nota_id = registro["id"]
+        anterior = self.indice.pop(nota_id, None)
+        if anterior:
+            self.bytes_mortos += anterior[2]
+        if registro.get("removida"):
+            self.bytes_mortos += posicao[2]
+        else:
+            self.indice[nota_id] = posicao
+
+    # === Escrita ===
+
+    def _acrescentar(self, registro: Dict[str, Any]) -> None:
+        payload = json.dumps(registro, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        dados = _CABECALHO.pack(len(payload), zlib.crc32(payload)) + payload
+        offset = self._lidos.get(self._ativo, 0)
+        if offset and offset + len(dados) > self.tamanho_segmento:
+            self._ativo += 1
+            offset = 0
+        with open(self._caminho_segmento(self._ativo), "ab") as f:
+            f.write(dados)
+            if self.sincronizar:
+                f.flush()
+                os.fsync(f.fileno())
+        posicao = (self._ativo, offset, len(dados))
+        self._lidos[self._ativo] = offset + len(dados)
+        self._aplicar(registro, posicao)
+
+        self._escritas_desde_snapshot += 1
+        if self._escritas_desde_snapshot >= self.snapshot_a_cada:
+            if self.deve_compactar():
+                self.compactar()
+            else:
+                self.salvar_indice()
+
+    def salvar(self, nota_id: str, dados: Dict[str, Any]) -> None:
+        """Acrescenta uma nova versao da nota ao log."""
+        self._acrescentar({"id": nota_id, "dados": dados})
+
+    def remover(self, nota_id: str) -> None:
+        """Acrescenta uma marca de remocao para a nota."""
+        if nota_id in self.indice:
+            self._acrescentar({"id": nota_id, "removida": True})
+
+    def salvar_indice(self) -> None:
+        """Grava o snapshot do indice de forma atomica (arquivo temporario + rename)."""
+        snapshot = {
+            "notas": self.indice,
+            "segmentos": {str(seg): pos for seg, pos in self._lidos.items()},
+            "bytes_mortos": self.bytes_mortos,
+            "migrado_de_arquivos": self.migrado_de_arquivos,
+        }
+        temporario = self._caminho_indice + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temporario, self._caminho_indice)
+        self._escritas_desde_snapshot = 0
+
+    # === Leitura ===
+
+    def listar_ids(self) -> List[str]:
+        """Lista os IDs das notas vivas, na ordem do indice."""
+        return list(self.indice.keys())
+
+    def carregar(self, nota_id: str) -> Dict[str, Any]:
+        """Le apenas o registro da nota, usando o offset do indice."""
+        numero, offset, total = self.indice[nota_id]
+        leitor = self._leitores.get(numero)
+        if leitor is None:
+            leitor = self._leitores[numero] = open(self._caminho_segmento(numero), "rb")
+        leitor.seek(offset + _CABECALHO.size)
+        return json.loads(leitor.read(total - _CABECALHO.size).decode("utf-8"))["dados"]
+
+    def _fechar_leitores(self) -> None:
+        for leitor in self._leitores.values():
+            leitor.close()
+        self._leitores = {}
+
+    # === Manutencao ===
+
+    def bytes_vivos(self) -> int:
+        return sum(pos[2] for pos in self.indice.values())
+
+    def deve_compactar(self) -> bool:
+        return self.bytes_mortos > self.fator_compactacao * max(self.bytes_vivos(), 1)
+
+    def compactar(self) -> None:
+        """
+        Reescreve os registros vivos em segmentos novos e apaga os antigos.
+
+        Os segmentos novos recebem numeros maiores, entao uma queda antes do snapshot
+        final so deixa versoes duplicadas e identicas, que a varredura resolve; uma queda
+        depois dele deixa segmentos antigos, que a proxima abertura apaga.
+        """
+        antigos = self._segmentos()
+        vivos = [(nid, self.carregar(nid)) for nid in list(self.indice.keys())]
+        self._fechar_leitores()
+        self._ativo = (antigos[-1] + 1) if antigos else 1
+        self.indice = {}
+        self.bytes_mortos = 0
+        self._lidos = {}
+        for nid, dados in vivos:
+            payload = json.dumps({"id": nid, "dados": dados}, ensure_ascii=False, separators=(",", ":"))
+            payload = payload.encode("utf-8")
+            offset = self._lidos.get(self._ativo, 0)
+            if offset and offset + _CABECALHO.size + len(payload) > self.tamanho_segmento:
+                self._ativo += 1
+                offset = 0
+            with open(self._caminho_segmento(self._ativo), "ab") as f:
+                f.write(_CABECALHO.pack(len(payload), zlib.crc32(payload)) + payload)
+            total = _CABECALHO.size + len(payload)
+            self.indice[nid] = (self._ativo, offset, total)
+            self._lidos[self._ativo] = offset + total
+        self.salvar_indice()
+        for numero in antigos:
+            os.remove(self._caminho_segmento(numero))
+        logger.info(f"Log de notas compactado: {len(vivos)} notas vivas")
+
+    def migrar_de_arquivos(self, diretorio_json: str) -> int:
+        """
+        Importa uma unica vez as notas do layout de um JSON por nota.
+
+        Os arquivos originais sao mantidos; a migracao fica registrada no snapshot.
+
+        :return: Numero de notas migradas.
+        """
+        if self.migrado_de_arquivos or not os.path.isdir(diretorio_json):
+            return 0
+        origem = ArmazenamentoArquivos(diretorio_json)
+        migradas = 0
+        for nota_id in origem.listar_ids():
+            if nota_id not in self.indice:
+                self.salvar(nota_id, origem.carregar(nota_id))
+                migradas += 1
+        self.migrado_de_arquivos = True
+        self.salvar_indice()
+        if migradas:
+            logger.info(f"{migradas} notas migradas de {diretorio_json} para o log")
+        return migradas
+
+    def fechar(self) -> None:
+        """Salva o snapshot do indice e fecha os arquivos abertos para leitura."""
+        self._fechar_leitores()
+        self.salvar_indice()
+
+
+class NotasPreguicosas(MutableMapping):
+    """
+    Dicionario id -> nota que so le o corpo da nota do armazenamento no primeiro acesso.
+
+    Iterar chaves, ``len`` e ``in`` nao carregam nada; ``values``/``items`` carregam
+    cada nota conforme a iteracao avanca.
+    """
+
+    def __init__(self, ids: Iterable[str], carregador: Callable[[str], Any]):
+        self._notas: Dict[str, Optional[Any]] = dict.fromkeys(ids)
+        self._carregador = carregador
+
+    def __getitem__(self, nota_id: str) -> Any:
+        nota = self._notas[nota_id]
+        if nota is None:
+            nota = self._notas[nota_id] = self._carregador(nota_id)
+        return nota
+
+    def __setitem__(self, nota_id: str, nota: Any) -> None:
+        self._notas[nota_id] = nota
+
+    def __delitem__(self, nota_id: str) -> None:
+        del self._notas[nota_id]
+
+    def __contains__(self, nota_id: object) -> bool:
+        return nota_id in self._notas
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._notas)
+
+    def __len__(self) -> int:
+        return len(self._notas)
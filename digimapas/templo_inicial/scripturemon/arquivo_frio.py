@@ -0,0 +1,201 @@
+"""
+Armazenamento frio de memorias: segmentos comprimidos, so de acrescimo.
+
+Cada chamada a ``arquivar`` grava um quadro ``[tamanho: u32][crc32: u32][zlib(JSON)]``
+com a lista de registros no segmento corrente (``frio-000001.seg``, ...), que roda
+ao passar de ``tamanho_segmento`` bytes. O quadro e sincronizado com ``fsync`` antes
+de ``arquivar`` retornar, entao quem arquiva pode apagar os originais em seguida.
+
+A leitura usa ``mmap`` dos segmentos: na abertura, os quadros sao percorridos para
+montar o indice id -> (segmento, posicao, tamanho). Um quadro final truncado ou
+corrompido (queda no meio da escrita) e cortado do arquivo.
+
+``remover`` grava um quadro de lapides (``{'id': ..., '_removido': True}``): o
+registro sai do indice, e o espaco fica no segmento.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CABECALHO = struct.Struct(">II")
+
+
+class ArquivoFrio:
+    """Segmentos comprimidos de registros arquivados (ver docstring do modulo)."""
+
+    def __init__(self, diretorio: str, tamanho_segmento: int = 8 * 1024 * 1024, nivel_compressao: int = 6):
+        """
+        :param diretorio: Diretorio dos segmentos.
+        :param tamanho_segmento: Bytes a partir dos quais um novo segmento e aberto.
+        :param nivel_compressao: Nivel do zlib.
+        """
+        self.diretorio = diretorio
+        self.tamanho_segmento = tamanho_segmento
+        self.nivel_compressao = nivel_compressao
+        os.makedirs(diretorio, exist_ok=True)
+
+        # id -> (segmento, posicao do quadro, tamanho do quadro)
+        self._posicoes: Dict[str, Tuple[int, int, int]] = {}
+        self._mapas: Dict[int, mmap.mmap] = {}
+        self._segmento = 1
+        self.bytes_comprimidos = 0
+        self.bytes_originais = 0
+        self._quadro_cache: Optional[Tuple[Tuple[int, int], Dict[str, Dict]]] = None
+        self._abrir()
+
+    def _caminho(self, segmento: int) -> str:
+        return os.path.join(self.diretorio, f"frio-{segmento:06d}.seg")
+
+    def segmentos(self) -> List[int]:
+        numeros = []
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith("frio-") and nome.endswith(".seg"):
+                numeros.append(int(nome[5:-4]))
+        return sorted(numeros)
+
+    def _abrir(self) -> None:
+        segmentos = self.segmentos()
+        for segmento in segmentos:
+            with open(self._caminho(segmento), "rb") as f:
+                dados = f.read()
+            posicao = 0
+            while posicao + _CABECALHO.size <= len(dados):
+                tamanho, crc = _CABECALHO.unpack_from(dados, posicao)
+                inicio = posicao + _CABECALHO.size
+                corpo = dados[inicio:inicio + tamanho]
+                if len(corpo) < tamanho or zlib.crc32(corpo) != crc:
+                    break
+                registros = json.loads(zlib.decompress(corpo))
+                for registro in registros:
+                    if registro.get("_removido"):
+                        self._posicoes.pop(registro["id"], None)
+                    else:
+                        self._posicoes[registro["id"]] = (segmento, posicao, tamanho)
+                self.bytes_comprimidos += _CABECALHO.size + tamanho
+                self.bytes_originais += sum(len(json.dumps(r, ensure_ascii=False).encode("utf-8"))
+                                            for r in registros)
+                posicao = inicio + tamanho
+            if posicao < len(dados):
+                logger.warning(f"Arquivo frio: quadro incompleto cortado em {self._caminho(segmento)}:{posicao}")
+                with open(self._caminho(segmento), "r+b") as f:
+                    f.truncate(posicao)
+        if segmentos:
+            self._segmento = segmentos[-1]
+
+    def __len__(self) -> int:
+        return len(self._posicoes)
+
+    def __contains__(self, registro_id: str) -> bool:
+        return registro_id in self._posicoes
+
+    def ids(self) -> Iterable[str]:
+        return self._posicoes.keys()
+
+    # === Escrita ===
+
+    def arquivar(self, registros: List[Dict[str, Any]]) -> int:
+        """
+        Grava registros (dicts JSON-serializaveis com 'id') num quadro sincronizado.
+        Ids ja arquivados sao ignorados, o que torna a operacao idempotente.
+
+        :return: Bytes gravados no disco.
+        """
+        novos = [r for r in registros if r["id"] not in self._posicoes]
+        if not novos:
+            return 0
+        posicao, tamanho = self._gravar_quadro(novos)
+        for registro in novos:
+            self._posicoes[registro["id"]] = (self._segmento, posicao, tamanho)
+        self.bytes_comprimidos += _CABECALHO.size + tamanho
+        self.bytes_originais += sum(len(json.dumps(r, ensure_ascii=False).encode("utf-8")) for r in novos)
+        return _CABECALHO.size + tamanho
+
+    def remover(self, ids: Iterable[str]) -> int:
+        """
+        Tira registros do arquivo (quadro de lapides sincronizado).
+
+        :return: Quantos estavam presentes.
+        """
+        presentes = [registro_id for registro_id in dict.fromkeys(ids) if registro_id in self._posicoes]
+        if not presentes:
+            return 0
+        self._gravar_quadro([{"id": registro_id, "_removido": True} for registro_id in presentes])
+        for registro_id in presentes:
+            del self._posicoes[registro_id]
+        return len(presentes)
+
+    def _gravar_quadro(self, registros: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Acrescenta e sincroniza um quadro; devolve (posicao, tamanho do corpo)."""
+        bruto = json.dumps(registros, ensure_ascii=False).encode("utf-8")
+        corpo = zlib.compress(bruto, self.nivel_compressao)
+        caminho = self._caminho(self._segmento)
+        if os.path.exists(caminho) and os.path.getsize(caminho) >= self.tamanho_segmento:
+            self._segmento += 1
+            caminho = self._caminho(self._segmento)
+        with open(caminho, "ab") as f:
+            posicao = f.tell()
+            f.write(_CABECALHO.pack(len(corpo), zlib.crc32(corpo)) + corpo)
+            f.flush()
+            os.fsync(f.fileno())
+        mapa = self._mapas.pop(self._segmento, None)
+        if mapa is not None:
+            mapa.close()  # remapeado no proximo acesso, ja com o quadro novo
+        return posicao, len(corpo)
+
+    # === Leitura ===
+
+    def _mapa(self, segmento: int) -> mmap.mmap:
+        mapa = self._mapas.get(segmento)
+        if mapa is None:
+            with open(self._caminho(segmento), "rb") as f:
+                mapa = self._mapas[segmento] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapa
+
+    def _quadro(self, segmento: int, posicao: int, tamanho: int) -> Dict[str, Dict]:
+        chave = (segmento, posicao)
+        if self._quadro_cache is not None and self._quadro_cache[0] == chave:
+            return self._quadro_cache[1]
+        inicio = posicao + _CABECALHO.size
+        corpo = self._mapa(segmento)[inicio:inicio + tamanho]
+        registros = {r["id"]: r for r in json.loads(zlib.decompress(corpo))}
+        self._quadro_cache = (chave, registros)
+        return registros
+
+    def ler(self, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Registros arquivados com os ids dados (ausentes sao omitidos)."""
+        encontrados = []
+        for registro_id in ids:
+            local = self._posicoes.get(registro_id)
+            if local is not None:
+                encontrados.append(self._quadro(*local)[registro_id])
+        return encontrados
+
+    def iterar(self) -> Iterator[Dict[str, Any]]:
+        """Todos os registros, quadro a quadro."""
+        quadros = sorted(set(self._posicoes.values()))
+        for segmento, posicao, tamanho in quadros:
+            for registro_id, registro in self._quadro(segmento, posicao, tamanho).items():
+                if self._posicoes.get(registro_id) == (segmento, posicao, tamanho):
+                    yield registro
+
+    def fechar(self) -> None:
+        for mapa in self._mapas.values():
+            mapa.close()
+        self._mapas.clear()
+        self._quadro_cache = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            'registros': len(self._posicoes),
+            'segmentos': len(self.segmentos()),
+            'bytes_comprimidos': self.bytes_comprimidos,
+            'bytes_originais': self.bytes_originais,
+            'taxa_compressao': self.bytes_originais / self.bytes_comprimidos if self.bytes_comprimidos else 0.0,
+        }
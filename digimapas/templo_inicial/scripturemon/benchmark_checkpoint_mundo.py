@@ -0,0 +1,105 @@
+"""
+Benchmark de checkpoints do OrquestradorGeral.
+
+Mede, para mundos com N agentes sinteticos (cada um com alguns KB de estado):
+o tempo que o tick gasta no snapshot, a gravacao completa e a incremental (so
+uma fracao dos agentes alterada) na thread de fundo, e o tempo de restauracao.
+
+Uso:
+    python benchmark_checkpoint_mundo.py --agentes 100 1000 --alterados 0.1
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from orquestrador_geral import OrquestradorGeral
+
+
+class _Consciencia:
+    def perceive(self, percepcao):
+        pass
+
+
+class AgenteComEstado:
+    """Agente sintetico com memoria de tamanho configuravel; picklavel."""
+
+    def __init__(self, tamanho: int):
+        self.consciencia = _Consciencia()
+        self.memorias = [f"memoria {i} " * 4 for i in range(tamanho)]
+        self.ciclos = 0
+
+    def viver(self):
+        self.ciclos += 1
+        return []
+
+
+def _config(diretorio: str, agentes: int) -> dict:
+    return {
+        'tick_rate': 0.0,
+        'max_agentes': agentes,
+        'max_workers': 4,
+        'locais_iniciais': ['praca_central', 'templo', 'floresta', 'laboratorio'],
+        'diretorio_checkpoint': diretorio,
+        'checkpoint_completo_a_cada': 1000,
+    }
+
+
+def _tamanho_diretorio(diretorio: str) -> int:
+    return sum(os.path.getsize(os.path.join(diretorio, f)) for f in os.listdir(diretorio))
+
+
+def _medir(agentes: int, tamanho: int, alterados: float) -> None:
+    diretorio = tempfile.mkdtemp(prefix="bench_checkpoint_")
+    try:
+        orquestrador = OrquestradorGeral(_config(diretorio, agentes))
+        for i in range(agentes):
+            orquestrador.adicionar_agente(f"agente_{i}", AgenteComEstado(tamanho))
+
+        orquestrador.checkpoint(bloquear=True)
+        snapshot_completo = orquestrador.stats['checkpoint_snapshot_s']
+        gravacao_completa = orquestrador.gravador_checkpoint.ultimo_tempo_gravacao
+
+        # Só uma fração dos agentes vive entre os dois checkpoints
+        orquestrador.agentes_ativos = set(list(orquestrador.agentes)[:max(1, int(agentes * alterados))])
+        orquestrador.executar_sync(num_ciclos=1)
+        orquestrador.checkpoint(bloquear=True)
+        snapshot_incremental = orquestrador.stats['checkpoint_snapshot_s']
+        gravacao_incremental = orquestrador.gravador_checkpoint.ultimo_tempo_gravacao
+        bytes_incremental = orquestrador.gravador_checkpoint.ultimo_resumo.get('bytes', 0)
+        orquestrador.parar()
+
+        restaurado = OrquestradorGeral(_config(diretorio, agentes))
+        inicio = time.perf_counter()
+        restaurado.restaurar_checkpoint(diretorio)
+        restauracao = time.perf_counter() - inicio
+        restaurado.parar()
+
+        print(
+            f"agentes={agentes:>5}  snapshot completo={snapshot_completo * 1000:8.1f}ms "
+            f"gravacao={gravacao_completa * 1000:8.1f}ms | incremental snapshot="
+            f"{snapshot_incremental * 1000:7.1f}ms gravacao={gravacao_incremental * 1000:7.1f}ms "
+            f"({bytes_incremental / 1024:.0f} KB) | restauracao={restauracao * 1000:8.1f}ms "
+            f"disco={_tamanho_diretorio(diretorio) / 1024:.0f} KB"
+        )
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de checkpoints do mundo")
+    parser.add_argument("--agentes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--tamanho", type=int, default=200, help="Memorias por agente")
+    parser.add_argument("--alterados", type=float, default=0.1, help="Fracao de agentes alterados")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    for agentes in args.agentes:
+        _medir(agentes, args.tamanho, args.alterados)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Microbenchmark da fila de eventos do OrquestradorGeral.
+
+P threads produtoras colocam eventos enquanto um consumidor drena em lotes (como
+o tick faz). Compara ``FilaEventos`` com ``queue.Queue`` e, para referencia, com a
+fila antiga do modo async (um ``create_task(fila.put(...))`` por evento, num so
+produtor, que e o unico uso em que ela funcionava).
+
+Uso:
+    python benchmark_fila_eventos.py --produtores 8 --eventos 200000
+"""
+
+import argparse
+import asyncio
+import queue
+import threading
+import time
+
+from fila_eventos import FilaEventos
+
+
+def _drenar_queue(fila: queue.Queue):
+    lote = []
+    try:
+        while True:
+            lote.append(fila.get_nowait())
+    except queue.Empty:
+        return lote
+
+
+def _medir_threads(nome: str, colocar, drenar, produtores: int, eventos: int) -> None:
+    por_produtor = eventos // produtores
+    total = por_produtor * produtores
+    largada = threading.Barrier(produtores + 1)
+
+    def produzir(indice: int):
+        largada.wait()
+        for i in range(por_produtor):
+            colocar((indice, i))
+
+    threads = [threading.Thread(target=produzir, args=(p,)) for p in range(produtores)]
+    for thread in threads:
+        thread.start()
+    largada.wait()
+    inicio = time.perf_counter()
+    recebidos = 0
+    lotes = 0
+    while recebidos < total:
+        lote = drenar()
+        if lote:
+            recebidos += len(lote)
+            lotes += 1
+        else:
+            time.sleep(0.0001)
+    duracao = time.perf_counter() - inicio
+    for thread in threads:
+        thread.join()
+    print(f"{nome:<28} produtores={produtores:>2}  {total / duracao:>12,.0f} eventos/s  "
+          f"({lotes} lotes, {total / max(lotes, 1):.0f} por lote)")
+
+
+async def _fila_antiga(eventos: int) -> float:
+    fila: asyncio.Queue = asyncio.Queue()
+    inicio = time.perf_counter()
+    for i in range(eventos):
+        asyncio.create_task(fila.put(i))
+    await asyncio.sleep(0)  # deixa as tarefas de put rodarem
+    while fila.qsize() < eventos:
+        await asyncio.sleep(0)
+    while not fila.empty():
+        await fila.get()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark da fila de eventos")
+    parser.add_argument("--produtores", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--eventos", type=int, default=200000)
+    args = parser.parse_args()
+
+    for produtores in args.produtores:
+        fila = FilaEventos(capacidade=args.eventos)
+        _medir_threads("FilaEventos", fila.colocar, fila.drenar, produtores, args.eventos)
+        referencia = queue.Queue(maxsize=args.eventos)
+        _medir_threads("queue.Queue", referencia.put_nowait, lambda: _drenar_queue(referencia),
+                       produtores, args.eventos)
+
+    duracao = asyncio.run(_fila_antiga(args.eventos))
+    print(f"{'asyncio.Queue+create_task':<28} produtores= 1  {args.eventos / duracao:>12,.0f} eventos/s")
+
+
+if __name__ == "__main__":
+    main()
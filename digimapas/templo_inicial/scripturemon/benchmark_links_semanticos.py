@@ -0,0 +1,81 @@
+"""
+Benchmark do relink em lote da MemoriaSemantica.
+
+Compara ``atualizar_links_em_lote`` em blocos com o laco antigo (um
+``link_automatico`` por nota). Os embeddings sao sinteticos (clusters
+aleatorios), entao nenhum modelo e carregado. Para tamanhos grandes o laco
+antigo e medido numa amostra de notas e extrapolado para o total.
+
+Uso:
+    python benchmark_links_semanticos.py --tamanhos 1000 10000 50000
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from memoria_semantica import MemoriaSemantica, NotaSemantica
+
+
+def _criar_memoria(n: int, dim: int, semente: int = 42) -> MemoriaSemantica:
+    """Cria uma memoria temporaria com n notas e embeddings agrupados em clusters."""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(max(1, n // 20), dim)).astype(np.float32)
+    vetores = centros[rng.integers(0, len(centros), size=n)]
+    vetores += 0.3 * rng.normal(size=(n, dim)).astype(np.float32)
+
+    memoria = MemoriaSemantica(persist_dir=tempfile.mkdtemp(prefix="bench_links_"))
+    memoria.threshold_link = 0.8
+    por_texto = {}
+    for i in range(n):
+        texto = f"nota sintetica {i}"
+        por_texto[texto] = vetores[i]
+        memoria.notas[f"n{i:07d}"] = NotaSemantica(conteudo=texto)
+    memoria.encode_many = lambda textos: np.array([por_texto[t] for t in textos])
+    memoria._garantir_matriz()
+    return memoria
+
+
+def _medir(n: int, dim: int, amostra: int, orcamento_mb: float) -> None:
+    memoria = _criar_memoria(n, dim)
+    try:
+        inicio = time.perf_counter()
+        resultado = memoria.atualizar_links_em_lote(orcamento_mb=orcamento_mb)
+        tempo_blocos = time.perf_counter() - inicio
+        total_links = sum(len(v) for v in resultado.values())
+    finally:
+        shutil.rmtree(memoria.persist_dir, ignore_errors=True)
+
+    memoria = _criar_memoria(n, dim)
+    try:
+        ids = list(memoria.notas.keys())[: min(amostra, n)]
+        inicio = time.perf_counter()
+        memoria.atualizar_links_em_lote(ids, em_blocos=False)
+        tempo_laco = (time.perf_counter() - inicio) * n / len(ids)
+    finally:
+        shutil.rmtree(memoria.persist_dir, ignore_errors=True)
+
+    estimado = "" if len(ids) == n else " (estimado)"
+    print(
+        f"n={n:>6}  blocos={tempo_blocos:8.2f}s  laco={tempo_laco:8.2f}s{estimado}  "
+        f"ganho={tempo_laco / tempo_blocos:6.1f}x  links={total_links}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de relink semantico em lote")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--amostra", type=int, default=1000, help="Notas medidas no laco antigo")
+    parser.add_argument("--orcamento-mb", type=float, default=64.0)
+    args = parser.parse_args()
+
+    for n in args.tamanhos:
+        _medir(n, args.dim, args.amostra, args.orcamento_mb)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark do custo do perfil de ticks do OrquestradorGeral.
+
+Roda o mesmo mundo (N agentes que falam e se movem, cada viver() gastando um
+tempo fixo de CPU) com o perfil ligado e desligado, alternando blocos de ticks,
+e mostra o custo relativo do perfil e o tempo de gerar as metricas.
+
+Uso:
+    python benchmark_perfil_ticks.py --agentes 100 500 --trabalho-us 200
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from orquestrador_geral import OrquestradorGeral
+from perfil_ticks import formatar_prometheus
+
+
+class _Consciencia:
+    def perceive(self, percepcao):
+        pass
+
+
+class AgenteOcupado:
+    """Agente sintetico: gasta ``trabalho`` segundos de CPU e fala ou se move."""
+
+    def __init__(self, trabalho: float, locais):
+        self.consciencia = _Consciencia()
+        self.trabalho = trabalho
+        self.locais = locais
+
+    def viver(self):
+        fim = time.perf_counter() + self.trabalho
+        while time.perf_counter() < fim:
+            pass
+        sorteio = random.random()
+        if sorteio < 0.2:
+            return [{'tipo': 'mover', 'destino': random.choice(self.locais)}]
+        if sorteio < 0.5:
+            return [{'tipo': 'falar', 'mensagem': f"ola {random.randint(0, 9)}"}]
+        return []
+
+
+def _medir(agentes: int, trabalho: float, ticks: int, blocos: int) -> None:
+    locais = ['praca_central', 'templo', 'floresta', 'laboratorio']
+    orquestrador = OrquestradorGeral({
+        'tick_rate': 0.0,
+        'max_agentes': agentes,
+        'max_workers': 4,
+        'locais_iniciais': locais,
+    })
+    for i in range(agentes):
+        orquestrador.adicionar_agente(f"agente_{i}", AgenteOcupado(trabalho, locais))
+
+    tempos = {True: 0.0, False: 0.0}
+    orquestrador.executar_sync(num_ciclos=ticks)  # aquecimento
+    for bloco in range(blocos * 2):
+        ativo = bloco % 2 == 0
+        orquestrador.perfil.ativo = ativo
+        inicio = time.perf_counter()
+        orquestrador.executar_sync(num_ciclos=ticks)
+        tempos[ativo] += time.perf_counter() - inicio
+
+    orquestrador.perfil.ativo = True
+    inicio = time.perf_counter()
+    texto = formatar_prometheus(orquestrador.metricas())
+    tempo_metricas = time.perf_counter() - inicio
+    orquestrador.parar()
+
+    total = ticks * blocos
+    custo = (tempos[True] - tempos[False]) / tempos[False] * 100
+    print(
+        f"agentes={agentes:>5}  tick desligado={tempos[False] / total * 1000:8.3f}ms "
+        f"ligado={tempos[True] / total * 1000:8.3f}ms  custo={custo:+6.2f}%  "
+        f"metricas={tempo_metricas * 1000:6.1f}ms ({len(texto) / 1024:.0f} KB de texto)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do perfil de ticks")
+    parser.add_argument("--agentes", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--trabalho-us", type=float, default=200.0, help="CPU por viver() (microssegundos)")
+    parser.add_argument("--ticks", type=int, default=20, help="Ticks por bloco")
+    parser.add_argument("--blocos", type=int, default=5, help="Blocos ligado/desligado")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    for agentes in args.agentes:
+        _medir(agentes, args.trabalho_us / 1e6, args.ticks, args.blocos)
+
+
+if __name__ == "__main__":
+    main()
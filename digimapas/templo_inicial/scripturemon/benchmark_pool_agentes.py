@@ -0,0 +1,81 @@
+"""
+Benchmark de ticks/s do OrquestradorGeral em threads e no pool de processos.
+
+Os agentes sao sinteticos: cada ``viver`` gasta um trabalho fixo em Python puro
+(segurando o GIL), como a arvore de comportamento e a matematica emocional do
+DigimonConsciente. O tick_rate e zero, entao o resultado mede so a capacidade.
+
+Uso:
+    python benchmark_pool_agentes.py --agentes 20 --processos 1 4 8 16
+"""
+
+import argparse
+import logging
+import time
+
+from orquestrador_geral import OrquestradorGeral
+
+
+class _Consciencia:
+    def __init__(self):
+        self.percepcoes = 0
+
+    def perceive(self, percepcao):
+        self.percepcoes += 1
+
+
+class AgenteSintetico:
+    """Agente com custo de CPU fixo por ciclo; definido no modulo para ser picklavel."""
+
+    def __init__(self, iteracoes: int):
+        self.iteracoes = iteracoes
+        self.consciencia = _Consciencia()
+        self.estado = 0.0
+
+    def viver(self):
+        x = self.estado
+        for i in range(self.iteracoes):
+            x = (x * 1.0000001 + i) % 9973.0
+        self.estado = x
+        return []
+
+
+def _medir(modo: str, processos: int, agentes: int, ticks: int, iteracoes: int) -> float:
+    orquestrador = OrquestradorGeral({
+        'tick_rate': 0.0,
+        'max_agentes': agentes,
+        'max_workers': 4,
+        'locais_iniciais': ['praca_central', 'templo', 'floresta', 'laboratorio'],
+        'orcamento_agente': float('inf'),
+        'modo_execucao': modo,
+        'processos_agentes': processos,
+    })
+    try:
+        for i in range(agentes):
+            orquestrador.adicionar_agente(f"agente_{i}", AgenteSintetico(iteracoes))
+        orquestrador.executar_sync(num_ciclos=2)  # aquecimento
+        inicio = time.perf_counter()
+        orquestrador.executar_sync(num_ciclos=ticks)
+        return ticks / (time.perf_counter() - inicio)
+    finally:
+        orquestrador.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pool de processos de agentes")
+    parser.add_argument("--agentes", type=int, default=20)
+    parser.add_argument("--processos", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--iteracoes", type=int, default=200000, help="Trabalho por viver()")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    base = _medir('threads', 1, args.agentes, args.ticks, args.iteracoes)
+    print(f"threads            {base:8.2f} ticks/s")
+    for processos in args.processos:
+        taxa = _medir('processos', processos, args.agentes, args.ticks, args.iteracoes)
+        print(f"processos={processos:<3}      {taxa:8.2f} ticks/s  ({taxa / base:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Buffers circulares de eventos por localizacao.
+
+Cada buffer guarda os ultimos ``capacidade`` eventos de um local, numerados com um
+sequencial crescente. Leitores (agentes) guardam so o sequencial do ultimo evento
+visto; ``ler_desde`` devolve apenas o que e novo, sem copiar o buffer inteiro.
+Leitores que ficam mais de ``capacidade`` eventos para tras perdem os mais antigos,
+e a quantidade perdida e informada.
+"""
+
+from typing import Any, List, Tuple
+
+
+class BufferEventos:
+    """Buffer circular de tamanho fixo com sequenciais monotonicamente crescentes."""
+
+    def __init__(self, capacidade: int = 256):
+        """
+        :param capacidade: Numero maximo de eventos retidos.
+        """
+        if capacidade <= 0:
+            raise ValueError("A capacidade do buffer deve ser positiva")
+        self.capacidade = capacidade
+        self._itens: List[Any] = [None] * capacidade
+        # Sequencial do ultimo evento publicado (o primeiro evento recebe 1)
+        self.ultimo_seq = 0
+
+    def __len__(self) -> int:
+        return min(self.ultimo_seq, self.capacidade)
+
+    @property
+    def primeiro_seq(self) -> int:
+        """Sequencial do evento mais antigo ainda retido."""
+        return max(1, self.ultimo_seq - self.capacidade + 1)
+
+    def publicar(self, evento: Any) -> int:
+        """Acrescenta um evento (sobrescrevendo o mais antigo se cheio) e retorna seu sequencial."""
+        seq = self.ultimo_seq + 1
+        self._itens[seq % self.capacidade] = evento
+        self.ultimo_seq = seq
+        return seq
+
+    def ler_desde(self, cursor: int) -> Tuple[List[Tuple[int, Any]], int, int]:
+        """
+        Eventos com sequencial maior que ``cursor``.
+
+        :param cursor: Ultimo sequencial ja visto pelo leitor (0 = nenhum).
+        :return: Tupla (lista de (seq, evento), novo cursor, eventos perdidos).
+        """
+        ultimo = self.ultimo_seq
+        inicio = max(cursor + 1, ultimo - self.capacidade + 1, 1)
+        eventos = [(seq, self._itens[seq % self.capacidade]) for seq in range(inicio, ultimo + 1)]
+        # Um publicador concorrente pode ter sobrescrito o inicio durante a leitura
+        sobrescritos = self.ultimo_seq - self.capacidade + 1 - inicio
+        if sobrescritos > 0:
+            eventos = eventos[sobrescritos:]
+            inicio += sobrescritos
+        # Se ate o ultimo lido foi sobrescrito, o cursor avanca ate antes do primeiro retido
+        return eventos, max(ultimo, inicio - 1), max(0, inicio - (cursor + 1))
@@ -0,0 +1,180 @@
+"""
+Cache de deduplicacao de fatos da Memoria Universal.
+
+``CacheDeduplicacao`` e um conjunto de hashes em ordem de insercao (``OrderedDict``
+hash -> instante), com verificacao O(1). Entradas saem por tamanho (a mais antiga
+primeiro) e por idade (``ttl``, em segundos). Como a ordem de insercao e tambem a
+ordem de tempo, a expiracao so olha o inicio do dicionario.
+
+Com ``arquivo``, cada insercao acrescenta 16 bytes (hash u64 + instante f64) num
+log binario. Na abertura o log e relido e os hashes ainda validos voltam ao cache,
+entao um reinicio nao reingere os ultimos fatos vistos. O log e reescrito so com as
+entradas vivas quando passa de ``fator_compactacao`` vezes ``max_entradas`` registros.
+
+``hash_fato`` substitui o hexdigest MD5: blake2b de 8 bytes convertido em ``int``,
+estavel entre processos e barato de comparar.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_REGISTRO = struct.Struct("<Qd")
+
+
+def hash_fato(conteudo: str) -> int:
+    """Hash de 64 bits do conteudo de um fato."""
+    return int.from_bytes(hashlib.blake2b(conteudo.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CacheDeduplicacao:
+    """Conjunto de hashes com limite de tamanho, TTL e persistencia opcional."""
+
+    def __init__(
+        self,
+        max_entradas: int = 10000,
+        ttl: Optional[float] = None,
+        arquivo: Optional[str] = None,
+        fator_compactacao: int = 2,
+    ):
+        """
+        :param max_entradas: Hashes mantidos no maximo.
+        :param ttl: Idade maxima de uma entrada, em segundos (None = sem expiracao).
+        :param arquivo: Log binario para sobreviver a reinicios (None = so em memoria).
+        :param fator_compactacao: Registros no log, em multiplos de max_entradas, que
+            disparam a reescrita do log.
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.arquivo = arquivo
+        self.fator_compactacao = fator_compactacao
+        self._hashes: "OrderedDict[int, float]" = OrderedDict()
+        self._log = None
+        self._registros_log = 0
+
+        self.acertos = 0
+        self.faltas = 0
+        self.despejados = 0
+        self.expirados = 0
+
+        if arquivo:
+            self._carregar()
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, chave: int) -> bool:
+        return self.contem(chave)
+
+    # === Consulta e insercao ===
+
+    def contem(self, chave: int) -> bool:
+        """Verifica (em O(1)) se o hash esta no cache e ainda valido; conta acerto/falta."""
+        instante = self._hashes.get(chave)
+        if instante is not None and self.ttl is not None and time.time() - instante > self.ttl:
+            del self._hashes[chave]
+            self.expirados += 1
+            instante = None
+        if instante is None:
+            self.faltas += 1
+            return False
+        self.acertos += 1
+        return True
+
+    def adicionar(self, chave: int) -> None:
+        """Insere (ou renova) o hash e despeja o que passou do tamanho ou da idade."""
+        agora = time.time()
+        self._hashes.pop(chave, None)
+        self._hashes[chave] = agora
+        if self._log is not None:
+            self._log.write(_REGISTRO.pack(chave, agora))
+            self._registros_log += 1
+        self._despejar(agora)
+        if self._log is not None and self._registros_log > self.fator_compactacao * self.max_entradas:
+            self.compactar()
+
+    def _despejar(self, agora: float) -> None:
+        hashes = self._hashes
+        if self.ttl is not None:
+            limite = agora - self.ttl
+            while hashes:
+                chave, instante = next(iter(hashes.items()))
+                if instante >= limite:
+                    break
+                hashes.popitem(last=False)
+                self.expirados += 1
+        while len(hashes) > self.max_entradas:
+            hashes.popitem(last=False)
+            self.despejados += 1
+
+    def limpar(self) -> None:
+        self._hashes.clear()
+        if self._log is not None:
+            self.compactar()
+
+    # === Persistencia ===
+
+    def _carregar(self) -> None:
+        """Rele o log (ignorando um registro final truncado) e abre-o para acrescimo."""
+        if os.path.exists(self.arquivo):
+            with open(self.arquivo, "rb") as f:
+                dados = f.read()
+            completos = len(dados) - len(dados) % _REGISTRO.size
+            for chave, instante in _REGISTRO.iter_unpack(dados[:completos]):
+                self._hashes.pop(chave, None)
+                self._hashes[chave] = instante
+            self._registros_log = completos // _REGISTRO.size
+            self._despejar(time.time())
+            if completos != len(dados):
+                logger.warning(f"Cache de deduplicacao: registro truncado descartado em {self.arquivo}")
+                self.compactar()
+                return
+        else:
+            pasta = os.path.dirname(self.arquivo)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+        self._log = open(self.arquivo, "ab")
+
+    def compactar(self) -> None:
+        """Reescreve o log so com as entradas vivas (troca atomica do arquivo)."""
+        if not self.arquivo:
+            return
+        if self._log is not None:
+            self._log.close()
+        temporario = self.arquivo + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(b"".join(_REGISTRO.pack(c, i) for c, i in self._hashes.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.arquivo)
+        self._registros_log = len(self._hashes)
+        self._log = open(self.arquivo, "ab")
+
+    def sincronizar(self) -> None:
+        """Empurra para o disco os registros acrescentados desde a ultima chamada."""
+        if self._log is not None:
+            self._log.flush()
+
+    def fechar(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    # === Metricas ===
+
+    def estatisticas(self) -> Dict[str, Any]:
+        consultas = self.acertos + self.faltas
+        return {
+            "tamanho": len(self._hashes),
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "taxa_acertos": self.acertos / consultas if consultas else 0.0,
+            "despejados": self.despejados,
+            "expirados": self.expirados,
+        }
@@ -0,0 +1,258 @@
+"""
+Caches de embeddings para a Memoria Semantica.
+
+``CacheLRUEmbeddings`` e o cache limitado em memoria. Em ``CacheEmbeddingsPersistente``
+os vetores ficam numa matriz float32 mapeada em memoria (``embeddings.f32``) e um
+indice lateral (``embeddings.idx``) guarda, linha a linha, o digest de cada texto.
+A primeira linha do indice e um cabecalho JSON com o nome do modelo, a dimensao e o
+esquema das chaves; se o modelo ou o esquema mudar, o cache inteiro e descartado na abertura.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA_CHAVE = "blake2b-160"
+
+
+def chave_embedding(texto: str, nome_modelo: str) -> str:
+    """Digest estavel (entre processos) para o par modelo + texto."""
+    return hashlib.blake2b(f"{nome_modelo}\0{texto}".encode("utf-8"), digest_size=20).hexdigest()
+
+
+class CacheEmbeddingsPersistente:
+    """
+    Cache em disco de embeddings, indexado por digest de conteudo + modelo.
+
+    Escritas sao apenas de acrescimo: os vetores sao gravados e sincronizados antes
+    de seus digests entrarem no indice, entao um processo interrompido nunca deixa
+    o indice apontando para linhas nao escritas.
+    """
+
+    def __init__(self, diretorio: str, nome_modelo: str, capacidade_inicial: int = 1024):
+        """
+        :param diretorio: Diretorio onde os arquivos do cache serao mantidos.
+        :param nome_modelo: Nome do modelo de embeddings; trocar o nome invalida o cache.
+        :param capacidade_inicial: Numero de linhas reservadas na primeira escrita.
+        """
+        self.diretorio = diretorio
+        self.nome_modelo = nome_modelo
+        self.capacidade_inicial = capacidade_inicial
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._caminho_vetores = os.path.join(self.diretorio, "embeddings.f32")
+        self._caminho_indice = os.path.join(self.diretorio, "embeddings.idx")
+
+        self.dim: Optional[int] = None
+        self._linhas: Dict[str, int] = {}
+        self._vetores: Optional[np.memmap] = None
+        self._abrir()
+
+    def _abrir(self) -> None:
+        """Le o indice lateral e mapeia a matriz de vetores, invalidando se o modelo ou as chaves mudaram."""
+        if not os.path.exists(self._caminho_indice):
+            return
+        with open(self._caminho_indice, encoding="utf-8") as f:
+            try:
+                cabecalho = json.loads(f.readline())
+            except ValueError:
+                cabecalho = {}
+            chaves = [linha.strip() for linha in f if linha.strip()]
+
+        if cabecalho.get("modelo") != self.nome_modelo or cabecalho.get("chave") != ESQUEMA_CHAVE:
+            logger.info(
+                f"Cache de embeddings invalidado: modelo {cabecalho.get('modelo')} -> {self.nome_modelo}, "
+                f"chaves {cabecalho.get('chave')} -> {ESQUEMA_CHAVE}"
+            )
+            self.limpar()
+            return
+
+        self.dim = int(cabecalho["dim"])
+        tamanho = os.path.getsize(self._caminho_vetores) if os.path.exists(self._caminho_vetores) else 0
+        capacidade = tamanho // (4 * self.dim)
+        # Linhas alem da capacidade gravada nunca foram sincronizadas; sao ignoradas
+        chaves = chaves[:capacidade]
+        self._linhas = {chave: linha for linha, chave in enumerate(chaves)}
+        if capacidade:
+            self._vetores = np.memmap(
+                self._caminho_vetores, dtype=np.float32, mode="r+", shape=(capacidade, self.dim)
+            )
+
+    def limpar(self) -> None:
+        """Apaga o cache em disco e em memoria."""
+        self._vetores = None
+        self._linhas = {}
+        self.dim = None
+        for caminho in (self._caminho_vetores, self._caminho_indice):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    def __len__(self) -> int:
+        return len(self._linhas)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self._linhas
+
+    def buscar(self, chaves: List[str]) -> Dict[str, np.ndarray]:
+        """Retorna os vetores (copias) das chaves presentes no cache."""
+        encontrados = {}
+        for chave in chaves:
+            linha = self._linhas.get(chave)
+            if linha is not None:
+                encontrados[chave] = np.array(self._vetores[linha])
+        return encontrados
+
+    def adicionar(self, chaves: List[str], vetores: np.ndarray) -> None:
+        """
+        Acrescenta vetores ao cache.
+
+        :param chaves: Digests gerados por ``chave_embedding``.
+        :param vetores: Matriz (len(chaves), dim) com os embeddings correspondentes.
+        """
+        # Uma chave repetida no lote ocuparia duas linhas e desalinharia o indice na reabertura
+        novos = [(c, v) for c, v in dict(zip(chaves, vetores)).items() if c not in self._linhas]
+        if not novos:
+            return
+        vetores = np.asarray([v for _, v in novos], dtype=np.float32)
+        if self.dim is None:
+            self.dim = vetores.shape[1]
+            with open(self._caminho_indice, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"modelo": self.nome_modelo, "dim": self.dim, "chave": ESQUEMA_CHAVE}) + "\n")
+        elif vetores.shape[1] != self.dim:
+            raise ValueError(f"Dimensao {vetores.shape[1]} incompativel com o cache ({self.dim})")
+
+        inicio = len(self._linhas)
+        self._garantir_capacidade(inicio + len(novos))
+        self._vetores[inicio:inicio + len(novos)] = vetores
+        self._vetores.flush()
+        with open(self._caminho_indice, "a", encoding="utf-8") as f:
+            f.write("".join(f"{chave}\n" for chave, _ in novos))
+        for deslocamento, (chave, _) in enumerate(novos):
+            self._linhas[chave] = inicio + deslocamento
+
+    def _garantir_capacidade(self, linhas: int) -> None:
+        """Aumenta o arquivo de vetores (por duplicacao) ate caber ``linhas`` linhas."""
+        atual = 0 if self._vetores is None else self._vetores.shape[0]
+        if linhas <= atual:
+            return
+        capacidade = max(self.capacidade_inicial, atual)
+        while capacidade < linhas:
+            capacidade *= 2
+        if self._vetores is not None:
+            self._vetores.flush()
+            self._vetores = None
+        with open(self._caminho_vetores, "ab") as f:
+            f.truncate(capacidade * self.dim * 4)
+        self._vetores = np.memmap(
+            self._caminho_vetores, dtype=np.float32, mode="r+", shape=(capacidade, self.dim)
+        )
+
+
+class CacheLRUEmbeddings:
+    """
+    Cache em memoria de embeddings com limite por numero de entradas e/ou bytes.
+
+    Entradas fixadas (``fixar``) nunca sao despejadas, mas contam no uso de memoria.
+    Os contadores de acertos, faltas e despejos ficam disponiveis em ``estatisticas``.
+    """
+
+    def __init__(self, max_entradas: Optional[int] = 10000, max_bytes: Optional[int] = None):
+        """
+        :param max_entradas: Numero maximo de embeddings em cache (None = sem limite).
+        :param max_bytes: Memoria maxima (bytes de ``ndarray.nbytes``) em cache (None = sem limite).
+        """
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._fixadas: Dict[str, np.ndarray] = {}
+        self.bytes_usados = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def __len__(self) -> int:
+        return len(self._lru) + len(self._fixadas)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self._lru or chave in self._fixadas
+
+    def obter(self, chave: str) -> Optional[np.ndarray]:
+        """Retorna o embedding (marcando-o como recente) ou None, contando acerto/falta."""
+        vetor = self._fixadas.get(chave)
+        if vetor is None:
+            vetor = self._lru.get(chave)
+            if vetor is not None:
+                self._lru.move_to_end(chave)
+        if vetor is None:
+            self.faltas += 1
+        else:
+            self.acertos += 1
+        return vetor
+
+    def guardar(self, chave: str, vetor: np.ndarray) -> None:
+        """Insere ou substitui um embedding e despeja os menos recentes se passar dos limites."""
+        if chave in self._fixadas:
+            self.bytes_usados += vetor.nbytes - self._fixadas[chave].nbytes
+            self._fixadas[chave] = vetor
+        else:
+            anterior = self._lru.pop(chave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior.nbytes
+            self._lru[chave] = vetor
+            self.bytes_usados += vetor.nbytes
+        self._despejar()
+
+    def atualizar(self, pares: Dict[str, np.ndarray]) -> None:
+        """Guarda varios embeddings."""
+        for chave, vetor in pares.items():
+            self.guardar(chave, vetor)
+
+    def _despejar(self) -> None:
+        while self._lru and (
+            (self.max_entradas is not None and len(self) > self.max_entradas)
+            or (self.max_bytes is not None and self.bytes_usados > self.max_bytes)
+        ):
+            _, vetor = self._lru.popitem(last=False)
+            self.bytes_usados -= vetor.nbytes
+            self.despejos += 1
+
+    def fixar(self, chave: str) -> bool:
+        """Impede o despejo da entrada. Retorna False se ela nao estiver em cache."""
+        vetor = self._lru.pop(chave, None)
+        if vetor is not None:
+            self._fixadas[chave] = vetor
+        return chave in self._fixadas
+
+    def desafixar(self, chave: str) -> None:
+        """Devolve a entrada ao LRU (como a mais recente)."""
+        vetor = self._fixadas.pop(chave, None)
+        if vetor is not None:
+            self._lru[chave] = vetor
+            self._despejar()
+
+    def limpar(self) -> None:
+        """Esvazia o cache (inclusive as entradas fixadas); os contadores sao mantidos."""
+        self._lru.clear()
+        self._fixadas.clear()
+        self.bytes_usados = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Uso atual e contadores, para dimensionar o cache por implantacao."""
+        consultas = self.acertos + self.faltas
+        return {
+            "entradas": len(self),
+            "fixadas": len(self._fixadas),
+            "bytes": self.bytes_usados,
+            "max_entradas": self.max_entradas,
+            "max_bytes": self.max_bytes,
+            "acertos": self.acertos,
+            "faltas": self.faltas,
+            "despejos": self.despejos,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+        }
@@ -0,0 +1,76 @@
+"""
+Entrega de falas do Digimundo por caixas de entrada.
+
+Cada fala vira uma unica ``Mensagem`` imutavel; a difusao para os ouvintes apenas
+acrescenta a mesma referencia na caixa (``deque`` limitada) de cada um. A
+conversao em percepcao acontece no passo do proprio receptor, quando a caixa e
+esvaziada, e nao no tick de quem falou.
+
+Caixas cheias descartam a mensagem mais antiga. Mensagens repetidas (mesmo
+emissor e conteudo) ainda nao lidas sao agrupadas numa so na entrega.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Mensagem:
+    """Fala compartilhada (por referencia) entre todos os ouvintes."""
+
+    __slots__ = ("emissor", "conteudo", "local", "tick")
+
+    emissor: str
+    conteudo: str
+    local: Optional[str]
+    tick: int
+
+    def como_percepcao(self) -> Dict:
+        return {
+            'tipo': 'mensagem',
+            'emissor': self.emissor,
+            'conteudo': self.conteudo,
+            'local': self.local
+        }
+
+
+class CaixaMensagens:
+    """Fila limitada das mensagens ainda nao entregues a um agente."""
+
+    __slots__ = ("_fila",)
+
+    def __init__(self, capacidade: int = 64):
+        self._fila: Deque[Mensagem] = deque(maxlen=capacidade)
+
+    def __len__(self) -> int:
+        return len(self._fila)
+
+    def depositar(self, mensagem: Mensagem) -> bool:
+        """
+        Acrescenta a mensagem.
+
+        :return: True se a caixa estava cheia e a mensagem mais antiga foi descartada.
+        """
+        cheia = len(self._fila) == self._fila.maxlen
+        self._fila.append(mensagem)
+        return cheia
+
+    def retirar(self) -> Tuple[List[Dict], int]:
+        """
+        Esvazia a caixa.
+
+        :return: Tupla (percepcoes, quantas repeticoes foram agrupadas).
+        """
+        percepcoes = []
+        vistas = set()
+        agrupadas = 0
+        while self._fila:
+            mensagem = self._fila.popleft()
+            chave = (mensagem.emissor, mensagem.conteudo)
+            if chave in vistas:
+                agrupadas += 1
+                continue
+            vistas.add(chave)
+            percepcoes.append(mensagem.como_percepcao())
+        return percepcoes, agrupadas
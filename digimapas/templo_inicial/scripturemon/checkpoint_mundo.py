@@ -0,0 +1,237 @@
+"""
+Checkpoints incrementais do mundo do Orquestrador Geral.
+
+O estado e dividido em secoes (``mundo``, ``mapa``, ``eventos`` e uma
+``agente:<nome>`` por agente), cada uma serializada com pickle. Um checkpoint grava
+num arquivo ``chk_NNNNNNNN.bin`` apenas as secoes cujo conteudo mudou desde o
+anterior (comparando digests), como registros binarios::
+
+    [tamanho do nome: u16][tamanho dos dados: u32][nome utf-8][pickle comprimido com zlib]
+
+O ``manifesto.json`` aponta, para cada secao viva, o arquivo e a posicao da sua
+versao mais recente. Arquivo de dados e manifesto sao escritos em temporarios,
+sincronizados e renomeados (atomicamente) nessa ordem, entao uma queda no meio
+de uma gravacao deixa o checkpoint anterior intacto. A cada ``completo_a_cada``
+checkpoints todas as secoes sao regravadas num unico arquivo e os antigos sao
+apagados.
+
+``GravadorCheckpoint`` faz a gravacao numa thread de fundo: o tick so serializa as
+secoes (a copia consistente do estado) e segue adiante.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_REGISTRO = struct.Struct(">HI")
+_MANIFESTO = "manifesto.json"
+
+
+def serializar(objeto: Any) -> bytes:
+    """Pickle no protocolo mais compacto disponivel."""
+    return pickle.dumps(objeto, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class ArmazemCheckpoints:
+    """Diretorio de checkpoints incrementais (ver docstring do modulo)."""
+
+    def __init__(self, diretorio: str, completo_a_cada: int = 20, nivel_compressao: int = 1):
+        """
+        :param diretorio: Diretorio dos arquivos de checkpoint.
+        :param completo_a_cada: A cada quantos checkpoints todas as secoes sao regravadas.
+        :param nivel_compressao: Nivel do zlib (1 = mais rapido).
+        """
+        self.diretorio = diretorio
+        self.completo_a_cada = completo_a_cada
+        self.nivel_compressao = nivel_compressao
+        os.makedirs(diretorio, exist_ok=True)
+        self.manifesto = self._ler_manifesto()
+
+    def _ler_manifesto(self) -> Dict[str, Any]:
+        caminho = os.path.join(self.diretorio, _MANIFESTO)
+        if not os.path.exists(caminho):
+            return {'sequencia': 0, 'desde_completo': 0, 'secoes': {}}
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _caminho(self, arquivo: str) -> str:
+        return os.path.join(self.diretorio, arquivo)
+
+    @staticmethod
+    def _gravar_atomico(caminho: str, dados: bytes) -> None:
+        temporario = caminho + ".tmp"
+        with open(temporario, "wb") as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+
+    def _ler_bruto(self, arquivo: str, posicao: int, tamanho: int) -> bytes:
+        """Dados comprimidos de um registro ja gravado."""
+        with open(self._caminho(arquivo), "rb") as f:
+            f.seek(posicao)
+            return f.read(tamanho)
+
+    def gravar(self, secoes: Dict[str, bytes], nomes_vivos: Iterable[str]) -> Dict[str, Any]:
+        """
+        Grava um checkpoint.
+
+        :param secoes: secao -> pickle das secoes possivelmente alteradas.
+        :param nomes_vivos: Todas as secoes existentes agora; as ausentes de ``secoes``
+            mantem a versao anterior, e as que sumiram saem do manifesto.
+        :return: Resumo (sequencia, secoes gravadas, bytes, se foi completo).
+        """
+        nomes_vivos = set(nomes_vivos)
+        antigas = self.manifesto['secoes']
+        completo = self.manifesto['desde_completo'] + 1 >= self.completo_a_cada
+
+        registros = []  # (nome, dados comprimidos, digest)
+        for nome in sorted(nomes_vivos):
+            dados = secoes.get(nome)
+            if dados is not None:
+                digest = hashlib.blake2b(dados, digest_size=16).hexdigest()
+                if completo or nome not in antigas or antigas[nome][3] != digest:
+                    registros.append((nome, zlib.compress(dados, self.nivel_compressao), digest))
+            elif completo and nome in antigas:
+                arquivo, posicao, tamanho, digest = antigas[nome]
+                registros.append((nome, self._ler_bruto(arquivo, posicao, tamanho), digest))
+
+        sequencia = self.manifesto['sequencia'] + 1
+        novas = {nome: entrada for nome, entrada in antigas.items() if nome in nomes_vivos}
+        arquivo = f"chk_{sequencia:08d}.bin"
+        corpo = bytearray()
+        for nome, comprimido, digest in registros:
+            nome_bytes = nome.encode("utf-8")
+            corpo += _REGISTRO.pack(len(nome_bytes), len(comprimido)) + nome_bytes
+            novas[nome] = [arquivo, len(corpo), len(comprimido), digest]
+            corpo += comprimido
+        if registros:
+            self._gravar_atomico(self._caminho(arquivo), bytes(corpo))
+
+        self.manifesto = {
+            'sequencia': sequencia,
+            'desde_completo': 0 if completo else self.manifesto['desde_completo'] + 1,
+            'secoes': novas,
+            'gravado_em': time.time(),
+        }
+        self._gravar_atomico(
+            self._caminho(_MANIFESTO), json.dumps(self.manifesto).encode("utf-8")
+        )
+        self._coletar_lixo()
+        return {
+            'sequencia': sequencia,
+            'secoes_gravadas': len(registros),
+            'bytes': len(corpo),
+            'completo': completo,
+        }
+
+    def _coletar_lixo(self) -> None:
+        """Apaga arquivos de dados que o manifesto nao referencia mais."""
+        usados = {entrada[0] for entrada in self.manifesto['secoes'].values()}
+        for arquivo in os.listdir(self.diretorio):
+            if arquivo.startswith("chk_") and arquivo not in usados:
+                try:
+                    os.remove(self._caminho(arquivo))
+                except OSError:
+                    pass
+
+    def carregar(self) -> Dict[str, Any]:
+        """Le a versao mais recente de cada secao (ja desserializada)."""
+        secoes = {}
+        por_arquivo: Dict[str, list] = {}
+        for nome, (arquivo, posicao, tamanho, _) in self.manifesto['secoes'].items():
+            por_arquivo.setdefault(arquivo, []).append((posicao, tamanho, nome))
+        for arquivo, entradas in por_arquivo.items():
+            with open(self._caminho(arquivo), "rb") as f:
+                conteudo = f.read()
+            for posicao, tamanho, nome in entradas:
+                secoes[nome] = pickle.loads(zlib.decompress(conteudo[posicao:posicao + tamanho]))
+        return secoes
+
+
+class GravadorCheckpoint:
+    """Thread de fundo que grava os snapshots entregues pelo tick."""
+
+    def __init__(self, armazem: ArmazemCheckpoints):
+        self.armazem = armazem
+        self._condicao = threading.Condition()
+        self._pendente: Optional[Dict[str, bytes]] = None
+        self._nomes_pendentes: Optional[set] = None
+        self._gravando = False
+        self._parar = False
+
+        self.checkpoints_gravados = 0
+        self.snapshots_agrupados = 0
+        self.falhas = 0
+        self.ultimo_resumo: Dict[str, Any] = {}
+        self.ultimo_tempo_gravacao = 0.0
+
+        self._thread = threading.Thread(target=self._laco, name="gravador-checkpoint", daemon=True)
+        self._thread.start()
+
+    def agendar(self, secoes: Dict[str, bytes], nomes_vivos: Iterable[str]) -> None:
+        """
+        Entrega um snapshot para gravacao. Se o anterior ainda nao comecou a ser
+        gravado, os dois sao fundidos (as secoes novas prevalecem).
+        """
+        with self._condicao:
+            if self._pendente is not None:
+                self._pendente.update(secoes)
+                self.snapshots_agrupados += 1
+            else:
+                self._pendente = dict(secoes)
+            self._nomes_pendentes = set(nomes_vivos)
+            self._condicao.notify_all()
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """Espera ate nao haver snapshot pendente nem gravacao em curso."""
+        with self._condicao:
+            return self._condicao.wait_for(
+                lambda: self._pendente is None and not self._gravando, timeout
+            )
+
+    def fechar(self, timeout: float = 30.0) -> None:
+        """Grava o snapshot pendente (se houver) e encerra a thread."""
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify_all()
+        self._thread.join(timeout)
+
+    def _laco(self) -> None:
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: self._pendente is not None or self._parar)
+                if self._pendente is None:
+                    return
+                secoes, nomes = self._pendente, self._nomes_pendentes
+                self._pendente, self._nomes_pendentes = None, None
+                self._gravando = True
+            inicio = time.monotonic()
+            try:
+                self.ultimo_resumo = self.armazem.gravar(secoes, nomes)
+                self.checkpoints_gravados += 1
+            except Exception as e:
+                self.falhas += 1
+                logger.error(f"Erro ao gravar checkpoint: {e}")
+            self.ultimo_tempo_gravacao = time.monotonic() - inicio
+            with self._condicao:
+                self._gravando = False
+                self._condicao.notify_all()
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            'checkpoints_gravados': self.checkpoints_gravados,
+            'snapshots_agrupados': self.snapshots_agrupados,
+            'falhas': self.falhas,
+            'ultimo_tempo_gravacao_s': self.ultimo_tempo_gravacao,
+            **{f'ultimo_{chave}': valor for chave, valor in self.ultimo_resumo.items()},
+        }
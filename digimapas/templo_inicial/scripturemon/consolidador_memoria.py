@@ -0,0 +1,686 @@
+"""
+Consolidacao de memorias em segundo plano para a Memoria Universal.
+
+``ConsolidadorMemoria`` percorre um armazenamento de memorias (uma "fonte", ver
+abaixo) em ciclos, fora do caminho das requisicoes. Cada ciclo tem as fases:
+
+1. ``sondar_antes`` -- mede a latencia de consultas de sonda (se houver ``consultar``);
+2. ``mesclar`` -- registros quase iguais viram um so registro canonico (o mais
+   antigo), que soma as mencoes, fica com a maior importancia e a ultima mencao, e
+   une as tags. Iguais sao detectados por hash do conteudo; quase iguais, pelo
+   ``DeduplicadorLSH`` (MinHash/LSH confirmado por cosseno ou Jaccard estimado);
+3. ``arquivar`` -- registros de baixa importancia sem mencao ha muito tempo vao para
+   o ``ArquivoFrio`` (comprimido) e saem da fonte. Registros antigos, mas que nao se
+   qualificam para o arquivo, sao anotados por periodo para a fase seguinte;
+4. ``resumir`` -- cada periodo antigo com registros suficientes vira um registro de
+   resumo; os registros do periodo vao para o arquivo frio e saem da fonte;
+5. ``sondar_depois`` -- repete as sondas e fecha o relatorio do ciclo.
+
+O trabalho e feito em unidades pequenas (um lote de ids ou uma operacao) dentro de
+fatias de tempo (``passo(orcamento_s)``). Depois de cada unidade o estado (fase,
+cursor, contadores) e gravado atomicamente em ``estado.json``. Operacoes com mais
+de uma escrita (mesclar, arquivar, resumir) sao registradas em ``pendente`` antes de
+comecar e refeitas na abertura se o processo caiu no meio: todas sao idempotentes
+(o arquivo frio ignora ids repetidos, remover ignora ids ausentes, o resumo tem
+chave fixa). O indice de quase-duplicatas vive so em memoria; apos uma queda a
+fase ``mesclar`` continua do cursor, comparando apenas com o que vier depois, e o
+ciclo seguinte cobre o resto.
+
+Fonte: objeto com ``listar_ids()``, ``obter(ids)`` (dicts com 'id', 'conteudo',
+'tags', 'importancia', 'mencoes', 'timestamp', 'ultima_mencao' e 'tipo'),
+``mesclar(canonico_id, campos, mesclados)``, ``remover(ids)`` e
+``registrar_resumo(chave, conteudo, metadados)``. ``FonteSemantica`` adapta a
+``MemoriaSemantica`` e ``FonteChroma`` uma colecao do ChromaDB.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .arquivo_frio import ArquivoFrio
+    from .deduplicacao_lsh import DeduplicadorLSH
+except ImportError:
+    from arquivo_frio import ArquivoFrio
+    from deduplicacao_lsh import DeduplicadorLSH
+
+logger = logging.getLogger(__name__)
+
+FASES_CICLO = ('sondar_antes', 'mesclar', 'arquivar', 'resumir', 'sondar_depois')
+
+CONFIG_PADRAO = {
+    'lote': 32,                         # ids por unidade de trabalho
+    'orcamento_s': 0.02,                # duracao de uma fatia
+    'pausa_s': 0.05,                    # espera entre fatias (libera a fonte)
+    'intervalo_ciclo_s': 600.0,         # espera entre ciclos (ou ate sinalizar)
+    'limiar_cosseno': 0.95,             # mescla por embedding
+    'limiar_jaccard': 0.85,             # mescla por MinHash, sem embedding
+    'min_caracteres': 24,               # abaixo disso, so mescla conteudo identico
+    'limiar_importancia': 0.3,          # arquiva abaixo desta importancia...
+    'idade_arquivo_s': 30 * 86400.0,    # ...sem mencao ha este tempo
+    'idade_resumo_s': 90 * 86400.0,     # registros mais velhos entram nos resumos
+    'periodo': 'mes',                   # 'dia', 'semana' ou 'mes'
+    'min_registros_resumo': 5,
+    'itens_resumo': 5,                  # registros citados no texto do resumo
+    'sondas': 10,
+    'k_sonda': 5,
+    'bytes_embedding': 384 * 4,         # estimativa por registro no armazenamento quente
+}
+
+
+def _instante(valor: Any) -> Optional[datetime]:
+    if isinstance(valor, datetime):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor))
+    except (TypeError, ValueError):
+        return None
+
+
+def chave_periodo(instante: datetime, periodo: str) -> str:
+    """Rotulo do periodo que contem ``instante`` ('2025-03', '2025-W09', '2025-03-02')."""
+    if periodo == 'dia':
+        return instante.strftime('%Y-%m-%d')
+    if periodo == 'semana':
+        ano, semana, _ = instante.isocalendar()
+        return f"{ano}-W{semana:02d}"
+    return instante.strftime('%Y-%m')
+
+
+def _bytes_registro(registro: Dict[str, Any], bytes_embedding: int) -> int:
+    """Estimativa do espaco de um registro no armazenamento quente (texto + metadados + vetor)."""
+    return len(json.dumps(registro, ensure_ascii=False, default=str).encode('utf-8')) + bytes_embedding
+
+
+# === Fontes ===
+
+class FonteSemantica:
+    """Fonte sobre a ``MemoriaSemantica`` (notas sem importancia propria usam ``importancia_padrao``)."""
+
+    def __init__(self, memoria, importancia_padrao: float = 0.5):
+        self.memoria = memoria
+        self.importancia_padrao = importancia_padrao
+
+    def listar_ids(self) -> List[str]:
+        return list(self.memoria.notas.keys())
+
+    def obter(self, ids: List[str]) -> List[Dict[str, Any]]:
+        registros = []
+        for nota_id in ids:
+            nota = self.memoria.notas.get(nota_id)
+            if nota is None:
+                continue
+            mesclados = nota.relacionamentos.get('mesclado_de', [])
+            registros.append({
+                'id': nota_id,
+                'conteudo': nota.conteudo,
+                'tags': list(nota.tags),
+                'importancia': self.importancia_padrao,
+                'mencoes': 1 + len(mesclados),
+                'timestamp': nota.created_at.isoformat(),
+                'ultima_mencao': nota.created_at.isoformat(),
+                'tipo': 'resumo' if 'resumo' in nota.tags else 'nota',
+            })
+        return registros
+
+    def mesclar(self, canonico_id: str, campos: Dict[str, Any], mesclados: List[str]) -> None:
+        if canonico_id in self.memoria.notas:
+            self.memoria.atualizar_nota(canonico_id, tags=campos.get('tags'), links={'mesclado_de': mesclados})
+
+    def remover(self, ids: List[str]) -> None:
+        for nota_id in ids:
+            if nota_id in self.memoria.notas:
+                self.memoria.remover_nota(nota_id)
+
+    def registrar_resumo(self, chave: str, conteudo: str, metadados: Dict[str, Any]) -> None:
+        marcador = f"resumo:{chave}"
+        if self.memoria.buscar_ids_por_tags([marcador]):
+            return
+        tags = ['resumo', marcador] + [t for t in metadados.get('tags', []) if t != 'resumo']
+        self.memoria.registrar_nota(conteudo, tags=tags)
+
+
+class FonteChroma:
+    """Fonte sobre uma colecao do ChromaDB (ex.: ``MemoriaVetorial.collection``)."""
+
+    def __init__(self, colecao):
+        self.colecao = colecao
+
+    def listar_ids(self) -> List[str]:
+        return list(self.colecao.get(include=[])['ids'])
+
+    def obter(self, ids: List[str]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        dados = self.colecao.get(ids=list(ids), include=['documents', 'metadatas'])
+        registros = []
+        for registro_id, documento, meta in zip(dados['ids'], dados['documents'], dados['metadatas']):
+            meta = meta or {}
+            tags = meta.get('tags', [])
+            if isinstance(tags, str):
+                tags = [t for t in tags.split(',') if t]
+            timestamp = meta.get('timestamp', '')
+            registros.append({
+                'id': registro_id,
+                'conteudo': documento or '',
+                'tags': list(tags),
+                'importancia': float(meta.get('importancia', 0.5)),
+                'mencoes': int(meta.get('mencoes', 1)),
+                'timestamp': timestamp,
+                'ultima_mencao': meta.get('ultima_mencao', timestamp),
+                'tipo': meta.get('tipo', 'evento'),
+            })
+        return registros
+
+    def mesclar(self, canonico_id: str, campos: Dict[str, Any], mesclados: List[str]) -> None:
+        meta = {
+            'importancia': campos['importancia'],
+            'mencoes': campos['mencoes'],
+            'ultima_mencao': campos['ultima_mencao'],
+            'tags': ','.join(campos['tags']),
+        }
+        self.colecao.update(ids=[canonico_id], metadatas=[meta])
+
+    def remover(self, ids: List[str]) -> None:
+        if ids:
+            self.colecao.delete(ids=list(ids))
+
+    def registrar_resumo(self, chave: str, conteudo: str, metadados: Dict[str, Any]) -> None:
+        meta = dict(metadados)
+        meta['tags'] = ','.join(meta.get('tags', []))
+        self.colecao.upsert(ids=[f"resumo-{chave}"], documents=[conteudo], metadatas=[meta])
+
+
+# === Consolidador ===
+
+class ConsolidadorMemoria:
+    """Ciclos de consolidacao em fatias de tempo, retomaveis (ver docstring do modulo)."""
+
+    def __init__(
+        self,
+        fonte: Any,
+        diretorio: str,
+        config: Optional[Dict[str, Any]] = None,
+        codificar: Optional[Callable[[List[str]], Any]] = None,
+        consultar: Optional[Callable[[str, int], Any]] = None,
+        trava: Any = None,
+        frio: Any = None,
+        manter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        ao_remover: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ):
+        """
+        :param fonte: Armazenamento consolidado (ver docstring do modulo).
+        :param diretorio: Onde ficam ``estado.json``, os periodos anotados e o arquivo frio.
+        :param config: Sobrescreve valores de ``CONFIG_PADRAO``.
+        :param codificar: Textos -> embeddings, para confirmar quase-duplicatas por cosseno.
+        :param consultar: (texto, k) -> resultados; usado nas sondas de latencia.
+        :param trava: Contexto (ex.: ``threading.RLock``) segurado durante cada unidade
+            de trabalho, compartilhado com quem escreve na fonte.
+        :param frio: Destino do que sai da fonte, com a interface do ``ArquivoFrio``
+            (ex.: ``CamadaFria``); None = ``ArquivoFrio`` em ``diretorio/frio``.
+        :param manter: Registro -> True para nao arquiva-lo nem resumi-lo
+            (ex.: ``MemoriaEmCamadas.manter_morno``).
+        :param ao_remover: Chamado com os registros (ao menos 'conteudo') que sairam
+            da fonte por mesclagem, arquivo ou resumo, inclusive ao refazer uma
+            operacao interrompida (ex.: ``MemoriaEmCamadas.descartar``).
+        """
+        self.fonte = fonte
+        self.diretorio = diretorio
+        self.config = {**CONFIG_PADRAO, **(config or {})}
+        self.codificar = codificar
+        self.consultar = consultar
+        self.trava = trava if trava is not None else nullcontext()
+        os.makedirs(diretorio, exist_ok=True)
+        self.frio = frio if frio is not None else ArquivoFrio(os.path.join(diretorio, 'frio'))
+        self.manter = manter
+        self.ao_remover = ao_remover
+        self._caminho_estado = os.path.join(diretorio, 'estado.json')
+        self._caminho_periodos = os.path.join(diretorio, 'periodos.jsonl')
+
+        self.estado = self._carregar_estado()
+        self._ids: Optional[List[str]] = None
+        self._deduplicador: Optional[DeduplicadorLSH] = None
+        self._canonicos: Dict[str, str] = {}
+
+        self._thread: Optional[threading.Thread] = None
+        self._parar = threading.Event()
+        self._sinal = threading.Event()
+        self.fatias = 0
+        self.falhas = 0
+
+        if self.estado.get('pendente'):
+            logger.info(f"Consolidacao: refazendo operacao interrompida ({self.estado['pendente']['op']})")
+            self._aplicar(self.estado['pendente'])
+            self.estado['pendente'] = None
+            self._salvar_estado()
+
+    # === Estado ===
+
+    @staticmethod
+    def _contadores() -> Dict[str, Any]:
+        return {
+            'registros_mesclados': 0,
+            'registros_arquivados': 0,
+            'registros_resumidos': 0,
+            'resumos_criados': 0,
+            'bytes_liberados': 0,
+            'bytes_frio': 0,
+        }
+
+    def _carregar_estado(self) -> Dict[str, Any]:
+        try:
+            with open(self._caminho_estado, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {
+                'ciclo': 0,
+                'fase': 'ocioso',
+                'cursor': None,
+                'pendente': None,
+                'periodos_feitos': [],
+                'sondas': [],
+                'ciclo_atual': self._contadores(),
+                'totais': self._contadores(),
+                'ultimo_ciclo': {},
+            }
+
+    def _salvar_estado(self) -> None:
+        temporario = self._caminho_estado + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.estado, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self._caminho_estado)
+
+    def _contar(self, **valores: int) -> None:
+        for chave, valor in valores.items():
+            self.estado['ciclo_atual'][chave] += valor
+            self.estado['totais'][chave] += valor
+
+    # === Execucao ===
+
+    def iniciar(self) -> None:
+        """Inicia a thread de fundo."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._laco, name="consolidador-memoria", daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout: float = 10.0) -> None:
+        """Encerra a thread ao fim da unidade corrente; o ciclo continua de onde parou na proxima vez."""
+        self._parar.set()
+        self._sinal.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.frio.fechar()
+
+    def sinalizar(self) -> None:
+        """Antecipa o proximo ciclo (ex.: depois de muitas memorias novas)."""
+        self._sinal.set()
+
+    def _laco(self) -> None:
+        while not self._parar.is_set():
+            if self.estado['fase'] == 'ocioso':
+                self._sinal.wait(self.config['intervalo_ciclo_s'])
+                self._sinal.clear()
+                if self._parar.is_set():
+                    return
+            try:
+                self.passo()
+            except Exception as e:
+                self.falhas += 1
+                logger.error(f"Erro na consolidacao de memorias: {e}")
+            self._parar.wait(self.config['pausa_s'])
+
+    def executar_ciclo(self, orcamento_s: Optional[float] = None) -> Dict[str, Any]:
+        """Roda um ciclo inteiro (ou termina o que estiver em curso) na thread atual."""
+        self.passo(orcamento_s)
+        while self.estado['fase'] != 'ocioso':
+            self.passo(orcamento_s)
+        return self.estado['ultimo_ciclo']
+
+    def passo(self, orcamento_s: Optional[float] = None) -> bool:
+        """
+        Executa unidades de trabalho ate esgotar a fatia de tempo.
+
+        :return: True se o ciclo ainda tem trabalho.
+        """
+        prazo = time.monotonic() + (self.config['orcamento_s'] if orcamento_s is None else orcamento_s)
+        self.fatias += 1
+        if self.estado['fase'] == 'ocioso':
+            self._iniciar_ciclo()
+        while self.estado['fase'] != 'ocioso':
+            with self.trava:
+                self._unidade()
+            self._salvar_estado()
+            if time.monotonic() >= prazo:
+                break
+        return self.estado['fase'] != 'ocioso'
+
+    def _iniciar_ciclo(self) -> None:
+        self.estado.update({
+            'ciclo': self.estado['ciclo'] + 1,
+            'fase': FASES_CICLO[0],
+            'cursor': None,
+            'inicio': time.time(),
+            'sondas': [],
+            'latencia_antes_ms': None,
+            'registros_antes': None,
+            'ciclo_atual': self._contadores(),
+        })
+        self._ids = None
+        self._deduplicador = None
+        self._canonicos = {}
+        if os.path.exists(self._caminho_periodos):
+            os.remove(self._caminho_periodos)
+        self._salvar_estado()
+
+    def _avancar_fase(self) -> None:
+        fase = self.estado['fase']
+        proxima = FASES_CICLO.index(fase) + 1
+        self.estado['fase'] = FASES_CICLO[proxima] if proxima < len(FASES_CICLO) else 'ocioso'
+        self.estado['cursor'] = None
+        self._ids = None
+
+    def _unidade(self) -> None:
+        fase = self.estado['fase']
+        if fase == 'sondar_antes':
+            ids = self._snapshot()
+            self.estado['registros_antes'] = len(ids)
+            amostra = random.sample(ids, min(self.config['sondas'], len(ids)))
+            self.estado['sondas'] = [r['conteudo'] for r in self.fonte.obter(amostra)]
+            self.estado['latencia_antes_ms'] = self._sondar()
+            self._avancar_fase()
+        elif fase in ('mesclar', 'arquivar'):
+            lote = self._proximo_lote()
+            if lote is None:
+                self._avancar_fase()
+            elif fase == 'mesclar':
+                self._mesclar_lote(lote)
+            else:
+                self._arquivar_lote(lote)
+        elif fase == 'resumir':
+            if not self._resumir_proximo_periodo():
+                self._avancar_fase()
+        elif fase == 'sondar_depois':
+            self._fechar_ciclo()
+            self._avancar_fase()
+
+    def _snapshot(self) -> List[str]:
+        if self._ids is None:
+            self._ids = sorted(self.fonte.listar_ids())
+        return self._ids
+
+    def _proximo_lote(self) -> Optional[List[Dict[str, Any]]]:
+        """Proximos registros a partir do cursor (ids em ordem); None no fim da fase."""
+        ids = self._snapshot()
+        cursor = self.estado['cursor']
+        inicio = 0 if cursor is None else bisect_right(ids, cursor)
+        if inicio >= len(ids):
+            return None
+        fatia = ids[inicio:inicio + self.config['lote']]
+        self.estado['cursor'] = fatia[-1]
+        return self.fonte.obter(fatia)
+
+    # === Operacoes (idempotentes, registradas em 'pendente') ===
+
+    def _executar(self, operacao: Dict[str, Any]) -> None:
+        self.estado['pendente'] = operacao
+        self._salvar_estado()
+        self._aplicar(operacao)
+        self.estado['pendente'] = None
+
+    def _aplicar(self, operacao: Dict[str, Any]) -> None:
+        op = operacao['op']
+        if op == 'mesclar':
+            self.fonte.mesclar(operacao['canonico'], operacao['campos'], operacao['mesclados'])
+            self.fonte.remover(operacao['mesclados'])
+            removidos = operacao.get('removidos', [])
+        elif op == 'arquivar':
+            self.frio.arquivar(operacao['registros'])
+            self.fonte.remover([r['id'] for r in operacao['registros']])
+            removidos = operacao['registros']
+        elif op == 'resumir':
+            self.frio.arquivar(operacao['registros'])
+            self.fonte.registrar_resumo(operacao['chave'], operacao['conteudo'], operacao['metadados'])
+            self.fonte.remover([r['id'] for r in operacao['registros']])
+            if operacao['periodo'] not in self.estado['periodos_feitos']:
+                self.estado['periodos_feitos'].append(operacao['periodo'])
+            removidos = operacao['registros']
+        if self.ao_remover is not None and removidos:
+            self.ao_remover(removidos)
+
+    # === Mesclar ===
+
+    def _mesclar_lote(self, registros: List[Dict[str, Any]]) -> None:
+        if self._deduplicador is None:
+            self._deduplicador = DeduplicadorLSH(
+                limiar_cosseno=self.config['limiar_cosseno'],
+                limiar_jaccard=self.config['limiar_jaccard'],
+                max_entradas=max(len(self._snapshot()), 1),
+                codificar=self.codificar,
+            )
+        candidatos = [r for r in registros if r['tipo'] != 'resumo']
+        por_id = {r['id']: r for r in candidatos}
+
+        # registro -> registro em que ele sera mesclado (iguais primeiro, depois quase iguais)
+        destino: Dict[str, str] = {}
+        digests: Dict[str, str] = {}
+        longos = []
+        for registro in candidatos:
+            digest = hashlib.blake2b(registro['conteudo'].encode('utf-8'), digest_size=16).hexdigest()
+            canonico = self._canonicos.get(digest)
+            if canonico is not None:
+                destino[registro['id']] = canonico
+                continue
+            self._canonicos[digest] = registro['id']
+            digests[registro['id']] = digest
+            if len(registro['conteudo']) >= self.config['min_caracteres']:
+                longos.append(registro)
+        if longos:
+            achados = self._deduplicador.verificar_lote([r['id'] for r in longos], [r['conteudo'] for r in longos])
+            for registro, achado in zip(longos, achados):
+                if achado is not None:
+                    destino[registro['id']] = achado[0]
+                    self._canonicos[digests[registro['id']]] = achado[0]
+
+        grupos: Dict[str, List[Dict[str, Any]]] = {}
+        for registro_id, alvo in destino.items():
+            while alvo in destino:
+                alvo = destino[alvo]
+            grupos.setdefault(alvo, []).append(por_id[registro_id])
+
+        for canonico_id, duplicatas in grupos.items():
+            canonico = por_id.get(canonico_id)
+            if canonico is None:
+                obtidos = self.fonte.obter([canonico_id])
+                if not obtidos:
+                    continue
+                canonico = obtidos[0]
+            membros = [canonico] + duplicatas
+            campos = {
+                'importancia': max(m['importancia'] for m in membros),
+                'mencoes': sum(m['mencoes'] for m in membros),
+                'ultima_mencao': max(str(m['ultima_mencao'] or m['timestamp']) for m in membros),
+                'tags': list(dict.fromkeys(t for m in membros for t in m['tags'])),
+            }
+            mesclados = [d['id'] for d in duplicatas]
+            # Duplicatas exatas tem o conteudo do canonico, que continua na fonte
+            removidos = [{'conteudo': d['conteudo']} for d in duplicatas if d['conteudo'] != canonico['conteudo']]
+            self._executar({'op': 'mesclar', 'canonico': canonico_id, 'campos': campos, 'mesclados': mesclados,
+                            'removidos': removidos})
+            canonico.update(campos)
+            self._contar(
+                registros_mesclados=len(mesclados),
+                bytes_liberados=sum(_bytes_registro(d, self.config['bytes_embedding']) for d in duplicatas),
+            )
+
+    # === Arquivar ===
+
+    def _arquivar_lote(self, registros: List[Dict[str, Any]]) -> None:
+        agora = datetime.now()
+        limite_arquivo = agora - timedelta(seconds=self.config['idade_arquivo_s'])
+        limite_resumo = agora - timedelta(seconds=self.config['idade_resumo_s'])
+        arquivar, periodos = [], {}
+        for registro in registros:
+            if registro['tipo'] == 'resumo':
+                continue
+            ultima = _instante(registro['ultima_mencao']) or _instante(registro['timestamp'])
+            criado = _instante(registro['timestamp']) or ultima
+            if ultima is None or self._manter(registro):
+                continue
+            if registro['importancia'] < self.config['limiar_importancia'] and ultima < limite_arquivo:
+                arquivar.append(dict(registro, motivo='arquivado', arquivado_em=agora.isoformat()))
+            elif criado < limite_resumo:
+                periodo = chave_periodo(criado, self.config['periodo'])
+                if periodo not in self.estado['periodos_feitos']:
+                    periodos.setdefault(periodo, []).append(registro['id'])
+        if periodos:
+            with open(self._caminho_periodos, 'a', encoding='utf-8') as f:
+                for periodo, ids in periodos.items():
+                    f.write(json.dumps({'periodo': periodo, 'ids': ids}) + '\n')
+        if arquivar:
+            ids_arquivados = {r['id'] for r in arquivar}
+            antes = self.frio.bytes_comprimidos
+            self._executar({'op': 'arquivar', 'registros': arquivar})
+            self._contar(
+                registros_arquivados=len(arquivar),
+                bytes_liberados=sum(_bytes_registro(r, self.config['bytes_embedding']) for r in registros
+                                    if r['id'] in ids_arquivados),
+                bytes_frio=self.frio.bytes_comprimidos - antes,
+            )
+
+    def _manter(self, registro: Dict[str, Any]) -> bool:
+        return self.manter is not None and self.manter(registro)
+
+    # === Resumir ===
+
+    def _periodos_anotados(self) -> Dict[str, List[str]]:
+        periodos: Dict[str, List[str]] = {}
+        if not os.path.exists(self._caminho_periodos):
+            return periodos
+        with open(self._caminho_periodos, encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    item = json.loads(linha)
+                except ValueError:
+                    continue  # linha cortada por uma queda
+                periodos.setdefault(item['periodo'], []).extend(item['ids'])
+        return periodos
+
+    def _resumir_proximo_periodo(self) -> bool:
+        """Resume um periodo pendente; False quando nao ha mais nenhum."""
+        feitos = set(self.estado['periodos_feitos'])
+        for periodo, ids in sorted(self._periodos_anotados().items()):
+            if periodo in feitos:
+                continue
+            # O filtro e refeito aqui: um registro pode ter sido acessado depois de anotado
+            registros = [r for r in self.fonte.obter(list(dict.fromkeys(ids))) if not self._manter(r)]
+            if len(registros) < self.config['min_registros_resumo']:
+                self.estado['periodos_feitos'].append(periodo)
+                return True
+            self._resumir(periodo, registros)
+            return True
+        return False
+
+    def _resumir(self, periodo: str, registros: List[Dict[str, Any]]) -> None:
+        principais = sorted(registros, key=lambda r: (r['importancia'], r['mencoes']), reverse=True)
+        principais = principais[:self.config['itens_resumo']]
+        conteudo = f"Resumo de {periodo} ({len(registros)} memorias): " + "; ".join(
+            r['conteudo'][:120] for r in principais
+        )
+        tags = [t for t, _ in Counter(t for r in registros for t in r['tags']).most_common(5)]
+        metadados = {
+            'tipo': 'resumo',
+            'periodo': periodo,
+            'tags': ['resumo'] + tags,
+            'importancia': max(r['importancia'] for r in registros),
+            'mencoes': sum(r['mencoes'] for r in registros),
+            'registros': len(registros),
+            'timestamp': max(str(r['timestamp']) for r in registros),
+        }
+        agora = datetime.now().isoformat()
+        arquivados = [dict(r, motivo=f"resumido:{periodo}", arquivado_em=agora) for r in registros]
+        antes = self.frio.bytes_comprimidos
+        self._executar({
+            'op': 'resumir',
+            'periodo': periodo,
+            'chave': f"{periodo}:{self.estado['ciclo']}",
+            'conteudo': conteudo,
+            'metadados': metadados,
+            'registros': arquivados,
+        })
+        bytes_resumo = _bytes_registro({'conteudo': conteudo, **metadados}, self.config['bytes_embedding'])
+        self._contar(
+            registros_resumidos=len(registros),
+            resumos_criados=1,
+            bytes_liberados=sum(_bytes_registro(r, self.config['bytes_embedding']) for r in registros) - bytes_resumo,
+            bytes_frio=self.frio.bytes_comprimidos - antes,
+        )
+
+    # === Sondas e relatorio ===
+
+    def _sondar(self) -> Optional[float]:
+        """Mediana (ms) das consultas de sonda, ou None sem ``consultar``."""
+        if self.consultar is None or not self.estado['sondas']:
+            return None
+        tempos = []
+        for texto in self.estado['sondas']:
+            inicio = time.perf_counter()
+            try:
+                self.consultar(texto, self.config['k_sonda'])
+            except Exception as e:
+                logger.error(f"Erro na sonda de latencia: {e}")
+                return None
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        tempos.sort()
+        return tempos[len(tempos) // 2]
+
+    def _fechar_ciclo(self) -> None:
+        antes = self.estado.get('latencia_antes_ms')
+        depois = self._sondar()
+        contadores = self.estado['ciclo_atual']
+        relatorio = {
+            'ciclo': self.estado['ciclo'],
+            'duracao_s': time.time() - self.estado.get('inicio', time.time()),
+            'registros_antes': self.estado.get('registros_antes'),
+            'registros_depois': len(self.fonte.listar_ids()),
+            **contadores,
+            'taxa_compressao_frio': self.frio.estatisticas()['taxa_compressao'],
+            'latencia_antes_ms': antes,
+            'latencia_depois_ms': depois,
+        }
+        if antes is not None and depois is not None:
+            relatorio['economia_latencia_ms'] = antes - depois
+            relatorio['economia_latencia_pct'] = (antes - depois) / antes * 100 if antes else 0.0
+        self.estado['ultimo_ciclo'] = relatorio
+        self._deduplicador = None
+        self._canonicos = {}
+        logger.info(
+            f"Consolidacao {relatorio['ciclo']}: {contadores['registros_mesclados']} mesclados, "
+            f"{contadores['registros_arquivados']} arquivados, {contadores['resumos_criados']} resumos, "
+            f"{contadores['bytes_liberados'] / 1024:.0f} KB liberados"
+        )
+
+    def relatorio(self) -> Dict[str, Any]:
+        """Fase corrente, ultimo ciclo, totais acumulados e o arquivo frio."""
+        return {
+            'ciclo': self.estado['ciclo'],
+            'fase': self.estado['fase'],
+            'fatias': self.fatias,
+            'falhas': self.falhas,
+            'ultimo_ciclo': self.estado['ultimo_ciclo'],
+            'totais': self.estado['totais'],
+            'frio': self.frio.estatisticas(),
+        }
@@ -0,0 +1,241 @@
+"""
+Deteccao de quase-duplicatas para a Memoria Universal: MinHash + LSH.
+
+Cada fato recente vira uma assinatura MinHash (``num_permutacoes`` minimos de
+hashes universais sobre os shingles de caracteres do texto em minusculas e sem
+pontuacao). A assinatura e cortada em ``bandas`` faixas; fatos que coincidem em
+alguma faixa caem no mesmo balde e viram candidatos. So os candidatos sao
+confirmados:
+
+* com ``codificar`` (ex.: ``MemoriaSemantica.encode_many``), por cosseno entre
+  embeddings, que ficam guardados junto de cada fato do indice;
+* sem ele, pela similaridade de Jaccard estimada pelas assinaturas.
+
+Um lote de textos e verificado com uma unica chamada a ``codificar``, so para os
+textos que tem candidatos (e para os candidatos ainda sem embedding). Textos que
+nao sao quase-duplicatas entram no indice, entao repeticoes dentro do proprio lote
+tambem sao detectadas. O indice guarda os ultimos ``max_entradas`` fatos.
+"""
+
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+_PRIMO = (1 << 31) - 1
+_PALAVRA = re.compile(r"\w+")
+
+
+class _Entrada:
+    __slots__ = ('texto', 'assinatura', 'embedding')
+
+    def __init__(self, texto: str, assinatura: np.ndarray):
+        self.texto = texto
+        self.assinatura = assinatura
+        self.embedding: Optional[np.ndarray] = None
+
+
+class DeduplicadorLSH:
+    """Indice MinHash/LSH de fatos recentes com confirmacao por embedding (ver docstring do modulo)."""
+
+    def __init__(
+        self,
+        num_permutacoes: int = 128,
+        bandas: int = 32,
+        tamanho_shingle: int = 4,
+        limiar_cosseno: float = 0.92,
+        limiar_jaccard: float = 0.7,
+        max_entradas: int = 10000,
+        codificar: Optional[Callable[[List[str]], np.ndarray]] = None,
+        semente: int = 1,
+    ):
+        """
+        :param num_permutacoes: Tamanho da assinatura MinHash.
+        :param bandas: Faixas do LSH (divide num_permutacoes). Mais bandas = mais candidatos.
+        :param tamanho_shingle: Caracteres por shingle.
+        :param limiar_cosseno: Cosseno minimo entre embeddings para confirmar a duplicata.
+        :param limiar_jaccard: Jaccard estimado minimo, usado quando nao ha ``codificar``.
+        :param max_entradas: Fatos mantidos no indice.
+        :param codificar: Funcao lista de textos -> matriz de embeddings (None = so MinHash).
+        :param semente: Semente das permutacoes (assinaturas so sao comparaveis com a mesma).
+        """
+        if num_permutacoes % bandas:
+            raise ValueError(f"num_permutacoes ({num_permutacoes}) deve ser multiplo de bandas ({bandas})")
+        self.num_permutacoes = num_permutacoes
+        self.bandas = bandas
+        self.linhas_banda = num_permutacoes // bandas
+        self.tamanho_shingle = tamanho_shingle
+        self.limiar_cosseno = limiar_cosseno
+        self.limiar_jaccard = limiar_jaccard
+        self.max_entradas = max_entradas
+        self.codificar = codificar
+
+        rng = np.random.default_rng(semente)
+        self._a = rng.integers(1, _PRIMO, size=(num_permutacoes, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIMO, size=(num_permutacoes, 1), dtype=np.uint64)
+
+        self._entradas: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._baldes: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bandas)]
+
+        self.consultas = 0
+        self.candidatos_avaliados = 0
+        self.confirmadas = 0
+        self.embeddings_calculados = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return chave in self._entradas
+
+    # === Assinaturas ===
+
+    def _shingles(self, texto: str) -> np.ndarray:
+        texto = " ".join(_PALAVRA.findall(texto.lower()))
+        k = self.tamanho_shingle
+        if len(texto) <= k:
+            partes = {texto}
+        else:
+            partes = {texto[i:i + k] for i in range(len(texto) - k + 1)}
+        return np.fromiter((zlib.crc32(p.encode("utf-8")) % _PRIMO for p in partes),
+                           dtype=np.uint64, count=len(partes))
+
+    def assinatura(self, texto: str) -> np.ndarray:
+        """Assinatura MinHash (uint32) do texto."""
+        hashes = (self._a * self._shingles(texto)[np.newaxis, :] + self._b) % _PRIMO
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def _chaves_bandas(self, assinatura: np.ndarray) -> List[bytes]:
+        r = self.linhas_banda
+        return [assinatura[i * r:(i + 1) * r].tobytes() for i in range(self.bandas)]
+
+    @staticmethod
+    def jaccard_estimado(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(a == b))
+
+    # === Indice ===
+
+    def adicionar(self, chave: Hashable, texto: str, assinatura: Optional[np.ndarray] = None,
+                  embedding: Optional[np.ndarray] = None) -> None:
+        """Insere um fato no indice, despejando o mais antigo se passar de max_entradas."""
+        if chave in self._entradas:
+            self._entradas.move_to_end(chave)
+            return
+        entrada = _Entrada(texto, self.assinatura(texto) if assinatura is None else assinatura)
+        entrada.embedding = embedding
+        self._entradas[chave] = entrada
+        for banda, chave_banda in enumerate(self._chaves_bandas(entrada.assinatura)):
+            self._baldes[banda].setdefault(chave_banda, set()).add(chave)
+        while len(self._entradas) > self.max_entradas:
+            self.remover(next(iter(self._entradas)))
+
+    def remover(self, chave: Hashable) -> None:
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        for banda, chave_banda in enumerate(self._chaves_bandas(entrada.assinatura)):
+            balde = self._baldes[banda].get(chave_banda)
+            if balde is not None:
+                balde.discard(chave)
+                if not balde:
+                    del self._baldes[banda][chave_banda]
+
+    def _candidatos(self, chaves_bandas: List[bytes]) -> Set[Hashable]:
+        candidatos: Set[Hashable] = set()
+        for banda, chave_banda in enumerate(chaves_bandas):
+            balde = self._baldes[banda].get(chave_banda)
+            if balde:
+                candidatos |= balde
+        return candidatos
+
+    # === Verificacao em lote ===
+
+    def verificar_lote(self, chaves: List[Hashable], textos: List[str]) -> List[Optional[Tuple[Hashable, float]]]:
+        """
+        Verifica varios textos de uma vez e indexa os que nao sao quase-duplicatas.
+
+        :param chaves: Identificador de cada texto (ex.: hash do fato).
+        :param textos: Textos a verificar.
+        :return: Para cada texto, (chave do fato parecido, similaridade) ou None.
+        """
+        self.consultas += len(textos)
+        assinaturas = [self.assinatura(texto) for texto in textos]
+        bandas = [self._chaves_bandas(a) for a in assinaturas]
+        embeddings = self._embeddings_necessarios(textos, bandas)
+
+        # Textos aceitos entram no indice na hora, entao os seguintes do lote ja os veem
+        resultado: List[Optional[Tuple[Hashable, float]]] = []
+        por_embedding = self.codificar is not None
+        limiar = self.limiar_cosseno if por_embedding else self.limiar_jaccard
+        for i, (chave, texto) in enumerate(zip(chaves, textos)):
+            melhor: Optional[Tuple[Hashable, float]] = None
+            candidatos = list(self._candidatos(bandas[i]))
+            if candidatos:
+                self.candidatos_avaliados += len(candidatos)
+                if por_embedding:
+                    base = np.stack([self._entradas[c].embedding for c in candidatos])
+                    similaridades = base @ embeddings[i]
+                else:
+                    base = np.stack([self._entradas[c].assinatura for c in candidatos])
+                    similaridades = (base == assinaturas[i]).mean(axis=1)
+                k = int(np.argmax(similaridades))
+                if similaridades[k] >= limiar:
+                    melhor = (candidatos[k], float(similaridades[k]))
+            if melhor is not None:
+                self.confirmadas += 1
+            else:
+                self.adicionar(chave, texto, assinaturas[i], embeddings.get(i))
+            resultado.append(melhor)
+        return resultado
+
+    def _embeddings_necessarios(self, textos: List[str], bandas: List[List[bytes]]) -> Dict[int, np.ndarray]:
+        """
+        Uma unica chamada a ``codificar`` para os textos que colidem com o indice ou
+        entre si e para os candidatos do indice ainda sem embedding (que ficam
+        guardados no indice).
+        """
+        if self.codificar is None:
+            return {}
+        do_lote: Set[int] = set()
+        do_indice: Set[Hashable] = set()
+        baldes_lote: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bandas)]
+        for i, chaves_bandas in enumerate(bandas):
+            candidatos = self._candidatos(chaves_bandas)
+            if candidatos:
+                do_lote.add(i)
+                do_indice.update(c for c in candidatos if self._entradas[c].embedding is None)
+            for banda, chave_banda in enumerate(chaves_bandas):
+                baldes_lote[banda].setdefault(chave_banda, []).append(i)
+        for baldes in baldes_lote:
+            for membros in baldes.values():
+                if len(membros) > 1:
+                    do_lote.update(membros)
+        if not do_lote and not do_indice:
+            return {}
+        ordem_lote = sorted(do_lote)
+        ordem_indice = list(do_indice)
+        vetores = np.asarray(self.codificar([textos[i] for i in ordem_lote] +
+                                            [self._entradas[c].texto for c in ordem_indice]), dtype=np.float32)
+        self.embeddings_calculados += len(vetores)
+        normas = np.linalg.norm(vetores, axis=1, keepdims=True)
+        vetores = np.divide(vetores, normas, out=np.zeros_like(vetores), where=normas > 0)
+        for c, vetor in zip(ordem_indice, vetores[len(ordem_lote):]):
+            self._entradas[c].embedding = vetor
+        return dict(zip(ordem_lote, vetores[:len(ordem_lote)]))
+
+    def texto(self, chave: Hashable) -> Optional[str]:
+        entrada = self._entradas.get(chave)
+        return entrada.texto if entrada is not None else None
+
+    # === Metricas ===
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            'entradas': len(self._entradas),
+            'consultas': self.consultas,
+            'candidatos_avaliados': self.candidatos_avaliados,
+            'confirmadas': self.confirmadas,
+            'embeddings_calculados': self.embeddings_calculados,
+        }
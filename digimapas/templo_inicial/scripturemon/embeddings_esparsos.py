@@ -0,0 +1,238 @@
+"""
+Motor de embeddings esparsos (fallback sem modelo) para a Memoria Semantica.
+
+Quando o SentenceTransformer nao carrega, as notas sao representadas por vetores
+TF-IDF esparsos com o truque de hashing: cada palavra vai para uma coluna fixa
+(hash estavel entre processos) num espaco de largura constante. Assim os vetores
+antigos continuam comparaveis com os novos, por mais notas que sejam adicionadas.
+
+As notas ficam numa matriz CSR crescente (indptr/indices/dados) e a similaridade
+cosseno contra todas as notas e calculada de forma vetorizada. Se o scipy estiver
+instalado, as buscas em lote usam multiplicacao de matrizes esparsas.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
+_PALAVRA = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def _coluna(palavra: str, dimensao: int) -> int:
+    """Coluna de hashing da palavra (LRU limitado: o vocabulario nao cresce sem fim)."""
+    digest = hashlib.blake2b(palavra.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % dimensao
+
+
+def _anexar(buffer: np.ndarray, usado: int, valores: np.ndarray) -> np.ndarray:
+    """Copia ``valores`` para ``buffer[usado:]``, dobrando a capacidade se necessario."""
+    necessario = usado + len(valores)
+    if necessario > len(buffer):
+        novo = np.empty(max(necessario, 2 * len(buffer)), dtype=buffer.dtype)
+        novo[:usado] = buffer[:usado]
+        buffer = novo
+    buffer[usado:necessario] = valores
+    return buffer
+
+
+class MotorTfidfHash:
+    """
+    TF-IDF esparso com colunas por hashing.
+
+    As frequencias de documento sao atualizadas a cada insercao/remocao; o IDF e
+    recalculado nas consultas, entao nao ha vetores "velhos" a reindexar. Remocoes
+    deixam a linha marcada (tombstone) ate a proxima compactacao.
+    """
+
+    def __init__(self, dimensao: int = 2 ** 18):
+        """
+        :param dimensao: Numero fixo de colunas do espaco de hashing.
+        """
+        self.dimensao = dimensao
+        self._df = np.zeros(dimensao, dtype=np.int32)
+
+        self._ids: List[str] = []
+        self._linha: Dict[str, int] = {}
+        self._removidas = np.zeros(64, dtype=bool)
+        self._indptr = np.zeros(65, dtype=np.int64)
+        self._indices = np.empty(1024, dtype=np.int32)
+        self._dados = np.empty(1024, dtype=np.float32)
+        self._linhas = np.empty(1024, dtype=np.int32)
+        self._nnz = 0
+        self._total_removidas = 0
+
+    def __len__(self) -> int:
+        return len(self._linha)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._linha
+
+    # === Vetorizacao ===
+
+    def termos(self, texto: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vetor TF (sublinear, 1 + log tf) esparso do texto.
+
+        :return: Tupla (colunas ordenadas, pesos TF).
+        """
+        colunas = [_coluna(p, self.dimensao) for p in _PALAVRA.findall(texto.lower())]
+        if not colunas:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        unicas, contagens = np.unique(np.asarray(colunas, dtype=np.int32), return_counts=True)
+        return unicas, (1.0 + np.log(contagens)).astype(np.float32)
+
+    def idf(self) -> np.ndarray:
+        """IDF suavizado de todas as colunas para o conjunto atual de documentos."""
+        n = len(self._linha)
+        return (np.log((1.0 + n) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+    def denso(self, texto: str, largura: int = 1024) -> np.ndarray:
+        """Vetor TF-IDF denso do texto, dobrado (colunas modulo ``largura``) para largura fixa."""
+        colunas, tf = self.termos(texto)
+        vetor = np.zeros(largura, dtype=np.float32)
+        np.add.at(vetor, colunas % largura, tf * self.idf()[colunas])
+        return vetor
+
+    # === Insercao e remocao ===
+
+    def adicionar(self, doc_id: str, texto: str) -> None:
+        """Indexa (ou reindexa) um documento."""
+        if doc_id in self._linha:
+            self.remover(doc_id)
+        colunas, tf = self.termos(texto)
+        linha = len(self._ids)
+        self._ids.append(doc_id)
+        self._linha[doc_id] = linha
+        self._removidas = _anexar(self._removidas, linha, np.zeros(1, dtype=bool))
+        self._indices = _anexar(self._indices, self._nnz, colunas)
+        self._dados = _anexar(self._dados, self._nnz, tf)
+        self._linhas = _anexar(self._linhas, self._nnz, np.full(len(colunas), linha, dtype=np.int32))
+        self._nnz += len(colunas)
+        self._indptr = _anexar(self._indptr, linha + 1, np.array([self._nnz]))
+        self._df[colunas] += 1
+
+    def remover(self, doc_id: str) -> None:
+        """Marca o documento como removido e desconta suas frequencias de documento."""
+        linha = self._linha.pop(doc_id, None)
+        if linha is None:
+            return
+        self._removidas[linha] = True
+        self._df[self._indices[self._indptr[linha]:self._indptr[linha + 1]]] -= 1
+        self._total_removidas += 1
+        if self._total_removidas > max(1024, len(self._linha)):
+            self._compactar()
+
+    def _compactar(self) -> None:
+        """Reconstroi a matriz sem as linhas removidas."""
+        vivos = [(doc_id, self._indptr[linha], self._indptr[linha + 1]) for doc_id, linha in self._linha.items()]
+        indices, dados = self._indices, self._dados
+        self._ids, self._linha = [], {}
+        self._removidas = np.zeros(max(64, len(vivos)), dtype=bool)
+        self._indptr = np.zeros(len(self._removidas) + 1, dtype=np.int64)
+        self._nnz, self._total_removidas = 0, 0
+        self._indices = np.empty(max(1024, len(indices)), dtype=np.int32)
+        self._dados = np.empty(len(self._indices), dtype=np.float32)
+        self._linhas = np.empty(len(self._indices), dtype=np.int32)
+        for linha, (doc_id, inicio, fim) in enumerate(vivos):
+            self._ids.append(doc_id)
+            self._linha[doc_id] = linha
+            tamanho = fim - inicio
+            self._indices[self._nnz:self._nnz + tamanho] = indices[inicio:fim]
+            self._dados[self._nnz:self._nnz + tamanho] = dados[inicio:fim]
+            self._linhas[self._nnz:self._nnz + tamanho] = linha
+            self._nnz += tamanho
+            self._indptr[linha + 1] = self._nnz
+
+    # === Similaridade ===
+
+    def _pesos_normalizados(self) -> np.ndarray:
+        """Pesos TF-IDF de todos os nao-zeros, ja divididos pela norma da linha."""
+        indices = self._indices[:self._nnz]
+        linhas = self._linhas[:self._nnz]
+        pesos = self._dados[:self._nnz] * self.idf()[indices]
+        normas = np.sqrt(np.bincount(linhas, weights=pesos * pesos, minlength=len(self._ids)))
+        normas[normas == 0] = 1.0
+        return (pesos / normas[linhas]).astype(np.float32)
+
+    def _sims_linha(self, linha: int, pesos: np.ndarray) -> np.ndarray:
+        """
+        Cosseno da linha contra todas as linhas (O(nnz log termos), vetorizado).
+
+        As colunas da linha ja estao ordenadas, entao cada nao-zero da matriz e
+        localizado nelas com ``searchsorted``; so as colunas em comum contribuem.
+        """
+        inicio, fim = self._indptr[linha], self._indptr[linha + 1]
+        colunas = self._indices[inicio:fim]
+        if not len(colunas):
+            return np.zeros(len(self._ids), dtype=np.float64)
+        indices = self._indices[:self._nnz]
+        posicoes = np.minimum(np.searchsorted(colunas, indices), len(colunas) - 1)
+        comuns = colunas[posicoes] == indices
+        return np.bincount(
+            self._linhas[:self._nnz][comuns],
+            weights=pesos[comuns] * pesos[inicio:fim][posicoes[comuns]],
+            minlength=len(self._ids),
+        )
+
+    def _topk(self, sims: np.ndarray, linhas: np.ndarray, k: int, limiar: float) -> List[List[Tuple[str, float]]]:
+        """Top-k acima do limiar de cada linha de ``sims`` (linhas x documentos)."""
+        sims[np.arange(len(linhas)), linhas] = -np.inf
+        sims[:, self._removidas[:len(self._ids)]] = -np.inf
+        k = min(k, sims.shape[1])
+        topo = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        valores = np.take_along_axis(sims, topo, axis=1)
+        ordem = np.argsort(-valores, axis=1, kind="stable")
+        topo = np.take_along_axis(topo, ordem, axis=1)
+        valores = np.take_along_axis(valores, ordem, axis=1)
+        return [
+            [(self._ids[j], float(v)) for j, v in zip(topo[i], valores[i]) if v >= limiar]
+            for i in range(len(linhas))
+        ]
+
+    def similares(self, doc_id: str, k: int, limiar: float) -> List[Tuple[str, float]]:
+        """Ate k documentos com cosseno >= limiar, em ordem decrescente."""
+        if k <= 0 or len(self._linha) < 2:
+            return []
+        linha = self._linha[doc_id]
+        sims = self._sims_linha(linha, self._pesos_normalizados())[np.newaxis, :]
+        return self._topk(sims, np.array([linha]), k, limiar)[0]
+
+    def similares_em_lote(
+        self, doc_ids: List[str], k: int, limiar: float, orcamento_mb: float = 64.0
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Top-k de varios documentos, em blocos de linhas que cabem em ``orcamento_mb``.
+
+        Com scipy, cada bloco e uma multiplicacao esparsa X[bloco] @ X.T; sem scipy,
+        cada linha do bloco usa o produto vetorizado de ``_sims_linha``.
+        """
+        resultado: Dict[str, List[Tuple[str, float]]] = {doc_id: [] for doc_id in doc_ids}
+        n = len(self._ids)
+        if k <= 0 or len(self._linha) < 2:
+            return resultado
+        pesos = self._pesos_normalizados()
+        matriz: Optional["sp.csr_matrix"] = None
+        if sp is not None:
+            matriz = sp.csr_matrix(
+                (pesos, self._indices[:self._nnz], self._indptr[:n + 1]), shape=(n, self.dimensao)
+            )
+        linhas = np.array([self._linha[doc_id] for doc_id in doc_ids], dtype=np.int64)
+        por_bloco = max(1, int(orcamento_mb * 1024 * 1024) // (n * 8))
+        for inicio in range(0, len(linhas), por_bloco):
+            bloco = linhas[inicio:inicio + por_bloco]
+            if matriz is not None:
+                sims = (matriz[bloco] @ matriz.T).toarray()
+            else:
+                sims = np.stack([self._sims_linha(linha, pesos) for linha in bloco])
+            for linha, pares in zip(bloco, self._topk(sims, bloco, k, limiar)):
+                resultado[self._ids[linha]] = pares
+        return resultado
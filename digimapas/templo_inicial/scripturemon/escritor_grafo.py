@@ -0,0 +1,321 @@
+"""
+Escrita em lote no grafo global (Neo4j) fora do caminho critico do tick.
+
+O ``EscritorGrafoLote`` recebe linhas (dicts) numa fila limitada e uma thread de
+fundo as grava com uma unica consulta ``UNWIND $rows AS row CREATE ...`` por lote.
+Um lote e enviado quando atinge ``tamanho_lote`` linhas ou quando a linha mais
+antiga esta esperando ha ``intervalo_flush`` segundos.
+
+Quando a fila enche, ``enfileirar`` espera ate ``timeout_enfileirar`` (pressao de
+volta no produtor); se ainda assim nao houver espaco, ou se o grafo falhar alem das
+tentativas, a politica decide: ``"descartar"`` conta e descarta as linhas;
+``"disco"`` as acrescenta (JSON por linha) num arquivo de derramamento, reenviado
+automaticamente quando o grafo volta a responder. O reenvio trabalha sobre uma copia
+(``<arquivo>.reenvio``) que so e apagada depois de todos os lotes gravados; se o
+processo cair no meio, a copia e reenviada na proxima vez (entrega ao menos uma vez).
+
+``DriverGrafoLocal`` imita o ``execute_query`` do driver Neo4j e apenas registra as
+consultas, para exercitar o lote sem servidor.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONSULTA_EVENTOS = """
+UNWIND $rows AS row
+CREATE (e:Evento {
+    tipo: row.tipo,
+    conteudo: row.conteudo,
+    origem: row.origem,
+    timestamp: row.timestamp
+})
+"""
+
+POLITICAS_FALHA = ("descartar", "disco")
+
+# Maior espera continua na fila antes de olhar de novo os pedidos de flush/parada
+_FATIA_ESPERA = 0.05
+
+
+class DriverGrafoLocal:
+    """Driver substituto: guarda as consultas recebidas e pode simular queda."""
+
+    def __init__(self):
+        self.consultas: List[tuple] = []
+        self.disponivel = True
+
+    def execute_query(self, query: str, parameters_: Optional[Dict] = None, **kwargs) -> None:
+        if not self.disponivel:
+            raise ConnectionError("Grafo indisponivel (simulado)")
+        parametros = dict(parameters_ or {})
+        parametros.update(kwargs)
+        self.consultas.append((query, parametros))
+
+    @property
+    def linhas_gravadas(self) -> int:
+        return sum(len(p.get("rows", ())) for _, p in self.consultas)
+
+
+class EscritorGrafoLote:
+    """Fila limitada + thread de fundo que grava linhas no grafo em lotes."""
+
+    def __init__(
+        self,
+        driver: Any,
+        consulta: str = CONSULTA_EVENTOS,
+        tamanho_lote: int = 500,
+        intervalo_flush: float = 1.0,
+        capacidade: int = 10000,
+        timeout_enfileirar: float = 0.0,
+        politica_falha: str = "descartar",
+        arquivo_derramamento: Optional[str] = None,
+        tentativas: int = 3,
+        intervalo_reenvio: float = 5.0,
+        ao_gravar: Optional[Callable[[float, int], None]] = None,
+    ):
+        """
+        :param driver: Objeto com ``execute_query(query, **parametros)`` (driver Neo4j).
+        :param consulta: Consulta Cypher que recebe o lote em ``$rows``.
+        :param tamanho_lote: Linhas que disparam um flush.
+        :param intervalo_flush: Espera maxima (segundos) de uma linha antes do flush.
+        :param capacidade: Tamanho maximo da fila de linhas pendentes.
+        :param timeout_enfileirar: Quanto ``enfileirar`` pode bloquear com a fila cheia.
+        :param politica_falha: "descartar" ou "disco" para linhas sem destino.
+        :param arquivo_derramamento: Arquivo JSONL da politica "disco".
+        :param tentativas: Tentativas por lote antes de aplicar a politica de falha.
+        :param intervalo_reenvio: Intervalo entre tentativas de reenviar o derramamento
+            enquanto o grafo estiver fora.
+        :param ao_gravar: Chamado na thread de fundo com (duracao, linhas) de cada lote gravado.
+        """
+        if politica_falha not in POLITICAS_FALHA:
+            raise ValueError(f"Politica de falha desconhecida: {politica_falha}")
+        if politica_falha == "disco" and not arquivo_derramamento:
+            raise ValueError("A politica 'disco' exige arquivo_derramamento")
+        self.driver = driver
+        self.consulta = consulta
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_flush = intervalo_flush
+        self.timeout_enfileirar = timeout_enfileirar
+        self.politica_falha = politica_falha
+        self.arquivo_derramamento = arquivo_derramamento
+        self.tentativas = tentativas
+        self.intervalo_reenvio = intervalo_reenvio
+        self.ao_gravar = ao_gravar
+        self._ultimo_reenvio = 0.0
+
+        self._fila: "queue.Queue[Dict]" = queue.Queue(maxsize=capacidade)
+        self._trava_metricas = threading.Lock()
+        self._pedido_flush = threading.Event()
+        self._flush_concluido = threading.Condition()
+        self._flushes_pedidos = 0
+        self._flushes_atendidos = 0
+        self._parar = threading.Event()
+        self._grafo_ok = True
+
+        self.lotes_gravados = 0
+        self.linhas_gravadas = 0
+        self.linhas_descartadas = 0
+        self.linhas_derramadas = 0
+        self.linhas_reenviadas = 0
+        self.falhas = 0
+        self.tempo_flush_total = 0.0
+        self.ultimo_flush = 0.0
+        self.maior_lote = 0
+
+        self._thread = threading.Thread(target=self._laco, name="escritor-grafo", daemon=True)
+        self._thread.start()
+
+    # === Produtor ===
+
+    def enfileirar(self, linha: Dict) -> bool:
+        """
+        Agenda uma linha para gravacao.
+
+        :return: False se a linha foi descartada ou derramada por falta de espaco.
+        """
+        try:
+            if self.timeout_enfileirar > 0:
+                self._fila.put(linha, timeout=self.timeout_enfileirar)
+            else:
+                self._fila.put_nowait(linha)
+            return True
+        except queue.Full:
+            self._sem_destino([linha])
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Pede a gravacao imediata do que esta na fila e espera o lote sair."""
+        with self._flush_concluido:
+            self._flushes_pedidos += 1
+            alvo = self._flushes_pedidos
+            self._pedido_flush.set()
+            return self._flush_concluido.wait_for(lambda: self._flushes_atendidos >= alvo, timeout)
+
+    def fechar(self, timeout: float = 10.0) -> None:
+        """Grava o que restou na fila e encerra a thread."""
+        self._parar.set()
+        self._pedido_flush.set()
+        self._thread.join(timeout)
+
+    # === Thread de fundo ===
+
+    def _laco(self) -> None:
+        while True:
+            lote = self._coletar_lote()
+            if lote:
+                if not self._gravar(lote):
+                    self._sem_destino(lote)
+            elif self.arquivo_derramamento and (
+                self._grafo_ok or time.monotonic() - self._ultimo_reenvio >= self.intervalo_reenvio
+            ):
+                self._reenviar_derramados()
+            if self._pedido_flush.is_set() and self._fila.empty():
+                self._pedido_flush.clear()
+                with self._flush_concluido:
+                    self._flushes_atendidos = self._flushes_pedidos
+                    self._flush_concluido.notify_all()
+            if self._parar.is_set() and self._fila.empty():
+                return
+
+    def _coletar_lote(self) -> List[Dict]:
+        """Espera a primeira linha e junta as seguintes ate o tamanho ou o prazo do lote."""
+        primeira = self._pegar(time.monotonic() + self.intervalo_flush)
+        if primeira is None:
+            return []
+        lote = [primeira]
+        prazo = time.monotonic() + self.intervalo_flush
+        while len(lote) < self.tamanho_lote:
+            linha = self._pegar(prazo)
+            if linha is None:
+                break
+            lote.append(linha)
+        return lote
+
+    def _pegar(self, prazo: float) -> Optional[Dict]:
+        """
+        Proxima linha da fila ate ``prazo`` (None se nao vier).
+
+        Espera em fatias curtas para que ``flush``/``fechar`` nao aguardem o prazo inteiro.
+        """
+        while True:
+            if self._pedido_flush.is_set():
+                try:
+                    return self._fila.get_nowait()
+                except queue.Empty:
+                    return None
+            espera = prazo - time.monotonic()
+            if espera <= 0:
+                return None
+            try:
+                return self._fila.get(timeout=min(espera, _FATIA_ESPERA))
+            except queue.Empty:
+                continue
+
+    def _gravar(self, lote: List[Dict]) -> bool:
+        """Grava o lote com ate ``tentativas`` tentativas; False se todas falharem."""
+        espera = 0.1
+        for tentativa in range(self.tentativas):
+            inicio = time.monotonic()
+            try:
+                self.driver.execute_query(self.consulta, rows=lote)
+            except Exception as e:
+                self.falhas += 1
+                self._grafo_ok = False
+                logger.warning(f"Falha ao gravar lote de {len(lote)} no grafo (tentativa {tentativa + 1}): {e}")
+                if tentativa + 1 < self.tentativas and not self._parar.is_set():
+                    time.sleep(espera)
+                    espera *= 2
+                continue
+            duracao = time.monotonic() - inicio
+            with self._trava_metricas:
+                self._grafo_ok = True
+                self.lotes_gravados += 1
+                self.linhas_gravadas += len(lote)
+                self.tempo_flush_total += duracao
+                self.ultimo_flush = duracao
+                self.maior_lote = max(self.maior_lote, len(lote))
+            if self.ao_gravar:
+                try:
+                    self.ao_gravar(duracao, len(lote))
+                except Exception as e:
+                    logger.debug(f"Erro no callback ao_gravar: {e}")
+            return True
+        return False
+
+    def _sem_destino(self, linhas: List[Dict]) -> None:
+        """Aplica a politica de falha as linhas que nao couberam ou nao foram gravadas."""
+        with self._trava_metricas:
+            if self.politica_falha == "disco":
+                if not linhas:
+                    return
+                self._derramar(linhas)
+                self.linhas_derramadas += len(linhas)
+            else:
+                self.linhas_descartadas += len(linhas)
+
+    def _derramar(self, linhas: List[Dict]) -> None:
+        """Acrescenta linhas ao arquivo de derramamento (chamado com a trava de metricas)."""
+        with open(self.arquivo_derramamento, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(linha, ensure_ascii=False) + "\n" for linha in linhas))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _reenviar_derramados(self) -> None:
+        """
+        Regrava em lotes as linhas derramadas em disco, se houver.
+
+        Uma copia ``.reenvio`` deixada por uma queda e reenviada antes de novas linhas.
+        Linhas que falharem de novo voltam ao derramamento sem contar como novas.
+        """
+        self._ultimo_reenvio = time.monotonic()
+        reenvio = self.arquivo_derramamento + ".reenvio"
+        with self._trava_metricas:
+            if not os.path.exists(reenvio):
+                if not os.path.exists(self.arquivo_derramamento):
+                    return
+                os.replace(self.arquivo_derramamento, reenvio)
+        with open(reenvio, encoding="utf-8") as f:
+            linhas = []
+            for texto in f:
+                try:
+                    linhas.append(json.loads(texto))
+                except ValueError:
+                    # Ultima linha cortada por uma queda durante o derramamento
+                    logger.warning("Linha invalida ignorada no derramamento do grafo")
+        for inicio in range(0, len(linhas), self.tamanho_lote):
+            lote = linhas[inicio:inicio + self.tamanho_lote]
+            if not self._gravar(lote):
+                with self._trava_metricas:
+                    self._derramar(linhas[inicio:])
+                    os.remove(reenvio)
+                return
+            with self._trava_metricas:
+                self.linhas_reenviadas += len(lote)
+        os.remove(reenvio)
+
+    # === Metricas ===
+
+    def metricas(self) -> Dict[str, Any]:
+        """Contadores de lotes, linhas e tempos de flush."""
+        with self._trava_metricas:
+            return {
+                'fila': self._fila.qsize(),
+                'capacidade': self._fila.maxsize,
+                'lotes_gravados': self.lotes_gravados,
+                'linhas_gravadas': self.linhas_gravadas,
+                'linhas_descartadas': self.linhas_descartadas,
+                'linhas_derramadas': self.linhas_derramadas,
+                'linhas_reenviadas': self.linhas_reenviadas,
+                'falhas': self.falhas,
+                'maior_lote': self.maior_lote,
+                'ultimo_flush_s': self.ultimo_flush,
+                'flush_medio_s': self.tempo_flush_total / self.lotes_gravados if self.lotes_gravados else 0.0,
+                'grafo_disponivel': self._grafo_ok,
+            }
@@ -0,0 +1,195 @@
+"""
+Processamento de eventos em faixas, uma por tipo de evento.
+
+Cada faixa (``"sistema"``, ``"ritual"``, ``"global"``, ``"mensagem"``, ``"local"``...)
+tem a sua ``FilaEventos``, um peso e um SLO de latencia (segundos entre entrar na
+fila e terminar de ser processado). Uma enxurrada de movimentos na faixa
+``local`` nao atrasa mais os eventos de sistema ou de ritual.
+
+Drenagem por tick (``drenar(limite)``):
+
+* com ``limite``, cada faixa com eventos recebe uma cota proporcional ao seu peso
+  (deficit round robin: a fracao nao usada de uma cota fica de credito para o
+  proximo tick). A cota que uma faixa nao consegue usar, e a sobra do
+  arredondamento, vai para as demais, a comecar pela de maior credito restante;
+* sem ``limite``, tudo o que estava nas filas e drenado;
+* faixas cujo evento mais antigo ja estourou o SLO vem primeiro no lote; as
+  outras seguem por ordem de peso.
+
+O consumidor chama ``concluir(faixa, entrada)`` depois de processar cada evento,
+o que alimenta a janela de latencia da faixa e a contagem de violacoes do SLO.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .fila_eventos import FilaEventos
+    from .perfil_ticks import JanelaMovel
+except ImportError:
+    from fila_eventos import FilaEventos
+    from perfil_ticks import JanelaMovel
+
+
+class Faixa:
+    """Fila, peso, SLO e medidas de uma faixa."""
+
+    __slots__ = ('nome', 'fila', 'peso', 'slo', 'credito', 'latencias', 'processados', 'violacoes_slo')
+
+    def __init__(self, nome: str, fila: FilaEventos, peso: float, slo: Optional[float], janela: int):
+        self.nome = nome
+        self.fila = fila
+        self.peso = peso
+        self.slo = slo
+        self.credito = 0.0
+        self.latencias = JanelaMovel(janela)
+        self.processados = 0
+        self.violacoes_slo = 0
+
+    def espera_mais_antigo(self, agora: float) -> float:
+        primeiro = self.fila.espiar()
+        return agora - primeiro[0] if primeiro is not None else 0.0
+
+
+class FaixasEventos:
+    """Filas por tipo de evento com drenagem ponderada (ver docstring do modulo)."""
+
+    def __init__(
+        self,
+        pesos: Dict[str, float],
+        slos: Optional[Dict[str, float]] = None,
+        capacidade: int = 10000,
+        politica: str = "descartar_antigo",
+        janela: int = 1024,
+    ):
+        """
+        :param pesos: faixa -> peso na drenagem. Faixas nao listadas sao criadas com peso 1.
+        :param slos: faixa -> latencia maxima desejada, em segundos (sem SLO se ausente).
+        :param capacidade: Capacidade da fila de cada faixa.
+        :param politica: Politica de transbordo das filas (ver fila_eventos.py).
+        :param janela: Amostras de latencia mantidas por faixa.
+        """
+        self.capacidade = capacidade
+        self.politica = politica
+        self.janela = janela
+        self.slos = dict(slos or {})
+        self._trava = threading.Lock()
+        self.faixas: Dict[str, Faixa] = {}
+        for nome, peso in pesos.items():
+            self._criar_faixa(nome, peso)
+
+    def _criar_faixa(self, nome: str, peso: float = 1.0) -> Faixa:
+        with self._trava:
+            faixa = self.faixas.get(nome)
+            if faixa is None:
+                fila = FilaEventos(self.capacidade, self.politica)
+                faixa = Faixa(nome, fila, peso, self.slos.get(nome), self.janela)
+                self.faixas = {**self.faixas, nome: faixa}
+            return faixa
+
+    def _faixa(self, nome: str) -> Faixa:
+        faixa = self.faixas.get(nome)
+        return faixa if faixa is not None else self._criar_faixa(nome)
+
+    def __len__(self) -> int:
+        return sum(len(faixa.fila) for faixa in self.faixas.values())
+
+    # === Produtores ===
+
+    def colocar(self, faixa: str, item: Any, bloquear: bool = True) -> bool:
+        """
+        Enfileira ``item`` na faixa (de qualquer thread). False se foi descartado.
+        ``bloquear=False``: ver ``FilaEventos.colocar``.
+        """
+        return self._faixa(faixa).fila.colocar((time.monotonic(), item), bloquear)
+
+    async def colocar_async(self, faixa: str, item: Any) -> bool:
+        """Versao para corrotinas (espera sem travar o loop na politica "bloquear")."""
+        return await self._faixa(faixa).fila.colocar_async((time.monotonic(), item))
+
+    # === Consumidor ===
+
+    def _cotas(self, ativas: List[Faixa], limite: int) -> Dict[str, int]:
+        """Deficit round robin: cota por peso, credito acumulado e sobra redistribuida."""
+        soma_pesos = sum(faixa.peso for faixa in ativas)
+        cotas = {}
+        for faixa in ativas:
+            faixa.credito += limite * faixa.peso / soma_pesos
+            cotas[faixa.nome] = min(len(faixa.fila), int(faixa.credito))
+        sobra = limite - sum(cotas.values())
+        # Arredondamento e cota nao usada: primeiro para quem ficou com mais credito,
+        # para que faixas de mesmo peso se revezem na sobra
+        for faixa in sorted(ativas, key=lambda f: (cotas[f.nome] - f.credito, -f.peso)):
+            if sobra <= 0:
+                break
+            extra = min(sobra, len(faixa.fila) - cotas[faixa.nome])
+            cotas[faixa.nome] += extra
+            sobra -= extra
+        for faixa in ativas:
+            faixa.credito = max(0.0, faixa.credito - cotas[faixa.nome])
+        return cotas
+
+    def drenar(self, limite: Optional[int] = None) -> List[Tuple[str, float, Any]]:
+        """
+        Retira o lote do tick.
+
+        :param limite: Maximo de eventos no lote (None = todos os presentes).
+        :return: Lista de (faixa, instante de entrada, item) na ordem de processamento.
+        """
+        ativas = [faixa for faixa in self.faixas.values() if len(faixa.fila)]
+        if not ativas:
+            return []
+        cotas = self._cotas(ativas, limite) if limite is not None else None
+
+        agora = time.monotonic()
+        ordem = sorted(ativas, key=lambda f: (
+            not (f.slo is not None and f.espera_mais_antigo(agora) >= f.slo), -f.peso
+        ))
+        lote = []
+        for faixa in ordem:
+            cota = None if cotas is None else cotas[faixa.nome]
+            if cota == 0:
+                continue
+            nome = faixa.nome
+            lote.extend((nome, entrada, item) for entrada, item in faixa.fila.drenar(cota))
+        # Faixas que esvaziaram nao guardam credito
+        for faixa in ativas:
+            if not len(faixa.fila):
+                faixa.credito = 0.0
+        return lote
+
+    def concluir(self, faixa: str, entrada: float) -> float:
+        """Registra o fim do processamento de um evento; devolve a latencia."""
+        latencia = time.monotonic() - entrada
+        registro = self.faixas[faixa]
+        registro.latencias.registrar(latencia)
+        registro.processados += 1
+        if registro.slo is not None and latencia > registro.slo:
+            registro.violacoes_slo += 1
+        return latencia
+
+    def copia(self) -> List[Any]:
+        """Itens pendentes de todas as faixas, sem retira-los."""
+        return [item for faixa in self.faixas.values() for _, item in faixa.fila.copia()]
+
+    # === Metricas ===
+
+    def metricas(self) -> Dict[str, Dict[str, Any]]:
+        """Por faixa: profundidade, espera do mais antigo, latencia (p50/p95/p99), SLO."""
+        agora = time.monotonic()
+        metricas = {}
+        for nome, faixa in self.faixas.items():
+            fila = faixa.fila.metricas()
+            latencia = faixa.latencias.resumo()
+            metricas[nome] = {
+                'profundidade': fila['profundidade'],
+                'descartados': fila['descartados'],
+                'processados': faixa.processados,
+                'peso': faixa.peso,
+                'slo_s': faixa.slo,
+                'violacoes_slo': faixa.violacoes_slo,
+                'espera_mais_antigo_s': faixa.espera_mais_antigo(agora),
+                'latencia': latencia,
+            }
+        return metricas
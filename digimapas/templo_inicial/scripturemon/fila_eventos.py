@@ -0,0 +1,180 @@
+"""
+Fila de eventos do Orquestrador Geral: varios produtores, drenagem em lote.
+
+``FilaEventos`` e uma ``deque`` limitada que pode ser usada ao mesmo tempo por
+threads (agentes no thread pool, escritor do grafo, API) e por corrotinas do event
+loop. ``append`` e ``popleft`` de ``deque`` sao atomicos no CPython, entao o
+caminho comum -- colocar com espaco sobrando, drenar o que houver -- nao toma
+trava. A trava so entra no transbordo e na contabilidade da drenagem.
+
+Politicas de transbordo (fila cheia):
+
+* ``"descartar_antigo"`` -- o evento novo entra e o mais antigo sai;
+* ``"descartar_novo"`` -- o evento novo e recusado;
+* ``"bloquear"`` -- o produtor espera espaco ate ``timeout_bloqueio`` e entao
+  descarta o evento novo. Corrotinas devem usar ``colocar_async``, que espera sem
+  bloquear o loop. Produtores que sao tambem o consumidor (o proprio tick) passam
+  ``bloquear=False`` a ``colocar`` e, com a fila cheia, tem o evento recusado em
+  vez de esperarem por si mesmos.
+
+Com varios produtores simultaneos, o limite de ``"descartar_novo"`` e
+``"bloquear"`` pode ser excedido por alguns itens (a verificacao de espaco e o
+``append`` nao sao uma operacao so).
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+POLITICAS_TRANSBORDO = ("descartar_antigo", "descartar_novo", "bloquear")
+
+
+class FilaEventos:
+    """Fila MPMC limitada, segura entre threads e corrotinas (ver docstring do modulo)."""
+
+    def __init__(self, capacidade: int = 10000, politica: str = "descartar_antigo",
+                 timeout_bloqueio: float = 1.0):
+        """
+        :param capacidade: Eventos retidos no maximo.
+        :param politica: O que fazer com a fila cheia (``POLITICAS_TRANSBORDO``).
+        :param timeout_bloqueio: Espera maxima de um produtor na politica "bloquear".
+        """
+        if politica not in POLITICAS_TRANSBORDO:
+            raise ValueError(f"Politica de transbordo desconhecida: {politica}")
+        self.capacidade = capacidade
+        self.politica = politica
+        self.timeout_bloqueio = timeout_bloqueio
+        # Em "descartar_antigo" a propria deque descarta o mais antigo, atomicamente
+        self._itens: Deque[Any] = deque(maxlen=capacidade if politica == "descartar_antigo" else None)
+        self._trava = threading.Lock()
+        self._espaco = threading.Condition(self._trava)
+        self._esperando = 0
+
+        self.drenados = 0
+        self.descartados = 0
+        self.bloqueios = 0
+        self.maior_lote = 0
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def vazia(self) -> bool:
+        return not self._itens
+
+    # === Produtores ===
+
+    def colocar(self, item: Any, bloquear: bool = True) -> bool:
+        """
+        Acrescenta um item (de qualquer thread; em corrotinas, so fora da politica
+        "bloquear").
+
+        :param bloquear: False faz a politica "bloquear" recusar o item na hora, como
+            "descartar_novo" (para produtores que rodam no consumidor).
+        :return: False se o item foi descartado.
+        """
+        itens = self._itens
+        if len(itens) < self.capacidade:
+            itens.append(item)
+            return True
+        return self._transbordar(item, bloquear)
+
+    def colocar_lote(self, lote: Iterable[Any]) -> int:
+        """
+        Acrescenta varios itens.
+
+        :return: Quantos foram aceitos.
+        """
+        lote = list(lote)
+        if len(self._itens) + len(lote) <= self.capacidade:
+            self._itens.extend(lote)
+            return len(lote)
+        return sum(self.colocar(item) for item in lote)
+
+    async def colocar_async(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Como ``colocar``, mas na politica "bloquear" espera espaco sem travar o loop."""
+        if self.politica != "bloquear" or len(self._itens) < self.capacidade:
+            return self.colocar(item)
+        prazo = time.monotonic() + (self.timeout_bloqueio if timeout is None else timeout)
+        espera = 0.001
+        with self._trava:
+            self.bloqueios += 1
+        while len(self._itens) >= self.capacidade:
+            if time.monotonic() >= prazo:
+                with self._trava:
+                    self.descartados += 1
+                return False
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 0.05)
+        self._itens.append(item)
+        return True
+
+    def _transbordar(self, item: Any, bloquear: bool = True) -> bool:
+        """Fila cheia: aplica a politica de transbordo."""
+        with self._espaco:
+            if self.politica == "descartar_antigo":
+                self.descartados += 1
+                self._itens.append(item)
+                return True
+            if self.politica == "descartar_novo" or not bloquear:
+                self.descartados += 1
+                return False
+
+            self.bloqueios += 1
+            self._esperando += 1
+            try:
+                if self._espaco.wait_for(lambda: len(self._itens) < self.capacidade, self.timeout_bloqueio):
+                    self._itens.append(item)
+                    return True
+            finally:
+                self._esperando -= 1
+            self.descartados += 1
+            return False
+
+    # === Consumidores ===
+
+    def drenar(self, max_itens: Optional[int] = None) -> List[Any]:
+        """
+        Retira de uma vez os itens presentes agora (ou ate ``max_itens``), em ordem
+        de chegada. Itens colocados durante a drenagem ficam para a proxima.
+        """
+        itens = self._itens
+        quantidade = len(itens) if max_itens is None else min(max_itens, len(itens))
+        lote = []
+        retirar = itens.popleft
+        try:
+            for _ in range(quantidade):
+                lote.append(retirar())
+        except IndexError:
+            pass  # outro consumidor levou o resto
+        if lote:
+            with self._espaco:
+                self.drenados += len(lote)
+                self.maior_lote = max(self.maior_lote, len(lote))
+                if self._esperando:
+                    self._espaco.notify_all()
+        return lote
+
+    def espiar(self) -> Any:
+        """O item mais antigo, sem retira-lo (None se vazia)."""
+        try:
+            return self._itens[0]
+        except IndexError:
+            return None
+
+    def copia(self) -> List[Any]:
+        """Itens pendentes, sem retira-los (ex.: para checkpoints)."""
+        return list(self._itens)
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._trava:
+            return {
+                'profundidade': len(self._itens),
+                'capacidade': self.capacidade,
+                'politica': self.politica,
+                'drenados': self.drenados,
+                'descartados': self.descartados,
+                'bloqueios': self.bloqueios,
+                'maior_lote': self.maior_lote,
+            }
@@ -0,0 +1,491 @@
+"""
+Indices de vizinhos mais proximos (ANN) para a Memoria Semantica.
+
+Todos os indices trabalham com vetores float32 L2-normalizados e similaridade por
+produto interno (= cosseno). Implementacoes:
+
+- ``IndiceExato``: busca exaustiva, referencia para medir recall.
+- ``IndiceIVFFlat``: listas invertidas sobre centroides de k-means esferico, em NumPy puro.
+- ``IndiceHNSW``: grafo HNSW via ``hnswlib``, quando a biblioteca esta instalada.
+
+Use ``criar_indice`` para escolher a implementacao pela configuracao e
+``recall_em_k`` para comparar um indice aproximado com a busca exata.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+
+def _anexar_linhas(buffer: Optional[np.ndarray], usado: int, linhas: np.ndarray) -> np.ndarray:
+    """Copia ``linhas`` para ``buffer[usado:]``, dobrando a capacidade quando necessario."""
+    necessario = usado + len(linhas)
+    if buffer is None or necessario > len(buffer):
+        capacidade = max(64, necessario, 0 if buffer is None else 2 * len(buffer))
+        novo = np.empty((capacidade,) + linhas.shape[1:], dtype=linhas.dtype)
+        if buffer is not None:
+            novo[:usado] = buffer[:usado]
+        buffer = novo
+    buffer[usado:necessario] = linhas
+    return buffer
+
+
+def _top_k(sims: np.ndarray, k: int) -> np.ndarray:
+    """Posicoes dos k maiores valores de ``sims``, em ordem decrescente."""
+    k = min(k, len(sims))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    topo = np.argpartition(-sims, k - 1)[:k]
+    return topo[np.argsort(-sims[topo], kind="stable")]
+
+
+class IndiceANN:
+    """
+    Interface dos indices de vizinhos mais proximos.
+
+    Os ids sao strings (IDs de nota). ``remover`` apenas marca o id como apagado
+    (tombstone); o espaco e recuperado quando a implementacao compacta ou reconstroi.
+    """
+
+    tipo = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, doc_id: str) -> bool:
+        raise NotImplementedError
+
+    def ids(self) -> List[str]:
+        """IDs vivos no indice."""
+        raise NotImplementedError
+
+    def adicionar(self, ids: List[str], vetores: np.ndarray) -> None:
+        """Insere vetores normalizados; ids ja existentes sao substituidos."""
+        raise NotImplementedError
+
+    def remover(self, doc_id: str) -> None:
+        """Marca o id como removido (sem efeito se ausente)."""
+        raise NotImplementedError
+
+    def buscar(self, vetor: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Ate k pares (id, similaridade) em ordem decrescente de similaridade."""
+        raise NotImplementedError
+
+    def salvar(self, diretorio: str) -> None:
+        """Grava o indice em ``diretorio``."""
+        raise NotImplementedError
+
+    @classmethod
+    def carregar(cls, diretorio: str) -> "IndiceANN":
+        """Le um indice gravado por ``salvar``."""
+        raise NotImplementedError
+
+    def _salvar_meta(self, diretorio: str, extra: Dict) -> None:
+        os.makedirs(diretorio, exist_ok=True)
+        meta = {"tipo": self.tipo, "dim": self.dim}
+        meta.update(extra)
+        temporario = os.path.join(diretorio, "meta.json.tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(temporario, os.path.join(diretorio, "meta.json"))
+
+
+class _IndicePlano(IndiceANN):
+    """Base para indices que guardam os vetores numa matriz crescente com tombstones."""
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self._vetores: Optional[np.ndarray] = None
+        self._removidos: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._linha: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._linha)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._linha
+
+    def ids(self) -> List[str]:
+        return list(self._linha.keys())
+
+    def _anexar(self, ids: List[str], vetores: np.ndarray) -> np.ndarray:
+        """Acrescenta linhas (substituindo ids repetidos) e retorna as posicoes novas."""
+        for doc_id in ids:
+            self.remover(doc_id)
+        inicio = len(self._ids)
+        vetores = np.asarray(vetores, dtype=np.float32).reshape(len(ids), self.dim)
+        self._vetores = _anexar_linhas(self._vetores, inicio, vetores)
+        self._removidos = _anexar_linhas(self._removidos, inicio, np.zeros(len(ids), dtype=bool))
+        for deslocamento, doc_id in enumerate(ids):
+            self._ids.append(doc_id)
+            self._linha[doc_id] = inicio + deslocamento
+        return np.arange(inicio, inicio + len(ids))
+
+    def remover(self, doc_id: str) -> None:
+        linha = self._linha.pop(doc_id, None)
+        if linha is not None:
+            self._removidos[linha] = True
+
+    def _buscar_em(self, linhas: Optional[np.ndarray], vetor: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Busca exaustiva restrita a ``linhas`` (None = todas)."""
+        n = len(self._ids)
+        if n == 0:
+            return []
+        if linhas is None:
+            sims = self._vetores[:n] @ vetor
+            sims[self._removidos[:n]] = -np.inf
+            escolhidas = _top_k(sims, k)
+            return [(self._ids[i], float(sims[i])) for i in escolhidas if np.isfinite(sims[i])]
+        linhas = linhas[~self._removidos[linhas]]
+        sims = self._vetores[linhas] @ vetor
+        escolhidas = _top_k(sims, k)
+        return [(self._ids[linhas[i]], float(sims[i])) for i in escolhidas]
+
+
+class IndiceExato(_IndicePlano):
+    """Busca exaustiva por produto interno sobre todos os vetores."""
+
+    tipo = "exato"
+
+    def adicionar(self, ids: List[str], vetores: np.ndarray) -> None:
+        self._anexar(ids, vetores)
+
+    def buscar(self, vetor: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        return self._buscar_em(None, np.asarray(vetor, dtype=np.float32), k)
+
+    def salvar(self, diretorio: str) -> None:
+        _salvar_plano(self, diretorio, {})
+        self._salvar_meta(diretorio, {})
+
+    @classmethod
+    def carregar(cls, diretorio: str) -> "IndiceExato":
+        meta, dados = _ler_plano(diretorio)
+        indice = cls(meta["dim"])
+        indice.adicionar(dados["ids"].tolist(), dados["vetores"])
+        return indice
+
+
+class IndiceIVFFlat(_IndicePlano):
+    """
+    IVF-flat: cada vetor vai para a lista do centroide mais proximo; a busca visita
+    apenas as ``nprobe`` listas mais proximas da consulta.
+
+    Enquanto houver menos de ``treinar_com`` vetores, a busca e exaustiva. O k-means
+    e refeito quando o indice cresce ``fator_retreino`` vezes desde o ultimo treino.
+    """
+
+    tipo = "ivf"
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        treinar_com: int = 1024,
+        fator_retreino: float = 4.0,
+        semente: int = 0,
+    ):
+        """
+        :param dim: Dimensao dos vetores.
+        :param nlist: Numero de listas; None usa sqrt(n) no momento do treino.
+        :param nprobe: Numero de listas visitadas por consulta.
+        :param treinar_com: Numero minimo de vetores para treinar os centroides.
+        :param fator_retreino: Crescimento que dispara um novo treino.
+        :param semente: Semente do k-means.
+        """
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.treinar_com = treinar_com
+        self.fator_retreino = fator_retreino
+        self.semente = semente
+        self.centroides: Optional[np.ndarray] = None
+        self._treinado_com = 0
+        self._listas: List[List[int]] = []
+
+    def adicionar(self, ids: List[str], vetores: np.ndarray) -> None:
+        linhas = self._anexar(ids, vetores)
+        if self.centroides is None:
+            if len(self) >= self.treinar_com:
+                self.treinar()
+        elif len(self) >= self.fator_retreino * self._treinado_com:
+            self.treinar()
+        else:
+            self._distribuir(linhas)
+
+    def treinar(self) -> None:
+        """(Re)calcula os centroides com k-means esferico e redistribui todos os vetores."""
+        self._compactar()
+        n = len(self._ids)
+        if n == 0:
+            return
+        nlist = min(n, self.nlist or max(1, int(np.sqrt(n))))
+        rng = np.random.default_rng(self.semente)
+        amostra = self._vetores[rng.choice(n, min(n, 256 * nlist), replace=False)]
+        self.centroides = _kmeans_esferico(amostra, nlist, rng)
+        self._treinado_com = n
+        self._listas = [[] for _ in range(nlist)]
+        self._distribuir(np.arange(n))
+
+    def _distribuir(self, linhas: np.ndarray) -> None:
+        atribuicoes = np.argmax(self._vetores[linhas] @ self.centroides.T, axis=1)
+        for linha, lista in zip(linhas, atribuicoes):
+            self._listas[lista].append(int(linha))
+
+    def _compactar(self) -> None:
+        """Descarta as linhas removidas (os ids sobreviventes mudam de posicao)."""
+        if self._removidos is None or not self._removidos[:len(self._ids)].any():
+            return
+        vivos = list(self._linha.items())
+        vetores = self._vetores[[linha for _, linha in vivos]]
+        self._vetores, self._removidos, self._ids, self._linha = None, None, [], {}
+        if vivos:
+            self._anexar([doc_id for doc_id, _ in vivos], vetores)
+
+    def remover(self, doc_id: str) -> None:
+        super().remover(doc_id)
+        # Muitas tombstones: reconstroi as listas sem elas
+        if self.centroides is not None and len(self._ids) > 2 * max(len(self), self.treinar_com):
+            self.treinar()
+
+    def buscar(self, vetor: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        vetor = np.asarray(vetor, dtype=np.float32)
+        if self.centroides is None:
+            return self._buscar_em(None, vetor, k)
+        proximas = _top_k(self.centroides @ vetor, self.nprobe)
+        linhas = np.fromiter(
+            (linha for lista in proximas for linha in self._listas[lista]), dtype=np.int64
+        )
+        return self._buscar_em(linhas, vetor, k)
+
+    def salvar(self, diretorio: str) -> None:
+        self._compactar()
+        if self.centroides is not None:
+            # As posicoes mudam na compactacao: refaz as listas antes de gravar
+            self._listas = [[] for _ in range(len(self.centroides))]
+            self._distribuir(np.arange(len(self._ids)))
+        extra = {} if self.centroides is None else {"centroides": self.centroides}
+        _salvar_plano(self, diretorio, extra)
+        self._salvar_meta(diretorio, {
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "treinar_com": self.treinar_com,
+            "fator_retreino": self.fator_retreino,
+            "treinado_com": self._treinado_com,
+            "semente": self.semente,
+        })
+
+    @classmethod
+    def carregar(cls, diretorio: str) -> "IndiceIVFFlat":
+        meta, dados = _ler_plano(diretorio)
+        indice = cls(
+            meta["dim"],
+            nlist=meta.get("nlist"),
+            nprobe=meta.get("nprobe", 8),
+            treinar_com=meta.get("treinar_com", 1024),
+            fator_retreino=meta.get("fator_retreino", 4.0),
+            semente=meta.get("semente", 0),
+        )
+        indice._anexar(dados["ids"].tolist(), dados["vetores"])
+        if "centroides" in dados:
+            indice.centroides = dados["centroides"]
+            indice._treinado_com = meta.get("treinado_com", len(indice))
+            indice._listas = [[] for _ in range(len(indice.centroides))]
+            indice._distribuir(np.arange(len(indice)))
+        return indice
+
+
+class IndiceHNSW(IndiceANN):
+    """Grafo HNSW (hnswlib) com produto interno; remocoes usam ``mark_deleted``."""
+
+    tipo = "hnsw"
+
+    def __init__(self, dim: int, M: int = 16, ef_construction: int = 200, ef: int = 64, capacidade: int = 1024):
+        """
+        :param dim: Dimensao dos vetores.
+        :param M: Numero de vizinhos por no do grafo.
+        :param ef_construction: Largura da busca durante a construcao.
+        :param ef: Largura da busca nas consultas.
+        :param capacidade: Numero inicial de elementos reservados.
+        """
+        if hnswlib is None:
+            raise ImportError("hnswlib nao esta instalado")
+        super().__init__(dim)
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self._indice = hnswlib.Index(space="ip", dim=dim)
+        self._indice.init_index(max_elements=capacidade, ef_construction=ef_construction, M=M)
+        self._indice.set_ef(ef)
+        self._rotulo: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._proximo_rotulo = 0
+
+    def __len__(self) -> int:
+        return len(self._rotulo)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rotulo
+
+    def ids(self) -> List[str]:
+        return list(self._rotulo.keys())
+
+    def adicionar(self, ids: List[str], vetores: np.ndarray) -> None:
+        for doc_id in ids:
+            self.remover(doc_id)
+        necessario = self._proximo_rotulo + len(ids)
+        if necessario > self._indice.get_max_elements():
+            self._indice.resize_index(max(necessario, 2 * self._indice.get_max_elements()))
+        rotulos = np.arange(self._proximo_rotulo, necessario)
+        self._indice.add_items(np.asarray(vetores, dtype=np.float32).reshape(len(ids), self.dim), rotulos)
+        for doc_id, rotulo in zip(ids, rotulos):
+            self._rotulo[doc_id] = int(rotulo)
+            self._ids[int(rotulo)] = doc_id
+        self._proximo_rotulo = necessario
+
+    def remover(self, doc_id: str) -> None:
+        rotulo = self._rotulo.pop(doc_id, None)
+        if rotulo is not None:
+            self._indice.mark_deleted(rotulo)
+            del self._ids[rotulo]
+
+    def buscar(self, vetor: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        rotulos, distancias = self._indice.knn_query(np.asarray(vetor, dtype=np.float32), k=k)
+        # Em space="ip" a distancia e 1 - produto interno
+        return [(self._ids[int(r)], float(1.0 - d)) for r, d in zip(rotulos[0], distancias[0])]
+
+    def salvar(self, diretorio: str) -> None:
+        os.makedirs(diretorio, exist_ok=True)
+        self._indice.save_index(os.path.join(diretorio, "hnsw.bin"))
+        with open(os.path.join(diretorio, "rotulos.json"), "w", encoding="utf-8") as f:
+            json.dump(self._rotulo, f)
+        self._salvar_meta(diretorio, {
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "ef": self.ef,
+            "proximo_rotulo": self._proximo_rotulo,
+            "capacidade": self._indice.get_max_elements(),
+        })
+
+    @classmethod
+    def carregar(cls, diretorio: str) -> "IndiceHNSW":
+        with open(os.path.join(diretorio, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        indice = cls(meta["dim"], M=meta["M"], ef_construction=meta["ef_construction"], ef=meta["ef"])
+        indice._indice.load_index(os.path.join(diretorio, "hnsw.bin"), max_elements=meta["capacidade"])
+        indice._indice.set_ef(indice.ef)
+        with open(os.path.join(diretorio, "rotulos.json"), encoding="utf-8") as f:
+            indice._rotulo = json.load(f)
+        indice._ids = {rotulo: doc_id for doc_id, rotulo in indice._rotulo.items()}
+        indice._proximo_rotulo = meta["proximo_rotulo"]
+        return indice
+
+
+def _kmeans_esferico(vetores: np.ndarray, k: int, rng: np.random.Generator, iteracoes: int = 10) -> np.ndarray:
+    """k-means com similaridade cosseno (centroides normalizados)."""
+    centroides = vetores[rng.choice(len(vetores), k, replace=False)].copy()
+    for _ in range(iteracoes):
+        atribuicoes = np.argmax(vetores @ centroides.T, axis=1)
+        ordem = np.argsort(atribuicoes, kind="stable")
+        presentes, inicios = np.unique(atribuicoes[ordem], return_index=True)
+        somas = np.zeros_like(centroides)
+        somas[presentes] = np.add.reduceat(vetores[ordem], inicios, axis=0)
+        normas = np.linalg.norm(somas, axis=1)
+        # Centroides sem pontos mantem a posicao anterior
+        vazios = normas == 0
+        somas[vazios] = centroides[vazios]
+        normas[vazios] = 1.0
+        centroides = (somas / normas[:, np.newaxis]).astype(np.float32)
+    return centroides
+
+
+def _salvar_plano(indice: _IndicePlano, diretorio: str, extra: Dict[str, np.ndarray]) -> None:
+    os.makedirs(diretorio, exist_ok=True)
+    vivos = list(indice._linha.items())
+    vetores = (
+        indice._vetores[[linha for _, linha in vivos]]
+        if vivos else np.zeros((0, indice.dim), dtype=np.float32)
+    )
+    temporario = os.path.join(diretorio, "vetores.tmp.npz")
+    np.savez(temporario, ids=np.array([doc_id for doc_id, _ in vivos], dtype=str), vetores=vetores, **extra)
+    os.replace(temporario, os.path.join(diretorio, "vetores.npz"))
+
+
+def _ler_plano(diretorio: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    with open(os.path.join(diretorio, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    with np.load(os.path.join(diretorio, "vetores.npz")) as dados:
+        return meta, {chave: dados[chave] for chave in dados.files}
+
+
+_TIPOS = {"exato": IndiceExato, "ivf": IndiceIVFFlat, "hnsw": IndiceHNSW}
+
+
+def tipo_efetivo(tipo: str) -> str:
+    """Tipo que ``criar_indice`` realmente cria para o nome configurado."""
+    if tipo == "hnsw" and hnswlib is None:
+        return "ivf"
+    return tipo
+
+
+def criar_indice(tipo: str, dim: int, **parametros) -> IndiceANN:
+    """
+    Cria um indice pelo nome configurado ("exato", "ivf" ou "hnsw").
+
+    Se "hnsw" for pedido sem hnswlib instalado, cai para IVF-flat.
+    """
+    if tipo_efetivo(tipo) != tipo:
+        logger.warning("hnswlib nao instalado; usando indice IVF-flat")
+        tipo, parametros = tipo_efetivo(tipo), {}
+    if tipo not in _TIPOS:
+        raise ValueError(f"Indice ANN desconhecido: {tipo}")
+    return _TIPOS[tipo](dim, **parametros)
+
+
+def carregar_indice(diretorio: str) -> Optional[IndiceANN]:
+    """Carrega o indice gravado em ``diretorio`` (None se nao houver ou se falhar)."""
+    caminho_meta = os.path.join(diretorio, "meta.json")
+    if not os.path.exists(caminho_meta):
+        return None
+    try:
+        with open(caminho_meta, encoding="utf-8") as f:
+            tipo = json.load(f)["tipo"]
+        return _TIPOS[tipo].carregar(diretorio)
+    except Exception as e:
+        logger.error(f"Erro ao carregar indice ANN de {diretorio}: {e}")
+        return None
+
+
+def recall_em_k(indice: IndiceANN, exato: IndiceANN, consultas: np.ndarray, k: int = 10) -> float:
+    """
+    Fracao media dos k vizinhos exatos que o indice aproximado tambem retorna.
+
+    :param indice: Indice avaliado.
+    :param exato: Indice de referencia (normalmente ``IndiceExato`` com os mesmos vetores).
+    :param consultas: Matriz (m, dim) de consultas normalizadas.
+    :param k: Numero de vizinhos comparados.
+    """
+    acertos, total = 0, 0
+    for consulta in consultas:
+        esperados = {doc_id for doc_id, _ in exato.buscar(consulta, k)}
+        obtidos = {doc_id for doc_id, _ in indice.buscar(consulta, k)}
+        acertos += len(esperados & obtidos)
+        total += len(esperados)
+    return acertos / total if total else 1.0
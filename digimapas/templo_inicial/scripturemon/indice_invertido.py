@@ -0,0 +1,148 @@
+"""
+Indice invertido compartilhado pelas memorias do Scripturemon.
+
+Mapeia cada chave (tag, emocao, tipo de relacao...) para a lista de itens que a
+possuem, mantida ordenada por (tempo, id). Isso permite filtrar por intervalo de
+tempo com busca binaria e paginar sem percorrer todos os itens.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class IndiceInvertido:
+    """
+    Indice chave -> conjunto ordenado de ids, mantido em insercao, atualizacao e remocao.
+
+    Os ids devem ser comparaveis entre si (todos str ou todos int), pois desempatam
+    itens com o mesmo tempo.
+    """
+
+    def __init__(self):
+        # chave -> lista de (tempo, id) em ordem crescente
+        self._postagens: Dict[Hashable, List[Tuple[float, Hashable]]] = {}
+        # id -> (tempo, chaves do item)
+        self._itens: Dict[Hashable, Tuple[float, Set[Hashable]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._itens
+
+    def chaves(self) -> Iterable[Hashable]:
+        """Chaves com pelo menos um item."""
+        return self._postagens.keys()
+
+    def chaves_do_item(self, item_id: Hashable) -> Set[Hashable]:
+        """Chaves atualmente associadas ao item (conjunto vazio se ausente)."""
+        return set(self._itens.get(item_id, (0.0, set()))[1])
+
+    def adicionar(self, item_id: Hashable, chaves: Iterable[Hashable], tempo: float) -> None:
+        """
+        Indexa um item; se ele ja existir, suas chaves sao substituidas.
+
+        :param item_id: Identificador do item.
+        :param chaves: Chaves do item (tags, emocoes...).
+        :param tempo: Instante do item (timestamp), usado para ordenar e filtrar.
+        """
+        if item_id in self._itens:
+            self.remover(item_id)
+        chaves = set(chaves)
+        self._itens[item_id] = (tempo, chaves)
+        for chave in chaves:
+            insort(self._postagens.setdefault(chave, []), (tempo, item_id))
+
+    def atualizar(self, item_id: Hashable, chaves: Iterable[Hashable]) -> None:
+        """Aplica apenas a diferenca entre as chaves antigas e as novas do item."""
+        if item_id not in self._itens:
+            raise KeyError(item_id)
+        tempo, antigas = self._itens[item_id]
+        novas = set(chaves)
+        for chave in antigas - novas:
+            self._retirar(chave, tempo, item_id)
+        for chave in novas - antigas:
+            insort(self._postagens.setdefault(chave, []), (tempo, item_id))
+        self._itens[item_id] = (tempo, novas)
+
+    def remover(self, item_id: Hashable) -> None:
+        """Remove o item de todas as suas chaves (sem efeito se ausente)."""
+        registro = self._itens.pop(item_id, None)
+        if registro is None:
+            return
+        tempo, chaves = registro
+        for chave in chaves:
+            self._retirar(chave, tempo, item_id)
+
+    def _retirar(self, chave: Hashable, tempo: float, item_id: Hashable) -> None:
+        postagens = self._postagens[chave]
+        posicao = bisect_left(postagens, (tempo, item_id))
+        if posicao < len(postagens) and postagens[posicao] == (tempo, item_id):
+            del postagens[posicao]
+        if not postagens:
+            del self._postagens[chave]
+
+    def _faixa(
+        self, chave: Hashable, inicio: Optional[float], fim: Optional[float]
+    ) -> List[Tuple[float, Hashable]]:
+        """Fatia das postagens da chave com inicio <= tempo <= fim."""
+        postagens = self._postagens.get(chave, [])
+        baixo = 0 if inicio is None else bisect_left(postagens, inicio, key=lambda p: p[0])
+        alto = len(postagens) if fim is None else bisect_right(postagens, fim, key=lambda p: p[0])
+        return postagens[baixo:alto]
+
+    def consultar(
+        self,
+        chaves: Iterable[Hashable],
+        modo: str = "ou",
+        inicio: Optional[float] = None,
+        fim: Optional[float] = None,
+        offset: int = 0,
+        limite: Optional[int] = None,
+        recentes_primeiro: bool = False,
+    ) -> List[Hashable]:
+        """
+        Retorna os ids que satisfazem a consulta, ordenados por tempo.
+
+        :param chaves: Chaves consultadas.
+        :param modo: "ou" (qualquer chave) ou "e" (todas as chaves).
+        :param inicio: Tempo minimo (inclusivo), ou None.
+        :param fim: Tempo maximo (inclusivo), ou None.
+        :param offset: Quantos resultados pular (paginacao).
+        :param limite: Maximo de resultados, ou None para todos.
+        :param recentes_primeiro: Se True, ordena do mais recente para o mais antigo.
+        """
+        chaves = list(dict.fromkeys(chaves))
+        if not chaves:
+            return []
+        faixas = [self._faixa(chave, inicio, fim) for chave in chaves]
+        if recentes_primeiro:
+            faixas = [reversed(faixa) for faixa in faixas]
+
+        if modo == "e":
+            base = min(range(len(chaves)), key=lambda i: len(self._postagens.get(chaves[i], ())))
+            outras = [c for i, c in enumerate(chaves) if i != base]
+            itens: Iterator = (
+                p for p in faixas[base] if all(c in self._itens[p[1]][1] for c in outras)
+            )
+        elif modo == "ou":
+            itens = self._uniao(faixas, recentes_primeiro)
+        else:
+            raise ValueError(f"Modo de consulta desconhecido: {modo}")
+
+        fim_pagina = None if limite is None else offset + limite
+        return [item_id for _, item_id in islice(itens, offset, fim_pagina)]
+
+    @staticmethod
+    def _uniao(faixas: List[Iterable], decrescente: bool) -> Iterator[Tuple[float, Hashable]]:
+        """Intercala faixas ja ordenadas descartando repeticoes (itens com varias chaves)."""
+        if len(faixas) == 1:
+            yield from faixas[0]
+            return
+        anterior = None
+        for postagem in heapq.merge(*faixas, reverse=decrescente):
+            if postagem != anterior:
+                yield postagem
+            anterior = postagem
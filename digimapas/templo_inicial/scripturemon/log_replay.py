@@ -0,0 +1,130 @@
+"""
+Log de replay deterministico do Orquestrador Geral.
+
+Com ``config['arquivo_replay']`` o orquestrador acrescenta a um log tudo o que entra
+no mundo de fora ou por sorteio, como tuplas:
+
+* ``('cabecalho', {'versao', 'config', 'criado_em'})`` -- so no inicio de um log novo;
+* ``('agente+', nome, local, pickle do agente ou None)`` e ``('agente-', nome)``;
+* ``('evento', evento)`` -- eventos vindos de fora (``adicionar_evento``);
+* ``('tick', tempo_mundo, passos, semente)`` -- abre o tick; ``random.seed(semente)``
+  e chamado logo em seguida, entao sorteios de ``random`` no tick sao reproduziveis;
+* ``('fisica', eventos)`` -- eventos sorteados pela ``FisicaDigital``;
+* ``('percepcoes', nome, percepcoes)`` e ``('acoes', nome, acoes)`` por agente.
+
+Os registros de um tick (e as entradas externas que o antecederam) formam um
+quadro ``[tamanho: u32][pickles concatenados, comprimidos com zlib]``, sempre
+acrescentado ao fim do arquivo. Um quadro truncado por uma queda so encerra a
+leitura; os anteriores continuam validos.
+
+A reproducao fica em ``replay_mundo.py``.
+"""
+
+import io
+import logging
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+VERSAO = 1
+_QUADRO = struct.Struct(">I")
+
+
+def _config_serializavel(config: Optional[Dict]) -> Dict[str, Any]:
+    """Copia da configuracao sem os valores que nao passam por pickle."""
+    copia = {}
+    for chave, valor in (config or {}).items():
+        try:
+            pickle.dumps(valor)
+        except Exception:
+            continue
+        copia[chave] = valor
+    return copia
+
+
+class GravadorReplay:
+    """Log de replay aberto para acrescimo (ver docstring do modulo)."""
+
+    def __init__(self, caminho: str, config: Optional[Dict] = None, nivel_compressao: int = 1):
+        """
+        :param caminho: Arquivo do log; se ja existir, os quadros novos vao para o fim.
+        :param config: Configuracao do orquestrador, gravada no cabecalho de um log novo.
+        :param nivel_compressao: Nivel do zlib (1 = mais rapido).
+        """
+        self.caminho = caminho
+        self.nivel_compressao = nivel_compressao
+        self._pendentes: List[bytes] = []
+        self._trava = threading.Lock()
+        self.quadros_gravados = 0
+        self.bytes_gravados = 0
+
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self._arquivo = open(caminho, "ab")
+        if novo:
+            self.registrar(('cabecalho', {
+                'versao': VERSAO,
+                'config': _config_serializavel(config),
+                'criado_em': time.time(),
+            }))
+
+    def registrar(self, registro: tuple) -> None:
+        """Acrescenta um registro ao quadro corrente (serializado na hora)."""
+        dados = pickle.dumps(registro, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._trava:
+            self._pendentes.append(dados)
+
+    def fechar_tick(self) -> None:
+        """Comprime o quadro corrente e o grava no fim do arquivo."""
+        with self._trava:
+            if not self._pendentes or self._arquivo.closed:
+                return
+            comprimido = zlib.compress(b"".join(self._pendentes), self.nivel_compressao)
+            self._pendentes = []
+            self._arquivo.write(_QUADRO.pack(len(comprimido)) + comprimido)
+            self._arquivo.flush()
+            self.quadros_gravados += 1
+            self.bytes_gravados += _QUADRO.size + len(comprimido)
+
+    def fechar(self) -> None:
+        """Grava o que estiver pendente e fecha o arquivo."""
+        self.fechar_tick()
+        with self._trava:
+            self._arquivo.close()
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            'quadros_gravados': self.quadros_gravados,
+            'bytes_gravados': self.bytes_gravados,
+        }
+
+
+def ler_replay(caminho: str) -> Iterator[List[tuple]]:
+    """Percorre os quadros do log, cada um como a lista dos seus registros."""
+    with open(caminho, "rb") as f:
+        while True:
+            cabecalho = f.read(_QUADRO.size)
+            if not cabecalho:
+                return
+            dados = b""
+            if len(cabecalho) == _QUADRO.size:
+                (tamanho,) = _QUADRO.unpack(cabecalho)
+                dados = f.read(tamanho)
+            if len(cabecalho) < _QUADRO.size or len(dados) < tamanho:
+                logger.warning(f"Quadro truncado no fim de {caminho}; leitura encerrada")
+                return
+            try:
+                bruto = zlib.decompress(dados)
+            except zlib.error as e:
+                logger.warning(f"Quadro corrompido em {caminho} ({e}); leitura encerrada")
+                return
+            fluxo = io.BytesIO(bruto)
+            registros = []
+            while fluxo.tell() < len(bruto):
+                registros.append(pickle.load(fluxo))
+            yield registros
@@ -0,0 +1,188 @@
+"""
+Grafo de locais do Digimundo.
+
+A topologia fica em arrays CSR (``indptr``/``vizinhos``, indices inteiros) mais um
+conjunto de arestas para validar movimentos em O(1). Rotas mais curtas e
+vizinhancas de k passos saem de buscas em largura feitas uma vez por origem e
+guardadas em cache (LRU), entao agentes podem planejar trajetos de varios passos
+sem uma busca por tick.
+
+Formato do arquivo de mundo (JSON)::
+
+    {
+        "locais": {
+            "praca_central": {"nome": "Praca Central", "descricao": "...",
+                              "propriedades": {}, "conexoes": ["templo"]},
+            "templo": {"conexoes": ["praca_central"]}
+        },
+        "arestas": [["templo", "floresta"]]
+    }
+
+``conexoes`` de cada local sao direcionadas (como no mapa original); pares em
+``arestas`` valem nos dois sentidos.
+"""
+
+import json
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class MapaMundo:
+    """Topologia imutavel dos locais, com rotas e vizinhancas em cache."""
+
+    def __init__(
+        self,
+        locais: Dict[str, Dict],
+        conexoes: Dict[str, Iterable[str]],
+        max_origens_cache: int = 1024,
+        max_vizinhancas_cache: int = 4096,
+    ):
+        """
+        :param locais: local -> atributos (nome, descricao, propriedades).
+        :param conexoes: local -> locais alcancaveis em um passo.
+        :param max_origens_cache: Buscas em largura (uma por origem) mantidas em cache.
+        :param max_vizinhancas_cache: Vizinhancas (local, k) mantidas em cache.
+        """
+        self.locais = locais
+        self.nomes: List[str] = list(locais)
+        self.indice: Dict[str, int] = {nome: i for i, nome in enumerate(self.nomes)}
+        n = len(self.nomes)
+
+        destinos = [
+            sorted({self.indice[d] for d in conexoes.get(nome, ()) if d in self.indice and d != nome})
+            for nome in self.nomes
+        ]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(d) for d in destinos])
+        self.vizinhos = np.fromiter((j for d in destinos for j in d), dtype=np.int32, count=int(self.indptr[-1]))
+        self._arestas = {i * n + j for i, d in enumerate(destinos) for j in d}
+        # Copias em listas Python: a busca em largura evita indexar numpy elemento a elemento
+        self._indptr_lista = self.indptr.tolist()
+        self._vizinhos_lista = self.vizinhos.tolist()
+
+        self.max_origens_cache = max_origens_cache
+        self.max_vizinhancas_cache = max_vizinhancas_cache
+        self._buscas: "OrderedDict[int, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._vizinhancas: "OrderedDict[Tuple[int, int], Tuple[str, ...]]" = OrderedDict()
+
+    # === Construcao ===
+
+    @classmethod
+    def de_dict(cls, dados: Dict, **kwargs) -> "MapaMundo":
+        """Cria o mapa a partir do dicionario do formato de arquivo (ver modulo)."""
+        locais, conexoes = {}, {}
+        for nome, info in dados.get("locais", {}).items():
+            info = dict(info or {})
+            conexoes[nome] = set(info.pop("conexoes", ()))
+            locais[nome] = {
+                "nome": info.get("nome", nome.replace("_", " ").title()),
+                "descricao": info.get("descricao", f"Um lugar no Digimundo: {nome}"),
+                "propriedades": info.get("propriedades", {}),
+            }
+        for origem, destino in dados.get("arestas", ()):
+            conexoes.setdefault(origem, set()).add(destino)
+            conexoes.setdefault(destino, set()).add(origem)
+        desconhecidos = {d for ds in conexoes.values() for d in ds} | set(conexoes)
+        desconhecidos -= set(locais)
+        if desconhecidos:
+            raise ValueError(f"Conexoes para locais inexistentes: {sorted(desconhecidos)[:10]}")
+        return cls(locais, conexoes, **kwargs)
+
+    @classmethod
+    def carregar(cls, caminho: str, **kwargs) -> "MapaMundo":
+        """
+        Le um arquivo de mundo JSON.
+
+        :raises ValueError: se o arquivo nao for JSON valido ou citar locais inexistentes.
+        """
+        with open(caminho, encoding="utf-8") as f:
+            try:
+                dados = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Arquivo de mundo invalido ({caminho}): {e}") from e
+        return cls.de_dict(dados, **kwargs)
+
+    # === Consultas O(1) / O(grau) ===
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def __contains__(self, local: str) -> bool:
+        return local in self.indice
+
+    def conectado(self, origem: str, destino: str) -> bool:
+        """Se ha passagem direta de origem para destino."""
+        i, j = self.indice.get(origem), self.indice.get(destino)
+        return i is not None and j is not None and i * len(self.nomes) + j in self._arestas
+
+    def conexoes(self, local: str) -> List[str]:
+        """Locais alcancaveis em um passo."""
+        i = self.indice[local]
+        return [self.nomes[j] for j in self._vizinhos_lista[self._indptr_lista[i]:self._indptr_lista[i + 1]]]
+
+    # === Rotas e vizinhancas (em cache) ===
+
+    def _busca(self, origem: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Distancias e predecessores da busca em largura a partir de ``origem``."""
+        resultado = self._buscas.get(origem)
+        if resultado is not None:
+            self._buscas.move_to_end(origem)
+            return resultado
+        n = len(self.nomes)
+        distancia = [-1] * n
+        anterior = [-1] * n
+        distancia[origem] = 0
+        fila = deque([origem])
+        indptr, vizinhos = self._indptr_lista, self._vizinhos_lista
+        while fila:
+            atual = fila.popleft()
+            proxima = distancia[atual] + 1
+            for j in vizinhos[indptr[atual]:indptr[atual + 1]]:
+                if distancia[j] < 0:
+                    distancia[j] = proxima
+                    anterior[j] = atual
+                    fila.append(j)
+        resultado = self._buscas[origem] = (
+            np.array(distancia, dtype=np.int32), np.array(anterior, dtype=np.int32)
+        )
+        if len(self._buscas) > self.max_origens_cache:
+            self._buscas.popitem(last=False)
+        return resultado
+
+    def precomputar(self, origens: Optional[Iterable[str]] = None) -> None:
+        """Aquece o cache de buscas (todas as origens, se nenhuma for dada)."""
+        for local in self.nomes if origens is None else origens:
+            self._busca(self.indice[local])
+
+    def distancia(self, origem: str, destino: str) -> Optional[int]:
+        """Numero de passos da rota mais curta, ou None se inalcancavel."""
+        d = int(self._busca(self.indice[origem])[0][self.indice[destino]])
+        return None if d < 0 else d
+
+    def rota(self, origem: str, destino: str) -> Optional[List[str]]:
+        """Rota mais curta (incluindo origem e destino), ou None se inalcancavel."""
+        alvo = self.indice[destino]
+        distancia, anterior = self._busca(self.indice[origem])
+        if distancia[alvo] < 0:
+            return None
+        caminho = [alvo]
+        while caminho[-1] != self.indice[origem]:
+            caminho.append(int(anterior[caminho[-1]]))
+        return [self.nomes[i] for i in reversed(caminho)]
+
+    def vizinhanca(self, local: str, k: int) -> Tuple[str, ...]:
+        """Locais a no maximo k passos (sem o proprio local), do mais proximo ao mais distante."""
+        chave = (self.indice[local], k)
+        resultado = self._vizinhancas.get(chave)
+        if resultado is not None:
+            self._vizinhancas.move_to_end(chave)
+            return resultado
+        distancia = self._busca(chave[0])[0]
+        alcancados = np.nonzero((distancia > 0) & (distancia <= k))[0]
+        alcancados = alcancados[np.argsort(distancia[alcancados], kind="stable")]
+        resultado = self._vizinhancas[chave] = tuple(self.nomes[i] for i in alcancados)
+        if len(self._vizinhancas) > self.max_vizinhancas_cache:
+            self._vizinhancas.popitem(last=False)
+        return resultado
@@ -4,13 +4,35 @@ Integra memória vetorial, semântica e grafo de conhecimento
 """
 
 import json
-import hashlib
+import os
+import threading
+import time
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
 import logging
 
+try:
+    from .cache_deduplicacao import CacheDeduplicacao, hash_fato
+    from .deduplicacao_lsh import DeduplicadorLSH
+    from .consolidador_memoria import ConsolidadorMemoria, FonteChroma, FonteSemantica
+    from .memoria_em_camadas import MemoriaEmCamadas
+except ImportError:
+    from cache_deduplicacao import CacheDeduplicacao, hash_fato
+    from deduplicacao_lsh import DeduplicadorLSH
+    from consolidador_memoria import ConsolidadorMemoria, FonteChroma, FonteSemantica
+    from memoria_em_camadas import MemoriaEmCamadas
+
 logger = logging.getLogger(__name__)
 
+# Uma única consulta por lote: cada linha traz o nome, o último timestamp e
+# quantas vezes a entidade foi mencionada no lote
+CONSULTA_ENTIDADES_LOTE = """
+UNWIND $rows AS row
+MERGE (e:Entidade {nome: row.nome})
+SET e.ultima_mencao = row.timestamp,
+    e.mencoes = COALESCE(e.mencoes, 0) + row.mencoes
+"""
+
 
 class MemoriaUniversal:
     """
@@ -22,7 +44,13 @@ class MemoriaUniversal:
                  memoria_vetorial=None, 
                  memoria_semantica=None, 
                  grafo_neo4j=None,
-                 threshold_similaridade: float = 0.85):
+                 threshold_similaridade: float = 0.85,
+                 max_cache: int = 10000,
+                 ttl_cache: Optional[float] = None,
+                 arquivo_cache: Optional[str] = None,
+                 config_deduplicacao: Optional[Dict[str, Any]] = None,
+                 config_consolidacao: Optional[Dict[str, Any]] = None,
+                 config_camadas: Optional[Dict[str, Any]] = None):
         """
         Inicializa a Memória Universal
         
@@ -31,28 +59,122 @@ class MemoriaUniversal:
             memoria_semantica: Instância de MemoriaSemantica (notas estruturadas)
             grafo_neo4j: Conexão com Neo4j para grafo de conhecimento
             threshold_similaridade: Limiar para considerar memórias como duplicatas
+            max_cache: Hashes de fatos recentes mantidos para deduplicação
+            ttl_cache: Idade máxima (segundos) de um fato no cache (None = sem expiração)
+            arquivo_cache: Log do cache em disco, para não reingerir fatos após reinício
+            config_deduplicacao: Detecção de quase-duplicatas (MinHash/LSH + cosseno).
+                Chaves: 'ativo', 'tipos' (tipos de fato verificados), 'min_caracteres'
+                (fatos mais curtos ficam só com o cache exato) e os parâmetros de
+                DeduplicadorLSH ('limiar_cosseno', 'limiar_jaccard', 'num_permutacoes',
+                'bandas', 'tamanho_shingle', 'max_entradas')
+            config_consolidacao: Consolidação em segundo plano (ver consolidador_memoria.py).
+                Sem 'diretorio', fica desligada. Chaves próprias: 'iniciar' (sobe as
+                threads já na criação) e 'sinalizar_a_cada' (memórias novas que
+                antecipam um ciclo); as demais vão para o ConsolidadorMemoria
+            config_camadas: Camadas quente/morna/fria (ver memoria_em_camadas.py).
+                Sem 'diretorio' (onde fica a camada fria), fica desligada; as demais
+                chaves vão para o MemoriaEmCamadas. Com consolidação, o arquivamento
+                do vetor passa a ser o rebaixamento morna -> fria
         """
         self.vetorial = memoria_vetorial
         self.semantica = memoria_semantica
         self.grafo = grafo_neo4j
         self.threshold_similaridade = threshold_similaridade
         
-        # Cache de memórias recentes para otimização
-        self._cache_recente = []
-        self._max_cache = 100
+        # Cache de memórias recentes para otimização: conjunto de hashes O(1) com TTL
+        self._cache_recente = CacheDeduplicacao(max_cache, ttl_cache, arquivo_cache)
+        
+        # Quase-duplicatas: filtradas antes de qualquer chamada ao armazenamento vetorial
+        config_dedup = dict(config_deduplicacao or {})
+        self._tipos_quase_duplicatas = tuple(config_dedup.pop('tipos', ('evento', 'reflexao')))
+        self._min_caracteres_quase_duplicatas = config_dedup.pop('min_caracteres', 24)
+        # Embeddings guardados (índices de quase-duplicatas, camadas) só com um modelo de
+        # verdade; sem ele, cada componente usa o seu caminho sem embeddings do modelo
+        codificar = self._codificador_estavel()
+        self.deduplicador = None
+        if config_dedup.pop('ativo', True):
+            self.deduplicador = DeduplicadorLSH(codificar=codificar, **config_dedup)
+        
+        # Escritas do pipeline e unidades de consolidação não se intercalam
+        self._trava_escrita = threading.RLock()
+        
+        # Camadas: quente (em memória), morna (o vetor) e fria (segmentos comprimidos)
+        self.camadas = None
+        config_cam = dict(config_camadas or {})
+        diretorio_camadas = config_cam.pop('diretorio', None)
+        if diretorio_camadas:
+            self.camadas = MemoriaEmCamadas(
+                self.vetorial,
+                diretorio_camadas,
+                config_cam,
+                codificar=codificar,
+                trava=self._trava_escrita
+            )
+        
+        # Consolidação em segundo plano: um consolidador por armazenamento
+        self.consolidadores: Dict[str, ConsolidadorMemoria] = {}
+        self._criadas_desde_sinal = 0
+        config_consol = dict(config_consolidacao or {})
+        self._sinalizar_a_cada = config_consol.pop('sinalizar_a_cada', 500)
+        iniciar = config_consol.pop('iniciar', True)
+        diretorio = config_consol.pop('diretorio', None)
+        if diretorio:
+            fontes = {}
+            if self.semantica is not None:
+                fontes['semantica'] = FonteSemantica(self.semantica)
+            if self.vetorial is not None and hasattr(self.vetorial, 'collection'):
+                fontes['vetorial'] = FonteChroma(self.vetorial.collection)
+            for nome, fonte in fontes.items():
+                consultar, frio, manter, ao_remover = None, None, None, None
+                if nome == 'vetorial':
+                    consultar = lambda texto, k: self.vetorial.buscar_contexto(texto, k)
+                    if self.camadas is not None:
+                        frio, manter = self.camadas.fria, self.camadas.manter_morno
+                        ao_remover = self.camadas.descartar
+                self.consolidadores[nome] = ConsolidadorMemoria(
+                    fonte,
+                    os.path.join(diretorio, nome),
+                    config_consol,
+                    codificar=codificar,
+                    consultar=consultar,
+                    trava=self._trava_escrita,
+                    frio=frio,
+                    manter=manter,
+                    ao_remover=ao_remover
+                )
+                if iniciar:
+                    self.consolidadores[nome].iniciar()
         
         # Estatísticas
         self.stats = {
             'total_processado': 0,
             'duplicatas_evitadas': 0,
+            'quase_duplicatas_evitadas': 0,
             'memorias_criadas': 0,
             'memorias_atualizadas': 0
         }
         
+    def _codificador_estavel(self):
+        """
+        encode_many da memória semântica, se os vetores dela forem comparáveis entre
+        chamadas (modelo carregado); senão None
+        
+        O fallback TF-IDF da MemoriaSemantica muda o IDF a cada nota, então vetores
+        guardados nos índices deixariam de ser comparáveis com os novos.
+        """
+        codificar = getattr(self.semantica, 'encode_many', None)
+        if codificar is None:
+            return None
+        if hasattr(self.semantica, 'embeddings_estaveis') and not self.semantica.embeddings_estaveis():
+            logger.info("Modelo de embeddings indisponível: deduplicação e camadas sem embeddings do modelo")
+            return None
+        return codificar
+        
     def extrair_e_atualizar(self, 
                            evento: str, 
                            pensamento: str = None,
-                           metadata: Dict = None) -> Dict[str, Any]:
+                           metadata: Dict = None,
+                           em_lote: bool = True) -> Dict[str, Any]:
         """
         Pipeline principal: extrai fatos relevantes e atualiza memórias
         
@@ -60,10 +182,16 @@ class MemoriaUniversal:
             evento: Descrição do evento/interação
             pensamento: Pensamento/reflexão do agente sobre o evento
             metadata: Metadados adicionais (emoção, contexto, etc)
+            em_lote: Se False, usa o laço antigo (busca e escritas fato a fato)
             
         Returns:
             Dict com resumo das operações realizadas
         """
+        if em_lote:
+            return self.extrair_e_atualizar_lote([
+                {'evento': evento, 'pensamento': pensamento, 'metadata': metadata}
+            ])
+            
         self.stats['total_processado'] += 1
         
         # 1. Fase de Extração
@@ -77,7 +205,8 @@ class MemoriaUniversal:
         
         # 2. Fase de Atualização
         for fato in fatos:
-            operacao = self._processar_fato(fato)
+            with self._trava_escrita:
+                operacao = self._processar_fato(fato)
             resultado['operacoes'].append(operacao)
             
         # 3. Consolidação e manutenção
@@ -85,6 +214,300 @@ class MemoriaUniversal:
         
         return resultado
         
+    def extrair_e_atualizar_lote(self, eventos: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Pipeline em lote: extrai os fatos de todos os eventos e os processa juntos
+        
+        Em vez de buscar e gravar fato a fato, o lote passa por estágios:
+        deduplicação (cache e repetições dentro do lote), uma busca vetorial com
+        todas as consultas, a decisão criar/atualizar/ignorar para o lote inteiro,
+        embeddings de todos os fatos novos numa chamada e, por fim, escritas
+        agrupadas por backend (vetorial, notas semânticas, links automáticos e um
+        único MERGE com UNWIND no grafo).
+        
+        Args:
+            eventos: Lista de dicts com 'evento' e, opcionalmente, 'pensamento' e 'metadata'
+            
+        Returns:
+            Dict com fatos extraídos, operações (na ordem dos fatos) e tempos por estágio (segundos)
+        """
+        tempos: Dict[str, float] = {}
+        inicio = marca = time.perf_counter()
+        
+        def medir(estagio: str):
+            nonlocal marca
+            agora = time.perf_counter()
+            tempos[estagio] = agora - marca
+            marca = agora
+        
+        # 1. Extração
+        fatos = []
+        for item in eventos:
+            self.stats['total_processado'] += 1
+            fatos.extend(self._extrair_fatos(
+                item.get('evento') or '', item.get('pensamento'), item.get('metadata')
+            ))
+        logger.info(f"Extraídos {len(fatos)} fatos de {len(eventos)} eventos")
+        medir('extracao')
+        
+        operacoes: List[Optional[Dict]] = [None] * len(fatos)
+        
+        # 2. Deduplicação: cache recente e repetições dentro do próprio lote
+        pendentes: List[int] = []
+        vistos = set()
+        for i, fato in enumerate(fatos):
+            fato_hash = self._gerar_hash(fato['conteudo'])
+            if fato_hash in vistos or self._existe_no_cache(fato_hash):
+                self.stats['duplicatas_evitadas'] += 1
+                razao = 'lote' if fato_hash in vistos else 'cache'
+                operacoes[i] = {'acao': 'IGNORADO', 'razao': razao, 'fato': fato['conteudo'][:50]}
+                continue
+            vistos.add(fato_hash)
+            pendentes.append(i)
+        medir('deduplicacao')
+        
+        # 2b. Quase-duplicatas (MinHash/LSH + cosseno), ainda sem tocar o vetor
+        pendentes = self._filtrar_quase_duplicatas(fatos, pendentes, operacoes)
+        medir('quase_duplicatas')
+        
+        # 3. Busca vetorial com todas as consultas de uma vez
+        similares_por_fato = self._buscar_similares_lote([fatos[i]['conteudo'] for i in pendentes])
+        medir('busca_vetorial')
+        
+        # 4. Decisão para o lote inteiro
+        criar: List[int] = []
+        atualizar: Dict[Any, Tuple[Dict, List[int]]] = {}
+        for i, similares in zip(pendentes, similares_por_fato):
+            existente = next(
+                (s for s in similares
+                 if self._calcular_similaridade(fatos[i]['conteudo'], s.get('conteudo', '')) > self.threshold_similaridade),
+                None
+            )
+            if existente is None:
+                criar.append(i)
+            else:
+                # Várias menções da mesma memória no lote viram uma única atualização
+                chave = existente.get('id', id(existente))
+                atualizar.setdefault(chave, (existente, []))[1].append(i)
+        medir('decisao')
+        
+        # 5. Embeddings de todos os fatos novos numa chamada (aquece o cache da memória semântica)
+        if criar and self.semantica and hasattr(self.semantica, 'encode_many'):
+            try:
+                self.semantica.encode_many([fatos[i]['conteudo'] for i in criar])
+            except Exception as e:
+                logger.error(f"Erro ao gerar embeddings do lote: {e}")
+        medir('embeddings')
+        
+        # 6. Escritas agrupadas por backend
+        erros: Dict[int, str] = {}
+        with self._trava_escrita:
+            self._atualizar_memorias_lote(fatos, atualizar, operacoes, erros)
+            medir('escrita_atualizacoes')
+            
+            self._registrar_vetorial_lote(fatos, criar, erros)
+            medir('escrita_vetorial')
+            
+            nota_ids = self._registrar_notas_lote(fatos, criar, erros)
+            medir('escrita_semantica')
+            
+            self._linkar_notas_lote(nota_ids)
+            medir('links')
+            
+            self._registrar_no_grafo_lote([fatos[i] for i in criar if i not in erros and fatos[i]['tipo'] == 'entidade'])
+            medir('escrita_grafo')
+        
+        criados = []
+        for i in criar:
+            fato = fatos[i]
+            if i in erros:
+                if self.deduplicador is not None:
+                    self.deduplicador.remover(self._gerar_hash(fato['conteudo']))
+                operacoes[i] = {'acao': 'ERRO', 'erro': erros[i], 'fato': fato['conteudo'][:50]}
+                continue
+            self._adicionar_ao_cache(self._gerar_hash(fato['conteudo']))
+            self.stats['memorias_criadas'] += 1
+            operacoes[i] = {'acao': 'CRIADO', 'tipo': fato['tipo'], 'fato': fato['conteudo'][:50]}
+            criados.append(fato)
+            
+        # 6b. Fatos novos entram na camada quente (um lote de embeddings)
+        self._admitir_em_camadas(criados)
+        medir('camadas')
+            
+        # 7. Consolidação e manutenção
+        self._consolidar_memorias()
+        medir('consolidacao')
+        tempos['total'] = time.perf_counter() - inicio
+        
+        return {
+            'eventos': len(eventos),
+            'fatos_extraidos': len(fatos),
+            'operacoes': operacoes,
+            'tempos': tempos
+        }
+        
+    def _filtrar_quase_duplicatas(self, 
+                                  fatos: List[Dict], 
+                                  pendentes: List[int],
+                                  operacoes: List[Optional[Dict]]) -> List[int]:
+        """
+        Marca como IGNORADO os fatos quase iguais a fatos recentes (ou a fatos
+        anteriores do mesmo lote) e devolve os índices que seguem no pipeline
+        """
+        if self.deduplicador is None:
+            return pendentes
+        verificar = [
+            i for i in pendentes
+            if fatos[i]['tipo'] in self._tipos_quase_duplicatas
+            and len(fatos[i]['conteudo']) >= self._min_caracteres_quase_duplicatas
+        ]
+        if not verificar:
+            return pendentes
+        try:
+            achados = self.deduplicador.verificar_lote(
+                [self._gerar_hash(fatos[i]['conteudo']) for i in verificar],
+                [fatos[i]['conteudo'] for i in verificar]
+            )
+        except Exception as e:
+            logger.error(f"Erro na detecção de quase-duplicatas: {e}")
+            return pendentes
+            
+        ignorados = set()
+        for i, achado in zip(verificar, achados):
+            if achado is None:
+                continue
+            chave, similaridade = achado
+            ignorados.add(i)
+            self.stats['duplicatas_evitadas'] += 1
+            self.stats['quase_duplicatas_evitadas'] += 1
+            operacoes[i] = {
+                'acao': 'IGNORADO',
+                'razao': 'quase_duplicata',
+                'similaridade': round(similaridade, 3),
+                'similar_a': (self.deduplicador.texto(chave) or '')[:50],
+                'fato': fatos[i]['conteudo'][:50]
+            }
+        return [i for i in pendentes if i not in ignorados]
+        
+    def _buscar_similares_lote(self, textos: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """
+        Busca similares de vários textos numa única consulta, se o backend vetorial
+        oferecer buscar_contexto_lote; senão, recai na busca texto a texto
+        """
+        if not self.vetorial or not textos:
+            return [[] for _ in textos]
+        try:
+            if hasattr(self.vetorial, 'buscar_contexto_lote'):
+                return self.vetorial.buscar_contexto_lote(textos, top_k)
+            return [self.vetorial.buscar_contexto(texto, top_k) for texto in textos]
+        except Exception as e:
+            logger.error(f"Erro na busca vetorial em lote: {e}")
+            return [[] for _ in textos]
+            
+    def _atualizar_memorias_lote(self, 
+                                 fatos: List[Dict], 
+                                 atualizar: Dict[Any, Tuple[Dict, List[int]]],
+                                 operacoes: List[Optional[Dict]],
+                                 erros: Dict[int, str]):
+        """
+        Aplica as atualizações decididas, uma por memória existente
+        
+        Cada memória mencionada n vezes no lote recebe n menções e +0.1 de
+        importância por menção, numa única escrita de metadados.
+        """
+        ids, metadados, conteudos = [], [], []
+        for existente, indices in atualizar.values():
+            if 'id' not in existente:
+                continue
+            ids.append(existente['id'])
+            conteudos.append(existente.get('conteudo') or existente.get('documento') or '')
+            metadados.append({
+                'ultima_mencao': max(fatos[i]['timestamp'] for i in indices),
+                'importancia': min(1.0, existente.get('importancia', 0.5) + 0.1 * len(indices)),
+                'mencoes': existente.get('mencoes', 1) + len(indices)
+            })
+            
+        erro = None
+        if self.vetorial and ids:
+            try:
+                if hasattr(self.vetorial, 'atualizar_metadata_lote'):
+                    self.vetorial.atualizar_metadata_lote(ids, metadados)
+                else:
+                    for memoria_id, meta in zip(ids, metadados):
+                        self.vetorial.atualizar_metadata(memoria_id, meta)
+            except Exception as e:
+                logger.error(f"Erro ao atualizar memórias em lote: {e}")
+                erro = str(e)
+        if erro is None and ids:
+            self._atualizar_em_camadas(list(zip(conteudos, metadados)))
+                
+        for existente, indices in atualizar.values():
+            falhou = erro is not None and 'id' in existente
+            for i in indices:
+                conteudo = fatos[i]['conteudo'][:50]
+                if falhou:
+                    erros[i] = erro
+                    operacoes[i] = {'acao': 'ERRO', 'erro': erro, 'fato': conteudo}
+                else:
+                    self.stats['memorias_atualizadas'] += 1
+                    operacoes[i] = {'acao': 'ATUALIZADO', 'razao': 'similar', 'fato': conteudo}
+                    
+    def _registrar_vetorial_lote(self, fatos: List[Dict], criar: List[int], erros: Dict[int, str]):
+        """Grava os fatos novos no vetor com uma única chamada, se o backend permitir"""
+        if not self.vetorial or not criar:
+            return
+        conteudos = [fatos[i]['conteudo'] for i in criar]
+        metadados = [
+            {
+                'tipo': fatos[i]['tipo'],
+                'tags': ','.join(fatos[i]['tags']),
+                'importancia': fatos[i]['importancia'],
+                'timestamp': fatos[i]['timestamp']
+            }
+            for i in criar
+        ]
+        try:
+            if hasattr(self.vetorial, 'registrar_eventos'):
+                self.vetorial.registrar_eventos(conteudos, metadados)
+            else:
+                for conteudo, meta in zip(conteudos, metadados):
+                    self.vetorial.registrar_evento(conteudo, meta)
+        except Exception as e:
+            logger.error(f"Erro ao registrar memórias vetoriais em lote: {e}")
+            for i in criar:
+                erros[i] = str(e)
+                
+    def _registrar_notas_lote(self, fatos: List[Dict], criar: List[int], erros: Dict[int, str]) -> List[str]:
+        """Registra as notas semânticas dos fatos novos; devolve os ids criados"""
+        nota_ids = []
+        if not self.semantica:
+            return nota_ids
+        for i in criar:
+            if i in erros:
+                continue
+            try:
+                nota_ids.append(self.semantica.registrar_nota(
+                    conteudo=fatos[i]['conteudo'],
+                    tags=fatos[i]['tags']
+                ))
+            except Exception as e:
+                logger.error(f"Erro ao registrar nota semântica: {e}")
+                erros[i] = str(e)
+        return nota_ids
+        
+    def _linkar_notas_lote(self, nota_ids: List[str]):
+        """Links automáticos de todas as notas novas numa passada só (em vez de uma varredura por nota)"""
+        if not self.semantica or not nota_ids:
+            return
+        try:
+            if hasattr(self.semantica, 'atualizar_links_em_lote'):
+                self.semantica.atualizar_links_em_lote(nota_ids)
+            elif hasattr(self.semantica, 'link_automatico'):
+                for nota_id in nota_ids:
+                    self.semantica.link_automatico(nota_id)
+        except Exception as e:
+            logger.error(f"Erro ao criar links automáticos em lote: {e}")
+            
     def _extrair_fatos(self, 
                       evento: str, 
                       pensamento: str = None,
@@ -151,9 +574,14 @@ class MemoriaUniversal:
             self.stats['duplicatas_evitadas'] += 1
             return {'acao': 'IGNORADO', 'razao': 'cache', 'fato': fato['conteudo'][:50]}
             
+        # Verificar quase-duplicatas antes de consultar o vetor
+        operacoes = [None]
+        if not self._filtrar_quase_duplicatas([fato], [0], operacoes):
+            return operacoes[0]
+            
         # Buscar similares na memória vetorial
         if self.vetorial:
-            similares = self.vetorial.buscar_contexto(fato['conteudo'], top_k=3)
+            similares = self.vetorial.buscar_contexto(fato['conteudo'], k=3)
             
             for similar in similares:
                 if self._calcular_similaridade(fato['conteudo'], similar.get('conteudo', '')) > self.threshold_similaridade:
@@ -172,9 +600,9 @@ class MemoriaUniversal:
             if self.vetorial:
                 self.vetorial.registrar_evento(
                     fato['conteudo'],
-                    metadata={
+                    metadados={
                         'tipo': fato['tipo'],
-                        'tags': fato['tags'],
+                        'tags': ','.join(fato['tags']),
                         'importancia': fato['importancia'],
                         'timestamp': fato['timestamp']
                     }
@@ -184,8 +612,7 @@ class MemoriaUniversal:
             if self.semantica:
                 nota_id = self.semantica.registrar_nota(
                     conteudo=fato['conteudo'],
-                    tags=fato['tags'],
-                    importancia=fato['importancia']
+                    tags=fato['tags']
                 )
                 
                 # Tentar link automático
@@ -198,12 +625,15 @@ class MemoriaUniversal:
                 
             # Adicionar ao cache
             self._adicionar_ao_cache(self._gerar_hash(fato['conteudo']))
+            self._admitir_em_camadas([fato])
             
             self.stats['memorias_criadas'] += 1
             return {'acao': 'CRIADO', 'tipo': fato['tipo'], 'fato': fato['conteudo'][:50]}
             
         except Exception as e:
             logger.error(f"Erro ao criar memória: {e}")
+            if self.deduplicador is not None:
+                self.deduplicador.remover(self._gerar_hash(fato['conteudo']))
             return {'acao': 'ERRO', 'erro': str(e), 'fato': fato['conteudo'][:50]}
             
     def _atualizar_memoria_existente(self, memoria_existente: Dict, novo_fato: Dict) -> Dict:
@@ -215,14 +645,15 @@ class MemoriaUniversal:
             if self.vetorial and 'id' in memoria_existente:
                 # Atualizar metadados
                 nova_importancia = min(1.0, memoria_existente.get('importancia', 0.5) + 0.1)
-                self.vetorial.atualizar_metadata(
-                    memoria_existente['id'],
-                    {
-                        'ultima_mencao': novo_fato['timestamp'],
-                        'importancia': nova_importancia,
-                        'mencoes': memoria_existente.get('mencoes', 1) + 1
-                    }
-                )
+                metadados = {
+                    'ultima_mencao': novo_fato['timestamp'],
+                    'importancia': nova_importancia,
+                    'mencoes': memoria_existente.get('mencoes', 1) + 1
+                }
+                self.vetorial.atualizar_metadata(memoria_existente['id'], metadados)
+                self._atualizar_em_camadas([
+                    (memoria_existente.get('conteudo') or memoria_existente.get('documento') or '', metadados)
+                ])
                 
             self.stats['memorias_atualizadas'] += 1
             return {'acao': 'ATUALIZADO', 'razao': 'similar', 'fato': novo_fato['conteudo'][:50]}
@@ -233,16 +664,42 @@ class MemoriaUniversal:
             
     def _consolidar_memorias(self):
         """
-        Consolida e otimiza memórias periodicamente
+        Manutenção leve ao fim de cada evento
+        
+        A consolidação pesada (mesclar memórias muito similares, arquivar memórias
+        antigas e gerar resumos de períodos) roda nos ConsolidadorMemoria, em
+        segundo plano; aqui só antecipamos um ciclo depois de muitas memórias novas.
         """
-        # Limpar cache se muito grande
-        if len(self._cache_recente) > self._max_cache:
-            self._cache_recente = self._cache_recente[-self._max_cache:]
+        # O cache se limita sozinho (tamanho e TTL); aqui só persiste o que entrou
+        self._cache_recente.sincronizar()
+        
+        if self.consolidadores and self.stats['memorias_criadas'] - self._criadas_desde_sinal >= self._sinalizar_a_cada:
+            self._criadas_desde_sinal = self.stats['memorias_criadas']
+            for consolidador in self.consolidadores.values():
+                consolidador.sinalizar()
+                
+    def _admitir_em_camadas(self, fatos: List[Dict]):
+        """Coloca fatos recém-criados na camada quente (falhas não afetam a escrita)"""
+        if self.camadas is None or not fatos:
+            return
+        try:
+            self.camadas.admitir(fatos)
+        except Exception as e:
+            logger.error(f"Erro ao admitir fatos na camada quente: {e}")
             
-        # TODO: Implementar consolidação mais avançada
-        # - Mesclar memórias muito similares
-        # - Arquivar memórias antigas
-        # - Gerar resumos de períodos
+    def _atualizar_em_camadas(self, atualizacoes: List[Tuple[str, Dict]]):
+        """Propaga menções/importância às camadas (pode promover para a quente)"""
+        if self.camadas is None:
+            return
+        try:
+            self.camadas.atualizar(atualizacoes)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar camadas: {e}")
+            
+    def parar_consolidacao(self, timeout: float = 10.0):
+        """Encerra as threads de consolidação (o ciclo em curso é retomado na próxima vez)"""
+        for consolidador in self.consolidadores.values():
+            consolidador.parar(timeout)
         
     def buscar_contexto_relevante(self, 
                                   query: str, 
@@ -253,21 +710,34 @@ class MemoriaUniversal:
         """
         resultados = []
         
+        # Em camadas: quente, o vetor (morna) só se faltar resultado, a fria só se ainda faltar
+        if self.camadas is not None:
+            for r in self.camadas.buscar(query, limite):
+                r['fonte'] = 'vetorial' if r['camada'] == 'morna' else r['camada']
+                resultados.append(r)
         # Buscar no vetor
-        if self.vetorial:
-            vetor_results = self.vetorial.buscar_contexto(query, top_k=limite)
+        elif self.vetorial:
+            vetor_results = self.vetorial.buscar_contexto(query, k=limite)
             for r in vetor_results:
                 r['fonte'] = 'vetorial'
                 resultados.append(r)
                 
-        # Buscar na semântica
+        # Buscar na semântica (indice invertido de tags: consulta unica, sem varrer notas)
+        # Sob a trava de escrita: a consolidação remove notas em outra thread
         if self.semantica and filtros and 'tags' in filtros:
-            for tag in filtros['tags']:
-                semantica_results = self.semantica.buscar_por_tag(tag)
+            with self._trava_escrita:
+                semantica_results = self.semantica.buscar_por_tags(
+                    filtros['tags'],
+                    modo=filtros.get('modo_tags', 'ou'),
+                    inicio=filtros.get('inicio'),
+                    fim=filtros.get('fim'),
+                    limite=limite,
+                    recentes_primeiro=True
+                )
                 for r in semantica_results:
                     resultados.append({
                         'conteudo': r.conteudo,
-                        'tags': r.tags,
+                        'tags': list(r.tags),
                         'importancia': getattr(r, 'importancia', 0.5),
                         'fonte': 'semantica'
                     })
@@ -283,13 +753,32 @@ class MemoriaUniversal:
         """
         stats = self.stats.copy()
         
-        # Adicionar contagens de cada tipo
+        cache = self._cache_recente.estatisticas()
+        stats['cache_size'] = cache['tamanho']
+        stats['cache_acertos'] = cache['acertos']
+        stats['cache_faltas'] = cache['faltas']
+        stats['cache_taxa_acertos'] = cache['taxa_acertos']
+        stats['cache_despejados'] = cache['despejados']
+        stats['cache_expirados'] = cache['expirados']
+        if self.deduplicador is not None:
+            stats['quase_duplicatas'] = self.deduplicador.estatisticas()
+        if self.consolidadores:
+            stats['consolidacao'] = {nome: c.relatorio() for nome, c in self.consolidadores.items()}
+        if self.camadas is not None:
+            stats['camadas'] = self.camadas.estatisticas()
+            
+        # Contagens de cada backend (por último: dependem da interface de cada um)
         if self.vetorial:
-            stats['total_memorias_vetoriais'] = self.vetorial.obter_contagem()
+            if hasattr(self.vetorial, 'obter_contagem'):
+                stats['total_memorias_vetoriais'] = self.vetorial.obter_contagem()
+            elif hasattr(self.vetorial, 'collection'):
+                stats['total_memorias_vetoriais'] = self.vetorial.collection.count()
         if self.semantica:
-            stats['total_notas_semanticas'] = len(self.semantica.listar_notas())
-            
-        stats['cache_size'] = len(self._cache_recente)
+            with self._trava_escrita:
+                if hasattr(self.semantica, 'listar_notas'):
+                    stats['total_notas_semanticas'] = len(self.semantica.listar_notas())
+                elif hasattr(self.semantica, 'notas'):
+                    stats['total_notas_semanticas'] = len(self.semantica.notas)
         
         return stats
         
@@ -324,17 +813,17 @@ class MemoriaUniversal:
                     
         return list(set(entidades))
         
-    def _gerar_hash(self, conteudo: str) -> str:
-        """Gera hash único para conteúdo"""
-        return hashlib.md5(conteudo.encode()).hexdigest()
+    def _gerar_hash(self, conteudo: str) -> int:
+        """Gera hash único (64 bits) para conteúdo"""
+        return hash_fato(conteudo)
         
-    def _existe_no_cache(self, fato_hash: str) -> bool:
-        """Verifica se fato já existe no cache recente"""
-        return fato_hash in self._cache_recente
+    def _existe_no_cache(self, fato_hash: int) -> bool:
+        """Verifica se fato já existe no cache recente (O(1), respeitando o TTL)"""
+        return self._cache_recente.contem(fato_hash)
         
-    def _adicionar_ao_cache(self, fato_hash: str):
+    def _adicionar_ao_cache(self, fato_hash: int):
         """Adiciona hash ao cache recente"""
-        self._cache_recente.append(fato_hash)
+        self._cache_recente.adicionar(fato_hash)
         
     def _calcular_similaridade(self, texto1: str, texto2: str) -> float:
         """Calcula similaridade simples entre textos"""
@@ -350,6 +839,23 @@ class MemoriaUniversal:
         
         return len(intersecao) / len(uniao) if uniao else 0.0
         
+    def _registrar_no_grafo_lote(self, fatos: List[Dict]):
+        """Registra as entidades do lote no grafo com um único MERGE (UNWIND)"""
+        if not self.grafo or not fatos:
+            return
+            
+        linhas: Dict[str, Dict] = {}
+        for fato in fatos:
+            nome = fato['conteudo'].replace('Mencionado: ', '')
+            linha = linhas.setdefault(nome, {'nome': nome, 'timestamp': fato['timestamp'], 'mencoes': 0})
+            linha['timestamp'] = max(linha['timestamp'], fato['timestamp'])
+            linha['mencoes'] += 1
+            
+        try:
+            self.grafo.execute_query(CONSULTA_ENTIDADES_LOTE, rows=list(linhas.values()))
+        except Exception as e:
+            logger.error(f"Erro ao registrar lote no grafo: {e}")
+            
     def _registrar_no_grafo(self, fato: Dict):
         """Registra fato no grafo Neo4j"""
         if not self.grafo:
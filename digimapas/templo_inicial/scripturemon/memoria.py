@@ -1,22 +1,52 @@
 from datetime import datetime
 import random
+import re
+
+try:
+    from .indice_invertido import IndiceInvertido
+except ImportError:
+    from indice_invertido import IndiceInvertido
+
+_PALAVRA = re.compile(r"\w+")
 
 class MemoriaEmocional:
     def __init__(self, digimon):
         self.digimon = digimon
         self.memoria = []
+        # Indices invertidos por emocao e por palavra do conteudo (ids = "id" de cada fragmento)
+        self._por_id = {}
+        self._proximo_id = 0
+        self._indice_emocoes = IndiceInvertido()
+        self._indice_palavras = IndiceInvertido()
 
     def registrar(self, conteudo: str, emocao: str, intensidade: float):
+        agora = datetime.now()
         fragmento = {
-            "timestamp": datetime.now().isoformat(),
+            "id": self._proximo_id,
+            "timestamp": agora.isoformat(),
             "conteudo": conteudo,
             "emocao": emocao,
             "intensidade": intensidade,
             "peso": self._calcular_peso(emocao, intensidade)
         }
+        self._proximo_id += 1
         self.memoria.append(fragmento)
+        self._por_id[fragmento["id"]] = fragmento
+        self._indice_emocoes.adicionar(fragmento["id"], [emocao], agora.timestamp())
+        self._indice_palavras.adicionar(
+            fragmento["id"], _PALAVRA.findall(conteudo.lower()), agora.timestamp()
+        )
         return fragmento
 
+    def esquecer(self, fragmento_id: int):
+        fragmento = self._por_id.pop(fragmento_id, None)
+        if fragmento is None:
+            return False
+        self.memoria.remove(fragmento)
+        self._indice_emocoes.remover(fragmento_id)
+        self._indice_palavras.remover(fragmento_id)
+        return True
+
     def _calcular_peso(self, emocao, intensidade):
         base = {
             "alegria": 1.2,
@@ -28,18 +58,33 @@ class MemoriaEmocional:
         }.get(emocao, 1.0)
         return round(base * intensidade, 2)
 
-    def buscar_por_emocao(self, emocao: str):
-        return [m for m in self.memoria if m["emocao"] == emocao]
+    def buscar_por_emocao(self, emocao: str, inicio=None, fim=None, offset=0, limite=None):
+        return self.buscar_por_emocoes([emocao], "ou", inicio, fim, offset, limite)
+
+    def buscar_por_emocoes(self, emocoes, modo="ou", inicio=None, fim=None, offset=0, limite=None):
+        ids = self._indice_emocoes.consultar(
+            emocoes,
+            modo=modo,
+            inicio=inicio.timestamp() if inicio else None,
+            fim=fim.timestamp() if fim else None,
+            offset=offset,
+            limite=limite,
+        )
+        return [self._por_id[i] for i in ids]
 
     def memorias_mais_pesadas(self, k=3):
         return sorted(self.memoria, key=lambda m: m["peso"], reverse=True)[:k]
 
     def conexoes_emocionais(self, alvo: str):
-        relacionados = []
-        for mem in self.memoria:
-            if alvo.lower() in mem["conteudo"].lower():
-                relacionados.append({"emocao": mem["emocao"], "peso": mem["peso"]})
-        return relacionados
+        alvo = alvo.lower()
+        if _PALAVRA.fullmatch(alvo):
+            # Um alvo so de letras/digitos so pode ocorrer dentro de uma unica palavra:
+            # basta unir os fragmentos das palavras do vocabulario que o contem.
+            palavras = [p for p in self._indice_palavras.chaves() if alvo in p]
+            candidatos = [self._por_id[i] for i in self._indice_palavras.consultar(palavras)]
+        else:
+            candidatos = [m for m in self.memoria if alvo in m["conteudo"].lower()]
+        return [{"emocao": mem["emocao"], "peso": mem["peso"]} for mem in candidatos]
 
 # Exemplo de uso
 if __name__ == "__main__":
@@ -0,0 +1,640 @@
+"""
+Armazenamento em camadas (quente / morna / fria) para a Memoria Universal.
+
+* **Quente** -- ``CamadaQuente``: fatos recentes ou importantes, em memoria, numa
+  matriz de embeddings normalizados com busca exata (um produto matriz-vetor).
+  Todo fato novo entra aqui (e continua sendo gravado na morna, que e o registro
+  duravel); quando passa de ``capacidade_quente``, saem os de menor pontuacao
+  (importancia + mencoes + acessos + bonus de recente). Sair da quente nao apaga
+  nada: o fato continua na morna.
+* **Morna** -- o armazenamento vetorial da ``MemoriaUniversal`` (ChromaDB), consultado
+  so quando a quente nao devolve ``k`` resultados acima de ``limiar_quente``.
+* **Fria** -- ``CamadaFria``: registros no ``ArquivoFrio`` (segmentos zlib lidos por
+  ``mmap``) mais uma matriz float16 de embeddings em disco, lida com ``np.memmap``
+  em blocos. So e consultada quando quente + morna devolvem menos de
+  ``min_resultados``. Quem rebaixa da morna para a fria e a fase ``arquivar`` do
+  ``ConsolidadorMemoria`` (importancia baixa e sem mencao ha tempo), que recebe a
+  ``CamadaFria`` como arquivo frio, ``manter_morno`` como filtro (registros com
+  acessos recentes, muitas mencoes ou presentes na quente ficam na morna, e fora
+  dos resumos) e ``descartar`` para tirar da quente o que saiu da morna.
+
+Promocao: cada resultado devolvido conta um acesso (contagem com meia-vida de
+``meia_vida_acessos_s``, pela chave ``hash_fato`` do conteudo, igual em todas as
+camadas). Um fato da morna com ``acessos_promocao`` acessos, ou com importancia
+acima de ``limiar_importancia_quente`` numa atualizacao, sobe para a quente. Um
+registro da fria com ``acessos_promocao_fria`` acessos volta para a morna e para a
+quente e sai da fria (lapide no ``ArquivoFrio``).
+
+``codificar`` (ex.: ``MemoriaSemantica.encode_many``) gera os embeddings; sem ele,
+usa-se o TF-IDF com hashing de ``MotorTfidfHash.denso``. A fria guarda a dimensao
+dos vetores e reindexa tudo se ela mudar (ex.: o modelo passou a carregar).
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from .arquivo_frio import ArquivoFrio
+    from .cache_deduplicacao import hash_fato
+    from .embeddings_esparsos import MotorTfidfHash
+except ImportError:
+    from arquivo_frio import ArquivoFrio
+    from cache_deduplicacao import hash_fato
+    from embeddings_esparsos import MotorTfidfHash
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {
+    'capacidade_quente': 2048,
+    'folga_despejo': 0.1,               # despeja ate (1 - folga) * capacidade de uma vez
+    'janela_recente_s': 3600.0,         # bonus de recente na pontuacao da quente
+    'limiar_importancia_quente': 0.7,   # atualizacoes acima disto sobem para a quente
+    'limiar_quente': 0.3,               # cosseno minimo de um resultado da quente
+    'min_resultados': None,             # abaixo disto consulta a fria (None = k)
+    'acessos_promocao': 2.5,            # morna -> quente (~3 acessos recentes)
+    'acessos_promocao_fria': 1.5,       # fria -> morna + quente (~2 acessos recentes)
+    'meia_vida_acessos_s': 86400.0,
+    'mencoes_morno': 3,                 # manter_morno: mencoes que seguram na morna...
+    'acessos_morno': 0.5,               # ...ou acessos (com decaimento)
+    'peso_mencoes': 0.1,
+    'peso_acessos': 0.2,
+    'max_acessos': 100000,              # chaves de acesso mantidas (poda as mais frias)
+    'largura_fallback': 1024,
+    'bloco_frio': 65536,                # linhas da matriz fria por bloco na busca
+}
+
+
+def _normalizar(vetores: np.ndarray) -> np.ndarray:
+    vetores = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(vetores, axis=-1, keepdims=True)
+    return np.divide(vetores, normas, out=np.zeros_like(vetores), where=normas > 0)
+
+
+def _melhores(similaridades: np.ndarray, k: int) -> np.ndarray:
+    """Indices dos k maiores valores, em ordem decrescente."""
+    if k >= len(similaridades):
+        return np.argsort(-similaridades)
+    topo = np.argpartition(-similaridades, k)[:k]
+    return topo[np.argsort(-similaridades[topo])]
+
+
+# === Camada quente ===
+
+class CamadaQuente:
+    """Registros em memoria com busca exata por cosseno."""
+
+    def __init__(self):
+        self._chaves: List[int] = []
+        self._linha: Dict[int, int] = {}
+        self._registros: List[Dict[str, Any]] = []
+        self._entrada: List[float] = []
+        self._matriz: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._chaves)
+
+    def __contains__(self, chave: int) -> bool:
+        return chave in self._linha
+
+    def chaves(self) -> List[int]:
+        return list(self._chaves)
+
+    def obter(self, chave: int) -> Optional[Dict[str, Any]]:
+        linha = self._linha.get(chave)
+        return self._registros[linha] if linha is not None else None
+
+    def entrada(self, chave: int) -> float:
+        return self._entrada[self._linha[chave]]
+
+    def inserir(self, chave: int, registro: Dict[str, Any], vetor: np.ndarray) -> None:
+        """Insere (ou substitui) um registro; ``vetor`` ja normalizado."""
+        linha = self._linha.get(chave)
+        if linha is not None:
+            self._registros[linha] = registro
+            self._matriz[linha] = vetor
+            return
+        n = len(self._chaves)
+        if self._matriz is None or self._matriz.shape[1] != len(vetor):
+            if n:
+                raise ValueError(f"Dimensao {len(vetor)} diferente da camada quente ({self._matriz.shape[1]})")
+            self._matriz = np.empty((64, len(vetor)), dtype=np.float32)
+        elif n == len(self._matriz):
+            nova = np.empty((2 * n, self._matriz.shape[1]), dtype=np.float32)
+            nova[:n] = self._matriz
+            self._matriz = nova
+        self._matriz[n] = vetor
+        self._linha[chave] = n
+        self._chaves.append(chave)
+        self._registros.append(registro)
+        self._entrada.append(time.time())
+
+    def remover(self, chave: int) -> None:
+        """Remove em O(1): a ultima linha ocupa o lugar da removida."""
+        linha = self._linha.pop(chave, None)
+        if linha is None:
+            return
+        ultima = len(self._chaves) - 1
+        if linha != ultima:
+            movida = self._chaves[ultima]
+            self._chaves[linha] = movida
+            self._registros[linha] = self._registros[ultima]
+            self._entrada[linha] = self._entrada[ultima]
+            self._matriz[linha] = self._matriz[ultima]
+            self._linha[movida] = linha
+        self._chaves.pop()
+        self._registros.pop()
+        self._entrada.pop()
+
+    def buscar(self, vetor: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """(chave, cosseno) dos k registros mais proximos."""
+        n = len(self._chaves)
+        if not n or self._matriz.shape[1] != len(vetor):
+            return []
+        similaridades = self._matriz[:n] @ vetor
+        return [(self._chaves[i], float(similaridades[i])) for i in _melhores(similaridades, k)]
+
+
+# === Camada fria ===
+
+class CamadaFria:
+    """
+    ``ArquivoFrio`` com embeddings em disco para busca (ver docstring do modulo).
+
+    Tem a interface de arquivo que o ``ConsolidadorMemoria`` usa (``arquivar``,
+    ``bytes_comprimidos``, ``estatisticas``, ``fechar``).
+    """
+
+    def __init__(self, diretorio: str, codificar: Callable[[List[str]], np.ndarray], bloco: int = 65536):
+        """
+        :param diretorio: Diretorio dos segmentos e da matriz de embeddings.
+        :param codificar: Textos -> embeddings normalizados.
+        :param bloco: Linhas da matriz lidas por vez na busca.
+        """
+        self.arquivo = ArquivoFrio(diretorio)
+        self.codificar = codificar
+        self.bloco = bloco
+        self._caminho_vetores = os.path.join(diretorio, 'vetores.f16')
+        self._caminho_ids = os.path.join(diretorio, 'vetores.ids')
+        self.dimensao: Optional[int] = None
+        self._ids: List[str] = []
+        self._linha: Dict[str, int] = {}
+        self._vivos = np.zeros(0, dtype=bool)
+        self._mapa: Optional[np.memmap] = None
+        self.buscas = 0
+        self.linhas_varridas = 0
+        self._abrir()
+
+    def _abrir(self) -> None:
+        """Rele os ids dos vetores e corta linhas sem par (queda no meio de uma gravacao)."""
+        if not os.path.exists(self._caminho_ids):
+            return
+        with open(self._caminho_ids, encoding='utf-8') as f:
+            linhas = f.read().split('\n')
+        try:
+            self.dimensao = int(json.loads(linhas[0])['dimensao'])
+            if self.dimensao <= 0:
+                raise ValueError(self.dimensao)
+        except (ValueError, KeyError, TypeError):
+            # Sem cabecalho valido a matriz nao serve: apaga os dois arquivos e os
+            # registros ganham vetores novos na primeira busca (``_completar``)
+            logger.warning(f"Camada fria: cabecalho invalido em {self._caminho_ids}; vetores serao refeitos")
+            self.dimensao = None
+            for caminho in (self._caminho_vetores, self._caminho_ids):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            return
+        ids = linhas[1:-1]  # a ultima parte vem depois do ultimo '\n' (vazia ou truncada)
+        tamanho_vetores = os.path.getsize(self._caminho_vetores) if os.path.exists(self._caminho_vetores) else 0
+        n = min(len(ids), tamanho_vetores // (2 * self.dimensao))
+        if n != len(ids) or n * 2 * self.dimensao != tamanho_vetores or linhas[-1]:
+            logger.warning(f"Camada fria: {len(ids) - n + bool(linhas[-1])} vetores incompletos descartados")
+            if tamanho_vetores:
+                with open(self._caminho_vetores, 'r+b') as f:
+                    f.truncate(n * 2 * self.dimensao)
+            with open(self._caminho_ids, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'dimensao': self.dimensao}) + '\n' + ''.join(i + '\n' for i in ids[:n]))
+        self._indexar(ids[:n])
+
+    def _indexar(self, ids: List[str]) -> None:
+        self._ids = list(ids)
+        self._linha = {registro_id: linha for linha, registro_id in enumerate(self._ids)}
+        self._vivos = np.zeros(len(self._ids), dtype=bool)
+        for registro_id, linha in self._linha.items():
+            self._vivos[linha] = registro_id in self.arquivo
+        self._mapa = None
+
+    def __len__(self) -> int:
+        return len(self.arquivo)
+
+    def __contains__(self, registro_id: str) -> bool:
+        return registro_id in self.arquivo
+
+    @property
+    def bytes_comprimidos(self) -> int:
+        return self.arquivo.bytes_comprimidos
+
+    # === Escrita ===
+
+    def arquivar(self, registros: List[Dict[str, Any]]) -> int:
+        """
+        Grava os registros no ``ArquivoFrio`` e os embeddings dos novos na matriz.
+
+        :return: Bytes gravados nos segmentos.
+        """
+        novos = [r for r in registros if r['id'] not in self.arquivo]
+        gravados = self.arquivo.arquivar(novos)
+        if novos:
+            self._anexar_vetores([r['id'] for r in novos], self.codificar([r.get('conteudo', '') for r in novos]))
+        return gravados
+
+    def remover(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        for registro_id in ids:
+            linha = self._linha.get(registro_id)
+            if linha is not None:
+                self._vivos[linha] = False
+        return self.arquivo.remover(ids)
+
+    def _anexar_vetores(self, ids: List[str], vetores: np.ndarray) -> None:
+        """Acrescenta linhas: primeiro os vetores, depois os ids (que as validam na abertura)."""
+        if self.dimensao is None or not self._ids:
+            self.dimensao = vetores.shape[1]
+            self._reescrever([], np.zeros((0, self.dimensao), dtype=np.float16))
+        elif vetores.shape[1] != self.dimensao:
+            self._reindexar(vetores.shape[1])
+            return
+        with open(self._caminho_vetores, 'ab') as f:
+            f.write(vetores.astype(np.float16).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self._caminho_ids, 'a', encoding='utf-8') as f:
+            f.write(''.join(i + '\n' for i in ids))
+            f.flush()
+            os.fsync(f.fileno())
+        inicio = len(self._ids)
+        self._ids.extend(ids)
+        self._vivos = np.concatenate([self._vivos, np.ones(len(ids), dtype=bool)])
+        for linha, registro_id in enumerate(ids, inicio):
+            antiga = self._linha.get(registro_id)
+            if antiga is not None:
+                self._vivos[antiga] = False
+            self._linha[registro_id] = linha
+        self._mapa = None
+
+    def _reescrever(self, ids: List[str], vetores: np.ndarray) -> None:
+        """Troca atomica dos dois arquivos da matriz."""
+        for caminho, dados in ((self._caminho_vetores, vetores.astype(np.float16).tobytes()),
+                               (self._caminho_ids, (json.dumps({'dimensao': self.dimensao}) + '\n' +
+                                                    ''.join(i + '\n' for i in ids)).encode('utf-8'))):
+            with open(caminho + '.tmp', 'wb') as f:
+                f.write(dados)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(caminho + '.tmp', caminho)
+        self._indexar(ids)
+
+    def _reindexar(self, dimensao: int) -> None:
+        """Refaz todos os embeddings (mudou o codificador)."""
+        registros = list(self.arquivo.iterar())
+        logger.info(f"Camada fria: reindexando {len(registros)} registros para dimensao {dimensao}")
+        self.dimensao = dimensao
+        vetores = (self.codificar([r.get('conteudo', '') for r in registros]) if registros
+                   else np.zeros((0, dimensao), dtype=np.float32))
+        self._reescrever([r['id'] for r in registros], vetores)
+
+    def _completar(self) -> None:
+        """Registros arquivados sem vetor (queda entre as duas gravacoes) ganham o seu."""
+        faltando = [registro_id for registro_id in self.arquivo.ids() if registro_id not in self._linha]
+        if faltando:
+            registros = self.arquivo.ler(faltando)
+            self._anexar_vetores(faltando, self.codificar([r.get('conteudo', '') for r in registros]))
+
+    # === Busca ===
+
+    def buscar(self, vetor: np.ndarray, k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """(registro, cosseno) dos k registros mais proximos, varrendo a matriz em blocos."""
+        if not len(self.arquivo) or k <= 0:
+            return []
+        if self.dimensao is not None and len(vetor) != self.dimensao:
+            self._reindexar(len(vetor))
+        self._completar()
+        n = len(self._ids)
+        if not n:
+            return []
+        if self._mapa is None:
+            self._mapa = np.memmap(self._caminho_vetores, dtype=np.float16, mode='r', shape=(n, self.dimensao))
+        self.buscas += 1
+        self.linhas_varridas += n
+        melhores_linhas, melhores_sims = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for inicio in range(0, n, self.bloco):
+            bloco = np.asarray(self._mapa[inicio:inicio + self.bloco], dtype=np.float32)
+            similaridades = bloco @ vetor
+            similaridades[~self._vivos[inicio:inicio + len(bloco)]] = -np.inf
+            topo = _melhores(similaridades, k)
+            melhores_linhas = np.concatenate([melhores_linhas, topo + inicio])
+            melhores_sims = np.concatenate([melhores_sims, similaridades[topo]])
+        ordem = _melhores(melhores_sims, k)
+        escolhidos = [(self._ids[melhores_linhas[i]], float(melhores_sims[i]))
+                      for i in ordem if np.isfinite(melhores_sims[i])]
+        registros = {r['id']: r for r in self.arquivo.ler(registro_id for registro_id, _ in escolhidos)}
+        return [(registros[registro_id], sim) for registro_id, sim in escolhidos if registro_id in registros]
+
+    def fechar(self) -> None:
+        self._mapa = None
+        self.arquivo.fechar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        estatisticas = self.arquivo.estatisticas()
+        estatisticas.update({
+            'vetores': len(self._ids),
+            'dimensao': self.dimensao,
+            'buscas': self.buscas,
+            'linhas_varridas': self.linhas_varridas,
+        })
+        return estatisticas
+
+
+# === Camadas ===
+
+class MemoriaEmCamadas:
+    """Quente (em memoria) / morna (vetorial) / fria (segmentos) -- ver docstring do modulo."""
+
+    def __init__(
+        self,
+        morna: Any,
+        diretorio: str,
+        config: Optional[Dict[str, Any]] = None,
+        codificar: Optional[Callable[[List[str]], Any]] = None,
+        trava: Any = None,
+    ):
+        """
+        :param morna: Armazenamento vetorial (``buscar_contexto(texto, k)`` e
+            ``registrar_eventos``/``registrar_evento``); None = sem camada morna.
+        :param diretorio: Diretorio da camada fria.
+        :param config: Sobrescreve valores de ``CONFIG_PADRAO``.
+        :param codificar: Textos -> embeddings (None = TF-IDF com hashing).
+        :param trava: Contexto segurado durante escritas e promocoes, compartilhado
+            com o pipeline e a consolidacao.
+        """
+        self.morna = morna
+        self.config = {**CONFIG_PADRAO, **(config or {})}
+        self._codificar_externo = codificar
+        self._motor_fallback = MotorTfidfHash() if codificar is None else None
+        self.trava = trava if trava is not None else nullcontext()
+        self._trava_acessos = threading.Lock()
+
+        self.quente = CamadaQuente()
+        self.fria = CamadaFria(diretorio, self.codificar, self.config['bloco_frio'])
+
+        # chave (hash do conteudo) -> (contagem, instante do ultimo acesso)
+        self._acessos: Dict[int, Tuple[float, float]] = {}
+
+        self.contadores = {
+            'buscas': 0,
+            'resultados_quente': 0,
+            'resultados_morna': 0,
+            'resultados_fria': 0,
+            'consultas_morna': 0,
+            'consultas_fria': 0,
+            'promovidos_morna_quente': 0,
+            'promovidos_fria': 0,
+            'rebaixados_quente': 0,
+        }
+        self.tempos = {'quente': 0.0, 'morna': 0.0, 'fria': 0.0}
+
+    def codificar(self, textos: List[str]) -> np.ndarray:
+        """Embeddings normalizados (float32) dos textos."""
+        if self._codificar_externo is not None:
+            return _normalizar(self._codificar_externo(list(textos)))
+        largura = self.config['largura_fallback']
+        if not textos:
+            return np.zeros((0, largura), dtype=np.float32)
+        return _normalizar(np.stack([self._motor_fallback.denso(t, largura) for t in textos]))
+
+    # === Acessos e pontuacao ===
+
+    def acessos(self, chave: int, agora: Optional[float] = None) -> float:
+        """Contagem de acessos com decaimento (meia-vida ``meia_vida_acessos_s``)."""
+        valor = self._acessos.get(chave)
+        if valor is None:
+            return 0.0
+        contagem, instante = valor
+        agora = time.time() if agora is None else agora
+        return contagem * 0.5 ** ((agora - instante) / self.config['meia_vida_acessos_s'])
+
+    def _registrar_acesso(self, chave: int, agora: float) -> float:
+        with self._trava_acessos:
+            contagem = self.acessos(chave, agora) + 1.0
+            self._acessos[chave] = (contagem, agora)
+            if len(self._acessos) > self.config['max_acessos']:
+                self._podar_acessos(agora)
+        return contagem
+
+    def _podar_acessos(self, agora: float) -> None:
+        """Mantem a metade mais quente das chaves."""
+        ordenadas = sorted(self._acessos, key=lambda c: self.acessos(c, agora), reverse=True)
+        for chave in ordenadas[self.config['max_acessos'] // 2:]:
+            del self._acessos[chave]
+
+    def pontuacao(self, chave: int, registro: Dict[str, Any], agora: float) -> float:
+        """Valor de manter o registro na quente."""
+        pontos = float(registro.get('importancia', 0.5))
+        pontos += self.config['peso_mencoes'] * math.log1p(max(0, int(registro.get('mencoes', 1)) - 1))
+        pontos += self.config['peso_acessos'] * math.log1p(self.acessos(chave, agora))
+        if chave in self.quente and agora - self.quente.entrada(chave) < self.config['janela_recente_s']:
+            pontos += 1.0
+        return pontos
+
+    def manter_morno(self, registro: Dict[str, Any]) -> bool:
+        """Filtro do rebaixamento morna -> fria: True segura o registro na morna."""
+        chave = hash_fato(registro.get('conteudo', ''))
+        return (chave in self.quente
+                or self.acessos(chave) >= self.config['acessos_morno']
+                or int(registro.get('mencoes', 1)) >= self.config['mencoes_morno'])
+
+    # === Escrita ===
+
+    def admitir(self, fatos: List[Dict[str, Any]]) -> None:
+        """Fatos recem-criados (ja gravados na morna) entram na quente."""
+        if not fatos:
+            return
+        vetores = self.codificar([f['conteudo'] for f in fatos])
+        with self.trava:
+            for fato, vetor in zip(fatos, vetores):
+                registro = {
+                    'conteudo': fato['conteudo'],
+                    'tipo': fato.get('tipo', 'evento'),
+                    'tags': list(fato.get('tags', [])),
+                    'importancia': fato.get('importancia', 0.5),
+                    'mencoes': fato.get('mencoes', 1),
+                    'timestamp': fato.get('timestamp', ''),
+                }
+                self.quente.inserir(hash_fato(fato['conteudo']), registro, vetor)
+            self._despejar_quente()
+
+    def atualizar(self, atualizacoes: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Propaga atualizacoes de metadados (importancia, mencoes, ultima_mencao) da morna.
+        Fatos fora da quente que passaram de ``limiar_importancia_quente`` sobem para ela.
+
+        :param atualizacoes: Pares (conteudo, metadados atualizados).
+        """
+        promover = []
+        with self.trava:
+            for conteudo, metadados in atualizacoes:
+                registro = self.quente.obter(hash_fato(conteudo))
+                if registro is not None:
+                    registro.update(metadados)
+                elif metadados.get('importancia', 0.0) >= self.config['limiar_importancia_quente']:
+                    promover.append({**metadados, 'conteudo': conteudo})
+        if promover:
+            self.admitir(promover)
+            self.contadores['promovidos_morna_quente'] += len(promover)
+
+    def descartar(self, registros: List[Dict[str, Any]]) -> None:
+        """Tira da quente registros que sairam da morna (mesclados, arquivados ou resumidos)."""
+        with self.trava:
+            for registro in registros:
+                self.quente.remover(hash_fato(registro.get('conteudo', '')))
+
+    def _despejar_quente(self) -> None:
+        """Acima da capacidade, tira os de menor pontuacao de uma vez (continuam na morna)."""
+        capacidade = self.config['capacidade_quente']
+        if len(self.quente) <= capacidade:
+            return
+        alvo = int(capacidade * (1.0 - self.config['folga_despejo']))
+        agora = time.time()
+        chaves = self.quente.chaves()
+        pontos = [self.pontuacao(c, self.quente.obter(c), agora) for c in chaves]
+        for i in np.argsort(pontos)[:len(chaves) - alvo]:
+            self.quente.remover(chaves[i])
+        self.contadores['rebaixados_quente'] += len(chaves) - alvo
+
+    # === Busca ===
+
+    def buscar(self, texto: str, k: int = 10, min_resultados: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Busca em cascata: quente, morna se faltar resultado, fria se ainda faltar.
+
+        :param texto: Consulta.
+        :param k: Resultados desejados.
+        :param min_resultados: Abaixo disto (apos quente + morna) consulta a fria.
+        :return: Dicts do registro com 'camada' ('quente', 'morna' ou 'fria'); os da
+            quente e da fria trazem 'similaridade' (cosseno), os da morna o que o
+            armazenamento vetorial devolver.
+        """
+        if min_resultados is None:
+            min_resultados = self.config['min_resultados'] or k
+        self.contadores['buscas'] += 1
+        agora = time.time()
+        marca = time.perf_counter()
+        vetor = self.codificar([texto])[0]
+
+        resultados: List[Dict[str, Any]] = []
+        vistos = set()
+        with self.trava:
+            for chave, similaridade in self.quente.buscar(vetor, k):
+                if similaridade < self.config['limiar_quente']:
+                    break
+                vistos.add(chave)
+                resultados.append(dict(self.quente.obter(chave), similaridade=similaridade, camada='quente'))
+                self._registrar_acesso(chave, agora)
+        self.contadores['resultados_quente'] += len(resultados)
+        self.tempos['quente'] += time.perf_counter() - marca
+
+        promover_morna: List[Dict[str, Any]] = []
+        if len(resultados) < k and self.morna is not None:
+            marca = time.perf_counter()
+            self.contadores['consultas_morna'] += 1
+            try:
+                encontrados = self.morna.buscar_contexto(texto, k)
+            except Exception as e:
+                logger.error(f"Erro na busca da camada morna: {e}")
+                encontrados = []
+            for item in encontrados:
+                conteudo = item.get('conteudo') or item.get('documento') or ''
+                chave = hash_fato(conteudo)
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+                resultados.append(dict(item, conteudo=conteudo, camada='morna'))
+                self.contadores['resultados_morna'] += 1
+                if self._registrar_acesso(chave, agora) >= self.config['acessos_promocao']:
+                    metadados = item.get('metadados') or item.get('metadata') or {}
+                    promover_morna.append({**metadados, 'conteudo': conteudo})
+            self.tempos['morna'] += time.perf_counter() - marca
+
+        promover_fria: List[Dict[str, Any]] = []
+        if len(resultados) < min_resultados and len(self.fria):
+            marca = time.perf_counter()
+            self.contadores['consultas_fria'] += 1
+            with self.trava:
+                frios = self.fria.buscar(vetor, k - len(resultados) if len(resultados) < k else 1)
+            for registro, similaridade in frios:
+                chave = hash_fato(registro.get('conteudo', ''))
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+                resultados.append(dict(registro, similaridade=similaridade, camada='fria'))
+                self.contadores['resultados_fria'] += 1
+                if self._registrar_acesso(chave, agora) >= self.config['acessos_promocao_fria']:
+                    promover_fria.append(registro)
+            self.tempos['fria'] += time.perf_counter() - marca
+
+        if promover_morna:
+            self.admitir(promover_morna)
+            self.contadores['promovidos_morna_quente'] += len(promover_morna)
+        if promover_fria:
+            self._promover_frios(promover_fria)
+        return resultados[:k]
+
+    def _promover_frios(self, registros: List[Dict[str, Any]]) -> None:
+        """Fria -> morna + quente; o registro sai da fria so depois de gravado na morna."""
+        conteudos = [r['conteudo'] for r in registros]
+        metadados = [
+            {
+                'tipo': r.get('tipo', 'evento'),
+                'tags': ','.join(r.get('tags', [])),
+                'importancia': r.get('importancia', 0.5),
+                'mencoes': r.get('mencoes', 1),
+                'timestamp': r.get('timestamp', ''),
+                'ultima_mencao': r.get('ultima_mencao', r.get('timestamp', '')),
+            }
+            for r in registros
+        ]
+        with self.trava:
+            try:
+                if self.morna is not None:
+                    if hasattr(self.morna, 'registrar_eventos'):
+                        self.morna.registrar_eventos(conteudos, metadados)
+                    else:
+                        for conteudo, meta in zip(conteudos, metadados):
+                            self.morna.registrar_evento(conteudo, meta)
+            except Exception as e:
+                logger.error(f"Erro ao promover registros frios: {e}")
+                return
+            self.fria.remover(r['id'] for r in registros)
+        self.admitir(registros)
+        self.contadores['promovidos_fria'] += len(registros)
+
+    # === Metricas ===
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            'quente': {'registros': len(self.quente), 'capacidade': self.config['capacidade_quente']},
+            'fria': self.fria.estatisticas(),
+            'acessos_rastreados': len(self._acessos),
+            'tempos_s': dict(self.tempos),
+            **self.contadores,
+        }
+
+    def fechar(self) -> None:
+        self.fria.fechar()
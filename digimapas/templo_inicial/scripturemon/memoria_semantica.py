@@ -8,7 +8,7 @@ causa ou emoticao.
 """
 
 import os
-import json
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Dict, Any, Tuple, Optional
@@ -17,6 +17,19 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 import logging
 
+try:
+    from .armazenamento_notas import ArmazenamentoArquivos, ArmazenamentoLog, NotasPreguicosas
+    from .cache_embeddings import CacheEmbeddingsPersistente, CacheLRUEmbeddings, chave_embedding
+    from .embeddings_esparsos import MotorTfidfHash
+    from .indice_ann import IndiceANN, IndiceExato, carregar_indice, criar_indice, recall_em_k, tipo_efetivo
+    from .indice_invertido import IndiceInvertido
+except ImportError:
+    from armazenamento_notas import ArmazenamentoArquivos, ArmazenamentoLog, NotasPreguicosas
+    from cache_embeddings import CacheEmbeddingsPersistente, CacheLRUEmbeddings, chave_embedding
+    from embeddings_esparsos import MotorTfidfHash
+    from indice_ann import IndiceANN, IndiceExato, carregar_indice, criar_indice, recall_em_k, tipo_efetivo
+    from indice_invertido import IndiceInvertido
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -32,21 +45,79 @@ class MemoriaSemantica:
     Memoria semantica para o Scripturemon.
 
     Esta classe armazena notas semanticas interconectadas. Cada nota pode estar ligada a outras notas
-    por relacoes explicitas. Para manter as coisas simples, notas sao persistidas em arquivos JSON
-    dentro de um diretorio de armazenamento.
+    por relacoes explicitas. Por padrao as notas sao persistidas num log de acrescimo segmentado
+    (``armazenamento="log"``); o layout antigo de um arquivo JSON por nota continua disponivel com
+    ``armazenamento="arquivos"``.
     """
 
-    def __init__(self, persist_dir: str = "digimapas/templo_inicial/scripturemon/memoria_semantica_store"):
+    def __init__(
+        self,
+        persist_dir: str = "digimapas/templo_inicial/scripturemon/memoria_semantica_store",
+        nome_modelo: str = "all-MiniLM-L6-v2",
+        cache_dir: Optional[str] = None,
+        armazenamento: str = "log",
+        indice_ann: str = "matriz",
+        parametros_indice: Optional[Dict[str, Any]] = None,
+        cache_max_entradas: Optional[int] = 10000,
+        cache_max_bytes: Optional[int] = None,
+        fixar_recentes: int = 0,
+    ):
+        """
+        :param persist_dir: Diretorio onde as notas sao persistidas.
+        :param nome_modelo: Modelo SentenceTransformer usado para embeddings.
+        :param cache_dir: Diretorio do cache persistente de embeddings (padrao: dentro de persist_dir).
+        :param armazenamento: "log" (log segmentado) ou "arquivos" (um JSON por nota).
+        :param indice_ann: Backend de busca de similares: "matriz" (exata, na matriz de embeddings),
+            "exato", "ivf" ou "hnsw" (ver indice_ann.criar_indice).
+        :param parametros_indice: Parametros repassados ao construtor do indice ANN.
+        :param cache_max_entradas: Limite de embeddings no cache em memoria (None = sem limite).
+        :param cache_max_bytes: Limite de bytes do cache em memoria (None = sem limite).
+        :param fixar_recentes: Quantos embeddings das notas mais recentes ficam fixados no cache.
+        """
         # Diretorio onde as notas serao persistidas
         self.persist_dir = persist_dir
         os.makedirs(self.persist_dir, exist_ok=True)
+        if armazenamento == "log":
+            self.armazenamento = ArmazenamentoLog(os.path.join(self.persist_dir, "log"))
+        elif armazenamento == "arquivos":
+            self.armazenamento = ArmazenamentoArquivos(self.persist_dir)
+        else:
+            raise ValueError(f"Armazenamento desconhecido: {armazenamento}")
         # Mapeamento de ID de nota para instancia NotaSemantica
         self.notas: Dict[str, NotaSemantica] = {}
 
         # Atributos para embedings semanticos
+        self.nome_modelo = nome_modelo
         self.modelo_embeddings = None
-        self._embeddings_cache = {}
+        self._embeddings_cache = CacheLRUEmbeddings(cache_max_entradas, cache_max_bytes)
+        self.fixar_recentes = fixar_recentes
+        self._chaves_recentes: deque = deque()
+        self._cache_persistente = CacheEmbeddingsPersistente(
+            cache_dir or os.path.join(self.persist_dir, "embeddings_cache"), nome_modelo
+        )
         self.threshold_link = 0.8
+        # Numero de textos enviados ao modelo por chamada ao reconstruir a matriz
+        self.lote_embeddings = 1024
+
+        # Matriz contigua de embeddings L2-normalizados (float32). A linha i corresponde
+        # a nota self._ids_matriz[i]; as linhas alem de len(self._ids_matriz) sao capacidade livre.
+        self._matriz: Optional[np.ndarray] = None
+        self._ids_matriz: List[str] = []
+        self._posicao_matriz: Dict[str, int] = {}
+        # Fallback sem modelo: TF-IDF esparso com colunas fixas por hashing
+        self._motor_esparso = MotorTfidfHash()
+
+        # Indice ANN opcional, mantido em sincronia com a matriz e salvo em persist_dir/indice_ann
+        self.tipo_indice = indice_ann
+        self.parametros_indice = parametros_indice or {}
+        self._dir_indice_ann = os.path.join(self.persist_dir, "indice_ann")
+        self._indice_ann: Optional[IndiceANN] = None
+
+        # Indices invertidos tag -> ids e tipo de relacao -> ids de origem, ordenados por created_at.
+        # Apos carregar_notas sao reconstruidos sob demanda (ver _garantir_indices).
+        self._indice_tags = IndiceInvertido()
+        self._indice_relacoes = IndiceInvertido()
+        self._indices_prontos = True
 
     def registrar_nota(self, conteudo: str, tags: List[str] = None, links: Dict[str, List[str]] = None) -> str:
         """
@@ -57,42 +128,185 @@ class MemoriaSemantica:
         :param links: Dicionario opcional de relacionamentos para outras notas, indexado por tipo de relacao.
         :return: Identificador unico da nota criada.
         """
-        nota_id = datetime.utcnow().isoformat()
+        nota_id = self._novo_id()
         nota = NotaSemantica(conteudo=conteudo, tags=tags or [], relacionamentos=links or {})
         self.notas[nota_id] = nota
         self._salvar_nota(nota_id, nota)
+        self._indexar_nota(nota_id)
+        self._indexar_embedding(nota_id)
+        if self.fixar_recentes > 0:
+            self._fixar_recente(chave_embedding(conteudo, self.nome_modelo))
+        return nota_id
+
+    def remover_nota(self, nota_id: str) -> None:
+        """
+        Remove uma nota da memoria, do armazenamento e dos indices.
+
+        Links de outras notas que apontam para ela sao mantidos (historico).
+        """
+        if nota_id not in self.notas:
+            raise KeyError(f"Nota {nota_id} nao encontrada.")
+        del self.notas[nota_id]
+        self.armazenamento.remover(nota_id)
+        self._indice_tags.remover(nota_id)
+        self._indice_relacoes.remover(nota_id)
+        self._remover_da_matriz(nota_id)
+
+    def atualizar_nota(
+        self,
+        nota_id: str,
+        tags: Optional[List[str]] = None,
+        links: Optional[Dict[str, List[str]]] = None,
+    ) -> None:
+        """
+        Acrescenta tags e relacionamentos a uma nota existente e a regrava.
+
+        :param nota_id: ID da nota.
+        :param tags: Tags a acrescentar (as repetidas sao ignoradas).
+        :param links: Relacionamentos a acrescentar, por tipo de relacao (destinos repetidos sao ignorados).
+        """
+        nota = self.notas.get(nota_id)
+        if not nota:
+            raise KeyError(f"Nota {nota_id} nao encontrada.")
+        if tags:
+            nota.tags = list(dict.fromkeys(nota.tags + list(tags)))
+        for tipo, destinos in (links or {}).items():
+            atuais = nota.relacionamentos.setdefault(tipo, [])
+            atuais.extend(d for d in dict.fromkeys(destinos) if d not in atuais)
+        self._salvar_nota(nota_id, nota)
+        self._indexar_nota(nota_id)
+
+    def _novo_id(self) -> str:
+        """Gera um ID baseado no horario, com sufixo quando outra nota ja usa o mesmo instante."""
+        base = datetime.utcnow().isoformat()
+        nota_id, sufixo = base, 1
+        while nota_id in self.notas:
+            nota_id = f"{base}-{sufixo}"
+            sufixo += 1
         return nota_id
 
     def _salvar_nota(self, nota_id: str, nota: NotaSemantica) -> None:
-        """Salva a nota em disco como JSON."""
-        path = os.path.join(self.persist_dir, f"{nota_id}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({
-                "conteudo": nota.conteudo,
-                "tags": nota.tags,
-                "relacionamentos": nota.relacionamentos,
-                "created_at": nota.created_at.isoformat()
-            }, f, ensure_ascii=False, indent=2)
+        """Persiste a nota no armazenamento configurado."""
+        self.armazenamento.salvar(nota_id, {
+            "conteudo": nota.conteudo,
+            "tags": nota.tags,
+            "relacionamentos": nota.relacionamentos,
+            "created_at": nota.created_at.isoformat()
+        })
+
+    def _ler_nota(self, nota_id: str) -> NotaSemantica:
+        """Le uma nota do armazenamento (usado pelo carregamento preguicoso)."""
+        data = self.armazenamento.carregar(nota_id)
+        return NotaSemantica(
+            conteudo=data.get("conteudo", ""),
+            tags=data.get("tags", []),
+            relacionamentos=data.get("relacionamentos", {}),
+            created_at=datetime.fromisoformat(data.get("created_at"))
+        )
 
     def carregar_notas(self) -> None:
-        """Carrega todas as notas persistidas do diretorio para a memoria em execucao."""
-        self.notas = {}
-        for filename in os.listdir(self.persist_dir):
-            if filename.endswith(".json"):
-                nota_id = filename[:-5]
-                with open(os.path.join(self.persist_dir, filename), encoding="utf-8") as f:
-                    data = json.load(f)
-                nota = NotaSemantica(
-                    conteudo=data.get("conteudo", ""),
-                    tags=data.get("tags", []),
-                    relacionamentos=data.get("relacionamentos", {}),
-                    created_at=datetime.fromisoformat(data.get("created_at"))
-                )
-                self.notas[nota_id] = nota
+        """
+        Carrega o indice das notas persistidas; o corpo de cada nota e lido no primeiro acesso.
+
+        No armazenamento em log, notas do layout antigo (um JSON por nota em persist_dir)
+        sao migradas uma unica vez.
+        """
+        self._limpar_matriz()
+        self._indice_tags = IndiceInvertido()
+        self._indice_relacoes = IndiceInvertido()
+        self._indices_prontos = False
+        if isinstance(self.armazenamento, ArmazenamentoLog):
+            self.armazenamento.migrar_de_arquivos(self.persist_dir)
+        self.notas = NotasPreguicosas(self.armazenamento.listar_ids(), self._ler_nota)
+        self._carregar_indice_ann()
+
+    def compactar(self) -> None:
+        """Compacta o log de notas (sem efeito no layout de um arquivo por nota)."""
+        if isinstance(self.armazenamento, ArmazenamentoLog):
+            self.armazenamento.compactar()
+
+    def fechar(self) -> None:
+        """Grava o indice do armazenamento (e o indice ANN, se houver) e libera arquivos abertos."""
+        self.armazenamento.fechar()
+        if self._indice_ann is not None:
+            self._indice_ann.salvar(self._dir_indice_ann)
+            with open(os.path.join(self._dir_indice_ann, "modelo.txt"), "w", encoding="utf-8") as f:
+                f.write(self.nome_modelo)
 
     def buscar_por_tag(self, tag: str) -> List[NotaSemantica]:
         """Retorna uma lista de notas que contem a tag especificada."""
-        return [nota for nota in self.notas.values() if tag in nota.tags]
+        return self.buscar_por_tags([tag])
+
+    def buscar_por_tags(
+        self,
+        tags: List[str],
+        modo: str = "ou",
+        inicio: Optional[datetime] = None,
+        fim: Optional[datetime] = None,
+        offset: int = 0,
+        limite: Optional[int] = None,
+        recentes_primeiro: bool = False,
+    ) -> List[NotaSemantica]:
+        """
+        Busca notas por varias tags usando o indice invertido.
+
+        :param tags: Tags consultadas.
+        :param modo: "ou" (qualquer tag) ou "e" (todas as tags).
+        :param inicio: Data minima de criacao (inclusiva).
+        :param fim: Data maxima de criacao (inclusiva).
+        :param offset: Quantas notas pular (paginacao).
+        :param limite: Numero maximo de notas retornadas.
+        :param recentes_primeiro: Ordena da nota mais recente para a mais antiga.
+        :return: Lista de notas, ordenadas por data de criacao.
+        """
+        return [self.notas[nid] for nid in self.buscar_ids_por_tags(
+            tags, modo, inicio, fim, offset, limite, recentes_primeiro
+        )]
+
+    def buscar_ids_por_tags(
+        self,
+        tags: List[str],
+        modo: str = "ou",
+        inicio: Optional[datetime] = None,
+        fim: Optional[datetime] = None,
+        offset: int = 0,
+        limite: Optional[int] = None,
+        recentes_primeiro: bool = False,
+    ) -> List[str]:
+        """Igual a buscar_por_tags, mas retorna apenas os IDs (sem carregar as notas)."""
+        self._garantir_indices()
+        return self._indice_tags.consultar(
+            tags,
+            modo=modo,
+            inicio=inicio.timestamp() if inicio else None,
+            fim=fim.timestamp() if fim else None,
+            offset=offset,
+            limite=limite,
+            recentes_primeiro=recentes_primeiro,
+        )
+
+    def buscar_por_relacao(self, tipo: str) -> List[str]:
+        """Retorna os IDs das notas que possuem ao menos um relacionamento do tipo dado."""
+        self._garantir_indices()
+        return self._indice_relacoes.consultar([tipo])
+
+    def _indexar_nota(self, nota_id: str) -> None:
+        """(Re)indexa tags e tipos de relacao da nota nos indices invertidos."""
+        if not self._indices_prontos:
+            return
+        nota = self.notas[nota_id]
+        tempo = nota.created_at.timestamp()
+        self._indice_tags.adicionar(nota_id, nota.tags, tempo)
+        tipos = [tipo for tipo, destinos in nota.relacionamentos.items() if destinos]
+        self._indice_relacoes.adicionar(nota_id, tipos, tempo)
+
+    def _garantir_indices(self) -> None:
+        """Constroi os indices invertidos na primeira consulta apos carregar_notas."""
+        if self._indices_prontos:
+            return
+        self._indices_prontos = True
+        for nid in list(self.notas.keys()):
+            self._indexar_nota(nid)
 
     def adicionar_relacionamento(self, origem_id: str, destino_id: str, tipo: str) -> None:
         """
@@ -108,6 +322,7 @@ class MemoriaSemantica:
         origem.relacionamentos.setdefault(tipo, []).append(destino_id)
         # Atualiza persistencia
         self._salvar_nota(origem_id, origem)
+        self._indexar_nota(origem_id)
 
     # === Métodos de link automático e embeddings ===
 
@@ -121,32 +336,279 @@ class MemoriaSemantica:
         """
         if nota_id not in self.notas:
             raise KeyError(f"Nota {nota_id} nao encontrada.")
-        embed_origem = self._gerar_embedding(self.notas[nota_id].conteudo)
-        similares = []
-        for other_id, nota in self.notas.items():
-            if other_id == nota_id:
-                continue
-            embed2 = self._gerar_embedding(nota.conteudo)
-            sim = self._similaridade_coseno(embed_origem, embed2)
-            if sim >= self.threshold_link:
-                similares.append((other_id, sim))
-        similares.sort(key=lambda x: x[1], reverse=True)
-        escolhidos = similares[:max_links]
+        escolhidos = self._similares(nota_id, max_links)
         for dest_id, sim in escolhidos:
             self.adicionar_relacionamento(nota_id, dest_id, "similaridade_auto")
         return escolhidos
 
+    def _similares(self, nota_id: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Ate k notas com similaridade >= threshold_link, usando o backend configurado.
+
+        Ordem de escolha: fallback esparso (sem modelo), indice ANN (se configurado)
+        e, por fim, a busca exata na matriz de embeddings.
+        """
+        self._garantir_matriz()
+        if self._modo_esparso():
+            return self._motor_esparso.similares(nota_id, k, self.threshold_link)
+        if self._indice_ann is not None and k > 0:
+            vetor = self._matriz[self._posicao_matriz[nota_id]]
+            pares = self._indice_ann.buscar(vetor, k + 1)
+            return [(d, s) for d, s in pares if d != nota_id and s >= self.threshold_link][:k]
+        return self._similares_por_matriz(nota_id, k)
+
+    def _similares_por_matriz(self, nota_id: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Retorna ate k notas com similaridade >= threshold_link, em ordem decrescente.
+
+        Usa um unico produto matriz-vetor sobre a matriz normalizada e argpartition
+        para selecionar o top-k sem ordenar todas as similaridades.
+        """
+        n = len(self._ids_matriz)
+        if k <= 0 or n < 2:
+            return []
+        pos = self._posicao_matriz[nota_id]
+        sims = self._matriz[:n] @ self._matriz[pos]
+        sims[pos] = -np.inf
+        candidatos = np.flatnonzero(sims >= self.threshold_link)
+        if candidatos.size > k:
+            candidatos = candidatos[np.argpartition(-sims[candidatos], k - 1)[:k]]
+        candidatos = candidatos[np.argsort(-sims[candidatos], kind="stable")]
+        return [(self._ids_matriz[i], float(sims[i])) for i in candidatos]
+
+    # === Matriz de embeddings ===
+
+    def _limpar_matriz(self) -> None:
+        """Descarta a matriz de embeddings (sera reconstruida sob demanda)."""
+        self._matriz = None
+        self._ids_matriz = []
+        self._posicao_matriz = {}
+        self._motor_esparso = MotorTfidfHash()
+        self._indice_ann = None
+
+    def _modo_esparso(self) -> bool:
+        """True quando o modelo nao carregou e o fallback TF-IDF esparso esta em uso."""
+        return self.modelo_embeddings == "simple"
+
+    def _remover_da_matriz(self, nota_id: str) -> None:
+        """Remove a linha da nota movendo a ultima linha para o seu lugar (O(dim))."""
+        self._motor_esparso.remover(nota_id)
+        if self._indice_ann is not None:
+            self._indice_ann.remover(nota_id)
+        pos = self._posicao_matriz.pop(nota_id, None)
+        if pos is None:
+            return
+        ultimo = len(self._ids_matriz) - 1
+        if pos != ultimo:
+            self._matriz[pos] = self._matriz[ultimo]
+            movido = self._ids_matriz[ultimo]
+            self._ids_matriz[pos] = movido
+            self._posicao_matriz[movido] = pos
+        self._ids_matriz.pop()
+
+    def _garantir_matriz(self) -> None:
+        """Indexa na matriz as notas que ainda nao possuem linha (ex.: apos carregar_notas)."""
+        if self._modo_esparso():
+            for nid in self.notas:
+                if nid not in self._motor_esparso:
+                    self._motor_esparso.adicionar(nid, self.notas[nid].conteudo)
+            return
+        if len(self._posicao_matriz) == len(self.notas):
+            return
+        faltantes = [nid for nid in self.notas if nid not in self._posicao_matriz]
+        for inicio in range(0, len(faltantes), self.lote_embeddings):
+            lote = faltantes[inicio:inicio + self.lote_embeddings]
+            try:
+                vetores = self.encode_many([self.notas[nid].conteudo for nid in lote])
+            except Exception as e:
+                logger.error(f"Erro ao gerar embeddings em lote: {e}")
+                vetores = [None] * len(lote)
+            if self._modo_esparso():
+                # O modelo acabou de falhar ao carregar: passa todas as notas ao fallback
+                self._limpar_matriz()
+                self._garantir_matriz()
+                return
+            for nid, vetor in zip(lote, vetores):
+                self._indexar_embedding(nid, vetor)
+
+    def _indexar_embedding(self, nota_id: str, vetor: Optional[np.ndarray] = None) -> None:
+        """
+        Insere (ou sobrescreve) a linha da nota na matriz de embeddings.
+
+        A capacidade cresce por duplicacao, entao inserir n notas custa O(n) copias amortizadas.
+        """
+        if vetor is None:
+            if self._modo_esparso():
+                self._motor_esparso.adicionar(nota_id, self.notas[nota_id].conteudo)
+                return
+            vetor = self._gerar_embedding(self.notas[nota_id].conteudo)
+            if self._modo_esparso():
+                self._limpar_matriz()
+                self._garantir_matriz()
+                return
+        vetor = np.asarray(vetor, dtype=np.float32).ravel()
+        if self._matriz is not None and vetor.shape[0] != self._matriz.shape[1]:
+            if np.any(vetor):
+                # Dimensao mudou (ex.: troca de modelo): reconstroi tudo com o modelo atual
+                self._limpar_matriz()
+                self._garantir_matriz()
+                return
+            vetor = np.zeros(self._matriz.shape[1], dtype=np.float32)
+        norma = np.linalg.norm(vetor)
+        if norma > 0:
+            vetor = vetor / norma
+
+        pos = self._posicao_matriz.get(nota_id)
+        if pos is None:
+            pos = len(self._ids_matriz)
+            if self._matriz is None:
+                self._matriz = np.empty((64, vetor.shape[0]), dtype=np.float32)
+            elif pos >= self._matriz.shape[0]:
+                nova = np.empty((self._matriz.shape[0] * 2, self._matriz.shape[1]), dtype=np.float32)
+                nova[:pos] = self._matriz[:pos]
+                self._matriz = nova
+            self._ids_matriz.append(nota_id)
+            self._posicao_matriz[nota_id] = pos
+        self._matriz[pos] = vetor
+        self._adicionar_ann(nota_id, vetor)
+
+    # === Indice ANN ===
+
+    def _adicionar_ann(self, nota_id: str, vetor: np.ndarray) -> None:
+        """Insere a nota no indice ANN configurado (notas ja presentes, ex. carregadas do disco, sao mantidas)."""
+        if self.tipo_indice == "matriz":
+            return
+        if self._indice_ann is None or self._indice_ann.dim != vetor.shape[0]:
+            self._indice_ann = criar_indice(self.tipo_indice, vetor.shape[0], **self.parametros_indice)
+        if nota_id not in self._indice_ann:
+            self._indice_ann.adicionar([nota_id], vetor[np.newaxis, :])
+
+    def _carregar_indice_ann(self) -> None:
+        """Carrega o indice ANN salvo ao lado das notas, se for do tipo e modelo configurados."""
+        if self.tipo_indice == "matriz":
+            return
+        caminho_modelo = os.path.join(self._dir_indice_ann, "modelo.txt")
+        if not os.path.exists(caminho_modelo):
+            return
+        with open(caminho_modelo, encoding="utf-8") as f:
+            if f.read().strip() != self.nome_modelo:
+                return
+        indice = carregar_indice(self._dir_indice_ann)
+        # Compara com o tipo que criar_indice geraria (ex.: "hnsw" sem hnswlib vira "ivf")
+        if indice is None or indice.tipo != tipo_efetivo(self.tipo_indice):
+            return
+        for nid in indice.ids():
+            if nid not in self.notas:
+                indice.remover(nid)
+        self._indice_ann = indice
+
+    def verificar_recall_ann(self, amostra: int = 100, k: int = 10, semente: int = 0) -> float:
+        """
+        Mede o recall@k do indice ANN contra a busca exata na matriz de embeddings.
+
+        :param amostra: Numero de notas usadas como consulta.
+        :param k: Numero de vizinhos comparados.
+        :return: Recall medio (1.0 se nao houver indice ANN configurado).
+        """
+        self._garantir_matriz()
+        if self._indice_ann is None or not self._ids_matriz:
+            return 1.0
+        n = len(self._ids_matriz)
+        exato = IndiceExato(self._matriz.shape[1])
+        exato.adicionar(self._ids_matriz, self._matriz[:n])
+        rng = np.random.default_rng(semente)
+        consultas = self._matriz[rng.choice(n, min(amostra, n), replace=False)]
+        recall = recall_em_k(self._indice_ann, exato, consultas, k)
+        logger.info(f"Recall@{k} do indice {self._indice_ann.tipo}: {recall:.3f}")
+        return recall
+
     def _inicializar_modelo_embeddings(self):
         """
         Inicializa o modelo de embeddings se ainda não estiver carregado.
         """
         if self.modelo_embeddings is None:
             try:
-                self.modelo_embeddings = SentenceTransformer("all-MiniLM-L6-v2")
+                self.modelo_embeddings = SentenceTransformer(self.nome_modelo)
             except Exception as e:
                 logger.error(f"Erro ao inicializar SentenceTransformer: {e}")
                 self.modelo_embeddings = "simple"
 
+    def embeddings_estaveis(self) -> bool:
+        """
+        Carrega o modelo se preciso; True quando ha modelo, ou seja, quando os vetores de
+        ``encode_many`` podem ser guardados e comparados com vetores de chamadas futuras.
+        """
+        self._inicializar_modelo_embeddings()
+        return not self._modo_esparso()
+
+    def encode_many(self, textos: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Gera embeddings para varios textos com uma unica chamada ao modelo.
+
+        Consulta primeiro o cache em memoria e o cache persistente (digest do texto + nome
+        do modelo); o modelo so e carregado se algum texto ainda nao tiver embedding.
+
+        :param textos: Textos a codificar.
+        :param batch_size: Tamanho de lote repassado ao SentenceTransformer.
+        :return: Matriz (len(textos), dim) com os embeddings na ordem de entrada.
+        """
+        if not textos:
+            return np.zeros((0, 0), dtype=np.float32)
+        chaves = [chave_embedding(texto, self.nome_modelo) for texto in textos]
+        encontrados: Dict[str, np.ndarray] = {}
+        if self.modelo_embeddings != "simple":
+            for chave in dict.fromkeys(chaves):
+                vetor = self._embeddings_cache.obter(chave)
+                if vetor is not None:
+                    encontrados[chave] = vetor
+            do_disco = self._cache_persistente.buscar([c for c in dict.fromkeys(chaves) if c not in encontrados])
+            self._embeddings_cache.atualizar(do_disco)
+            encontrados.update(do_disco)
+
+        pendentes = {c: t for c, t in zip(chaves, textos) if c not in encontrados}
+        if pendentes:
+            self._inicializar_modelo_embeddings()
+            if self.modelo_embeddings == "simple":
+                # Vetores do fallback dependem do vocabulario atual: nao podem ser reaproveitados
+                return np.array([self._embedding_simples(texto) for texto in textos])
+            novos = np.asarray(
+                self.modelo_embeddings.encode(list(pendentes.values()), batch_size=batch_size),
+                dtype=np.float32,
+            )
+            self._cache_persistente.adicionar(list(pendentes.keys()), novos)
+            novos = dict(zip(pendentes.keys(), novos))
+            self._embeddings_cache.atualizar(novos)
+            encontrados.update(novos)
+        return np.array([encontrados[c] for c in chaves])
+
+    # === Cache de embeddings em memoria ===
+
+    def _fixar_recente(self, chave: str) -> None:
+        """Fixa o embedding de uma nota nova e libera o da nota que saiu da janela de recentes."""
+        if not self._embeddings_cache.fixar(chave):
+            return
+        self._chaves_recentes.append(chave)
+        while len(self._chaves_recentes) > self.fixar_recentes:
+            antiga = self._chaves_recentes.popleft()
+            if antiga not in self._chaves_recentes:
+                self._embeddings_cache.desafixar(antiga)
+
+    def fixar_embeddings(self, nota_ids: List[str]) -> int:
+        """
+        Fixa no cache os embeddings das notas dadas (gerando-os se preciso).
+
+        :return: Numero de embeddings fixados.
+        """
+        textos = [self.notas[nid].conteudo for nid in nota_ids]
+        self.encode_many(textos)
+        return sum(self._embeddings_cache.fixar(chave_embedding(t, self.nome_modelo)) for t in textos)
+
+    def estatisticas_cache(self) -> Dict[str, Any]:
+        """Estatisticas do cache em memoria (acertos, faltas, despejos, bytes) e do cache em disco."""
+        stats = self._embeddings_cache.estatisticas()
+        stats["persistente_entradas"] = len(self._cache_persistente)
+        return stats
+
     def _gerar_embedding(self, texto: str) -> np.ndarray:
         """
         Gera um embedding para o texto dado.
@@ -154,36 +616,28 @@ class MemoriaSemantica:
         :param texto: Texto para gerar embedding
         :return: Vetor numpy com o embedding
         """
-        self._inicializar_modelo_embeddings()
-        texto_hash = hash(texto)
-        if texto_hash in self._embeddings_cache:
-            return self._embeddings_cache[texto_hash]
         try:
-            if self.modelo_embeddings == "simple":
-                embedding = self._embedding_simples(texto)
-            else:
-                embedding = self.modelo_embeddings.encode(texto)
-            self._embeddings_cache[texto_hash] = embedding
-            return embedding
+            return self.encode_many([texto])[0]
         except Exception as e:
             logger.error(f"Erro ao gerar embedding: {e}")
             return np.zeros((768,))
 
     def _embedding_simples(self, texto: str) -> np.ndarray:
         """
-        Fallback simples: bag-of-words binário em vocabulário reduzido.
+        Fallback sem modelo: vetor TF-IDF com hashing, de largura fixa.
+
+        A largura nao depende do numero de notas, entao vetores gerados em momentos
+        diferentes continuam comparaveis.
         """
-        vocab = self._obter_vocabulario()
-        vec = np.zeros(len(vocab), dtype=float)
-        for i, word in enumerate(vocab):
-            vec[i] = 1.0 if word in texto else 0.0
-        return vec
+        return self._motor_esparso.denso(texto)
 
     def _buscar_similares(self, nota_id: str, topn: int = 3) -> List[Tuple[str, float]]:
         """
-        Busca as top-N notas mais similares a uma dada nota existente.
+        Busca as top-N notas mais similares a uma dada nota existente (sem criar links).
         """
-        return self.link_automatico(nota_id, max_links=topn)
+        if nota_id not in self.notas:
+            raise KeyError(f"Nota {nota_id} nao encontrada.")
+        return self._similares(nota_id, topn)
 
     def _similaridade_coseno(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
@@ -200,28 +654,83 @@ class MemoriaSemantica:
             logger.error(f"Erro em similaridade_coseno: {e}")
             return 0.0
 
-    def _obter_vocabulario(self) -> List[str]:
-        """
-        Constrói vocabulário a partir de todas as notas existentes.
-        """
-        vocab = set()
-        for nota in self.notas.values():
-            for word in nota.conteudo.split():
-                vocab.add(word.lower())
-        return sorted(vocab)
-
-    def atualizar_links_em_lote(self, nota_ids: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    def atualizar_links_em_lote(
+        self,
+        nota_ids: Optional[List[str]] = None,
+        max_links: int = 5,
+        em_blocos: bool = True,
+        orcamento_mb: float = 64.0,
+    ) -> Dict[str, List[str]]:
         """
         Atualiza automaticamente links de similares em lote.
 
+        No modo em blocos, as similaridades de todos os alvos sao calculadas por
+        multiplicacao de matrizes em faixas de linhas que cabem em ``orcamento_mb``,
+        e cada nota alterada e gravada em disco uma unica vez.
+
         :param nota_ids: Lista de IDs de notas para processar. Se None, processa todas.
+        :param max_links: Número máximo de links por nota.
+        :param em_blocos: Se False, usa o laco antigo de link_automatico por nota.
+        :param orcamento_mb: Memoria maxima (MB) para cada bloco de similaridades.
         :return: Dicionário com mapeamento nota_id -> lista de IDs relacionados.
         """
-        resultados = {}
         alvo = nota_ids or list(self.notas.keys())
+        if not em_blocos:
+            return {nid: [dest for dest, _ in self.link_automatico(nid, max_links)] for nid in alvo}
+
+        for nid in alvo:
+            if nid not in self.notas:
+                raise KeyError(f"Nota {nid} nao encontrada.")
+        self._garantir_matriz()
+        escolhidos = self._similares_em_blocos(alvo, max_links, orcamento_mb)
+
+        alterados = []
         for nid in alvo:
-            resultados[nid] = [dest for dest, _ in self.link_automatico(nid)]
-        return resultados
+            if escolhidos[nid]:
+                destinos = self.notas[nid].relacionamentos.setdefault("similaridade_auto", [])
+                destinos.extend(dest for dest, _ in escolhidos[nid])
+                alterados.append(nid)
+        for nid in dict.fromkeys(alterados):
+            self._salvar_nota(nid, self.notas[nid])
+            self._indexar_nota(nid)
+        return {nid: [dest for dest, _ in escolhidos[nid]] for nid in alvo}
+
+    def _similares_em_blocos(
+        self, alvo: List[str], k: int, orcamento_mb: float
+    ) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Calcula o top-k acima de threshold_link para varias notas sem materializar a matriz n x n.
+
+        Cada bloco tem no maximo ``orcamento_mb`` de similaridades float32 (linhas x n).
+        """
+        if self._modo_esparso():
+            return self._motor_esparso.similares_em_lote(alvo, k, self.threshold_link, orcamento_mb)
+        n = len(self._ids_matriz)
+        resultado: Dict[str, List[Tuple[str, float]]] = {nid: [] for nid in alvo}
+        if k <= 0 or n < 2:
+            return resultado
+        k = min(k, n - 1)
+        linhas_por_bloco = max(1, int(orcamento_mb * 1024 * 1024) // (n * 4))
+        posicoes = np.array([self._posicao_matriz[nid] for nid in alvo], dtype=np.int64)
+        base = self._matriz[:n]
+
+        for inicio in range(0, len(posicoes), linhas_por_bloco):
+            bloco = posicoes[inicio:inicio + linhas_por_bloco]
+            sims = base[bloco] @ base.T
+            sims[np.arange(len(bloco)), bloco] = -np.inf
+            topo = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            valores = np.take_along_axis(sims, topo, axis=1)
+            ordem = np.argsort(-valores, axis=1, kind="stable")
+            topo = np.take_along_axis(topo, ordem, axis=1)
+            valores = np.take_along_axis(valores, ordem, axis=1)
+            for linha, pos in enumerate(bloco):
+                nid = self._ids_matriz[pos]
+                resultado[nid] = [
+                    (self._ids_matriz[j], float(v))
+                    for j, v in zip(topo[linha], valores[linha])
+                    if v >= self.threshold_link
+                ]
+        return resultado
 
     def obter_grafo_semantico(self) -> Dict[str, Any]:
         """
@@ -16,17 +16,57 @@ class MemoriaVetorial:
         uid = f"{self.digimon_id}-{datetime.now().isoformat()}"
         self.collection.add(documents=[conteudo], metadatas=[metadados], ids=[uid])
 
+    def registrar_eventos(self, conteudos: List[str], metadados: List[Dict[str, Any]]) -> None:
+        """Registra varios eventos com um unico add (um lote de embeddings)."""
+        if not conteudos:
+            return
+        base = f"{self.digimon_id}-{datetime.now().isoformat()}"
+        ids = [f"{base}-{i}" for i in range(len(conteudos))]
+        self.collection.add(documents=list(conteudos), metadatas=list(metadados), ids=ids)
+
     def buscar_contexto(self, consulta: str, k: int = 5) -> List[Dict[str, Any]]:
-        resultados = self.collection.query(query_texts=[consulta], n_results=k)
+        return self.buscar_contexto_lote([consulta], k)[0]
+
+    def buscar_contexto_lote(self, consultas: List[str], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Uma unica consulta com varios textos; devolve uma lista de resultados por texto.
+        Cada resultado traz 'id', 'conteudo', 'importancia' e 'mencoes' (dos metadados),
+        'distancia' e 'similaridade' (ambas a distancia do Chroma: menor e mais parecido,
+        como sempre foi) e 'cosseno' (1 - distancia: maior e mais parecido).
+        """
+        if not consultas:
+            return []
+        resultados = self.collection.query(
+            query_texts=list(consultas), n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
         return [
-            {
-                "documento": doc,
-                "metadados": meta,
-                "similaridade": score
-            }
-            for doc, meta, score in zip(resultados["documents"][0], resultados["metadatas"][0], resultados["distances"][0])
+            [
+                {
+                    "id": uid,
+                    "conteudo": doc or "",
+                    "documento": doc,
+                    "metadados": meta or {},
+                    "importancia": float((meta or {}).get("importancia", 0.5)),
+                    "mencoes": int((meta or {}).get("mencoes", 1)),
+                    "distancia": distancia,
+                    "similaridade": distancia,
+                    "cosseno": 1.0 - distancia
+                }
+                for uid, doc, meta, distancia in zip(ids, docs, metas, distancias)
+            ]
+            for ids, docs, metas, distancias in zip(resultados["ids"], resultados["documents"],
+                                                    resultados["metadatas"], resultados["distances"])
         ]
 
+    def atualizar_metadata_lote(self, ids: List[str], metadados: List[Dict[str, Any]]) -> None:
+        """Atualiza (mescla) os metadados de varios registros com um unico update."""
+        if ids:
+            self.collection.update(ids=list(ids), metadatas=list(metadados))
+
+    def atualizar_metadata(self, uid: str, metadados: Dict[str, Any]) -> None:
+        self.atualizar_metadata_lote([uid], [metadados])
+
     def apagar_memoria_antiga(self, limite: int = 1000) -> None:
         all_ids = self.collection.get()["ids"]
         if len(all_ids) > limite:
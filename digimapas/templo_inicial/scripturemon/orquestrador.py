@@ -8,16 +8,25 @@ from typing import List, Dict, Any, Optional
 import logging
 try:
     from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
 except ImportError:
     # fallback stub if fastapi is not installed
     class FastAPI:
         def __init__(self):
             pass
-        def get(self, path: str):
+        def get(self, path: str, **kwargs):
             def decorator(func):
                 return func
             return decorator
 
+    def PlainTextResponse(content: str, media_type: Optional[str] = None) -> str:
+        return content
+
+try:
+    from .perfil_ticks import formatar_prometheus
+except ImportError:
+    from perfil_ticks import formatar_prometheus
+
 class FisicaDigital:
     """Stub de fisica digital para ser substituido pela implementacao real."""
     def tick(self) -> None:
@@ -82,6 +91,9 @@ class Supervisor:
 # Instancia global opcional para uso em API de monitoramento
 supervisor_global: Optional[Supervisor] = None
 
+# OrquestradorGeral cujas metricas saem em /metrics (atribuir ao iniciar o mundo)
+orquestrador_geral_global: Optional[Any] = None
+
 # API HTTP simples para monitoramento de estado
 app = FastAPI()
 
@@ -95,3 +107,14 @@ def status() -> Dict[str, Any]:
         for a in supervisor_global.agentes:
             agentes_info.append({"nome": getattr(a, "nome", "desconhecido"), "estado": getattr(a, "estado", {})})
     return {"agentes": agentes_info}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Metricas do OrquestradorGeral no formato de texto do Prometheus: percentis por
+    fase do tick e por agente, mais os contadores do mundo e dos subsistemas.
+    """
+    texto = ""
+    if orquestrador_geral_global is not None:
+        texto = formatar_prometheus(orquestrador_geral_global.metricas())
+    return PlainTextResponse(texto, media_type="text/plain; version=0.0.4")
@@ -6,14 +6,40 @@ Coordena múltiplos agentes, gerencia o ambiente e facilita interações
 import asyncio
 import json
 import logging
+import random
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import threading
 from concurrent.futures import ThreadPoolExecutor
 
+try:
+    from .agendador_ticks import AgendadorTicks
+    from .buffer_eventos import BufferEventos
+    from .pool_agentes import PoolProcessosAgentes
+    from .protocolo_agentes import LimitesConcorrencia, eh_agente_async, versao_estado
+    from .escritor_grafo import EscritorGrafoLote
+    from .mapa_mundo import MapaMundo
+    from .caixa_mensagens import CaixaMensagens, Mensagem
+    from .checkpoint_mundo import ArmazemCheckpoints, GravadorCheckpoint, serializar
+    from .log_replay import GravadorReplay
+    from .perfil_ticks import PerfilTicks
+    from .faixas_eventos import FaixasEventos
+except ImportError:
+    from agendador_ticks import AgendadorTicks
+    from buffer_eventos import BufferEventos
+    from pool_agentes import PoolProcessosAgentes
+    from protocolo_agentes import LimitesConcorrencia, eh_agente_async, versao_estado
+    from escritor_grafo import EscritorGrafoLote
+    from mapa_mundo import MapaMundo
+    from caixa_mensagens import CaixaMensagens, Mensagem
+    from checkpoint_mundo import ArmazemCheckpoints, GravadorCheckpoint, serializar
+    from log_replay import GravadorReplay
+    from perfil_ticks import PerfilTicks
+    from faixas_eventos import FaixasEventos
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +52,23 @@ class TipoEvento(Enum):
     RITUAL = "ritual"
 
 
+# Faixas de eventos: peso na drenagem de cada tick e SLO de latência (segundos)
+PESOS_FAIXAS_PADRAO = {
+    TipoEvento.SISTEMA.value: 8,
+    TipoEvento.RITUAL.value: 6,
+    TipoEvento.GLOBAL.value: 4,
+    TipoEvento.MENSAGEM.value: 2,
+    TipoEvento.LOCAL.value: 1,
+}
+SLO_FAIXAS_PADRAO = {
+    TipoEvento.SISTEMA.value: 0.5,
+    TipoEvento.RITUAL.value: 1.0,
+    TipoEvento.GLOBAL.value: 2.0,
+    TipoEvento.MENSAGEM.value: 2.0,
+    TipoEvento.LOCAL.value: 5.0,
+}
+
+
 @dataclass
 class Evento:
     """Estrutura de um evento no mundo"""
@@ -63,9 +106,18 @@ class OrquestradorGeral:
         self.orquestrador_contexto = None
         self.fisica_digital = None
         self.grafo_global = None
+        self.escritor_grafo = None
         
-        # Fila de eventos
-        self.fila_eventos = asyncio.Queue() if asyncio.get_event_loop().is_running() else []
+        # Fila de eventos: uma faixa por TipoEvento, a mesma nos modos sync e async,
+        # segura entre threads; drenada por peso a cada tick
+        self.fila_eventos = FaixasEventos(
+            pesos=self.config.get('pesos_faixas_eventos', PESOS_FAIXAS_PADRAO),
+            slos=self.config.get('slo_faixas_eventos', SLO_FAIXAS_PADRAO),
+            capacidade=self.config.get('capacidade_fila_eventos', 10000),
+            politica=self.config.get('politica_fila_eventos', 'descartar_antigo'),
+            janela=self.config.get('perfil_janela', 1024)
+        )
+        self.tratadores_eventos: Dict[TipoEvento, List[Callable[[Evento], None]]] = {}
         
         # Estado do mundo
         self.tempo_mundo = 0
@@ -74,51 +126,157 @@ class OrquestradorGeral:
         
         # Localização dos agentes
         self.localizacoes = {}
+        self.rotas: Dict[str, List[str]] = {}  # agente -> próximos passos de uma viagem
         self.mapa_mundo = self._criar_mapa_inicial()
         
+        # Eventos recentes por local (criados no primeiro evento) e globais,
+        # e o cursor de leitura de cada agente
+        self.buffers_eventos: Dict[str, BufferEventos] = {}
+        self.buffer_global = self._novo_buffer()
+        self._cursores_local: Dict[str, tuple] = {}  # agente -> (local, último seq visto)
+        self._cursores_global: Dict[str, int] = {}
+        
+        # Falas pendentes de cada agente, entregues no início do seu passo
+        self.caixas_mensagens: Dict[str, CaixaMensagens] = {}
+        self._falas_tick: set = set()  # (emissor, conteúdo) já difundidos neste tick
+        
         # Estatísticas
         self.stats = {
             'ciclos_executados': 0,
             'eventos_processados': 0,
             'interacoes_agentes': 0,
-            'tempo_execucao_total': 0
+            'tempo_execucao_total': 0,
+            'estouros_agente': 0,
+            'agentes_adiados': 0,
+            'eventos_perdidos_buffer': 0,
+            'mensagens_entregues': 0,
+            'mensagens_descartadas': 0,
+            'mensagens_agrupadas': 0,
+            'checkpoint_snapshot_s': 0.0
         }
         
+        # Checkpoints: seções alteradas desde o último e a thread de gravação
+        self.gravador_checkpoint: Optional[GravadorCheckpoint] = None
+        self._agentes_sujos: set = set()
+        self._versoes_agentes: Dict[str, Any] = {}  # versao_estado vista após o último passo
+        self._versoes_checkpoint: Dict[str, Any] = {}  # versao_estado no último checkpoint
+        self._mapa_sujo = True
+        self._ultimo_checkpoint = time.monotonic()
+        
+        # Perfil por fase e por agente (pode ser ligado/desligado em execução)
+        self.perfil = PerfilTicks(
+            janela=self.config.get('perfil_janela', 1024),
+            ativo=self.config.get('perfil_ativo', True)
+        )
+        
+        # Log de replay: entradas externas e sorteios de cada tick (ver log_replay.py)
+        self.log_replay: Optional[GravadorReplay] = None
+        self._rng_replay = random.Random(self.config.get('semente_replay'))
+        self._semente_tick: Optional[int] = None  # semente de random do tick (gravado/reproduzido)
+        if self.config.get('arquivo_replay'):
+            self.log_replay = GravadorReplay(self.config['arquivo_replay'], self.config)
+        
+        # Agendamento em taxa fixa: prazos monotonicos e orcamento por agente
+        self.agendador = AgendadorTicks(
+            self.config.get('tick_rate', 1.0),
+            politica=self.config.get('politica_atraso', 'pular')
+        )
+        self._passos_tick = 1
+        self._ordem_agentes: List[str] = []  # agentes adiados rodam primeiro no tick seguinte
+        self._divida_agentes: Dict[str, float] = {}  # tempo excedido ainda a compensar
+        self._tarefas_agentes: Dict[str, asyncio.Future] = {}  # execucoes async ainda em curso
+        
         # Thread pool para execução paralela
         self.executor = ThreadPoolExecutor(max_workers=self.config['max_workers'])
         
+        # Limites compartilhados pelos agentes assíncronos (viver_async)
+        self.limites = LimitesConcorrencia(
+            max_llm=self.config.get('max_llm_concorrentes', 8),
+            max_grafo=self.config.get('max_grafo_concorrentes', 4)
+        )
+        
+        # Modo 'processos': agentes vivem em processos trabalhadores fixos
+        self.pool_agentes = None
+        if self.config.get('modo_execucao', 'threads') == 'processos':
+            self.pool_agentes = PoolProcessosAgentes(
+                self.config.get('processos_agentes'),
+                contexto=self.config.get('contexto_processos')
+            )
+        
         logger.info("Orquestrador Geral inicializado")
         
-    def _config_padrao(self) -> Dict:
+    @staticmethod
+    def _config_padrao() -> Dict:
         """Configurações padrão do orquestrador"""
         return {
             'tick_rate': 1.0,  # segundos entre ciclos
             'max_agentes': 20,
             'max_workers': 4,
-            'auto_save_interval': 300,  # 5 minutos
-            'locais_iniciais': ['praca_central', 'templo', 'floresta', 'laboratorio']
+            'auto_save_interval': 300,  # 5 minutos entre checkpoints automáticos
+            'diretorio_checkpoint': None,  # None desativa os checkpoints automáticos
+            'checkpoint_completo_a_cada': 20,  # checkpoints incrementais entre dois completos
+            'politica_atraso': 'pular',  # 'pular' ou 'agrupar' ticks atrasados
+            'orcamento_agente': 0.25,  # segundos de viver() por agente por tick
+            'fracao_agentes': 0.8,  # fração do tick reservada à fase de agentes (modo sync)
+            'capacidade_buffer_eventos': 256,  # eventos retidos por local
+            'capacidade_fila_eventos': 10000,  # eventos aguardando, por faixa (TipoEvento)
+            'politica_fila_eventos': 'descartar_antigo',  # ver fila_eventos.py
+            'pesos_faixas_eventos': dict(PESOS_FAIXAS_PADRAO),  # parte de cada faixa na drenagem
+            'slo_faixas_eventos': dict(SLO_FAIXAS_PADRAO),  # latência desejada por faixa (s)
+            'max_eventos_tick': 5000,  # eventos processados por tick (None = todos)
+            'capacidade_caixa_mensagens': 64,  # falas não lidas por agente
+            'modo_execucao': 'threads',  # 'threads' ou 'processos'
+            'processos_agentes': None,  # trabalhadores no modo 'processos' (None = nº de CPUs)
+            'max_llm_concorrentes': 8,  # chamadas simultâneas ao LLM (agentes viver_async)
+            'max_grafo_concorrentes': 4,  # chamadas simultâneas ao grafo (agentes viver_async)
+            'grafo_tamanho_lote': 500,  # eventos por UNWIND no grafo global
+            'grafo_intervalo_flush': 1.0,  # espera máxima de um evento antes do flush
+            'grafo_capacidade_fila': 10000,
+            'grafo_politica_falha': 'descartar',  # 'descartar' ou 'disco'
+            'grafo_arquivo_derramamento': None,  # JSONL usado pela política 'disco'
+            'locais_iniciais': ['praca_central', 'templo', 'floresta', 'laboratorio'],
+            'arquivo_mundo': None,  # JSON de mundo (ver mapa_mundo.py); substitui locais_iniciais
+            'arquivo_replay': None,  # log de replay (ver log_replay.py); None desativa
+            'semente_replay': None,  # gera as sementes dos ticks gravados (None = aleatória)
+            'perfil_ativo': True,  # mede fases e agentes a cada tick (ver perfil_ticks.py)
+            'perfil_janela': 1024,  # amostras por fase/agente nos percentis
         }
         
     def _criar_mapa_inicial(self) -> Dict:
-        """Cria estrutura inicial do mundo"""
+        """Cria estrutura inicial do mundo (do arquivo de mundo, se configurado)"""
+        if self.config.get('arquivo_mundo'):
+            self.grafo_mapa = MapaMundo.carregar(self.config['arquivo_mundo'])
+        else:
+            locais = self.config['locais_iniciais']
+            # Conexões padrão entre os locais iniciais
+            conexoes = {
+                'praca_central': ['templo', 'floresta', 'laboratorio'],
+                'templo': ['praca_central'],
+                'floresta': ['praca_central', 'laboratorio'],
+                'laboratorio': ['praca_central', 'floresta']
+            }
+            self.grafo_mapa = MapaMundo.de_dict({'locais': {
+                local: {'conexoes': [c for c in conexoes.get(local, []) if c in locais]}
+                for local in locais
+            }})
+            
         mapa = {}
-        
-        for local in self.config['locais_iniciais']:
+        for local in self.grafo_mapa.nomes:
+            info = self.grafo_mapa.locais[local]
             mapa[local] = {
-                'nome': local.replace('_', ' ').title(),
-                'descricao': f"Um lugar no Digimundo: {local}",
+                'nome': info['nome'],
+                'descricao': info['descricao'],
                 'agentes_presentes': set(),
-                'propriedades': {}
+                'propriedades': dict(info['propriedades']),
+                'conexoes': self.grafo_mapa.conexoes(local)
             }
             
-        # Definir conexões entre locais
-        mapa['praca_central']['conexoes'] = ['templo', 'floresta', 'laboratorio']
-        mapa['templo']['conexoes'] = ['praca_central']
-        mapa['floresta']['conexoes'] = ['praca_central', 'laboratorio']
-        mapa['laboratorio']['conexoes'] = ['praca_central', 'floresta']
-        
+        self.local_padrao = 'praca_central' if 'praca_central' in mapa else next(iter(mapa), None)
         return mapa
         
+    def _novo_buffer(self) -> BufferEventos:
+        return BufferEventos(self.config.get('capacidade_buffer_eventos', 256))
+        
     def inicializar_sistemas(self, 
                            orquestrador_contexto=None,
                            fisica_digital=None,
@@ -135,6 +293,21 @@ class OrquestradorGeral:
         self.fisica_digital = fisica_digital
         self.grafo_global = grafo_global
         
+        # Eventos vão ao grafo em lotes, por uma thread de fundo
+        if self.escritor_grafo:
+            self.escritor_grafo.fechar()
+            self.escritor_grafo = None
+        if grafo_global:
+            self.escritor_grafo = EscritorGrafoLote(
+                grafo_global,
+                tamanho_lote=self.config.get('grafo_tamanho_lote', 500),
+                intervalo_flush=self.config.get('grafo_intervalo_flush', 1.0),
+                capacidade=self.config.get('grafo_capacidade_fila', 10000),
+                politica_falha=self.config.get('grafo_politica_falha', 'descartar'),
+                arquivo_derramamento=self.config.get('grafo_arquivo_derramamento'),
+                ao_gravar=self._registrar_lote_grafo
+            )
+        
         logger.info("Sistemas auxiliares inicializados")
         
     def adicionar_agente(self, 
@@ -160,24 +333,26 @@ class OrquestradorGeral:
             logger.warning(f"Agente {nome} já existe")
             return False
             
-        # Registrar agente
-        self.agentes[nome] = agente
-        self.agentes_ativos.add(nome)
+        if not self._registrar_agente(nome, agente):
+            return False
         
         # Definir localização inicial
         if local_inicial in self.mapa_mundo:
             self.localizacoes[nome] = local_inicial
             self.mapa_mundo[local_inicial]['agentes_presentes'].add(nome)
         else:
-            self.localizacoes[nome] = 'praca_central'
-            self.mapa_mundo['praca_central']['agentes_presentes'].add(nome)
+            self.localizacoes[nome] = self.local_padrao
+            self.mapa_mundo[self.local_padrao]['agentes_presentes'].add(nome)
+            
+        if self.log_replay:
+            self.log_replay.registrar(('agente+', nome, self.localizacoes[nome], self._agente_para_replay(agente)))
             
         # Criar contexto se orquestrador de contexto disponível
         if self.orquestrador_contexto:
             self.orquestrador_contexto.criar_contexto(nome)
             
         # Evento de nascimento
-        self.adicionar_evento(Evento(
+        self._enfileirar_evento(Evento(
             tipo=TipoEvento.SISTEMA,
             conteudo=f"{nome} entrou no Digimundo",
             origem="sistema",
@@ -187,24 +362,65 @@ class OrquestradorGeral:
         logger.info(f"Agente {nome} adicionado ao mundo em {local_inicial}")
         return True
         
+    def _registrar_agente(self, nome: str, agente: Any) -> bool:
+        """Registra o agente nas estruturas do orquestrador (sem localização nem eventos)"""
+        # Agentes assíncronos compartilham os limites de LLM/grafo
+        if eh_agente_async(agente):
+            agente.limites = self.limites
+            
+        # Lida antes de o agente (no modo 'processos') virar um AgenteRemoto
+        versao = versao_estado(agente)
+        
+        # No modo 'processos' o agente passa a viver no trabalhador
+        if self.pool_agentes:
+            try:
+                agente = self.pool_agentes.adicionar(nome, agente)
+            except RuntimeError as e:
+                logger.error(f"Erro ao enviar agente {nome} ao pool de processos: {e}")
+                return False
+                
+        self.agentes[nome] = agente
+        self.agentes_ativos.add(nome)
+        if versao is not None:
+            self._versoes_agentes[nome] = versao
+        self._cursores_global[nome] = self.buffer_global.ultimo_seq
+        self.caixas_mensagens[nome] = CaixaMensagens(self.config.get('capacidade_caixa_mensagens', 64))
+        self._agentes_sujos.add(nome)
+        self._mapa_sujo = True
+        return True
+        
     def remover_agente(self, nome: str) -> bool:
         """Remove um agente do mundo"""
         if nome not in self.agentes:
             return False
             
+        if self.log_replay:
+            self.log_replay.registrar(('agente-', nome))
+            
         # Remover de localização
         local_atual = self.localizacoes.get(nome)
         if local_atual and local_atual in self.mapa_mundo:
             self.mapa_mundo[local_atual]['agentes_presentes'].discard(nome)
             
         # Remover registros
+        if self.pool_agentes:
+            self.pool_agentes.remover(nome)
         del self.agentes[nome]
         self.agentes_ativos.discard(nome)
         if nome in self.localizacoes:
             del self.localizacoes[nome]
+        self._cursores_local.pop(nome, None)
+        self._cursores_global.pop(nome, None)
+        self.caixas_mensagens.pop(nome, None)
+        self._agentes_sujos.discard(nome)
+        self._versoes_agentes.pop(nome, None)
+        self._versoes_checkpoint.pop(nome, None)
+        self._mapa_sujo = True
+        self.rotas.pop(nome, None)
+        self.perfil.remover_agente(nome)
             
         # Evento de saída
-        self.adicionar_evento(Evento(
+        self._enfileirar_evento(Evento(
             tipo=TipoEvento.SISTEMA,
             conteudo=f"{nome} deixou o Digimundo",
             origem="sistema"
@@ -213,25 +429,64 @@ class OrquestradorGeral:
         logger.info(f"Agente {nome} removido do mundo")
         return True
         
-    def adicionar_evento(self, evento: Evento):
-        """Adiciona um evento à fila de processamento"""
-        if asyncio.get_event_loop().is_running():
-            asyncio.create_task(self.fila_eventos.put(evento))
-        else:
-            if isinstance(self.fila_eventos, list):
-                self.fila_eventos.append(evento)
+    def adicionar_evento(self, evento: Evento) -> bool:
+        """
+        Adiciona um evento externo à fila de processamento (de qualquer thread)
+        
+        Returns:
+            bool: False se a fila estava cheia e o evento foi descartado
+        """
+        if self.log_replay:
+            self.log_replay.registrar(('evento', evento))
+        return self.fila_eventos.colocar(evento.tipo.value, evento)
+        
+    async def adicionar_evento_async(self, evento: Evento) -> bool:
+        """Versão para corrotinas: com a política 'bloquear', espera sem travar o loop"""
+        if self.log_replay:
+            self.log_replay.registrar(('evento', evento))
+        return await self.fila_eventos.colocar_async(evento.tipo.value, evento)
+        
+    def _enfileirar_evento(self, evento: Evento) -> bool:
+        """
+        Enfileira um evento gerado pelo próprio mundo (não vai ao log de replay)
+        
+        Roda no tick (ou no event loop), que é quem drena a fila: nunca espera por
+        espaço, nem com a política 'bloquear'; com a faixa cheia o evento é recusado
+        """
+        return self.fila_eventos.colocar(evento.tipo.value, evento, bloquear=False)
+        
+    def registrar_tratador(self, tipo: TipoEvento, tratador: Callable[[Evento], None]):
+        """
+        Registra uma função chamada com cada evento do tipo, depois do
+        processamento padrão (grafo, log e publicação aos agentes)
+        """
+        self.tratadores_eventos.setdefault(tipo, []).append(tratador)
+        
+    def remover_tratador(self, tipo: TipoEvento, tratador: Callable[[Evento], None]) -> bool:
+        """Remove um tratador registrado; False se ele não estava registrado"""
+        tratadores = self.tratadores_eventos.get(tipo, [])
+        if tratador not in tratadores:
+            return False
+        tratadores.remove(tratador)
+        return True
                 
     async def executar_async(self):
         """Execução assíncrona do loop principal"""
         self.rodando = True
         logger.info("Iniciando execução assíncrona do Orquestrador")
         
+        self.agendador.iniciar()
+        
         try:
             while self.rodando:
+                inicio = self.agendador.inicio_tick()
                 if not self.paused:
                     await self._executar_ciclo_async()
                     
-                await asyncio.sleep(self.config['tick_rate'])
+                self._checkpoint_automatico()
+                espera, self._passos_tick = self.agendador.fim_tick(inicio)
+                self.stats.update(self.agendador.estatisticas())
+                await asyncio.sleep(espera)
                 
         except Exception as e:
             logger.error(f"Erro no loop principal: {e}")
@@ -249,13 +504,20 @@ class OrquestradorGeral:
         
         logger.info(f"Iniciando execução síncrona do Orquestrador ({'infinito' if num_ciclos == -1 else f'{num_ciclos} ciclos'})")
         
+        self.agendador.iniciar()
+        
         try:
             while self.rodando and (num_ciclos == -1 or ciclos < num_ciclos):
+                inicio = self.agendador.inicio_tick()
                 if not self.paused:
-                    self._executar_ciclo_sync()
+                    self._executar_ciclo_sync(inicio)
                     ciclos += 1
                     
-                time.sleep(self.config['tick_rate'])
+                self._checkpoint_automatico()
+                espera, self._passos_tick = self.agendador.fim_tick(inicio)
+                self.stats.update(self.agendador.estatisticas())
+                if espera > 0:
+                    time.sleep(espera)
                 
         except KeyboardInterrupt:
             logger.info("Execução interrompida pelo usuário")
@@ -266,54 +528,169 @@ class OrquestradorGeral:
             
     async def _executar_ciclo_async(self):
         """Executa um ciclo completo (versão assíncrona)"""
-        inicio = time.time()
+        inicio = time.monotonic()
+        if self.log_replay:
+            self._abrir_tick_replay()
+            
+        # Ações de agentes que estouraram o orçamento no tick anterior entram
+        # agora, no event loop, antes de o mundo andar
+        self._aplicar_agentes_concluidos()
+        self._semear_fase(0)
         
         # 1. Atualizar física do mundo
-        eventos_mundo = await self._atualizar_mundo_async()
+        with self.perfil.fase('mundo'):
+            eventos_mundo = await self._atualizar_mundo_async()
         
         # 2. Processar eventos pendentes
-        await self._processar_eventos_async()
+        with self.perfil.fase('eventos'):
+            await self._processar_eventos_async()
+        self._semear_fase(1)
         
-        # 3. Executar agentes em paralelo
-        tasks = []
-        for nome in list(self.agentes_ativos):
-            task = asyncio.create_task(self._executar_agente_async(nome))
-            tasks.append(task)
-            
-        await asyncio.gather(*tasks)
+        # 3. Executar agentes em paralelo. No pool de processos vai um lote por
+        # tick; em threads, quem não termina dentro do orçamento segue rodando,
+        # mas o tick não espera por ele. As tarefas só devolvem ações: quem as
+        # aplica ao mundo é sempre o event loop (_aplicar_agentes_concluidos)
+        if self.pool_agentes:
+            await asyncio.get_event_loop().run_in_executor(
+                self.executor, self._executar_agentes_processos, self._agentes_do_tick()
+            )
+        else:
+            for nome in self._agentes_do_tick():
+                if nome in self._tarefas_agentes:
+                    self.stats['agentes_adiados'] += 1
+                    continue
+                self._tarefas_agentes[nome] = asyncio.ensure_future(self._executar_agente_async(nome))
+                
+            if self._tarefas_agentes:
+                _, pendentes = await asyncio.wait(
+                    list(self._tarefas_agentes.values()),
+                    timeout=self.config.get('orcamento_agente', 0.25)
+                )
+                self.stats['estouros_agente'] += len(pendentes)
+                self._aplicar_agentes_concluidos()
         
         # 4. Atualizar estatísticas
-        self._atualizar_estatisticas(time.time() - inicio)
+        self._atualizar_estatisticas(time.monotonic() - inicio)
+        self._semente_tick = None
+        if self.log_replay:
+            self.log_replay.fechar_tick()
         
-    def _executar_ciclo_sync(self):
-        """Executa um ciclo completo (versão síncrona)"""
-        inicio = time.time()
+    def _executar_ciclo_sync(self, inicio_tick: Optional[float] = None,
+                             ordem: Optional[List[str]] = None):
+        """
+        Executa um ciclo completo (versão síncrona)
+        
+        Args:
+            inicio_tick: Início do tick segundo o agendador (padrão: agora)
+            ordem: Agentes a executar, nesta ordem (padrão: _agentes_do_tick())
+        """
+        inicio = time.monotonic()
+        inicio_tick = inicio if inicio_tick is None else inicio_tick
+        if self.log_replay:
+            self._abrir_tick_replay()
+        self._semear_fase(0)
         
         # 1. Atualizar física do mundo
-        eventos_mundo = self._atualizar_mundo_sync()
+        with self.perfil.fase('mundo'):
+            eventos_mundo = self._atualizar_mundo_sync()
         
         # 2. Processar eventos pendentes
-        self._processar_eventos_sync()
+        with self.perfil.fase('eventos'):
+            self._processar_eventos_sync()
+        self._semear_fase(1)
         
-        # 3. Executar cada agente
-        for nome in list(self.agentes_ativos):
+        # 3. Executar cada agente dentro da janela de agentes do tick
+        tick_rate = self.config.get('tick_rate', 1.0)
+        prazo_agentes = inicio_tick + tick_rate * self.config.get('fracao_agentes', 0.8)
+        if ordem is None:
+            ordem = self._agentes_do_tick()
+        if self.pool_agentes:
+            # Todos os agentes do tick rodam em paralelo num único lote
+            self._executar_agentes_processos(ordem)
+            ordem = []
+        for posicao, nome in enumerate(ordem):
+            if posicao > 0 and tick_rate > 0 and time.monotonic() >= prazo_agentes:
+                # Janela esgotada: os restantes abrem o próximo tick
+                self._ordem_agentes = ordem[posicao:]
+                self.stats['agentes_adiados'] += len(ordem) - posicao
+                break
+            inicio_agente = time.monotonic()
             self._executar_agente_sync(nome)
+            self._cobrar_orcamento(nome, time.monotonic() - inicio_agente)
             
         # 4. Atualizar estatísticas
-        self._atualizar_estatisticas(time.time() - inicio)
+        self._atualizar_estatisticas(time.monotonic() - inicio)
+        self._semente_tick = None
+        if self.log_replay:
+            self.log_replay.fechar_tick()
+            
+    def _abrir_tick_replay(self):
+        """Sorteia e grava a semente do tick"""
+        self._semente_tick = self._rng_replay.getrandbits(64)
+        self.log_replay.registrar(('tick', self.tempo_mundo, self._passos_tick, self._semente_tick))
+        
+    def _semear_fase(self, fase: int):
+        """
+        Reinicia o módulo random no início de cada fase do tick (0 = mundo,
+        1 = agentes) quando o tick tem semente, para que os sorteios dos agentes
+        não dependam de quantos números a física consumiu
+        """
+        if self._semente_tick is not None:
+            random.seed(self._semente_tick + fase)
+        
+    def _agentes_do_tick(self) -> List[str]:
+        """
+        Agentes a executar neste tick: primeiro os adiados do tick anterior, depois
+        os demais ativos. Agentes em dívida de orçamento pulam o tick, abatendo um
+        orçamento da dívida.
+        """
+        orcamento = self.config.get('orcamento_agente', 0.25)
+        adiados = [nome for nome in self._ordem_agentes if nome in self.agentes_ativos]
+        vistos = set(adiados)
+        # Ordem de inserção dos agentes: a mesma a cada execução (e no replay)
+        ordem = adiados + [nome for nome in self.agentes
+                           if nome in self.agentes_ativos and nome not in vistos]
+        self._ordem_agentes = []
+        
+        selecionados = []
+        for nome in ordem:
+            divida = self._divida_agentes.get(nome, 0.0)
+            if divida > 0:
+                self._divida_agentes[nome] = max(0.0, divida - orcamento)
+                self.stats['agentes_adiados'] += 1
+                continue
+            selecionados.append(nome)
+        return selecionados
+        
+    def _cobrar_orcamento(self, nome: str, duracao: float):
+        """Registra estouro do orçamento do agente e lança o excesso como dívida"""
+        excesso = duracao - self.config.get('orcamento_agente', 0.25)
+        if excesso > 0:
+            self.stats['estouros_agente'] += 1
+            self._divida_agentes[nome] = self._divida_agentes.get(nome, 0.0) + excesso
         
     def _atualizar_mundo_sync(self) -> List[Evento]:
         """Atualiza o estado do mundo e gera eventos globais"""
         eventos = []
-        self.tempo_mundo += 1
+        tempo_anterior = self.tempo_mundo
+        # Ticks agrupados pelo agendador avançam o tempo de uma vez
+        self.tempo_mundo += self._passos_tick
+        
+        self._falas_tick.clear()
         
+        # Agentes em viagem avançam um local por tick
+        if self.rotas:
+            self._avancar_viagens()
+            
         # Atualizar física digital se disponível
         if self.fisica_digital:
             eventos_fisica = self.fisica_digital.atualizar(self.tempo_mundo)
+            if self.log_replay:
+                self.log_replay.registrar(('fisica', list(eventos_fisica)))
             eventos.extend(eventos_fisica)
             
         # Eventos baseados no tempo
-        if self.tempo_mundo % 100 == 0:  # A cada 100 ciclos
+        if self.tempo_mundo // 100 > tempo_anterior // 100:  # A cada 100 ciclos
             hora_dia = self._calcular_hora_dia()
             eventos.append(Evento(
                 tipo=TipoEvento.GLOBAL,
@@ -323,7 +700,7 @@ class OrquestradorGeral:
             
         # Adicionar eventos à fila
         for evento in eventos:
-            self.adicionar_evento(evento)
+            self._enfileirar_evento(evento)
             
         return eventos
         
@@ -332,32 +709,62 @@ class OrquestradorGeral:
         return self._atualizar_mundo_sync()
         
     def _processar_eventos_sync(self):
-        """Processa eventos pendentes na fila"""
-        if isinstance(self.fila_eventos, list):
-            eventos = self.fila_eventos.copy()
-            self.fila_eventos.clear()
-            
-            for evento in eventos:
-                self._processar_evento(evento)
+        """
+        Processa o lote do tick: até max_eventos_tick eventos, repartidos entre as
+        faixas pelo peso, com as faixas fora do SLO primeiro
+        """
+        lote = self.fila_eventos.drenar(self.config.get('max_eventos_tick'))
+        for faixa, entrada, evento in lote:
+            self._processar_evento(evento)
+            self.fila_eventos.concluir(faixa, entrada)
                 
     async def _processar_eventos_async(self):
         """Versão assíncrona de processar eventos"""
-        while not self.fila_eventos.empty():
-            evento = await self.fila_eventos.get()
-            self._processar_evento(evento)
+        self._processar_eventos_sync()
             
     def _processar_evento(self, evento: Evento):
         """Processa um evento individual"""
         self.stats['eventos_processados'] += 1
         
         # Registrar no grafo global se disponível
-        if self.grafo_global and evento.tipo in [TipoEvento.GLOBAL, TipoEvento.SISTEMA]:
+        if self.escritor_grafo and evento.tipo in [TipoEvento.GLOBAL, TipoEvento.SISTEMA]:
             self._registrar_evento_grafo(evento)
             
         # Log de eventos importantes
         if evento.tipo in [TipoEvento.SISTEMA, TipoEvento.RITUAL]:
             logger.info(f"Evento {evento.tipo.value}: {evento.conteudo}")
             
+        self._publicar_evento(evento)
+        
+        for tratador in self.tratadores_eventos.get(evento.tipo, ()):
+            try:
+                tratador(evento)
+            except Exception as e:
+                logger.error(f"Erro no tratador de eventos {evento.tipo.value}: {e}")
+            
+    def _publicar_evento(self, evento: Evento):
+        """Publica o evento no buffer do(s) local(is) onde ele é perceptível"""
+        metadata = evento.metadata or {}
+        if evento.tipo == TipoEvento.GLOBAL:
+            locais = []
+        elif 'local_anterior' in metadata or 'local_novo' in metadata:
+            # Movimento: visto por quem fica e por quem está no destino
+            locais = [metadata.get('local_anterior'), metadata.get('local_novo')]
+        elif 'local' in metadata:
+            locais = [metadata['local']]
+        else:
+            locais = [self.localizacoes.get(evento.origem)]
+            
+        locais = [local for local in locais if local in self.mapa_mundo]
+        if not locais:
+            self.buffer_global.publicar(evento)
+            return
+        for local in locais:
+            buffer = self.buffers_eventos.get(local)
+            if buffer is None:
+                buffer = self.buffers_eventos[local] = self._novo_buffer()
+            buffer.publicar(evento)
+            
     def _executar_agente_sync(self, nome: str):
         """Executa o ciclo de um agente específico"""
         try:
@@ -368,17 +775,20 @@ class OrquestradorGeral:
                 self.orquestrador_contexto.carregar_estado(nome)
                 
             # Coletar percepções
+            medir = self.perfil.ativo
+            inicio = time.perf_counter() if medir else 0.0
             percepcoes = self._coletar_percepcoes(nome)
+            inicio_viver = time.perf_counter() if medir else 0.0
             
-            # Enviar percepções ao agente
-            for percepcao in percepcoes:
-                agente.consciencia.perceive(percepcao)
-                
-            # Executar ciclo do agente
-            acoes = agente.viver()
+            acoes = self._viver_agente(agente, percepcoes)
+            fim_viver = time.perf_counter() if medir else 0.0
+            self._marcar_agente(nome, versao_estado(agente))
             
             # Processar ações
             self._processar_acoes(nome, acoes)
+            if medir:
+                self.perfil.agente(nome, inicio_viver - inicio, fim_viver - inicio_viver,
+                                   time.perf_counter() - fim_viver)
             
             # Salvar contexto
             if self.orquestrador_contexto:
@@ -387,22 +797,130 @@ class OrquestradorGeral:
         except Exception as e:
             logger.error(f"Erro ao executar agente {nome}: {e}")
             
-    async def _executar_agente_async(self, nome: str):
-        """Versão assíncrona de executar agente"""
-        # Por ora, delega para versão síncrona
-        await asyncio.get_event_loop().run_in_executor(
-            self.executor,
-            self._executar_agente_sync,
-            nome
-        )
+    def _marcar_agente(self, nome: str, versao: Any):
+        """
+        Marca o agente para o próximo checkpoint se seu estado mudou desde o último
+        
+        Sem versao_estado (None) não há como saber: o agente que viveu é marcado
+        """
+        if versao is None:
+            self._agentes_sujos.add(nome)
+            return
+        self._versoes_agentes[nome] = versao
+        if versao != self._versoes_checkpoint.get(nome):
+            self._agentes_sujos.add(nome)
+            
+    @staticmethod
+    def _viver_agente(agente: Any, percepcoes: List[Dict]) -> Optional[List[Dict]]:
+        """Entrega as percepções e roda um passo do agente (não toca no mundo)"""
+        if not hasattr(agente, 'viver') and eh_agente_async(agente):
+            # Agente só assíncrono rodando no loop síncrono
+            return asyncio.run(agente.viver_async(percepcoes))
+        # Enviar percepções ao agente
+        for percepcao in percepcoes:
+            agente.consciencia.perceive(percepcao)
+        # Executar ciclo do agente
+        return agente.viver()
         
+    def _executar_agentes_processos(self, nomes: List[str]):
+        """Executa um lote de agentes no pool de processos e processa suas ações"""
+        medir = self.perfil.ativo
+        lote = {}
+        inicio = time.perf_counter() if medir else 0.0
+        for nome in nomes:
+            if self.orquestrador_contexto:
+                self.orquestrador_contexto.carregar_estado(nome)
+            lote[nome] = self._coletar_percepcoes(nome)
+        if medir:
+            self.perfil.somar('percepcoes', time.perf_counter() - inicio)
+            
+        try:
+            resultados = self.pool_agentes.executar(lote)
+        except Exception as e:
+            logger.error(f"Erro no pool de processos: {e}")
+            return
+            
+        for nome in nomes:
+            acoes, duracao, versao = resultados.get(nome, (None, 0.0, None))
+            if nome in resultados:
+                self._marcar_agente(nome, versao)
+            inicio_acoes = time.perf_counter() if medir else 0.0
+            self._processar_acoes(nome, acoes)
+            if medir:
+                # viver() foi medido no próprio trabalhador
+                self.perfil.agente(nome, 0.0, duracao, time.perf_counter() - inicio_acoes)
+            self._cobrar_orcamento(nome, duracao)
+            if self.orquestrador_contexto:
+                self.orquestrador_contexto.salvar_estado(nome)
+                
+    async def _executar_agente_async(self, nome: str) -> Optional[Tuple[Optional[List[Dict]], float, float]]:
+        """
+        Versão assíncrona de executar agente
+        
+        Percepções são coletadas no event loop; agentes só síncronos vivem no
+        thread pool. As ações não são aplicadas aqui: a tarefa devolve
+        (ações, tempo de percepções, tempo de viver) e _aplicar_agentes_concluidos
+        as aplica no event loop, de modo que um agente atrasado nunca mexe no
+        mundo enquanto o tick seguinte o atualiza
+        """
+        agente = self.agentes.get(nome)
+        try:
+            if self.orquestrador_contexto:
+                self.orquestrador_contexto.carregar_estado(nome)
+            inicio = time.perf_counter()
+            percepcoes = self._coletar_percepcoes(nome)
+            inicio_viver = time.perf_counter()
+            if eh_agente_async(agente):
+                # Aguardado direto no event loop, sem ocupar thread; inclui a
+                # espera por LLM/grafo: é o tempo que o agente leva no tick
+                acoes = await agente.viver_async(percepcoes)
+            else:
+                acoes = await asyncio.get_event_loop().run_in_executor(
+                    self.executor, self._viver_agente, agente, percepcoes
+                )
+            return acoes, inicio_viver - inicio, time.perf_counter() - inicio_viver
+        except Exception as e:
+            logger.error(f"Erro ao executar agente {nome}: {e}")
+            return None
+            
+    def _aplicar_agentes_concluidos(self):
+        """Aplica, no event loop e na ordem de disparo, as ações das tarefas de agentes já concluídas"""
+        for nome, tarefa in list(self._tarefas_agentes.items()):
+            if not tarefa.done():
+                continue
+            del self._tarefas_agentes[nome]
+            resultado = None if tarefa.cancelled() or tarefa.exception() else tarefa.result()
+            if resultado is None:
+                continue
+            acoes, tempo_percepcoes, tempo_viver = resultado
+            inicio = time.perf_counter()
+            try:
+                if nome in self.agentes:
+                    self._marcar_agente(nome, versao_estado(self.agentes[nome]))
+                self._processar_acoes(nome, acoes)
+                if self.orquestrador_contexto:
+                    self.orquestrador_contexto.salvar_estado(nome)
+            except Exception as e:
+                logger.error(f"Erro ao aplicar ações do agente {nome}: {e}")
+            if self.perfil.ativo:
+                self.perfil.agente(nome, tempo_percepcoes, tempo_viver, time.perf_counter() - inicio)
+                
     def _coletar_percepcoes(self, nome_agente: str) -> List[Dict]:
         """Coleta percepções relevantes para um agente"""
         percepcoes = []
+        
+        # Falas recebidas desde o último passo
+        caixa = self.caixas_mensagens.get(nome_agente)
+        if caixa:
+            mensagens, agrupadas = caixa.retirar()
+            percepcoes.extend(mensagens)
+            self.stats['mensagens_entregues'] += len(mensagens)
+            self.stats['mensagens_agrupadas'] += agrupadas
+            
         local_agente = self.localizacoes.get(nome_agente)
         
         if not local_agente:
-            return percepcoes
+            return self._gravar_percepcoes(nome_agente, percepcoes)
             
         # Percepção do ambiente
         local_info = self.mapa_mundo.get(local_agente, {})
@@ -410,16 +928,60 @@ class OrquestradorGeral:
             'tipo': 'ambiente',
             'local': local_agente,
             'descricao': local_info.get('descricao', ''),
-            'agentes_presentes': list(local_info.get('agentes_presentes', set()) - {nome_agente})
+            'agentes_presentes': list(local_info.get('agentes_presentes', set()) - {nome_agente}),
+            'conexoes': local_info.get('conexoes', [])
         })
         
-        # Eventos globais recentes
-        # TODO: Implementar buffer de eventos por localização
+        # Eventos novos do local e globais, a partir do cursor do agente
+        buffer_local = self.buffers_eventos.get(local_agente)
+        if buffer_local is None:
+            # Local ainda sem eventos: o primeiro que surgir já é novo
+            self._cursores_local[nome_agente] = (local_agente, 0)
+        else:
+            local_cursor, cursor = self._cursores_local.get(nome_agente, (None, 0))
+            if local_cursor != local_agente:
+                # Recém-chegado: não recebe o histórico do local
+                cursor = buffer_local.ultimo_seq
+            novos, cursor, perdidos = buffer_local.ler_desde(cursor)
+            self._cursores_local[nome_agente] = (local_agente, cursor)
+            self._anexar_eventos(percepcoes, nome_agente, novos, perdidos, local_agente)
+            
+        novos, cursor, perdidos = self.buffer_global.ler_desde(
+            self._cursores_global.get(nome_agente, self.buffer_global.ultimo_seq)
+        )
+        self._cursores_global[nome_agente] = cursor
+        self._anexar_eventos(percepcoes, nome_agente, novos, perdidos, None)
+        
+        return self._gravar_percepcoes(nome_agente, percepcoes)
         
+    def _gravar_percepcoes(self, nome_agente: str, percepcoes: List[Dict]) -> List[Dict]:
+        """Registra no log de replay as percepções entregues ao agente"""
+        if self.log_replay:
+            self.log_replay.registrar(('percepcoes', nome_agente, percepcoes))
         return percepcoes
         
+    def _anexar_eventos(self, percepcoes: List[Dict], nome_agente: str,
+                        novos: List, perdidos: int, local: Optional[str]):
+        """Converte eventos do buffer em percepções, ignorando os do próprio agente"""
+        if perdidos:
+            self.stats['eventos_perdidos_buffer'] += perdidos
+        for seq, evento in novos:
+            if evento.origem == nome_agente:
+                continue
+            percepcoes.append({
+                'tipo': 'evento',
+                'evento': evento.tipo.value,
+                'conteudo': evento.conteudo,
+                'origem': evento.origem,
+                'local': local,
+                'seq': seq,
+                'timestamp': evento.timestamp
+            })
+        
     def _processar_acoes(self, nome_agente: str, acoes: Optional[List[Dict]]):
         """Processa as ações executadas por um agente"""
+        if self.log_replay:
+            self.log_replay.registrar(('acoes', nome_agente, acoes))
         if not acoes:
             return
             
@@ -427,7 +989,10 @@ class OrquestradorGeral:
             tipo_acao = acao.get('tipo')
             
             if tipo_acao == 'mover':
+                self.rotas.pop(nome_agente, None)
                 self._processar_movimento(nome_agente, acao.get('destino'))
+            elif tipo_acao == 'viajar':
+                self._iniciar_viagem(nome_agente, acao.get('destino'))
             elif tipo_acao == 'falar':
                 self._processar_fala(nome_agente, acao.get('mensagem'))
             elif tipo_acao == 'interagir':
@@ -438,53 +1003,73 @@ class OrquestradorGeral:
         local_atual = self.localizacoes.get(agente)
         
         if not local_atual or destino not in self.mapa_mundo:
-            return
+            return False
             
         # Verificar se movimento é válido
-        if destino not in self.mapa_mundo[local_atual].get('conexoes', []):
-            return
+        if not self.grafo_mapa.conectado(local_atual, destino):
+            return False
             
         # Atualizar localização
         self.mapa_mundo[local_atual]['agentes_presentes'].discard(agente)
         self.mapa_mundo[destino]['agentes_presentes'].add(agente)
         self.localizacoes[agente] = destino
+        self._mapa_sujo = True
         
         # Evento de movimento
-        self.adicionar_evento(Evento(
+        self._enfileirar_evento(Evento(
             tipo=TipoEvento.LOCAL,
             conteudo=f"{agente} moveu-se para {destino}",
             origem=agente,
             metadata={'local_anterior': local_atual, 'local_novo': destino}
         ))
+        return True
+        
+    def _iniciar_viagem(self, agente: str, destino: str):
+        """Planeja a rota mais curta até o destino e dá o primeiro passo"""
+        local_atual = self.localizacoes.get(agente)
+        if not local_atual or destino not in self.grafo_mapa:
+            return
+        rota = self.grafo_mapa.rota(local_atual, destino)
+        if not rota or len(rota) < 2:
+            self.rotas.pop(agente, None)
+            return
+        self.rotas[agente] = rota[2:]
+        self._processar_movimento(agente, rota[1])
+        
+    def _avancar_viagens(self):
+        """Move um passo cada agente em viagem (a rota vem do cache do mapa)"""
+        for agente, passos in list(self.rotas.items()):
+            if not passos or not self._processar_movimento(agente, passos.pop(0)):
+                self.rotas.pop(agente, None)
+            elif not passos:
+                del self.rotas[agente]
         
     def _processar_fala(self, emissor: str, mensagem: str):
-        """Processa uma mensagem falada por um agente"""
+        """Difunde uma fala para as caixas dos agentes no mesmo local"""
         local_emissor = self.localizacoes.get(emissor)
         
         if not local_emissor:
             return
             
-        # Criar evento de mensagem para agentes no mesmo local
         agentes_local = self.mapa_mundo[local_emissor]['agentes_presentes']
         
+        # A mesma fala repetida no tick é difundida uma vez só
+        chave = (emissor, mensagem)
+        if chave in self._falas_tick:
+            self.stats['mensagens_agrupadas'] += len(agentes_local) - 1
+            return
+        self._falas_tick.add(chave)
+        
+        # Uma única mensagem imutável, compartilhada por referência
+        fala = Mensagem(emissor, mensagem, local_emissor, self.tempo_mundo)
+        descartadas = 0
         for receptor in agentes_local:
             if receptor != emissor:
-                evento = Evento(
-                    tipo=TipoEvento.MENSAGEM,
-                    conteudo=mensagem,
-                    origem=emissor,
-                    destino=receptor,
-                    metadata={'local': local_emissor}
-                )
-                
-                # Enviar diretamente ao agente
-                if receptor in self.agentes:
-                    self.agentes[receptor].consciencia.perceive({
-                        'tipo': 'mensagem',
-                        'emissor': emissor,
-                        'conteudo': mensagem
-                    })
+                caixa = self.caixas_mensagens.get(receptor)
+                if caixa is not None and caixa.depositar(fala):
+                    descartadas += 1
                     
+        self.stats['mensagens_descartadas'] += descartadas
         self.stats['interacoes_agentes'] += 1
         
     def _processar_interacao(self, agente: str, alvo: str, tipo_interacao: str):
@@ -493,7 +1078,7 @@ class OrquestradorGeral:
             return
             
         # Registrar interação
-        self.adicionar_evento(Evento(
+        self._enfileirar_evento(Evento(
             tipo=TipoEvento.LOCAL,
             conteudo=f"{agente} {tipo_interacao} {alvo}",
             origem=agente,
@@ -523,32 +1108,26 @@ class OrquestradorGeral:
         return "dia"
         
     def _registrar_evento_grafo(self, evento: Evento):
-        """Registra evento no grafo global Neo4j"""
-        try:
-            query = """
-            CREATE (e:Evento {
-                tipo: $tipo,
-                conteudo: $conteudo,
-                origem: $origem,
-                timestamp: $timestamp
+        """Agenda o evento para o próximo lote gravado no grafo global Neo4j"""
+        with self.perfil.fase('grafo'):
+            self.escritor_grafo.enfileirar({
+                'tipo': evento.tipo.value,
+                'conteudo': evento.conteudo,
+                'origem': evento.origem or "desconhecido",
+                'timestamp': evento.timestamp
             })
-            """
-            
-            self.grafo_global.execute_query(
-                query,
-                tipo=evento.tipo.value,
-                conteudo=evento.conteudo,
-                origem=evento.origem or "desconhecido",
-                timestamp=evento.timestamp
-            )
             
-        except Exception as e:
-            logger.error(f"Erro ao registrar evento no grafo: {e}")
+    def _registrar_lote_grafo(self, duracao: float, linhas: int):
+        """Chamado pela thread do escritor a cada lote gravado no grafo"""
+        if self.perfil.ativo:
+            self.perfil.registrar('grafo_lote', duracao)
             
     def _atualizar_estatisticas(self, tempo_ciclo: float):
         """Atualiza estatísticas do orquestrador"""
         self.stats['ciclos_executados'] += 1
         self.stats['tempo_execucao_total'] += tempo_ciclo
+        if self.perfil.ativo:
+            self.perfil.fechar_tick(tempo_ciclo)
         
         # Log periódico
         if self.stats['ciclos_executados'] % 100 == 0:
@@ -557,6 +1136,26 @@ class OrquestradorGeral:
                        f"tempo médio: {tempo_medio:.3f}s, "
                        f"agentes ativos: {len(self.agentes_ativos)}")
             
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Estatísticas, perfil por fase/agente (p50/p95/p99) e métricas dos subsistemas
+        
+        Ver perfil_ticks.formatar_prometheus para o formato de texto do Prometheus.
+        """
+        metricas = {
+            'stats': dict(self.stats),
+            'perfil': self.perfil.metricas(),
+            'limites': self.limites.estatisticas(),
+            'faixas_eventos': self.fila_eventos.metricas(),
+        }
+        if self.escritor_grafo:
+            metricas['grafo'] = self.escritor_grafo.metricas()
+        if self.gravador_checkpoint:
+            metricas['checkpoint'] = self.gravador_checkpoint.metricas()
+        if self.log_replay:
+            metricas['replay'] = self.log_replay.metricas()
+        return metricas
+        
     def pausar(self):
         """Pausa a execução do mundo"""
         self.paused = True
@@ -570,9 +1169,190 @@ class OrquestradorGeral:
     def parar(self):
         """Para completamente a execução"""
         self.rodando = False
+        for tarefa in list(self._tarefas_agentes.values()):
+            tarefa.cancel()
         self.executor.shutdown(wait=True)
+        if self.pool_agentes:
+            self.pool_agentes.fechar()
+        if self.escritor_grafo:
+            self.escritor_grafo.fechar()
+        if self.gravador_checkpoint:
+            self.gravador_checkpoint.fechar()
+        if self.log_replay:
+            self.log_replay.fechar()
         logger.info("Orquestrador parado")
         
+    def _checkpoint_automatico(self):
+        """Dispara um checkpoint a cada auto_save_interval segundos, se configurado"""
+        if not self.config.get('diretorio_checkpoint'):
+            return
+        if time.monotonic() - self._ultimo_checkpoint >= self.config.get('auto_save_interval', 300):
+            self.checkpoint()
+            
+    def _eventos_pendentes(self) -> List[Evento]:
+        """Cópia dos eventos ainda não processados"""
+        return self.fila_eventos.copia()
+        
+    @staticmethod
+    def _agente_para_replay(agente: Any) -> Optional[bytes]:
+        """Pickle do agente para o modo 'agentes' do replay (None se não serializável)"""
+        try:
+            return serializar(agente)
+        except Exception as e:
+            logger.debug(f"Agente não serializável para o replay: {e}")
+            return None
+            
+    @staticmethod
+    def _estado_agente(agente: Any) -> tuple:
+        """Estado serializável do agente: serializar_estado() ou o próprio objeto"""
+        if hasattr(agente, 'serializar_estado'):
+            return ('estado', agente.serializar_estado())
+        return ('objeto', agente)
+        
+    def checkpoint(self, diretorio: Optional[str] = None, bloquear: bool = False) -> bool:
+        """
+        Salva um checkpoint incremental do mundo (ver checkpoint_mundo.py)
+        
+        O tick só serializa as seções alteradas desde o último checkpoint: agentes
+        entram quando sua versao_estado mudou (ou, sem ela, quando viveram). No modo
+        'processos' as cópias desses agentes vêm num pedido por trabalhador.
+        Compressão e escrita em disco ficam com a thread de fundo.
+        
+        Args:
+            diretorio: Diretório dos checkpoints (padrão: config['diretorio_checkpoint'])
+            bloquear: Esperar a gravação terminar
+            
+        Returns:
+            bool: Se o snapshot foi entregue (e gravado, quando bloquear=True)
+        """
+        diretorio = diretorio or self.config.get('diretorio_checkpoint')
+        if not diretorio:
+            logger.warning("Checkpoint sem diretório configurado")
+            return False
+        if self.gravador_checkpoint is None or self.gravador_checkpoint.armazem.diretorio != diretorio:
+            if self.gravador_checkpoint:
+                self.gravador_checkpoint.fechar()
+            self.gravador_checkpoint = GravadorCheckpoint(ArmazemCheckpoints(
+                diretorio, completo_a_cada=self.config.get('checkpoint_completo_a_cada', 20)
+            ))
+            # Diretório novo: todas as seções precisam ser gravadas
+            self._agentes_sujos.update(self.agentes)
+            self._mapa_sujo = True
+            
+        inicio = time.perf_counter()
+        secoes = {
+            'mundo': serializar({
+                'tempo_mundo': self.tempo_mundo,
+                'stats': self.stats,
+                'config': self.config
+            }),
+            'eventos': serializar({
+                'pendentes': self._eventos_pendentes(),
+                'buffers': self.buffers_eventos,
+                'buffer_global': self.buffer_global,
+                'cursores_local': self._cursores_local,
+                'cursores_global': self._cursores_global
+            })
+        }
+        if self._mapa_sujo:
+            secoes['mapa'] = serializar({
+                'ocupantes': {
+                    local: sorted(info['agentes_presentes'])
+                    for local, info in self.mapa_mundo.items() if info['agentes_presentes']
+                },
+                'propriedades': {
+                    local: info['propriedades']
+                    for local, info in self.mapa_mundo.items() if info['propriedades']
+                },
+                'localizacoes': self.localizacoes,
+                'rotas': self.rotas
+            })
+        sujos = [nome for nome in self.agentes if nome in self._agentes_sujos]
+        agentes = {nome: self.agentes[nome] for nome in sujos}
+        if self.pool_agentes and sujos:
+            try:
+                agentes = self.pool_agentes.obter_lote(sujos)
+            except Exception as e:
+                logger.error(f"Agentes do pool não puderam ser lidos no checkpoint: {e}")
+                agentes = {}
+        for nome, agente in agentes.items():
+            try:
+                secoes[f'agente:{nome}'] = serializar(self._estado_agente(agente))
+            except Exception as e:
+                logger.error(f"Agente {nome} não pôde ser serializado no checkpoint: {e}")
+                continue
+            self._agentes_sujos.discard(nome)
+            self._versoes_checkpoint[nome] = self._versoes_agentes.get(nome)
+        self._agentes_sujos.intersection_update(self.agentes)
+        self._mapa_sujo = False
+        self._ultimo_checkpoint = time.monotonic()
+        self.stats['checkpoint_snapshot_s'] = time.perf_counter() - inicio
+        
+        nomes = {'mundo', 'eventos', 'mapa'} | {f'agente:{nome}' for nome in self.agentes}
+        self.gravador_checkpoint.agendar(secoes, nomes)
+        if bloquear:
+            return self.gravador_checkpoint.aguardar()
+        return True
+        
+    def restaurar_checkpoint(self, diretorio: str) -> bool:
+        """
+        Reconstrói o mundo a partir do último checkpoint gravado em disco
+        
+        Agentes já registrados com restaurar_estado() recebem o estado salvo; os
+        demais são recriados a partir do objeto salvo.
+        
+        Returns:
+            bool: Sucesso da operação
+        """
+        try:
+            secoes = ArmazemCheckpoints(diretorio).carregar()
+        except Exception as e:
+            logger.error(f"Erro ao ler checkpoint de {diretorio}: {e}")
+            return False
+        if 'mundo' not in secoes:
+            logger.error(f"Nenhum checkpoint encontrado em {diretorio}")
+            return False
+            
+        mundo = secoes['mundo']
+        self.tempo_mundo = mundo['tempo_mundo']
+        self.stats.update(mundo['stats'])
+        
+        for chave, estado in secoes.items():
+            if not chave.startswith('agente:'):
+                continue
+            nome = chave[len('agente:'):]
+            tipo, valor = estado
+            if nome in self.agentes:
+                if tipo == 'estado' and hasattr(self.agentes[nome], 'restaurar_estado'):
+                    self.agentes[nome].restaurar_estado(valor)
+            elif tipo == 'objeto':
+                self._registrar_agente(nome, valor)
+            else:
+                logger.warning(f"Agente {nome} tem só estado salvo; registre-o antes de restaurar")
+                
+        mapa = secoes.get('mapa', {})
+        for local, info in self.mapa_mundo.items():
+            info['agentes_presentes'] = set()
+            info['propriedades'] = dict(mapa.get('propriedades', {}).get(local, info['propriedades']))
+        for local, ocupantes in mapa.get('ocupantes', {}).items():
+            if local in self.mapa_mundo:
+                self.mapa_mundo[local]['agentes_presentes'].update(o for o in ocupantes if o in self.agentes)
+        self.localizacoes = {
+            nome: local for nome, local in mapa.get('localizacoes', {}).items() if nome in self.agentes
+        }
+        self.rotas = dict(mapa.get('rotas', {}))
+        
+        eventos = secoes.get('eventos', {})
+        self.buffers_eventos = eventos.get('buffers', {})
+        self.buffer_global = eventos.get('buffer_global', self._novo_buffer())
+        self._cursores_local = eventos.get('cursores_local', {})
+        self._cursores_global.update(eventos.get('cursores_global', {}))
+        for evento in eventos.get('pendentes', []):
+            self._enfileirar_evento(evento)
+            
+        logger.info(f"Checkpoint restaurado de {diretorio} (tempo {self.tempo_mundo}, {len(self.agentes)} agentes)")
+        return True
+        
     def salvar_estado(self, caminho: str):
         """Salva o estado completo do mundo"""
         estado = {
@@ -0,0 +1,233 @@
+"""
+Perfil por fase e por agente dos ticks do Orquestrador Geral.
+
+Cada tick soma o tempo gasto em cada fase (``mundo``, ``eventos``, ``percepcoes``,
+``viver``, ``acoes`` e ``grafo``) e, ao fechar, grava a soma de cada uma e a
+duracao total (``tick``) numa janela movel das ultimas ``janela`` amostras. Cada
+agente tem a sua janela de tempos de ``viver``. Percentis (p50/p95/p99) sao
+calculados so quando as metricas sao pedidas; no tick, medir custa um
+``perf_counter`` e um ``append`` por ponto medido.
+
+``grafo`` e o enfileiramento das linhas no tick (ja contido em ``eventos``);
+``grafo_lote`` e cada lote gravado pela thread de fundo do escritor.
+
+``ativo`` pode ser trocado a qualquer momento; desligado, nada e medido.
+``formatar_prometheus`` converte ``OrquestradorGeral.metricas()`` no formato de
+texto do Prometheus.
+"""
+
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+import numpy as np
+
+FASES = ('mundo', 'eventos', 'percepcoes', 'viver', 'acoes', 'grafo')
+QUANTIS = (0.5, 0.95, 0.99)
+
+
+class JanelaMovel:
+    """Ultimas amostras de uma medida, mais contagem e soma desde o inicio."""
+
+    __slots__ = ('amostras', 'contagem', 'soma')
+
+    def __init__(self, janela: int = 1024):
+        self.amostras: Deque[float] = deque(maxlen=janela)
+        self.contagem = 0
+        self.soma = 0.0
+
+    def registrar(self, valor: float) -> None:
+        self.amostras.append(valor)
+        self.contagem += 1
+        self.soma += valor
+
+    def resumo(self) -> Dict[str, float]:
+        """p50/p95/p99, media e maximo da janela; contagem e soma totais."""
+        resumo = {'contagem': self.contagem, 'soma': self.soma}
+        # Copia primeiro: a thread do escritor do grafo pode estar acrescentando
+        valores = np.array(list(self.amostras), dtype=np.float64)
+        if not len(valores):
+            return {**resumo, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'media': 0.0, 'max': 0.0}
+        p50, p95, p99 = np.quantile(valores, QUANTIS)
+        return {
+            **resumo,
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'media': float(valores.mean()),
+            'max': float(valores.max()),
+        }
+
+
+class _Cronometro:
+    __slots__ = ('perfil', 'fase', 'inicio')
+
+    def __init__(self, perfil: "PerfilTicks", fase: str):
+        self.perfil = perfil
+        self.fase = fase
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.perfil.somar(self.fase, time.perf_counter() - self.inicio)
+        return False
+
+
+class _SemMedida:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SEM_MEDIDA = _SemMedida()
+
+
+class PerfilTicks:
+    """Janelas moveis por fase e por agente (ver docstring do modulo)."""
+
+    def __init__(self, janela: int = 1024, ativo: bool = True):
+        """
+        :param janela: Amostras mantidas por fase e por agente.
+        :param ativo: Se comeca medindo.
+        """
+        self.janela = janela
+        self.ativo = ativo
+        self.fases: Dict[str, JanelaMovel] = {
+            fase: JanelaMovel(janela) for fase in ('tick',) + FASES + ('grafo_lote',)
+        }
+        self.agentes: Dict[str, JanelaMovel] = {}
+        self._tick: Dict[str, float] = dict.fromkeys(FASES, 0.0)
+
+    def ativar(self) -> None:
+        self.ativo = True
+
+    def desativar(self) -> None:
+        self.ativo = False
+        self._tick = dict.fromkeys(FASES, 0.0)
+
+    def fase(self, fase: str):
+        """Contexto que soma a duracao do bloco a fase no tick corrente."""
+        return _Cronometro(self, fase) if self.ativo else _SEM_MEDIDA
+
+    def somar(self, fase: str, duracao: float) -> None:
+        """Acrescenta ``duracao`` a fase no tick corrente."""
+        self._tick[fase] += duracao
+
+    def agente(self, nome: str, percepcoes: float, viver: float, acoes: float) -> None:
+        """Registra um passo de agente: soma as fases do tick e guarda o viver do agente."""
+        tick = self._tick
+        tick['percepcoes'] += percepcoes
+        tick['viver'] += viver
+        tick['acoes'] += acoes
+        janela = self.agentes.get(nome)
+        if janela is None:
+            janela = self.agentes[nome] = JanelaMovel(self.janela)
+        janela.registrar(viver)
+
+    def registrar(self, fase: str, duracao: float) -> None:
+        """Amostra avulsa, fora do tick (ex.: lotes do grafo)."""
+        self.fases[fase].registrar(duracao)
+
+    def fechar_tick(self, duracao: float) -> None:
+        """Grava as somas das fases do tick e a duracao total."""
+        tick, self._tick = self._tick, dict.fromkeys(FASES, 0.0)
+        for fase, total in tick.items():
+            self.fases[fase].registrar(total)
+        self.fases['tick'].registrar(duracao)
+
+    def remover_agente(self, nome: str) -> None:
+        self.agentes.pop(nome, None)
+
+    def limpar(self) -> None:
+        """Descarta todas as amostras."""
+        for fase in self.fases:
+            self.fases[fase] = JanelaMovel(self.janela)
+        self.agentes.clear()
+        self._tick = dict.fromkeys(FASES, 0.0)
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            'ativo': self.ativo,
+            'janela': self.janela,
+            'fases': {fase: janela.resumo() for fase, janela in self.fases.items()},
+            'agentes': {nome: janela.resumo() for nome, janela in list(self.agentes.items())},
+        }
+
+
+# === Formato de texto do Prometheus ===
+
+def _rotulo(valor: Any) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _resumos(linhas: List[str], nome: str, ajuda: str, rotulo: str, resumos: Dict[str, Dict]) -> None:
+    if not resumos:
+        return
+    linhas.append(f"# HELP {nome} {ajuda}")
+    linhas.append(f"# TYPE {nome} summary")
+    for chave, resumo in resumos.items():
+        base = f'{rotulo}="{_rotulo(chave)}"'
+        for quantil in QUANTIS:
+            valor = resumo[f"p{int(round(quantil * 100))}"]
+            linhas.append(f'{nome}{{{base},quantile="{quantil}"}} {valor!r}')
+        linhas.append(f'{nome}_sum{{{base}}} {resumo["soma"]!r}')
+        linhas.append(f'{nome}_count{{{base}}} {resumo["contagem"]}')
+
+
+def _medidores(linhas: List[str], prefixo: str, valores: Dict[str, Any]) -> None:
+    for chave, valor in valores.items():
+        if isinstance(valor, bool):
+            valor = int(valor)
+        if isinstance(valor, (int, float)):
+            nome = f"{prefixo}_{chave}"
+            linhas.append(f"# TYPE {nome} gauge")
+            linhas.append(f"{nome} {valor!r}")
+
+
+def _medidores_rotulados(linhas: List[str], prefixo: str, rotulo: str,
+                         por_chave: Dict[str, Dict[str, Any]]) -> None:
+    """Um gauge por campo numerico, com uma serie por chave (ex.: por faixa)."""
+    campos: Dict[str, List[str]] = {}
+    for chave, valores in por_chave.items():
+        for campo, valor in valores.items():
+            if isinstance(valor, bool):
+                valor = int(valor)
+            if isinstance(valor, (int, float)):
+                campos.setdefault(campo, []).append(f'{prefixo}_{campo}{{{rotulo}="{_rotulo(chave)}"}} {valor!r}')
+    for campo, series in campos.items():
+        linhas.append(f"# TYPE {prefixo}_{campo} gauge")
+        linhas.extend(series)
+
+
+def formatar_prometheus(metricas: Dict[str, Any], prefixo: str = "digimundo") -> str:
+    """
+    Converte o dicionario de ``OrquestradorGeral.metricas()`` em texto do Prometheus:
+    fases e agentes viram ``summary`` (quantis da janela, soma e contagem totais);
+    contadores numericos de ``stats`` e dos subsistemas viram ``gauge``. As faixas de
+    eventos viram gauges rotulados por faixa e um ``summary`` de latencia.
+    """
+    linhas: List[str] = []
+    perfil = metricas.get('perfil') or {}
+    if perfil:
+        linhas.append(f"# TYPE {prefixo}_perfil_ativo gauge")
+        linhas.append(f"{prefixo}_perfil_ativo {int(perfil.get('ativo', False))}")
+        _resumos(linhas, f"{prefixo}_fase_segundos", "Tempo de cada fase por tick",
+                 "fase", perfil.get('fases', {}))
+        _resumos(linhas, f"{prefixo}_agente_viver_segundos", "Tempo de viver() por agente",
+                 "agente", perfil.get('agentes', {}))
+    faixas = metricas.get('faixas_eventos') or {}
+    if faixas:
+        _medidores_rotulados(linhas, f"{prefixo}_faixa", "faixa", faixas)
+        _resumos(linhas, f"{prefixo}_faixa_latencia_segundos", "Latencia dos eventos por faixa",
+                 "faixa", {nome: faixa['latencia'] for nome, faixa in faixas.items()})
+    _medidores(linhas, prefixo, metricas.get('stats', {}))
+    for subsistema, valores in metricas.items():
+        if subsistema not in ('stats', 'perfil', 'faixas_eventos') and isinstance(valores, dict):
+            _medidores(linhas, f"{prefixo}_{subsistema}", valores)
+    return "\n".join(linhas) + "\n"
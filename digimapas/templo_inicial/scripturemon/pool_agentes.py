@@ -0,0 +1,234 @@
+"""
+Execucao de agentes em processos separados para o Orquestrador Geral.
+
+Cada agente e enviado (pickle) uma unica vez ao processo trabalhador escolhido
+para ele e passa a viver la: a alocacao e fixa ate o agente ser removido. A cada
+tick so trafegam as percepcoes (e chamadas pendentes, como registros de interacao)
+na ida e as acoes na volta. Os trabalhadores de um lote executam em paralelo,
+escapando do GIL do processo principal.
+
+No processo principal o orquestrador guarda um ``AgenteRemoto`` no lugar de cada
+agente; ele acumula as percepcoes e chamadas recebidas entre ticks.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .protocolo_agentes import versao_estado
+except ImportError:
+    from protocolo_agentes import versao_estado
+
+logger = logging.getLogger(__name__)
+
+
+class _ConscienciaRemota:
+    def __init__(self, agente: "AgenteRemoto"):
+        self._agente = agente
+
+    def perceive(self, percepcao: Dict) -> None:
+        self._agente.percepcoes_pendentes.append(percepcao)
+
+
+class _RedeRemota:
+    def __init__(self, agente: "AgenteRemoto"):
+        self._agente = agente
+
+    def registrar_interacao(self, *args) -> None:
+        self._agente.chamadas_pendentes.append(("rede.registrar_interacao", args))
+
+
+class AgenteRemoto:
+    """
+    Representante local de um agente que vive num processo trabalhador.
+
+    Expoe ``consciencia.perceive`` e ``rede.registrar_interacao``, que apenas
+    enfileiram o pedido para o proximo lote enviado ao trabalhador.
+    """
+
+    remoto = True
+
+    def __init__(self, nome: str, trabalhador: int):
+        self.nome = nome
+        self.trabalhador = trabalhador
+        self.percepcoes_pendentes: List[Dict] = []
+        self.chamadas_pendentes: List[Tuple[str, tuple]] = []
+        self.consciencia = _ConscienciaRemota(self)
+        self.rede = _RedeRemota(self)
+
+    def retirar_pendentes(self) -> Tuple[List[Dict], List[Tuple[str, tuple]]]:
+        """Entrega e esvazia as percepcoes e chamadas acumuladas."""
+        percepcoes, chamadas = self.percepcoes_pendentes, self.chamadas_pendentes
+        self.percepcoes_pendentes, self.chamadas_pendentes = [], []
+        return percepcoes, chamadas
+
+
+def _resolver(objeto: Any, caminho: str) -> Any:
+    for parte in caminho.split("."):
+        objeto = getattr(objeto, parte)
+    return objeto
+
+
+def _viver(agente: Any, percepcoes: List[Dict], chamadas: List[Tuple[str, tuple]]) -> Tuple[Any, float, Any]:
+    """
+    Aplica chamadas e percepcoes e executa um ciclo do agente, medindo a duracao.
+
+    :return: (acoes, duracao, ``versao_estado`` do agente ou None).
+    """
+    inicio = time.monotonic()
+    for caminho, args in chamadas:
+        try:
+            _resolver(agente, caminho)(*args)
+        except AttributeError:
+            pass
+    for percepcao in percepcoes:
+        agente.consciencia.perceive(percepcao)
+    acoes = agente.viver()
+    return acoes, time.monotonic() - inicio, versao_estado(agente)
+
+
+def _laco_trabalhador(conexao) -> None:
+    """Laco do processo trabalhador: guarda seus agentes e atende comandos."""
+    agentes: Dict[str, Any] = {}
+    while True:
+        try:
+            comando, args = conexao.recv()
+        except EOFError:
+            return
+        try:
+            if comando == "viver":
+                resultado = {}
+                for nome, (percepcoes, chamadas) in args.items():
+                    try:
+                        resultado[nome] = _viver(agentes[nome], percepcoes, chamadas)
+                    except Exception as e:
+                        logger.error(f"Erro ao executar agente {nome}: {e}")
+                        resultado[nome] = (None, 0.0, None)
+            elif comando == "adicionar":
+                nome, agente = args
+                agentes[nome] = agente
+                resultado = True
+            elif comando == "remover":
+                resultado = agentes.pop(args, None)
+            elif comando == "obter":
+                resultado = agentes.get(args)
+            elif comando == "obter_lote":
+                resultado = {nome: agentes.get(nome) for nome in args}
+            elif comando == "parar":
+                conexao.send(("ok", True))
+                return
+            else:
+                raise ValueError(f"Comando desconhecido: {comando}")
+            conexao.send(("ok", resultado))
+        except Exception as e:
+            conexao.send(("erro", repr(e)))
+
+
+class PoolProcessosAgentes:
+    """Conjunto fixo de processos trabalhadores, cada um com um subconjunto dos agentes."""
+
+    def __init__(self, num_processos: Optional[int] = None, contexto: Optional[str] = None):
+        """
+        :param num_processos: Numero de trabalhadores (padrao: numero de CPUs).
+        :param contexto: Metodo de inicio do multiprocessing ("fork", "spawn",
+            "forkserver"), ou None para o padrao da plataforma.
+        """
+        self.num_processos = num_processos or os.cpu_count() or 1
+        ctx = multiprocessing.get_context(contexto)
+        self._conexoes = []
+        self._processos = []
+        for _ in range(self.num_processos):
+            local, remota = ctx.Pipe()
+            processo = ctx.Process(target=_laco_trabalhador, args=(remota,), daemon=True)
+            processo.start()
+            remota.close()
+            self._conexoes.append(local)
+            self._processos.append(processo)
+        self._carga = [0] * self.num_processos
+        self.agentes: Dict[str, AgenteRemoto] = {}
+
+    def _pedir(self, trabalhador: int, comando: str, args: Any) -> Any:
+        conexao = self._conexoes[trabalhador]
+        conexao.send((comando, args))
+        return self._resposta(conexao)
+
+    @staticmethod
+    def _resposta(conexao) -> Any:
+        status, resultado = conexao.recv()
+        if status == "erro":
+            raise RuntimeError(resultado)
+        return resultado
+
+    def adicionar(self, nome: str, agente: Any) -> AgenteRemoto:
+        """
+        Envia o agente ao trabalhador menos carregado, onde ele fica ate ser removido.
+
+        :raises RuntimeError: se o agente nao puder ser serializado ou recebido.
+        """
+        trabalhador = min(range(self.num_processos), key=self._carga.__getitem__)
+        try:
+            self._pedir(trabalhador, "adicionar", (nome, agente))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # Falha de pickle no envio
+            raise RuntimeError(f"Agente {nome} nao pode ser enviado ao processo: {e}") from e
+        self._carga[trabalhador] += 1
+        remoto = self.agentes[nome] = AgenteRemoto(nome, trabalhador)
+        return remoto
+
+    def remover(self, nome: str) -> Any:
+        """Retira o agente do trabalhador e retorna seu estado final."""
+        remoto = self.agentes.pop(nome)
+        self._carga[remoto.trabalhador] -= 1
+        return self._pedir(remoto.trabalhador, "remover", nome)
+
+    def obter(self, nome: str) -> Any:
+        """Copia atual do agente (para checkpoints e inspecao)."""
+        return self._pedir(self.agentes[nome].trabalhador, "obter", nome)
+
+    def obter_lote(self, nomes: List[str]) -> Dict[str, Any]:
+        """Copias de varios agentes com um pedido por trabalhador, atendidos em paralelo."""
+        lotes: Dict[int, List[str]] = {}
+        for nome in nomes:
+            lotes.setdefault(self.agentes[nome].trabalhador, []).append(nome)
+        for trabalhador, lote in lotes.items():
+            self._conexoes[trabalhador].send(("obter_lote", lote))
+        resultado = {}
+        for trabalhador in lotes:
+            resultado.update(self._resposta(self._conexoes[trabalhador]))
+        return resultado
+
+    def executar(self, percepcoes: Dict[str, List[Dict]]) -> Dict[str, Tuple[Any, float, Any]]:
+        """
+        Executa um ciclo dos agentes indicados, em paralelo entre trabalhadores.
+
+        :param percepcoes: agente -> percepcoes deste tick (somadas as pendentes).
+        :return: agente -> (acoes, duracao de viver em segundos, ``versao_estado`` ou None).
+        """
+        lotes: Dict[int, Dict[str, tuple]] = {}
+        for nome, novas in percepcoes.items():
+            remoto = self.agentes[nome]
+            pendentes, chamadas = remoto.retirar_pendentes()
+            lotes.setdefault(remoto.trabalhador, {})[nome] = (pendentes + novas, chamadas)
+        for trabalhador, lote in lotes.items():
+            self._conexoes[trabalhador].send(("viver", lote))
+        resultado = {}
+        for trabalhador in lotes:
+            resultado.update(self._resposta(self._conexoes[trabalhador]))
+        return resultado
+
+    def fechar(self) -> None:
+        """Encerra os trabalhadores (os agentes neles sao descartados)."""
+        for conexao in self._conexoes:
+            try:
+                conexao.send(("parar", None))
+                self._resposta(conexao)
+            except (OSError, EOFError):
+                pass
+            conexao.close()
+        for processo in self._processos:
+            processo.join(timeout=5)
+        self._conexoes, self._processos = [], []
@@ -0,0 +1,110 @@
+"""
+Protocolo de agentes assincronos do Orquestrador Geral.
+
+Um agente pode, alem de (ou em vez de) ``viver()``, definir::
+
+    async def viver_async(self, percepcoes: List[Dict]) -> Optional[List[Dict]]
+
+No modo assincrono o orquestrador aguarda ``viver_async`` diretamente no event
+loop, passando as percepcoes do tick (em vez de chamar ``consciencia.perceive``),
+e processa as acoes retornadas. Agentes so sincronos continuam rodando no thread
+pool. Assim, agentes que passam o tempo esperando LLM, Chroma, Neo4j ou TTS nao
+ocupam uma thread cada.
+
+Ao ser adicionado, o agente assincrono recebe o atributo ``limites`` (um
+``LimitesConcorrencia`` compartilhado por todos os agentes) e deve envolver suas
+chamadas externas com ele::
+
+    async with self.limites.llm():
+        resposta = await cliente.gerar(prompt)
+
+Para checkpoints incrementais baratos, o agente (sincrono ou nao) pode expor
+``versao_estado``: um contador (atributo, propriedade ou metodo sem argumentos)
+incrementado sempre que seu estado muda. O orquestrador so serializa de novo os
+agentes cuja versao mudou desde o ultimo checkpoint; agentes sem ``versao_estado``
+sao serializados a cada checkpoint em que tiverem vivido.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class AgenteAsync(Protocol):
+    """Agente que sabe viver um ciclo sem bloquear o event loop."""
+
+    async def viver_async(self, percepcoes: List[Dict]) -> Optional[List[Dict]]:
+        ...
+
+
+def eh_agente_async(agente: Any) -> bool:
+    """Se o agente implementa ``viver_async`` como corrotina."""
+    return asyncio.iscoroutinefunction(getattr(agente, "viver_async", None))
+
+
+def versao_estado(agente: Any) -> Optional[Any]:
+    """``versao_estado`` do agente (chamado se for metodo), ou None se ele nao a expoe."""
+    versao = getattr(agente, "versao_estado", None)
+    return versao() if callable(versao) else versao
+
+
+class LimitesConcorrencia:
+    """Semaforos que limitam chamadas simultaneas a LLM e ao grafo entre todos os agentes."""
+
+    def __init__(self, max_llm: int = 8, max_grafo: int = 4):
+        """
+        :param max_llm: Chamadas simultaneas ao LLM.
+        :param max_grafo: Chamadas simultaneas ao grafo (Neo4j).
+        """
+        self.max_llm = max_llm
+        self.max_grafo = max_grafo
+        # Semaforos do event loop em que foram usados (criados no primeiro uso)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+        self.em_uso = {'llm': 0, 'grafo': 0}
+        self.esperas = {'llm': 0, 'grafo': 0}
+
+    def __reduce__(self):
+        # Semaforos nao viajam em pickle (checkpoints, pool de processos): recria vazios
+        return (LimitesConcorrencia, (self.max_llm, self.max_grafo))
+
+    def _semaforo(self, recurso: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Um semaforo fica preso ao loop em que esperou; agentes so assincronos no
+            # modo sincrono rodam cada ciclo num asyncio.run novo
+            self._loop = loop
+            self._semaforos = {
+                'llm': asyncio.Semaphore(self.max_llm),
+                'grafo': asyncio.Semaphore(self.max_grafo),
+            }
+        return self._semaforos[recurso]
+
+    @asynccontextmanager
+    async def _usar(self, recurso: str) -> AsyncIterator[None]:
+        semaforo = self._semaforo(recurso)
+        if semaforo.locked():
+            self.esperas[recurso] += 1
+        async with semaforo:
+            self.em_uso[recurso] += 1
+            try:
+                yield
+            finally:
+                self.em_uso[recurso] -= 1
+
+    def llm(self):
+        """Contexto assincrono para uma chamada ao LLM."""
+        return self._usar('llm')
+
+    def grafo(self):
+        """Contexto assincrono para uma chamada ao grafo."""
+        return self._usar('grafo')
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            'llm_em_uso': self.em_uso['llm'],
+            'llm_esperas': self.esperas['llm'],
+            'grafo_em_uso': self.em_uso['grafo'],
+            'grafo_esperas': self.esperas['grafo'],
+        }
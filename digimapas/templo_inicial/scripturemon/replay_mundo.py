@@ -0,0 +1,316 @@
+"""
+Reproducao acelerada de um log de replay do Orquestrador Geral (ver log_replay.py).
+
+O ``ReprodutorReplay`` recria o orquestrador com a configuracao gravada e refaz,
+tick a tick, as entradas registradas: agentes que entram e saem, eventos externos,
+a semente de ``random``, os eventos da ``FisicaDigital`` e a ordem em que os
+agentes rodaram. ``tick_rate`` e ignorado e nao ha espera entre ticks.
+
+Modos:
+
+* ``'acoes'`` -- cada agente e um ``AgenteGravado`` que devolve as acoes do log;
+  mede so o custo do proprio mundo (eventos, percepcoes, falas, movimentos, grafo)
+  e conta divergencias entre as percepcoes recalculadas e as gravadas;
+* ``'agentes'`` -- os agentes gravados (quando serializaveis) voltam a viver, com
+  as mesmas sementes, e servicos externos trocados pelos ``StubsReplay``.
+
+Neo4j vira um ``DriverGrafoLocal`` (ou o driver dado nos stubs). O relatorio traz
+ticks/s e o tempo de cada fase (do ``PerfilTicks`` do orquestrador), para comparar
+versoes do codigo contra a mesma carga gravada.
+
+Uso:
+    python replay_mundo.py dia.replay --modo acoes --max-ticks 5000
+"""
+
+import argparse
+import logging
+import pickle
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from .escritor_grafo import DriverGrafoLocal
+    from .log_replay import ler_replay
+    from .orquestrador_geral import OrquestradorGeral
+    from .perfil_ticks import FASES
+except ImportError:
+    from escritor_grafo import DriverGrafoLocal
+    from log_replay import ler_replay
+    from orquestrador_geral import OrquestradorGeral
+    from perfil_ticks import FASES
+
+logger = logging.getLogger(__name__)
+
+MODOS = ("acoes", "agentes")
+
+def _llm_vazio(*args, **kwargs) -> str:
+    return ""
+
+
+def _tts_mudo(*args, **kwargs) -> str:
+    return "stub-tts"
+
+
+@dataclass
+class StubsReplay:
+    """
+    Servicos externos usados pelo replay.
+
+    O grafo substitui o Neo4j do orquestrador. Agentes que chamam LLM ou TTS por
+    conta propria recebem os stubs em ``usar_stubs(stubs)``, se o definirem; os
+    ``ExpressorEmocional`` encontrados no agente falam pelo stub de TTS.
+    """
+
+    grafo: Any = field(default_factory=DriverGrafoLocal)
+    llm: Callable[..., str] = _llm_vazio
+    tts: Callable[..., str] = _tts_mudo
+
+    def instalar(self, agente: Any) -> None:
+        if hasattr(agente, 'usar_stubs'):
+            agente.usar_stubs(self)
+        for valor in list(getattr(agente, '__dict__', {}).values()):
+            if hasattr(valor, 'voz_api') and hasattr(valor, '_falar'):
+                valor._falar = lambda emocao, texto: self.tts(emocao, texto)
+                valor._mover_rosto = lambda emocao: self.tts(emocao, None)
+
+
+def _normalizar(percepcoes: Optional[List[Dict]]) -> Optional[List[Dict]]:
+    """Percepcoes comparaveis entre execucoes (sem horario, presentes ordenados)."""
+    if percepcoes is None:
+        return None
+    normalizadas = []
+    for percepcao in percepcoes:
+        percepcao = {k: v for k, v in percepcao.items() if k != 'timestamp'}
+        if 'agentes_presentes' in percepcao:
+            percepcao['agentes_presentes'] = sorted(percepcao['agentes_presentes'])
+        normalizadas.append(percepcao)
+    return normalizadas
+
+
+class AgenteGravado:
+    """Agente que devolve, a cada tick, as acoes gravadas no log."""
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.consciencia = self
+        self.acoes: Optional[List[Dict]] = None
+        self.percepcoes_gravadas: Optional[List[Dict]] = None
+        self.recebidas: List[Dict] = []
+        self.divergencias = 0
+
+    def perceive(self, percepcao: Dict) -> None:
+        self.recebidas.append(percepcao)
+
+    def viver(self) -> Optional[List[Dict]]:
+        if self.percepcoes_gravadas is not None:
+            if _normalizar(self.recebidas) != _normalizar(self.percepcoes_gravadas):
+                self.divergencias += 1
+        self.recebidas = []
+        acoes, self.acoes = self.acoes, None
+        return acoes
+
+
+class FisicaGravada:
+    """Devolve os eventos da FisicaDigital gravados para o tick."""
+
+    def __init__(self):
+        self.eventos: List = []
+
+    def atualizar(self, tempo_mundo: int) -> List:
+        eventos, self.eventos = self.eventos, []
+        return eventos
+
+
+class ReprodutorReplay:
+    """Refaz um log de replay sem esperas (ver docstring do modulo)."""
+
+    def __init__(self, caminho: str, modo: str = "acoes", stubs: Optional[StubsReplay] = None,
+                 verificar: bool = True, config: Optional[Dict] = None):
+        """
+        :param caminho: Arquivo do log de replay.
+        :param modo: ``'acoes'`` ou ``'agentes'``.
+        :param stubs: Servicos externos (padrao: ``StubsReplay()``).
+        :param verificar: Comparar as percepcoes recalculadas com as gravadas (modo 'acoes').
+        :param config: Chaves que sobrescrevem a configuracao gravada.
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo de replay desconhecido: {modo!r} (use {MODOS})")
+        self.caminho = caminho
+        self.modo = modo
+        self.stubs = stubs or StubsReplay()
+        self.verificar = verificar
+
+        primeiro = next(ler_replay(caminho), [])
+        cabecalho = primeiro[0][1] if primeiro and primeiro[0][0] == 'cabecalho' else {}
+        config_gravada = dict(cabecalho.get('config') or OrquestradorGeral._config_padrao())
+        config_gravada.update({
+            'tick_rate': 0.0,
+            'max_agentes': sys.maxsize,
+            'modo_execucao': 'threads',
+            'diretorio_checkpoint': None,
+            'arquivo_replay': None,
+            'perfil_ativo': True,
+        })
+        config_gravada.update(config or {})
+
+        self.orquestrador = OrquestradorGeral(config_gravada)
+        self.fisica = FisicaGravada()
+        self.orquestrador.inicializar_sistemas(fisica_digital=self.fisica, grafo_global=self.stubs.grafo)
+
+        self.ticks = 0
+        self.agentes_substituidos = 0
+        self.tempo_flush_grafo = 0.0
+
+    def _criar_agente(self, nome: str, dados: Optional[bytes]) -> Any:
+        if self.modo == "agentes":
+            if dados is not None:
+                try:
+                    agente = pickle.loads(dados)
+                    self.stubs.instalar(agente)
+                    return agente
+                except Exception as e:
+                    logger.warning(f"Agente {nome} nao pode ser recriado ({e}); usando acoes gravadas")
+            self.agentes_substituidos += 1
+        return AgenteGravado(nome)
+
+    def _aplicar(self, registro: tuple) -> None:
+        """Refaz uma entrada externa gravada."""
+        tipo = registro[0]
+        if tipo == 'agente+':
+            _, nome, local, dados = registro
+            self.orquestrador.adicionar_agente(nome, self._criar_agente(nome, dados), local)
+        elif tipo == 'agente-':
+            self.orquestrador.remover_agente(registro[1])
+        elif tipo == 'evento':
+            self.orquestrador.adicionar_evento(registro[1])
+
+    def _reproduzir_quadro(self, registros: List[tuple]) -> None:
+        antes, depois = [], []
+        tick = None
+        fisica: List = []
+        percepcoes: Dict[str, List[Dict]] = {}
+        acoes: Dict[str, Optional[List[Dict]]] = {}
+        for registro in registros:
+            tipo = registro[0]
+            if tipo == 'tick':
+                tick = registro
+            elif tipo == 'fisica':
+                fisica.extend(registro[1])
+            elif tipo == 'percepcoes':
+                percepcoes.setdefault(registro[1], registro[2])
+            elif tipo == 'acoes':
+                acoes[registro[1]] = registro[2]
+            elif tipo != 'cabecalho':
+                (depois if tick else antes).append(registro)
+
+        for registro in antes:
+            self._aplicar(registro)
+        if tick is not None:
+            self._executar_tick(tick, fisica, percepcoes, acoes)
+        for registro in depois:
+            self._aplicar(registro)
+
+    def _executar_tick(self, tick: tuple, fisica: List, percepcoes: Dict, acoes: Dict) -> None:
+        _, tempo_mundo, passos, semente = tick
+        orquestrador = self.orquestrador
+        orquestrador.tempo_mundo = tempo_mundo
+        orquestrador._passos_tick = passos
+        self.fisica.eventos = fisica
+
+        # Os agentes rodam na ordem gravada (a de coleta das percepcoes)
+        ordem = [nome for nome in percepcoes if nome in orquestrador.agentes]
+        for nome in ordem:
+            agente = orquestrador.agentes[nome]
+            if isinstance(agente, AgenteGravado):
+                agente.acoes = acoes.get(nome)
+                agente.percepcoes_gravadas = percepcoes[nome] if self.verificar else None
+
+        orquestrador._semente_tick = semente
+        orquestrador._executar_ciclo_sync(ordem=ordem)
+        self.ticks += 1
+
+    def executar(self, max_ticks: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reproduz o log (ou os primeiros ``max_ticks`` ticks). A duracao nao inclui
+        o flush final do grafo, que sai a parte no relatorio.
+
+        :return: Relatorio (ver ``relatorio``).
+        """
+        inicio = time.perf_counter()
+        for registros in ler_replay(self.caminho):
+            self._reproduzir_quadro(registros)
+            if max_ticks is not None and self.ticks >= max_ticks:
+                break
+        duracao = time.perf_counter() - inicio
+        escritor = self.orquestrador.escritor_grafo
+        if escritor:
+            inicio_flush = time.perf_counter()
+            escritor.flush()
+            self.tempo_flush_grafo = time.perf_counter() - inicio_flush
+        return self.relatorio(duracao)
+
+    def relatorio(self, duracao: float) -> Dict[str, Any]:
+        """Ticks/s e, por fase, o tempo total, medio e p95 por tick."""
+        perfil = self.orquestrador.perfil.metricas()['fases']
+        fases = {fase: dict(perfil[fase]) for fase in FASES}
+        # 'eventos' contem o enfileiramento no grafo; no relatorio as fases sao exclusivas
+        fases['eventos']['soma'] -= fases['grafo']['soma']
+        fases['outros'] = {
+            'soma': max(0.0, perfil['tick']['soma'] - sum(f['soma'] for f in fases.values())),
+            'p95': 0.0,
+        }
+        ticks = max(self.ticks, 1)
+        divergencias = sum(
+            agente.divergencias for agente in self.orquestrador.agentes.values()
+            if isinstance(agente, AgenteGravado)
+        )
+        return {
+            'ticks': self.ticks,
+            'duracao_s': duracao,
+            'ticks_por_s': self.ticks / duracao if duracao > 0 else 0.0,
+            'fases': {
+                fase: {
+                    'total_s': resumo['soma'],
+                    'ms_por_tick': resumo['soma'] * 1000 / ticks,
+                    'p95_ms': resumo['p95'] * 1000,
+                }
+                for fase, resumo in fases.items()
+            },
+            'flush_grafo_s': self.tempo_flush_grafo,
+            'divergencias': divergencias,
+            'agentes_substituidos': self.agentes_substituidos,
+            'eventos_processados': self.orquestrador.stats['eventos_processados'],
+        }
+
+    def fechar(self) -> None:
+        self.orquestrador.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz um log de replay do Digimundo sem esperas")
+    parser.add_argument("log", help="Arquivo gravado com config['arquivo_replay']")
+    parser.add_argument("--modo", choices=MODOS, default="acoes")
+    parser.add_argument("--max-ticks", type=int, default=None)
+    parser.add_argument("--sem-verificacao", action="store_true",
+                        help="Nao compara percepcoes recalculadas com as gravadas")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    reprodutor = ReprodutorReplay(args.log, modo=args.modo, verificar=not args.sem_verificacao)
+    try:
+        relatorio = reprodutor.executar(args.max_ticks)
+    finally:
+        reprodutor.fechar()
+
+    print(f"ticks={relatorio['ticks']}  duracao={relatorio['duracao_s']:.2f}s  "
+          f"ticks/s={relatorio['ticks_por_s']:.1f}  eventos={relatorio['eventos_processados']}  "
+          f"divergencias={relatorio['divergencias']}")
+    for fase, tempos in relatorio['fases'].items():
+        print(f"  {fase:<11} {tempos['total_s']:9.3f}s  {tempos['ms_por_tick']:8.3f} ms/tick  "
+              f"p95={tempos['p95_ms']:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+
+import pytest
+
+from digimapas.templo_inicial.scripturemon import armazenamento_notas
+from digimapas.templo_inicial.scripturemon.armazenamento_notas import (
+    ArmazenamentoArquivos,
+    ArmazenamentoLog,
+    NotasPreguicosas,
+)
+
+
+def _dados(i, versao=0):
+    return {"conteudo": f"nota {i} versao {versao} " * 4, "tags": [f"t{i % 3}"]}
+
+
+def _conteudos(log):
+    return {nid: log.carregar(nid) for nid in log.listar_ids()}
+
+
+def test_reabertura_sem_fechar_recupera_escritas_apos_o_snapshot(tmp_path):
+    log = ArmazenamentoLog(str(tmp_path), snapshot_a_cada=5)
+    for i in range(7):
+        log.salvar(f"n{i}", _dados(i))
+    log.salvar("n1", _dados(1, versao=1))
+    log.remover("n2")
+    esperado = _conteudos(log)
+    # Sem fechar: o snapshot so cobre as 5 primeiras escritas
+    reaberto = ArmazenamentoLog(str(tmp_path), snapshot_a_cada=5)
+
+    assert _conteudos(reaberto) == esperado
+    assert "n2" not in reaberto.indice
+    assert reaberto.carregar("n1") == _dados(1, versao=1)
+    assert reaberto.bytes_mortos == log.bytes_mortos
+
+
+@pytest.mark.parametrize("corte", ["truncado", "corrompido"])
+def test_registro_final_danificado_e_descartado(tmp_path, corte):
+    log = ArmazenamentoLog(str(tmp_path))
+    for i in range(4):
+        log.salvar(f"n{i}", _dados(i))
+    caminho = log._caminho_segmento(log._ativo)
+    tamanho_valido = os.path.getsize(caminho)
+    log.salvar("n4", _dados(4))
+
+    with open(caminho, "r+b") as f:
+        if corte == "truncado":
+            f.truncate(os.path.getsize(caminho) - 5)
+        else:
+            f.seek(-3, os.SEEK_END)
+            f.write(b"###")
+
+    reaberto = ArmazenamentoLog(str(tmp_path))
+    assert sorted(reaberto.listar_ids()) == ["n0", "n1", "n2", "n3"]
+    assert os.path.getsize(caminho) == tamanho_valido
+
+    # O log continua utilizavel depois do corte
+    reaberto.salvar("n4", _dados(4))
+    reaberto.fechar()
+    assert ArmazenamentoLog(str(tmp_path)).carregar("n4") == _dados(4)
+
+
+def test_segmentos_giram_pelo_tamanho(tmp_path):
+    log = ArmazenamentoLog(str(tmp_path), tamanho_segmento=300)
+    for i in range(12):
+        log.salvar(f"n{i}", _dados(i))
+    assert len(log._segmentos()) > 2
+    log.fechar()
+    assert _conteudos(ArmazenamentoLog(str(tmp_path))) == {f"n{i}": _dados(i) for i in range(12)}
+
+
+def test_compactacao_reescreve_so_os_registros_vivos(tmp_path):
+    log = ArmazenamentoLog(str(tmp_path), tamanho_segmento=400, snapshot_a_cada=10 ** 6)
+    for versao in range(3):
+        for i in range(8):
+            log.salvar(f"n{i}", _dados(i, versao))
+    for i in range(4):
+        log.remover(f"n{i}")
+    esperado = _conteudos(log)
+    antigos = log._segmentos()
+    assert log.deve_compactar()
+
+    log.compactar()
+    assert log.bytes_mortos == 0 and not log.deve_compactar()
+    assert min(log._segmentos()) > max(antigos)
+    assert _conteudos(log) == esperado
+    assert _conteudos(ArmazenamentoLog(str(tmp_path))) == esperado
+
+
+def test_compactacao_automatica_no_snapshot(tmp_path):
+    log = ArmazenamentoLog(str(tmp_path), snapshot_a_cada=4, fator_compactacao=1.0)
+    for _ in range(3):
+        log.salvar("n0", _dados(0))
+    assert len(log._segmentos()) == 1
+    log.salvar("n0", _dados(0, versao=1))
+    # Tres versoes mortas contra uma viva: o snapshot vira compactacao
+    assert log.bytes_mortos == 0
+    assert _conteudos(log) == {"n0": _dados(0, versao=1)}
+
+
+def test_queda_no_meio_da_compactacao_nao_perde_notas(tmp_path, monkeypatch):
+    log = ArmazenamentoLog(str(tmp_path), tamanho_segmento=400, snapshot_a_cada=10 ** 6)
+    for versao in range(2):
+        for i in range(6):
+            log.salvar(f"n{i}", _dados(i, versao))
+    log.remover("n5")
+    log.salvar_indice()
+    esperado = _conteudos(log)
+
+    # Queda antes do snapshot final: segmentos novos e antigos convivem no disco
+    def cair():
+        raise OSError("queda simulada")
+
+    monkeypatch.setattr(log, "salvar_indice", cair)
+    with pytest.raises(OSError):
+        log.compactar()
+    reaberto = ArmazenamentoLog(str(tmp_path))
+    assert _conteudos(reaberto) == esperado
+
+    # Queda depois do snapshot, antes de apagar os segmentos antigos
+    monkeypatch.setattr(armazenamento_notas.os, "remove", lambda caminho: cair())
+    with pytest.raises(OSError):
+        reaberto.compactar()
+    monkeypatch.undo()
+    novos = reaberto._segmentos()
+    assert len(novos) > len(reaberto._lidos)
+
+    # Na abertura as sobras sao apagadas em vez de reindexadas
+    final = ArmazenamentoLog(str(tmp_path))
+    assert _conteudos(final) == esperado
+    assert final._segmentos() == sorted(reaberto._lidos)
+    assert final.bytes_mortos == 0
+
+
+def test_migracao_de_arquivos_acontece_uma_vez(tmp_path):
+    antigo = ArmazenamentoArquivos(str(tmp_path))
+    for i in range(3):
+        antigo.salvar(f"n{i}", _dados(i))
+
+    log = ArmazenamentoLog(str(tmp_path / "log"))
+    assert log.migrar_de_arquivos(str(tmp_path)) == 3
+    assert _conteudos(log) == {f"n{i}": _dados(i) for i in range(3)}
+    log.fechar()
+
+    # Os arquivos originais ficam, mas a migracao nao se repete
+    antigo.salvar("n9", _dados(9))
+    reaberto = ArmazenamentoLog(str(tmp_path / "log"))
+    assert reaberto.migrar_de_arquivos(str(tmp_path)) == 0
+    assert "n9" not in reaberto.indice
+    assert sorted(antigo.listar_ids()) == ["n0", "n1", "n2", "n9"]
+
+
+def test_notas_preguicosas_so_carregam_no_acesso():
+    carregadas = []
+
+    def carregar(nota_id):
+        carregadas.append(nota_id)
+        return f"corpo de {nota_id}"
+
+    notas = NotasPreguicosas(["a", "b", "c"], carregar)
+    assert len(notas) == 3 and "b" in notas and list(notas) == ["a", "b", "c"]
+    assert carregadas == []
+
+    assert notas["b"] == "corpo de b"
+    assert notas["b"] == "corpo de b"
+    assert carregadas == ["b"]
+
+    notas["d"] = "nova"
+    del notas["a"]
+    assert dict(notas.items()) == {"b": "corpo de b", "c": "corpo de c", "d": "nova"}
+    assert carregadas == ["b", "c"]
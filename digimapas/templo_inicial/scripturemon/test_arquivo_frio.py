@@ -0,0 +1,55 @@
+import os
+
+from digimapas.templo_inicial.scripturemon.arquivo_frio import ArquivoFrio
+
+
+def _registros(inicio, fim):
+    return [{"id": f"r{i}", "conteudo": f"memoria numero {i} " * 8} for i in range(inicio, fim)]
+
+
+def test_quadro_truncado_e_cortado_na_abertura(tmp_path):
+    arquivo = ArquivoFrio(str(tmp_path))
+    arquivo.arquivar(_registros(0, 10))
+    caminho = arquivo._caminho(arquivo.segmentos()[-1])
+    tamanho_valido = os.path.getsize(caminho)
+    arquivo.arquivar(_registros(10, 20))
+    arquivo.fechar()
+
+    # Queda no meio da escrita do segundo quadro
+    with open(caminho, "r+b") as f:
+        f.truncate(os.path.getsize(caminho) - 7)
+
+    reaberto = ArquivoFrio(str(tmp_path))
+    assert len(reaberto) == 10
+    assert os.path.getsize(caminho) == tamanho_valido
+    assert [r["id"] for r in reaberto.ler(["r3", "r15"])] == ["r3"]
+
+    # O arquivo continua utilizavel e o quadro perdido pode ser regravado
+    reaberto.arquivar(_registros(10, 20))
+    reaberto.fechar()
+    assert len(ArquivoFrio(str(tmp_path))) == 20
+
+
+def test_quadro_corrompido_e_cortado(tmp_path):
+    arquivo = ArquivoFrio(str(tmp_path))
+    arquivo.arquivar(_registros(0, 5))
+    arquivo.arquivar(_registros(5, 10))
+    caminho = arquivo._caminho(arquivo.segmentos()[-1])
+    arquivo.fechar()
+    with open(caminho, "r+b") as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b"\x00\x00\x00")
+
+    assert sorted(ArquivoFrio(str(tmp_path)).ids()) == sorted(f"r{i}" for i in range(5))
+
+
+def test_arquivar_e_idempotente_e_remover_sobrevive_a_reabertura(tmp_path):
+    arquivo = ArquivoFrio(str(tmp_path))
+    assert arquivo.arquivar(_registros(0, 5)) > 0
+    assert arquivo.arquivar(_registros(0, 5)) == 0
+    assert arquivo.remover(["r1", "r2", "inexistente"]) == 2
+    arquivo.fechar()
+
+    reaberto = ArquivoFrio(str(tmp_path))
+    assert sorted(reaberto.ids()) == ["r0", "r3", "r4"]
+    assert sorted(r["id"] for r in reaberto.iterar()) == ["r0", "r3", "r4"]
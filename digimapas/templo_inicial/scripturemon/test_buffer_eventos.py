@@ -0,0 +1,71 @@
+import pytest
+
+from digimapas.templo_inicial.scripturemon.buffer_eventos import BufferEventos
+
+
+def test_leitor_recebe_so_o_que_e_novo():
+    buffer = BufferEventos(capacidade=4)
+    assert buffer.ler_desde(0) == ([], 0, 0)
+    for evento in "abc":
+        buffer.publicar(evento)
+
+    eventos, cursor, perdidos = buffer.ler_desde(0)
+    assert eventos == [(1, "a"), (2, "b"), (3, "c")] and cursor == 3 and perdidos == 0
+    assert buffer.ler_desde(cursor) == ([], 3, 0)
+    assert buffer.publicar("d") == 4
+    assert buffer.ler_desde(cursor) == ([(4, "d")], 4, 0)
+
+
+def test_leitor_atrasado_perde_os_mais_antigos_e_e_informado():
+    buffer = BufferEventos(capacidade=4)
+    for i in range(10):
+        buffer.publicar(i)
+    assert len(buffer) == 4 and buffer.primeiro_seq == 7
+
+    eventos, cursor, perdidos = buffer.ler_desde(2)
+    assert [seq for seq, _ in eventos] == [7, 8, 9, 10]
+    assert [evento for _, evento in eventos] == [6, 7, 8, 9]
+    assert cursor == 10 and perdidos == 4
+
+    # Somando leituras, cada evento publicado e entregue ou contado como perdido uma vez
+    total, cursor = 0, 0
+    for rodada in range(5):
+        for i in range(3 + rodada * 2):
+            buffer.publicar(i)
+        eventos, cursor, perdidos = buffer.ler_desde(cursor)
+        total += len(eventos) + perdidos
+    assert total == buffer.ultimo_seq
+
+
+class _ItensConcorrentes(list):
+    """Simula um publicador que sobrescreve o buffer no meio de uma leitura."""
+
+    def __init__(self, itens, buffer, publicacoes):
+        super().__init__(itens)
+        self.buffer = buffer
+        self.publicacoes = publicacoes
+
+    def __getitem__(self, posicao):
+        while self.publicacoes:
+            self.publicacoes -= 1
+            self.buffer.publicar("concorrente")
+        return super().__getitem__(posicao)
+
+
+@pytest.mark.parametrize("publicacoes", [2, 7])
+def test_sobrescrita_durante_a_leitura_nao_conta_perda_duas_vezes(publicacoes):
+    buffer = BufferEventos(capacidade=4)
+    for i in range(4):
+        buffer.publicar(i)
+    buffer._itens = _ItensConcorrentes(buffer._itens, buffer, publicacoes)
+
+    eventos, cursor, perdidos = buffer.ler_desde(0)
+    assert all(seq >= buffer.primeiro_seq for seq, _ in eventos)
+    restantes, cursor, perdidos_depois = buffer.ler_desde(cursor)
+    entregues = len(eventos) + len(restantes)
+    assert entregues + perdidos + perdidos_depois == buffer.ultimo_seq == 4 + publicacoes
+
+
+def test_capacidade_invalida():
+    with pytest.raises(ValueError):
+        BufferEventos(capacidade=0)
@@ -0,0 +1,110 @@
+import logging
+import os
+import time
+
+from digimapas.templo_inicial.scripturemon.cache_deduplicacao import CacheDeduplicacao, hash_fato
+
+
+class RelogioFalso:
+    def __init__(self, agora=1000.0):
+        self.agora = agora
+
+    def __call__(self):
+        return self.agora
+
+
+def test_hash_estavel_e_despejo_do_mais_antigo():
+    assert hash_fato("fato") == hash_fato("fato") != hash_fato("fato.")
+    assert 0 <= hash_fato("fato") < 2 ** 64
+
+    cache = CacheDeduplicacao(max_entradas=3)
+    for chave in (1, 2, 3):
+        cache.adicionar(chave)
+    # Renovar leva a entrada para o fim da fila
+    cache.adicionar(1)
+    cache.adicionar(4)
+    assert 2 not in cache and all(c in cache for c in (1, 3, 4))
+    stats = cache.estatisticas()
+    assert (stats["tamanho"], stats["despejados"], stats["acertos"], stats["faltas"]) == (3, 1, 3, 1)
+
+
+def test_ttl_expira_na_consulta_e_na_insercao(monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(time, "time", relogio)
+    cache = CacheDeduplicacao(max_entradas=10, ttl=60)
+    cache.adicionar(1)
+    relogio.agora += 30
+    cache.adicionar(2)
+    relogio.agora += 31
+    assert 1 not in cache and 2 in cache
+    assert cache.expirados == 1 and len(cache) == 1
+
+    cache.adicionar(3)
+    relogio.agora += 45
+    cache.adicionar(4)
+    assert len(cache) == 2 and cache.expirados == 2
+    assert 3 in cache and 4 in cache
+
+
+def test_log_sobrevive_a_reinicio_e_respeita_ttl(tmp_path, monkeypatch):
+    relogio = RelogioFalso()
+    monkeypatch.setattr(time, "time", relogio)
+    arquivo = str(tmp_path / "sub" / "dedup.log")
+    cache = CacheDeduplicacao(max_entradas=10, ttl=100, arquivo=arquivo)
+    for chave in (1, 2, 3):
+        cache.adicionar(chave)
+        relogio.agora += 40
+    cache.adicionar(1)
+    # Sem fechar: um reinicio depois de sincronizar ve tudo o que foi escrito
+    cache.sincronizar()
+
+    reaberto = CacheDeduplicacao(max_entradas=10, ttl=100, arquivo=arquivo)
+    assert list(reaberto._hashes) == [2, 3, 1]
+    relogio.agora += 50
+    reaberto.adicionar(4)
+    assert list(reaberto._hashes) == [3, 1, 4]
+    reaberto.fechar()
+    relogio.agora += 1000
+    assert len(CacheDeduplicacao(max_entradas=10, ttl=100, arquivo=arquivo)) == 0
+
+
+def test_registro_truncado_e_descartado_e_log_reescrito(tmp_path, caplog):
+    arquivo = str(tmp_path / "dedup.log")
+    cache = CacheDeduplicacao(max_entradas=10, arquivo=arquivo)
+    for chave in (10, 20, 30):
+        cache.adicionar(chave)
+    cache.fechar()
+    # Queda no meio de uma escrita: metade de um registro no fim
+    with open(arquivo, "ab") as f:
+        f.write(b"\x01" * 7)
+
+    with caplog.at_level(logging.WARNING):
+        reaberto = CacheDeduplicacao(max_entradas=10, arquivo=arquivo)
+    assert "truncado" in caplog.text
+    assert list(reaberto._hashes) == [10, 20, 30]
+    assert os.path.getsize(arquivo) == 3 * 16
+    reaberto.adicionar(40)
+    reaberto.fechar()
+    assert list(CacheDeduplicacao(max_entradas=10, arquivo=arquivo)._hashes) == [10, 20, 30, 40]
+
+
+def test_compactacao_mantem_so_as_entradas_vivas(tmp_path):
+    arquivo = str(tmp_path / "dedup.log")
+    cache = CacheDeduplicacao(max_entradas=3, arquivo=arquivo, fator_compactacao=2)
+    for chave in range(6):
+        cache.adicionar(chave)
+    cache.sincronizar()
+    assert os.path.getsize(arquivo) == 6 * 16
+    cache.adicionar(6)
+    assert os.path.getsize(arquivo) == 3 * 16 and not os.path.exists(arquivo + ".tmp")
+    cache.adicionar(7)
+    cache.fechar()
+    assert list(CacheDeduplicacao(max_entradas=3, arquivo=arquivo)._hashes) == [5, 6, 7]
+
+    # Mais entradas no log que o limite atual: a reabertura despeja as antigas
+    menor = CacheDeduplicacao(max_entradas=2, arquivo=arquivo)
+    assert list(menor._hashes) == [6, 7] and menor.despejados == 2
+    menor.limpar()
+    menor.fechar()
+    assert os.path.getsize(arquivo) == 0
+    assert len(CacheDeduplicacao(max_entradas=2, arquivo=arquivo)) == 0
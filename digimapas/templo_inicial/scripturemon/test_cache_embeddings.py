@@ -0,0 +1,108 @@
+import numpy as np
+
+from digimapas.templo_inicial.scripturemon.cache_embeddings import (
+    CacheEmbeddingsPersistente,
+    CacheLRUEmbeddings,
+    chave_embedding,
+)
+
+
+def _vetores(n, dim=4, inicio=0):
+    return np.arange(inicio * dim, (inicio + n) * dim, dtype=np.float32).reshape(n, dim)
+
+
+def test_chave_repetida_no_lote_ocupa_uma_linha(tmp_path):
+    cache = CacheEmbeddingsPersistente(str(tmp_path), "modelo-a", capacidade_inicial=2)
+    a, b, c = (chave_embedding(t, "modelo-a") for t in ("a", "b", "c"))
+    cache.adicionar([a, b, a], _vetores(3))
+    assert len(cache) == 2
+    cache.adicionar([c], _vetores(1, inicio=3))
+
+    # A ultima ocorrencia vence, como em um dict
+    np.testing.assert_array_equal(cache.buscar([a])[a], _vetores(1, inicio=2)[0])
+    with open(tmp_path / "embeddings.idx", encoding="utf-8") as f:
+        assert len(f.readlines()) == 1 + 3
+
+    reaberto = CacheEmbeddingsPersistente(str(tmp_path), "modelo-a")
+    assert len(reaberto) == 3
+    encontrados = reaberto.buscar([a, b, c])
+    np.testing.assert_array_equal(encontrados[a], _vetores(1, inicio=2)[0])
+    np.testing.assert_array_equal(encontrados[b], _vetores(1, inicio=1)[0])
+    np.testing.assert_array_equal(encontrados[c], _vetores(1, inicio=3)[0])
+
+
+def test_reabertura_cresce_e_invalida_por_modelo(tmp_path):
+    cache = CacheEmbeddingsPersistente(str(tmp_path), "modelo-a", capacidade_inicial=2)
+    chaves = [chave_embedding(f"texto {i}", "modelo-a") for i in range(5)]
+    cache.adicionar(chaves[:3], _vetores(3))
+    cache.adicionar(chaves, _vetores(5))
+    assert len(cache) == 5
+
+    reaberto = CacheEmbeddingsPersistente(str(tmp_path), "modelo-a")
+    encontrados = reaberto.buscar(chaves)
+    np.testing.assert_array_equal(np.stack([encontrados[c] for c in chaves]), _vetores(5))
+
+    outro = CacheEmbeddingsPersistente(str(tmp_path), "modelo-b")
+    assert len(outro) == 0 and outro.buscar(chaves) == {}
+    assert not (tmp_path / "embeddings.f32").exists()
+
+
+def _vetor(n=4, valor=0.0):
+    return np.full(n, valor, dtype=np.float32)
+
+
+def test_lru_despeja_o_menos_recente_por_entradas():
+    cache = CacheLRUEmbeddings(max_entradas=3)
+    for chave in "abc":
+        cache.guardar(chave, _vetor())
+    assert cache.obter("a") is not None
+    cache.guardar("d", _vetor())
+
+    assert "b" not in cache and set("acd") == {c for c in "abcd" if c in cache}
+    assert cache.obter("b") is None
+    stats = cache.estatisticas()
+    assert (stats["acertos"], stats["faltas"], stats["despejos"]) == (1, 1, 1)
+    assert stats["taxa_acerto"] == 0.5 and stats["bytes"] == 3 * 16
+
+
+def test_lru_despeja_por_bytes_e_conta_substituicoes():
+    cache = CacheLRUEmbeddings(max_entradas=None, max_bytes=100)
+    cache.guardar("pequeno", _vetor(4))
+    cache.guardar("grande", _vetor(20))
+    assert cache.bytes_usados == 96
+    # Substituir desconta o vetor antigo antes de somar o novo
+    cache.guardar("pequeno", _vetor(5))
+    assert cache.bytes_usados == 100 and len(cache) == 2
+
+    cache.guardar("outro", _vetor(2))
+    assert "grande" not in cache and cache.bytes_usados == 28
+    cache.guardar("enorme", _vetor(30))
+    assert len(cache) == 0 and cache.bytes_usados == 0 and cache.despejos == 4
+
+
+def test_entradas_fixadas_nunca_sao_despejadas_mas_contam_nos_limites():
+    cache = CacheLRUEmbeddings(max_entradas=3, max_bytes=None)
+    for chave in "abc":
+        cache.guardar(chave, _vetor())
+    assert cache.fixar("a") and cache.fixar("a") and not cache.fixar("z")
+    for chave in "defg":
+        cache.guardar(chave, _vetor())
+    assert "a" in cache and len(cache) == 3
+    assert cache.estatisticas()["fixadas"] == 1
+
+    # Ao desafixar, volta ao LRU como a mais recente
+    cache.desafixar("a")
+    cache.guardar("h", _vetor())
+    assert "a" in cache and "f" not in cache
+    assert cache.estatisticas()["fixadas"] == 0
+
+    # Crescer uma entrada fixada tambem respeita o limite de bytes
+    limitado = CacheLRUEmbeddings(max_entradas=None, max_bytes=64)
+    limitado.guardar("fixa", _vetor(4))
+    limitado.fixar("fixa")
+    limitado.guardar("livre", _vetor(8))
+    limitado.guardar("fixa", _vetor(12))
+    assert "fixa" in limitado and "livre" not in limitado and limitado.bytes_usados == 48
+
+    limitado.limpar()
+    assert len(limitado) == 0 and limitado.bytes_usados == 0 and limitado.despejos == 1
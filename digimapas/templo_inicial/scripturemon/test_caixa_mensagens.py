@@ -0,0 +1,23 @@
+from digimapas.templo_inicial.scripturemon.caixa_mensagens import CaixaMensagens, Mensagem
+
+
+def test_caixa_cheia_descarta_a_mais_antiga():
+    caixa = CaixaMensagens(capacidade=2)
+    assert not caixa.depositar(Mensagem("a", "um", "praca", 1))
+    assert not caixa.depositar(Mensagem("a", "dois", "praca", 1))
+    assert caixa.depositar(Mensagem("a", "tres", "praca", 2))
+
+    percepcoes, agrupadas = caixa.retirar()
+    assert [p['conteudo'] for p in percepcoes] == ["dois", "tres"] and agrupadas == 0
+    assert len(caixa) == 0 and caixa.retirar() == ([], 0)
+
+
+def test_repeticoes_nao_lidas_sao_agrupadas_na_ordem():
+    caixa = CaixaMensagens()
+    for emissor, conteudo in [("a", "oi"), ("b", "oi"), ("a", "oi"), ("a", "tchau"), ("b", "oi")]:
+        caixa.depositar(Mensagem(emissor, conteudo, "templo", 3))
+
+    percepcoes, agrupadas = caixa.retirar()
+    assert [(p['emissor'], p['conteudo']) for p in percepcoes] == [("a", "oi"), ("b", "oi"), ("a", "tchau")]
+    assert agrupadas == 2
+    assert percepcoes[0] == {'tipo': 'mensagem', 'emissor': "a", 'conteudo': "oi", 'local': "templo"}
@@ -0,0 +1,132 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from digimapas.templo_inicial.scripturemon.consolidador_memoria import ConsolidadorMemoria
+
+CONFIG = {'idade_resumo_s': 1e9, 'orcamento_s': 60.0}
+
+
+class FonteMemoria:
+    """Fonte em memoria; ``falhar_remocao`` simula uma queda no meio de uma operacao."""
+
+    def __init__(self, registros):
+        self.registros = {r['id']: dict(r) for r in registros}
+        self.falhar_remocao = 0
+
+    def listar_ids(self):
+        return list(self.registros)
+
+    def obter(self, ids):
+        return [dict(self.registros[i]) for i in ids if i in self.registros]
+
+    def mesclar(self, canonico_id, campos, mesclados):
+        self.registros[canonico_id].update(campos)
+
+    def remover(self, ids):
+        if self.falhar_remocao:
+            self.falhar_remocao -= 1
+            raise RuntimeError("queda simulada")
+        for registro_id in ids:
+            self.registros.pop(registro_id, None)
+
+    def registrar_resumo(self, chave, conteudo, metadados):
+        self.registros[f"resumo-{chave}"] = {'id': f"resumo-{chave}", 'conteudo': conteudo, **metadados}
+
+
+def _registro(registro_id, conteudo, dias=0, importancia=0.5, mencoes=1):
+    instante = (datetime.now() - timedelta(days=dias)).isoformat()
+    return {
+        'id': registro_id, 'conteudo': conteudo, 'tags': ['teste'], 'importancia': importancia,
+        'mencoes': mencoes, 'timestamp': instante, 'ultima_mencao': instante, 'tipo': 'evento',
+    }
+
+
+def _antigos(n):
+    return [_registro(f"antigo-{i:02d}", f"lembranca esquecida numero {i} do templo", dias=60, importancia=0.1)
+            for i in range(n)]
+
+
+def _estado(diretorio):
+    with open(os.path.join(diretorio, 'estado.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_queda_no_arquivamento_e_refeita_na_abertura(tmp_path):
+    diretorio = str(tmp_path)
+    fonte = FonteMemoria(_antigos(6) + [_registro("recente", "treino de hoje no templo de fogo")])
+    fonte.falhar_remocao = 1
+
+    with pytest.raises(RuntimeError):
+        ConsolidadorMemoria(fonte, diretorio, CONFIG).executar_ciclo()
+
+    # O registro arquivado ja esta no frio, mas a fonte ainda o tem
+    estado_na_queda = _estado(diretorio)
+    assert estado_na_queda['pendente']['op'] == 'arquivar'
+    assert len(fonte.registros) == 7
+
+    consolidador = ConsolidadorMemoria(fonte, diretorio, CONFIG)
+    assert consolidador.estado['pendente'] is None
+    assert sorted(fonte.registros) == ["recente"]
+    assert len(consolidador.frio) == 6
+    consolidador.parar()
+
+    # Refazer a mesma operacao de novo nao muda nada
+    with open(os.path.join(diretorio, 'estado.json'), 'w', encoding='utf-8') as f:
+        json.dump(estado_na_queda, f)
+    consolidador = ConsolidadorMemoria(fonte, diretorio, CONFIG)
+    assert sorted(fonte.registros) == ["recente"]
+    assert len(consolidador.frio) == 6
+    assert consolidador.frio.estatisticas()['registros'] == 6
+
+    # E o ciclo interrompido termina do cursor
+    relatorio = consolidador.executar_ciclo()
+    assert relatorio['registros_depois'] == 1
+    consolidador.parar()
+
+
+def test_queda_na_mesclagem_nao_soma_mencoes_duas_vezes(tmp_path):
+    diretorio = str(tmp_path)
+    texto = "Agumon e Gabumon treinaram juntos no templo"
+    fonte = FonteMemoria([_registro(f"m{i}", texto, mencoes=2) for i in range(3)])
+    fonte.falhar_remocao = 1
+
+    with pytest.raises(RuntimeError):
+        ConsolidadorMemoria(fonte, diretorio, CONFIG).executar_ciclo()
+    assert fonte.registros['m0']['mencoes'] == 6  # aplicado antes da queda
+
+    estado_na_queda = _estado(diretorio)
+    for _ in range(2):
+        with open(os.path.join(diretorio, 'estado.json'), 'w', encoding='utf-8') as f:
+            json.dump(estado_na_queda, f)
+        ConsolidadorMemoria(fonte, diretorio, CONFIG).parar()
+        assert sorted(fonte.registros) == ["m0"]
+        assert fonte.registros['m0']['mencoes'] == 6
+
+
+def test_contagens_do_ciclo_batem_com_a_fonte(tmp_path):
+    grupos = [f"fato repetido numero {g} sobre o digimundo" for g in range(5)]
+    duplicados = [_registro(f"d{g}-{c}", texto, importancia=0.6 + 0.1 * c)
+                  for g, texto in enumerate(grupos) for c in range(3)]
+    recentes = [_registro(f"novo-{i}", f"acontecimento recente {i} na vila inicial") for i in range(4)]
+    fonte = FonteMemoria(duplicados + _antigos(6) + recentes)
+
+    consolidador = ConsolidadorMemoria(fonte, str(tmp_path), CONFIG)
+    relatorio = consolidador.executar_ciclo()
+
+    assert relatorio['registros_antes'] == 25
+    assert relatorio['registros_mesclados'] == 10
+    assert relatorio['registros_arquivados'] == 6
+    assert relatorio['registros_depois'] == len(fonte.registros) == 25 - 10 - 6
+    assert len(consolidador.frio) == 6
+    assert all(not registro_id.startswith("antigo") for registro_id in fonte.registros)
+    for g in range(5):
+        canonico = fonte.registros[f"d{g}-0"]
+        assert canonico['mencoes'] == 3
+        assert canonico['importancia'] == pytest.approx(0.8)
+    totais = consolidador.relatorio()['totais']
+    assert totais['registros_mesclados'] == 10
+    assert totais['registros_arquivados'] == 6
+    consolidador.parar()
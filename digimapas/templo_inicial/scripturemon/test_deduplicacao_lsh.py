@@ -0,0 +1,129 @@
+import random
+
+import numpy as np
+import pytest
+
+from digimapas.templo_inicial.scripturemon.deduplicacao_lsh import DeduplicadorLSH
+
+_LETRAS = random.Random(0)
+VOCABULARIO = ["".join(_LETRAS.choices("abcdefghijklmnopqrstuvwxyz", k=6)) for _ in range(300)]
+_POSICAO = {palavra: i for i, palavra in enumerate(VOCABULARIO)}
+
+
+def _frases(n, semente=1, palavras=12):
+    rng = random.Random(semente)
+    return [" ".join(rng.choices(VOCABULARIO, k=palavras)) for _ in range(n)]
+
+
+def _trocar(frase, rng, quantas=1):
+    partes = frase.split()
+    for i in rng.sample(range(len(partes)), quantas):
+        partes[i] = rng.choice(VOCABULARIO)
+    return " ".join(partes)
+
+
+def _jaccard(dedup, a, b):
+    sa, sb = set(dedup._shingles(a).tolist()), set(dedup._shingles(b).tolist())
+    return len(sa & sb) / len(sa | sb)
+
+
+class CodificadorFalso:
+    """Saco de palavras normalizado; conta chamadas e textos codificados."""
+
+    def __init__(self):
+        self.chamadas = []
+
+    def __call__(self, textos):
+        self.chamadas.append(list(textos))
+        vetores = np.zeros((len(textos), len(VOCABULARIO)), dtype=np.float32)
+        for linha, texto in enumerate(textos):
+            for palavra in texto.lower().split():
+                vetores[linha, _POSICAO[palavra.strip(".,!")]] += 1
+        return vetores
+
+
+def test_assinatura_estima_o_jaccard_dos_shingles():
+    dedup = DeduplicadorLSH()
+    rng = random.Random(2)
+    for frase in _frases(50):
+        variante = _trocar(frase, rng, rng.randint(0, 6))
+        estimado = dedup.jaccard_estimado(dedup.assinatura(frase), dedup.assinatura(variante))
+        assert abs(estimado - _jaccard(dedup, frase, variante)) < 0.15
+    # Caixa e pontuacao nao mudam a assinatura
+    a, b, c = VOCABULARIO[:3]
+    np.testing.assert_array_equal(dedup.assinatura(f"{a.upper()}, {b}! {c}."), dedup.assinatura(f"{a} {b} {c}"))
+    with pytest.raises(ValueError):
+        DeduplicadorLSH(num_permutacoes=100, bandas=32)
+
+
+def test_quase_duplicatas_e_falsos_negativos_sem_codificar():
+    dedup = DeduplicadorLSH()
+    frases = _frases(200)
+    assert dedup.verificar_lote(list(range(200)), frases) == [None] * 200
+
+    rng = random.Random(3)
+    variantes = [_trocar(frase, rng) for frase in frases]
+    # Uma palavra trocada em doze fica acima do limiar e o LSH nao deixa escapar nenhuma:
+    # todas caem no balde da frase original
+    assert all(_jaccard(dedup, a, b) >= dedup.limiar_jaccard for a, b in zip(frases, variantes))
+    assert all(i in dedup._candidatos(dedup._chaves_bandas(dedup.assinatura(variante)))
+               for i, variante in enumerate(variantes))
+    resultado = dedup.verificar_lote([f"v{i}" for i in range(200)], variantes)
+    # Falsos negativos so vem do Jaccard estimado perto do limiar, e sao raros
+    encontrados = [r[0] if r else None for r in resultado]
+    perdidos = [i for i, achado in enumerate(encontrados) if achado is None]
+    assert len(perdidos) <= 4
+    assert all(achado == i for i, achado in enumerate(encontrados) if achado is not None)
+    assert all(_jaccard(dedup, frases[i], variantes[i]) < 0.85 for i in perdidos)
+
+    # Metade trocada: nao e duplicata, e o texto entra no indice
+    distantes = [_trocar(frase, rng, 6) for frase in frases[:50]]
+    resultado = dedup.verificar_lote([f"d{i}" for i in range(50)], distantes)
+    assert resultado == [None] * 50
+    assert all(f"d{i}" in dedup for i in range(50))
+    stats = dedup.estatisticas()
+    assert stats["confirmadas"] == 200 - len(perdidos) and stats["consultas"] == 450
+    assert stats["entradas"] == 250 + len(perdidos)
+
+
+def test_repeticao_dentro_do_lote_e_despejo_limpam_os_baldes():
+    dedup = DeduplicadorLSH(max_entradas=3)
+    frase = " ".join(VOCABULARIO[:5])
+    resultado = dedup.verificar_lote(["a", "b", "c"], [frase, frase.upper() + "!", " ".join(VOCABULARIO[5:8])])
+    assert resultado[0] is None and resultado[1] == ("a", 1.0) and resultado[2] is None
+    assert "b" not in dedup and dedup.texto("a") == frase
+
+    for i, outra in enumerate(_frases(3, semente=4)):
+        dedup.adicionar(f"n{i}", outra)
+    assert len(dedup) == 3 and "a" not in dedup and dedup.texto("a") is None
+    # O fato despejado nao e mais encontrado
+    assert dedup.verificar_lote(["a2"], [frase]) == [None]
+    membros = set().union(*(b for baldes in dedup._baldes for b in baldes.values()))
+    assert membros == set(dedup._entradas)
+
+
+def test_confirmacao_por_embedding_com_uma_chamada_por_lote():
+    codificar = CodificadorFalso()
+    dedup = DeduplicadorLSH(codificar=codificar, limiar_cosseno=0.9)
+    frases = _frases(30, semente=5)
+    assert dedup.verificar_lote(list(range(30)), frases) == [None] * 30
+    # Sem colisoes nada e codificado
+    assert codificar.chamadas == []
+
+    rng = random.Random(6)
+    variantes = [frases[0].upper() + ".", _trocar(frases[1], rng), " ".join(VOCABULARIO[-5:])]
+    resultado = dedup.verificar_lote(["x", "y", "z"], variantes)
+    assert resultado[0] == (0, pytest.approx(1.0)) and resultado[1][0] == 1 and resultado[2] is None
+    # Uma chamada: os dois textos com candidatos e os dois candidatos do indice
+    assert len(codificar.chamadas) == 1 and sorted(codificar.chamadas[0][2:]) == sorted(frases[:2])
+    assert dedup.estatisticas()["embeddings_calculados"] == 4
+
+    # Embeddings dos candidatos ficam no indice; so o texto novo e codificado
+    assert dedup.verificar_lote(["x2"], [frases[0]]) == [(0, pytest.approx(1.0))]
+    assert codificar.chamadas[-1] == [frases[0]]
+
+    # Mesmas palavras em outra ordem: o MinHash aproxima, o embedding confirma;
+    # um limiar de cosseno acima do possivel vira falso negativo e o texto e indexado
+    estrito = DeduplicadorLSH(codificar=CodificadorFalso(), limiar_cosseno=1.01)
+    estrito.verificar_lote(["a"], [frases[2]])
+    assert estrito.verificar_lote(["b"], [frases[2]]) == [None] and "b" in estrito
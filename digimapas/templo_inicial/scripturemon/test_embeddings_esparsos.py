@@ -0,0 +1,116 @@
+import random
+
+import numpy as np
+import pytest
+
+from digimapas.templo_inicial.scripturemon import embeddings_esparsos
+from digimapas.templo_inicial.scripturemon.embeddings_esparsos import MotorTfidfHash
+
+VOCABULARIO = [f"palavra{i}" for i in range(60)]
+
+
+def _textos(n, semente=5):
+    rng = random.Random(semente)
+    return {f"d{i:04d}": " ".join(rng.choices(VOCABULARIO, k=rng.randint(3, 12))) for i in range(n)}
+
+
+def _motor(textos, dimensao=4096):
+    motor = MotorTfidfHash(dimensao=dimensao)
+    for doc_id, texto in textos.items():
+        motor.adicionar(doc_id, texto)
+    return motor
+
+
+def _forca_bruta(motor, textos, doc_id, k, limiar):
+    """Cosseno TF-IDF com vetores densos, documento a documento."""
+    idf = motor.idf()
+
+    def vetor(texto):
+        denso = np.zeros(motor.dimensao)
+        colunas, tf = motor.termos(texto)
+        denso[colunas] = tf * idf[colunas]
+        return denso / (np.linalg.norm(denso) or 1.0)
+
+    alvo = vetor(textos[doc_id])
+    pares = [(outro, float(alvo @ vetor(texto))) for outro, texto in textos.items() if outro != doc_id]
+    pares = sorted((p for p in pares if p[1] >= limiar), key=lambda p: -p[1])
+    return pares[:k]
+
+
+def _comparar(obtido, esperado):
+    assert [sim for _, sim in obtido] == pytest.approx([sim for _, sim in esperado], abs=1e-5)
+    assert {nid for nid, _ in obtido} == {nid for nid, _ in esperado}
+
+
+def test_similares_iguais_a_forca_bruta_com_remocoes_e_reindexacao():
+    textos = _textos(150)
+    motor = _motor(textos)
+    for doc_id in list(textos)[::4]:
+        _comparar(motor.similares(doc_id, 5, 0.2), _forca_bruta(motor, textos, doc_id, 5, 0.2))
+
+    rng = random.Random(9)
+    for doc_id in rng.sample(sorted(textos), 50):
+        motor.remover(doc_id)
+        del textos[doc_id]
+    for doc_id in rng.sample(sorted(textos), 20):
+        textos[doc_id] = " ".join(rng.choices(VOCABULARIO, k=6))
+        motor.adicionar(doc_id, textos[doc_id])
+    assert len(motor) == len(textos)
+    # As frequencias de documento descontam removidos e versoes antigas
+    np.testing.assert_array_equal(motor._df, _motor(textos)._df)
+
+    for doc_id in list(textos)[::3]:
+        _comparar(motor.similares(doc_id, 5, 0.2), _forca_bruta(motor, textos, doc_id, 5, 0.2))
+        assert all(outro in textos for outro, _ in motor.similares(doc_id, 100, 0.0))
+
+
+def test_compactacao_descarta_tombstones_sem_mudar_resultados():
+    textos = _textos(1200, semente=2)
+    motor = _motor(textos, dimensao=1024)
+    removidos = list(textos)[:1100]
+    for doc_id in removidos[:1024]:
+        motor.remover(doc_id)
+        del textos[doc_id]
+    assert motor._total_removidas == 1024 and len(motor._ids) == 1200
+
+    consultados = list(textos)[80::10]
+    for doc_id in consultados:
+        _comparar(motor.similares(doc_id, 4, 0.1), _forca_bruta(motor, textos, doc_id, 4, 0.1))
+    # A proxima remocao passa do limite (max(1024, vivos)) e compacta
+    motor.remover(removidos[1024])
+    del textos[removidos[1024]]
+    assert motor._total_removidas == 0 and len(motor._ids) == len(textos) == 175
+    assert not motor._removidas[:len(motor._ids)].any()
+    for doc_id in consultados:
+        depois = motor.similares(doc_id, 4, 0.1)
+        assert all(outro != removidos[1024] for outro, _ in depois)
+        _comparar(depois, _forca_bruta(motor, textos, doc_id, 4, 0.1))
+
+    motor.adicionar("novo", textos[next(iter(textos))])
+    assert motor.similares("novo", 1, 0.99)[0][1] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("com_scipy", [True, False])
+def test_lote_em_blocos_igual_a_busca_por_documento(monkeypatch, com_scipy):
+    if com_scipy:
+        pytest.importorskip("scipy")
+    else:
+        monkeypatch.setattr(embeddings_esparsos, "sp", None)
+    textos = _textos(80)
+    motor = _motor(textos)
+    for doc_id in list(textos)[:10]:
+        motor.remover(doc_id)
+
+    vivos = list(textos)[10:]
+    lote = motor.similares_em_lote(vivos, 5, 0.2, orcamento_mb=1e-4)
+    for doc_id in vivos:
+        _comparar(lote[doc_id], motor.similares(doc_id, 5, 0.2))
+
+
+def test_denso_tem_largura_fixa_e_texto_vazio_nao_quebra():
+    motor = _motor(_textos(10))
+    assert motor.denso("palavra1 palavra2").shape == (1024,)
+    assert not motor.denso("").any()
+    motor.adicionar("vazio", "")
+    assert all(sim == 0.0 for _, sim in motor.similares("vazio", 3, 0.0))
+    assert motor.similares("vazio", 3, 0.1) == []
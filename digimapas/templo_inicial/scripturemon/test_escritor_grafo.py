@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+
+from digimapas.templo_inicial.scripturemon.escritor_grafo import DriverGrafoLocal, EscritorGrafoLote
+
+
+def _esperar(condicao, timeout=3.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return condicao()
+
+
+def _linhas(n, inicio=0):
+    return [{"tipo": "teste", "conteudo": f"evento {i}", "origem": "pytest", "timestamp": i}
+            for i in range(inicio, inicio + n)]
+
+
+def _derramadas(caminho):
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+class DriverLento(DriverGrafoLocal):
+    """Segura cada gravacao ate ``liberar`` ser sinalizado."""
+
+    def __init__(self):
+        super().__init__()
+        self.gravando = threading.Event()
+        self.liberar = threading.Event()
+
+    def execute_query(self, query, parameters_=None, **kwargs):
+        self.gravando.set()
+        self.liberar.wait(5.0)
+        super().execute_query(query, parameters_, **kwargs)
+
+
+class DriverFalhaDepois(DriverGrafoLocal):
+    """Aceita ``aceitar`` consultas e depois fica indisponivel."""
+
+    def __init__(self, aceitar):
+        super().__init__()
+        self.aceitar = aceitar
+
+    def execute_query(self, query, parameters_=None, **kwargs):
+        if len(self.consultas) >= self.aceitar:
+            self.disponivel = False
+        super().execute_query(query, parameters_, **kwargs)
+
+
+def test_lote_sai_ao_atingir_o_tamanho():
+    driver = DriverGrafoLocal()
+    escritor = EscritorGrafoLote(driver, tamanho_lote=10, intervalo_flush=5.0)
+    for linha in _linhas(25):
+        assert escritor.enfileirar(linha)
+
+    assert _esperar(lambda: driver.linhas_gravadas == 20)
+    assert [len(p["rows"]) for _, p in driver.consultas] == [10, 10]
+    assert "UNWIND $rows" in driver.consultas[0][0]
+
+    assert escritor.flush(timeout=2.0)
+    assert [len(p["rows"]) for _, p in driver.consultas] == [10, 10, 5]
+    metricas = escritor.metricas()
+    assert metricas["lotes_gravados"] == 3 and metricas["linhas_gravadas"] == 25
+    assert metricas["maior_lote"] == 10
+    escritor.fechar()
+
+
+def test_lote_sai_pelo_prazo_sem_encher():
+    driver = DriverGrafoLocal()
+    escritor = EscritorGrafoLote(driver, tamanho_lote=1000, intervalo_flush=0.1)
+    for linha in _linhas(3):
+        escritor.enfileirar(linha)
+
+    assert _esperar(lambda: driver.linhas_gravadas == 3, timeout=2.0)
+    assert len(driver.consultas) == 1
+    escritor.fechar()
+
+
+def test_fila_cheia_segura_o_produtor_e_depois_descarta():
+    driver = DriverLento()
+    escritor = EscritorGrafoLote(driver, tamanho_lote=1, intervalo_flush=0.05, capacidade=2,
+                                 timeout_enfileirar=0.2)
+    escritor.enfileirar(_linhas(1)[0])
+    assert driver.gravando.wait(2.0)
+    assert escritor.enfileirar(_linhas(1, 1)[0])
+    assert escritor.enfileirar(_linhas(1, 2)[0])
+
+    inicio = time.monotonic()
+    assert not escritor.enfileirar(_linhas(1, 3)[0])
+    assert time.monotonic() - inicio >= 0.2
+    assert escritor.metricas()["linhas_descartadas"] == 1
+
+    driver.liberar.set()
+    assert escritor.flush(timeout=2.0)
+    assert driver.linhas_gravadas == 3
+    escritor.fechar()
+
+
+def test_politica_descartar_com_grafo_fora():
+    driver = DriverGrafoLocal()
+    driver.disponivel = False
+    escritor = EscritorGrafoLote(driver, tamanho_lote=10, intervalo_flush=0.05, tentativas=2)
+    for linha in _linhas(5):
+        escritor.enfileirar(linha)
+
+    assert escritor.flush(timeout=3.0)
+    metricas = escritor.metricas()
+    assert metricas["linhas_descartadas"] == 5
+    assert metricas["falhas"] == 2
+    assert not metricas["grafo_disponivel"]
+    escritor.fechar()
+
+
+def test_politica_disco_derrama_e_reenvia_quando_o_grafo_volta(tmp_path):
+    caminho = str(tmp_path / "grafo.jsonl")
+    driver = DriverGrafoLocal()
+    driver.disponivel = False
+    escritor = EscritorGrafoLote(driver, tamanho_lote=10, intervalo_flush=0.05, tentativas=1,
+                                 politica_falha="disco", arquivo_derramamento=caminho,
+                                 intervalo_reenvio=0.05)
+    for linha in _linhas(15):
+        escritor.enfileirar(linha)
+    assert escritor.flush(timeout=3.0)
+    assert len(_derramadas(caminho)) == 15
+
+    # Varios reenvios falham enquanto o grafo esta fora: nada e contado de novo nem perdido
+    assert _esperar(lambda: escritor.metricas()["falhas"] >= 6)
+    assert escritor.metricas()["linhas_derramadas"] == 15
+    assert _esperar(lambda: len(_derramadas(caminho)) == 15)
+
+    driver.disponivel = True
+    assert _esperar(lambda: escritor.metricas()["linhas_reenviadas"] == 15)
+    assert sorted(p["timestamp"] for _, q in driver.consultas for p in q["rows"]) == list(range(15))
+    assert not os.path.exists(caminho) and not os.path.exists(caminho + ".reenvio")
+    assert escritor.metricas()["linhas_derramadas"] == 15
+    escritor.fechar()
+
+
+def test_reenvio_interrompido_nao_perde_linhas(tmp_path):
+    caminho = str(tmp_path / "grafo.jsonl")
+    # Queda no meio de um reenvio anterior: a copia ficou no disco, com novas linhas ao lado
+    with open(caminho + ".reenvio", "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(linha) + "\n" for linha in _linhas(6)))
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("".join(json.dumps(linha) + "\n" for linha in _linhas(2, 6)))
+
+    # O grafo aceita um lote e cai de novo: o restante volta para o derramamento
+    driver = DriverFalhaDepois(aceitar=1)
+    escritor = EscritorGrafoLote(driver, tamanho_lote=2, intervalo_flush=0.05, tentativas=1,
+                                 politica_falha="disco", arquivo_derramamento=caminho,
+                                 intervalo_reenvio=0.05)
+    assert _esperar(lambda: not os.path.exists(caminho + ".reenvio"))
+    assert escritor.metricas()["linhas_reenviadas"] == 2
+    pendentes = sorted(linha["timestamp"] for linha in _derramadas(caminho))
+    assert pendentes == [2, 3, 4, 5, 6, 7]
+
+    driver.disponivel = True
+    driver.aceitar = 100
+    assert _esperar(lambda: escritor.metricas()["linhas_reenviadas"] == 8)
+    assert sorted(p["timestamp"] for _, q in driver.consultas for p in q["rows"]) == list(range(8))
+    assert escritor.metricas()["linhas_derramadas"] == 0
+    escritor.fechar()
@@ -0,0 +1,72 @@
+import time
+from collections import Counter
+
+from digimapas.templo_inicial.scripturemon.faixas_eventos import FaixasEventos
+
+
+def _encher(faixas, quantidades):
+    for nome, quantidade in quantidades.items():
+        for i in range(quantidade):
+            faixas.colocar(nome, f"{nome}{i}")
+
+
+def _contagem(lote):
+    return Counter(nome for nome, _, _ in lote)
+
+
+def test_drenagem_por_peso_com_credito_e_revezamento():
+    faixas = FaixasEventos({"sistema": 8, "local": 1})
+    _encher(faixas, {"sistema": 1000, "local": 1000})
+    assert _contagem(faixas.drenar(90)) == {"sistema": 80, "local": 10}
+
+    # Mesmo peso e cota fracionaria: o credito e a sobra se revezam entre as faixas
+    iguais = FaixasEventos({"a": 1, "b": 1, "c": 1})
+    _encher(iguais, {"a": 500, "b": 500, "c": 500})
+    total = Counter()
+    for _ in range(30):
+        lote = iguais.drenar(10)
+        assert len(lote) == 10
+        total.update(_contagem(lote))
+    assert total == {"a": 100, "b": 100, "c": 100}
+
+
+def test_cota_nao_usada_vai_para_as_outras_faixas():
+    faixas = FaixasEventos({"sistema": 8, "mensagem": 2, "local": 1})
+    _encher(faixas, {"sistema": 3, "mensagem": 100, "local": 100})
+    lote = faixas.drenar(22)
+    # As 13 que o sistema nao usou vao primeiro para a faixa de mais peso entre as restantes
+    assert _contagem(lote) == {"sistema": 3, "mensagem": 17, "local": 2}
+    # Faixa que esvaziou nao guarda credito
+    assert faixas.faixas["sistema"].credito == 0.0
+    # Em cada faixa a ordem de chegada e mantida
+    assert [item for nome, _, item in lote if nome == "local"] == [f"local{i}" for i in range(2)]
+
+
+def test_faixa_fora_do_slo_vem_primeiro():
+    faixas = FaixasEventos({"sistema": 8, "local": 1}, slos={"local": 0.05, "sistema": 10.0})
+    faixas.colocar("local", "movimento antigo")
+    time.sleep(0.06)
+    faixas.colocar("sistema", "aviso")
+    lote = faixas.drenar()
+    assert [item for _, _, item in lote] == ["movimento antigo", "aviso"]
+
+    for nome, entrada, _ in lote:
+        faixas.concluir(nome, entrada)
+    metricas = faixas.metricas()
+    assert metricas["local"]["violacoes_slo"] == 1 and metricas["sistema"]["violacoes_slo"] == 0
+    assert metricas["local"]["processados"] == 1 and metricas["local"]["profundidade"] == 0
+
+    # Sem SLO estourado, a ordem e por peso
+    faixas.colocar("local", "movimento")
+    faixas.colocar("sistema", "aviso")
+    assert [item for _, _, item in faixas.drenar()] == ["aviso", "movimento"]
+
+
+def test_faixa_desconhecida_e_criada_com_peso_um():
+    faixas = FaixasEventos({"sistema": 8}, capacidade=2, politica="descartar_novo")
+    assert faixas.colocar("nova", 1) and faixas.colocar("nova", 2)
+    assert not faixas.colocar("nova", 3)
+    assert faixas.faixas["nova"].peso == 1 and len(faixas) == 2
+    assert faixas.copia() == [1, 2]
+    assert faixas.metricas()["nova"]["descartados"] == 1
+    assert [item for _, _, item in faixas.drenar(None)] == [1, 2] and faixas.drenar(5) == []
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from digimapas.templo_inicial.scripturemon.fila_eventos import FilaEventos
+
+
+def test_descartar_antigo_e_descartar_novo():
+    antigo = FilaEventos(capacidade=3, politica="descartar_antigo")
+    assert all(antigo.colocar(i) for i in range(5))
+    assert antigo.drenar() == [2, 3, 4]
+
+    novo = FilaEventos(capacidade=3, politica="descartar_novo")
+    assert [novo.colocar(i) for i in range(5)] == [True, True, True, False, False]
+    assert novo.colocar_lote([7, 8]) == 0
+    assert novo.espiar() == 0 and novo.copia() == [0, 1, 2]
+    assert novo.drenar(max_itens=2) == [0, 1] and novo.drenar() == [2]
+    assert novo.espiar() is None and novo.vazia()
+    metricas = novo.metricas()
+    assert (metricas['descartados'], metricas['drenados'], metricas['maior_lote']) == (4, 3, 2)
+
+    with pytest.raises(ValueError):
+        FilaEventos(politica="ignorar")
+
+
+def test_bloquear_espera_o_consumidor_e_depois_desiste():
+    fila = FilaEventos(capacidade=2, politica="bloquear", timeout_bloqueio=2.0)
+    fila.colocar_lote(["a", "b"])
+    resultado = []
+    produtor = threading.Thread(target=lambda: resultado.append(fila.colocar("c")))
+    produtor.start()
+    time.sleep(0.1)
+    assert produtor.is_alive() and len(fila) == 2
+
+    assert fila.drenar(max_itens=1) == ["a"]
+    produtor.join(1.0)
+    assert resultado == [True] and fila.copia() == ["b", "c"]
+
+    fila.timeout_bloqueio = 0.1
+    inicio = time.monotonic()
+    assert not fila.colocar("d")
+    assert time.monotonic() - inicio >= 0.1
+    assert fila.metricas()['bloqueios'] == 2 and fila.metricas()['descartados'] == 1
+
+
+def test_bloquear_false_recusa_sem_esperar():
+    fila = FilaEventos(capacidade=1, politica="bloquear", timeout_bloqueio=5.0)
+    fila.colocar("tick")
+    inicio = time.monotonic()
+    assert not fila.colocar("do proprio tick", bloquear=False)
+    assert time.monotonic() - inicio < 0.5
+    assert fila.metricas()['bloqueios'] == 0 and fila.metricas()['descartados'] == 1
+
+
+def test_colocar_async_espera_sem_travar_o_loop():
+    fila = FilaEventos(capacidade=1, politica="bloquear", timeout_bloqueio=2.0)
+    fila.colocar("cheia")
+
+    async def consumir_depois():
+        await asyncio.sleep(0.05)
+        return fila.drenar()
+
+    async def rodar():
+        return await asyncio.gather(fila.colocar_async("nova"), consumir_depois())
+
+    aceito, drenados = asyncio.run(rodar())
+    assert aceito and drenados == ["cheia"] and fila.copia() == ["nova"]
+    assert not asyncio.run(fila.colocar_async("sem espaco", timeout=0.05))
+
+
+def test_varios_produtores_sem_perda_nem_reordenacao():
+    fila = FilaEventos(capacidade=500, politica="bloquear", timeout_bloqueio=5.0)
+    produtores = [
+        threading.Thread(target=lambda p=p: [fila.colocar((p, i)) for i in range(2000)])
+        for p in range(4)
+    ]
+    for produtor in produtores:
+        produtor.start()
+    recebidos = []
+    while any(p.is_alive() for p in produtores) or not fila.vazia():
+        recebidos.extend(fila.drenar(max_itens=64))
+    for produtor in produtores:
+        produtor.join()
+
+    assert len(recebidos) == 8000 and fila.metricas()['descartados'] == 0
+    for p in range(4):
+        assert [i for q, i in recebidos if q == p] == list(range(2000))
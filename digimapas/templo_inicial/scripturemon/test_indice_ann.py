@@ -0,0 +1,130 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from digimapas.templo_inicial.scripturemon import indice_ann
+from digimapas.templo_inicial.scripturemon.indice_ann import (
+    IndiceExato,
+    IndiceIVFFlat,
+    carregar_indice,
+    criar_indice,
+    recall_em_k,
+    tipo_efetivo,
+)
+
+
+def _normalizados(n, dim=24, grupos=12, semente=0):
+    """Vetores unitarios agrupados em torno de alguns centros (como embeddings reais)."""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(grupos, dim))
+    vetores = centros[rng.integers(grupos, size=n)] + 0.4 * rng.normal(size=(n, dim))
+    return (vetores / np.linalg.norm(vetores, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _ids(n, prefixo="n"):
+    return [f"{prefixo}{i}" for i in range(n)]
+
+
+def test_exato_igual_a_forca_bruta_com_substituicao_e_remocao(tmp_path):
+    vetores = _normalizados(200)
+    indice = IndiceExato(vetores.shape[1])
+    indice.adicionar(_ids(200), vetores)
+    novos = _normalizados(5, semente=1)
+    indice.adicionar(_ids(5), novos)
+    for doc_id in _ids(20)[10:]:
+        indice.remover(doc_id)
+    vetores[:5] = novos
+    vivos = [i for i in range(200) if not 10 <= i < 20]
+
+    consulta = vetores[3]
+    sims = vetores[vivos] @ consulta
+    esperado = [f"n{vivos[i]}" for i in np.argsort(-sims)[:8]]
+    assert [doc_id for doc_id, _ in indice.buscar(consulta, 8)] == esperado
+    assert len(indice) == 190 and "n12" not in indice
+
+    indice.salvar(str(tmp_path))
+    carregado = carregar_indice(str(tmp_path))
+    assert isinstance(carregado, IndiceExato) and sorted(carregado.ids()) == sorted(indice.ids())
+    assert carregado.buscar(consulta, 8) == pytest.approx(indice.buscar(consulta, 8))
+
+
+def test_ivf_recall_contra_a_busca_exata():
+    vetores = _normalizados(3000)
+    exato = IndiceExato(vetores.shape[1])
+    exato.adicionar(_ids(3000), vetores)
+    ivf = IndiceIVFFlat(vetores.shape[1], nprobe=6, treinar_com=512)
+    ivf.adicionar(_ids(3000), vetores)
+    assert ivf.centroides is not None
+
+    consultas = vetores[::60]
+    assert recall_em_k(ivf, exato, consultas, k=10) >= 0.9
+    # Visitando todas as listas a busca e exata
+    ivf.nprobe = len(ivf.centroides)
+    assert recall_em_k(ivf, exato, consultas, k=10) == 1.0
+
+    for doc_id in _ids(3000)[::2]:
+        ivf.remover(doc_id)
+        exato.remover(doc_id)
+    assert recall_em_k(ivf, exato, consultas, k=10) == 1.0
+    assert all(int(doc_id[1:]) % 2 for doc_id, _ in ivf.buscar(vetores[1], 50))
+
+
+def test_ivf_salvo_e_carregado_mantem_resultados_e_semente(tmp_path):
+    vetores = _normalizados(900, semente=3)
+    ivf = IndiceIVFFlat(vetores.shape[1], nprobe=3, treinar_com=200, semente=42)
+    ivf.adicionar(_ids(600), vetores[:600])
+    for doc_id in _ids(600)[::7]:
+        ivf.remover(doc_id)
+    ivf.salvar(str(tmp_path))
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["semente"] == 42
+
+    carregado = carregar_indice(str(tmp_path))
+    assert isinstance(carregado, IndiceIVFFlat) and carregado.semente == 42
+    np.testing.assert_array_equal(carregado.centroides, ivf.centroides)
+    for consulta in vetores[600::50]:
+        assert carregado.buscar(consulta, 5) == ivf.buscar(consulta, 5)
+
+    # O retreino (crescimento x fator_retreino) usa a mesma semente nos dois
+    for indice in (ivf, carregado):
+        indice.fator_retreino = 1.3
+        indice.adicionar(_ids(300, "m"), vetores[600:])
+    assert carregado._treinado_com == ivf._treinado_com == len(ivf)
+    np.testing.assert_array_equal(carregado.centroides, ivf.centroides)
+
+
+def test_hnsw_sem_hnswlib_vira_ivf(monkeypatch):
+    monkeypatch.setattr(indice_ann, "hnswlib", None)
+    assert tipo_efetivo("hnsw") == "ivf" and tipo_efetivo("exato") == "exato"
+    # Parametros do HNSW nao servem ao IVF e sao descartados
+    indice = criar_indice("hnsw", 8, M=32, ef=10)
+    assert isinstance(indice, IndiceIVFFlat)
+    with pytest.raises(ValueError):
+        criar_indice("lsh", 8)
+
+
+def test_carregar_indice_ausente_ou_corrompido_retorna_none(tmp_path):
+    assert carregar_indice(str(tmp_path)) is None
+    IndiceExato(4).salvar(str(tmp_path))
+    assert len(carregar_indice(str(tmp_path))) == 0
+    os.remove(tmp_path / "vetores.npz")
+    assert carregar_indice(str(tmp_path)) is None
+
+
+def test_hnsw_recall_e_persistencia(tmp_path):
+    pytest.importorskip("hnswlib")
+    vetores = _normalizados(1500)
+    exato = IndiceExato(vetores.shape[1])
+    exato.adicionar(_ids(1500), vetores)
+    hnsw = criar_indice("hnsw", vetores.shape[1], capacidade=256)
+    hnsw.adicionar(_ids(1500), vetores)
+    hnsw.remover("n0")
+    exato.remover("n0")
+    assert recall_em_k(hnsw, exato, vetores[1::50], k=10) >= 0.9
+
+    hnsw.salvar(str(tmp_path))
+    carregado = carregar_indice(str(tmp_path))
+    assert "n0" not in carregado and len(carregado) == 1499
+    assert recall_em_k(carregado, exato, vetores[1::50], k=10) >= 0.9
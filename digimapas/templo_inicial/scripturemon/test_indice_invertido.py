@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from digimapas.templo_inicial.scripturemon.indice_invertido import IndiceInvertido
+from digimapas.templo_inicial.scripturemon.memoria import MemoriaEmocional
+
+CHAVES = ["alegria", "medo", "raiva", "templo", "floresta"]
+
+
+def _popular(semente=3, n=200):
+    rng = random.Random(semente)
+    indice = IndiceInvertido()
+    itens = {}
+    for i in range(n):
+        # Tempos repetidos de proposito: o id desempata
+        chaves = set(rng.sample(CHAVES, rng.randint(0, 3)))
+        tempo = float(rng.randint(0, 40))
+        indice.adicionar(f"id{i:03d}", chaves, tempo)
+        itens[f"id{i:03d}"] = (tempo, chaves)
+    return indice, itens, rng
+
+
+def _forca_bruta(itens, chaves, modo="ou", inicio=None, fim=None, offset=0, limite=None,
+                 recentes_primeiro=False):
+    teste = all if modo == "e" else any
+    escolhidos = sorted(
+        (tempo, nid) for nid, (tempo, proprias) in itens.items()
+        if teste(c in proprias for c in chaves)
+        and (inicio is None or tempo >= inicio) and (fim is None or tempo <= fim)
+    )
+    if recentes_primeiro:
+        escolhidos.reverse()
+    fim_pagina = None if limite is None else offset + limite
+    return [nid for _, nid in escolhidos[offset:fim_pagina]]
+
+
+def _conferir(indice, itens, rng, consultas=300):
+    for _ in range(consultas):
+        filtro = dict(
+            chaves=rng.sample(CHAVES, rng.randint(1, 3)),
+            modo=rng.choice(["ou", "e"]),
+            inicio=rng.choice([None, 5.0, 12.0]),
+            fim=rng.choice([None, 12.0, 30.0]),
+            offset=rng.choice([0, 0, 3]),
+            limite=rng.choice([None, 1, 7]),
+            recentes_primeiro=rng.random() < 0.5,
+        )
+        assert indice.consultar(**filtro) == _forca_bruta(itens, **filtro), filtro
+
+
+def test_consultas_iguais_a_forca_bruta():
+    indice, itens, rng = _popular()
+    assert len(indice) == len(itens)
+    _conferir(indice, itens, rng)
+    assert indice.consultar([]) == []
+    with pytest.raises(ValueError):
+        indice.consultar(["medo"], modo="xor")
+
+
+def test_atualizacao_e_remocao_mantem_as_postagens():
+    indice, itens, rng = _popular()
+    for nid in rng.sample(sorted(itens), 60):
+        tempo, _ = itens[nid]
+        novas = set(rng.sample(CHAVES, rng.randint(0, 3)))
+        indice.atualizar(nid, novas)
+        itens[nid] = (tempo, novas)
+    for nid in rng.sample(sorted(itens), 50):
+        indice.remover(nid)
+        del itens[nid]
+    # Readicionar substitui as chaves e o tempo
+    indice.adicionar("id000", ["medo"], 100.0)
+    itens["id000"] = (100.0, {"medo"})
+
+    _conferir(indice, itens, rng)
+    assert set(indice.chaves()) == set().union(*(chaves for _, chaves in itens.values()))
+    assert indice.chaves_do_item("id000") == {"medo"}
+    indice.remover("ausente")
+    with pytest.raises(KeyError):
+        indice.atualizar("ausente", ["medo"])
+
+
+def test_memoria_emocional_usa_o_indice_sem_mudar_o_resultado():
+    memoria = MemoriaEmocional(digimon=None)
+    memoria.registrar("Sonhei com Reflectimon na floresta.", "compaixao", 0.9)
+    memoria.registrar("Fui ignorado por Reflectimon.", "tristeza", 0.7)
+    memoria.registrar("Toquei o codigo base da realidade.", "curiosidade", 0.95)
+    memoria.registrar("Reflectimon voltou ao templo.", "tristeza", 0.4)
+
+    def varredura(alvo):
+        return [{"emocao": m["emocao"], "peso": m["peso"]}
+                for m in memoria.memoria if alvo in m["conteudo"].lower()]
+
+    for alvo in ("reflectimon", "flect", "floresta", "templo.", "nada"):
+        assert memoria.conexoes_emocionais(alvo) == varredura(alvo)
+
+    assert [m["id"] for m in memoria.buscar_por_emocao("tristeza")] == [1, 3]
+    assert memoria.esquecer(1) and not memoria.esquecer(1)
+    assert [m["id"] for m in memoria.buscar_por_emocoes(["tristeza", "compaixao"])] == [0, 3]
+    assert memoria.conexoes_emocionais("ignorado") == []
@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from digimapas.templo_inicial.scripturemon.memoria_semantica import MemoriaSemantica
+
+
+class ModeloFalso:
+    """Faz o papel do SentenceTransformer com vetores fixos por texto."""
+
+    def __init__(self, vetores):
+        self.vetores = vetores
+        self.codificados = 0
+
+    def encode(self, textos, batch_size=64):
+        self.codificados += len(textos)
+        return np.array([self.vetores[texto] for texto in textos])
+
+
+def _vetores(n=60, grupos=3, dim=16, semente=7):
+    """Notas em grupos: parecidas (cosseno alto) dentro do grupo, distantes entre grupos."""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(grupos, dim))
+    return {
+        f"grupo {i % grupos} nota {i}": centros[i % grupos] + 0.35 * rng.normal(size=dim)
+        for i in range(n)
+    }
+
+
+def _memoria(diretorio, vetores, **kwargs):
+    memoria = MemoriaSemantica(persist_dir=str(diretorio), **kwargs)
+    memoria.modelo_embeddings = ModeloFalso(vetores)
+    return memoria
+
+
+def _forca_bruta(memoria, vetores, nota_id, k):
+    """Top-k por cosseno, um par de cada vez, acima de threshold_link."""
+    alvo = vetores[memoria.notas[nota_id].conteudo]
+    pares = []
+    for outro, nota in memoria.notas.items():
+        if outro == nota_id:
+            continue
+        vetor = vetores[nota.conteudo]
+        sim = float(alvo @ vetor / (np.linalg.norm(alvo) * np.linalg.norm(vetor)))
+        if sim >= memoria.threshold_link:
+            pares.append((outro, sim))
+    pares.sort(key=lambda par: -par[1])
+    return pares[:k]
+
+
+def _comparar(obtido, esperado):
+    assert [nid for nid, _ in obtido] == [nid for nid, _ in esperado]
+    assert [sim for _, sim in obtido] == pytest.approx([sim for _, sim in esperado], abs=1e-5)
+
+
+def test_top_k_da_matriz_igual_a_forca_bruta_mesmo_apos_remocoes(tmp_path):
+    vetores = _vetores()
+    memoria = _memoria(tmp_path, vetores)
+    ids = [memoria.registrar_nota(texto) for texto in vetores]
+
+    for nid in ids[::7]:
+        _comparar(memoria._buscar_similares(nid, 5), _forca_bruta(memoria, vetores, nid, 5))
+        # k maior que o grupo: quem corta e o threshold_link
+        longa = memoria._buscar_similares(nid, 40)
+        assert 5 < len(longa) < 40
+        _comparar(longa, _forca_bruta(memoria, vetores, nid, 40))
+
+    # Remover move a ultima linha da matriz para o buraco
+    for nid in ids[:10] + ids[-5:]:
+        memoria.remover_nota(nid)
+    assert sorted(memoria._ids_matriz) == sorted(memoria.notas)
+    for nid in list(memoria.notas)[::5]:
+        _comparar(memoria._buscar_similares(nid, 4), _forca_bruta(memoria, vetores, nid, 4))
+
+    escolhidos = memoria.link_automatico(ids[20], max_links=3)
+    assert memoria.notas[ids[20]].relacionamentos["similaridade_auto"] == [nid for nid, _ in escolhidos]
+
+
+def test_links_em_blocos_iguais_ao_laco_por_nota(tmp_path):
+    vetores = _vetores(n=40)
+    textos = list(vetores)
+    em_blocos = _memoria(tmp_path / "blocos", vetores)
+    por_nota = _memoria(tmp_path / "por_nota", vetores)
+    for texto in textos:
+        em_blocos.registrar_nota(texto)
+        por_nota.registrar_nota(texto)
+
+    # Orcamento minimo: uma linha de similaridades por bloco
+    links_blocos = em_blocos.atualizar_links_em_lote(max_links=4, orcamento_mb=1e-6)
+    links_por_nota = por_nota.atualizar_links_em_lote(max_links=4, em_blocos=False)
+
+    def por_conteudo(memoria, links):
+        return {
+            memoria.notas[nid].conteudo: [memoria.notas[d].conteudo for d in destinos]
+            for nid, destinos in links.items()
+        }
+
+    assert por_conteudo(em_blocos, links_blocos) == por_conteudo(por_nota, links_por_nota)
+    assert any(links_blocos.values())
+
+
+def test_reabertura_reconstroi_a_matriz_pelo_cache_em_disco(tmp_path):
+    vetores = _vetores(n=30)
+    memoria = _memoria(tmp_path, vetores)
+    ids = [memoria.registrar_nota(texto) for texto in vetores]
+    antes = {nid: memoria._buscar_similares(nid, 3) for nid in ids}
+    memoria.fechar()
+
+    reaberta = _memoria(tmp_path, vetores)
+    reaberta.carregar_notas()
+    for nid in ids:
+        _comparar(reaberta._buscar_similares(nid, 3), antes[nid])
+    # Todos os embeddings vieram do cache persistente
+    assert reaberta.modelo_embeddings.codificados == 0
+
+
+def test_indices_de_tags_e_relacoes_sobrevivem_a_reabertura(tmp_path):
+    vetores = _vetores(n=6)
+    memoria = _memoria(tmp_path, vetores)
+    textos = list(vetores)
+    ids = [memoria.registrar_nota(texto, tags=["grupo", f"g{i % 2}"]) for i, texto in enumerate(textos)]
+    memoria.adicionar_relacionamento(ids[0], ids[1], "causa")
+    memoria.atualizar_nota(ids[2], tags=["extra"])
+    memoria.remover_nota(ids[4])
+    memoria.fechar()
+
+    reaberta = _memoria(tmp_path, vetores)
+    reaberta.carregar_notas()
+    assert reaberta.buscar_ids_por_tags(["g0"]) == [ids[0], ids[2]]
+    assert reaberta.buscar_ids_por_tags(["grupo", "g1"], modo="e", recentes_primeiro=True) == [
+        ids[5], ids[3], ids[1]
+    ]
+    assert reaberta.buscar_ids_por_tags(["grupo"], offset=1, limite=2) == [ids[1], ids[2]]
+    assert [n.conteudo for n in reaberta.buscar_por_tag("extra")] == [textos[2]]
+    assert reaberta.buscar_por_relacao("causa") == [ids[0]]
+
+
+def test_indice_ann_salvo_e_reaproveitado_na_reabertura(tmp_path, monkeypatch):
+    from digimapas.templo_inicial.scripturemon import indice_ann
+
+    # "hnsw" sem hnswlib vira IVF (com parametros padrao, treinado a partir de 1024 notas);
+    # o indice salvo como "ivf" deve ser reaproveitado
+    monkeypatch.setattr(indice_ann, "hnswlib", None)
+    vetores = _vetores(n=1100, grupos=20)
+    memoria = _memoria(tmp_path, vetores, indice_ann="hnsw", parametros_indice={"M": 8})
+    ids = [memoria.registrar_nota(texto) for texto in vetores]
+    assert memoria._indice_ann.tipo == "ivf" and memoria._indice_ann.centroides is not None
+    assert memoria.verificar_recall_ann(amostra=30, k=5) >= 0.9
+    memoria.fechar()
+
+    # Nota removida do log sem passar pelo indice (ex.: queda antes de salva-lo)
+    memoria.armazenamento.remover(ids[0])
+    memoria.armazenamento.fechar()
+
+    reaberta = _memoria(tmp_path, vetores, indice_ann="hnsw", parametros_indice={"M": 8})
+    reaberta.carregar_notas()
+    assert reaberta._indice_ann is not None and ids[0] not in reaberta._indice_ann
+    np.testing.assert_array_equal(reaberta._indice_ann.centroides, memoria._indice_ann.centroides)
+    vizinhos = reaberta._buscar_similares(ids[1], 5)
+    assert vizinhos and all(nid != ids[0] for nid, _ in vizinhos)
+
+
+def test_embeddings_das_notas_recentes_ficam_fixados(tmp_path):
+    vetores = _vetores(n=8)
+    textos = list(vetores)
+    memoria = _memoria(tmp_path, vetores, cache_max_entradas=3, fixar_recentes=2)
+    for texto in textos:
+        memoria.registrar_nota(texto)
+
+    stats = memoria.estatisticas_cache()
+    assert stats["entradas"] == 3 and stats["fixadas"] == 2
+    assert stats["persistente_entradas"] == 8
+    # As duas notas mais novas nao saem do cache mesmo com outras consultas
+    memoria.encode_many(textos[:3])
+    antes = memoria.estatisticas_cache()
+    memoria.encode_many(textos[-2:])
+    depois = memoria.estatisticas_cache()
+    assert depois["acertos"] - antes["acertos"] == 2 and depois["faltas"] == antes["faltas"]
+    assert depois["fixadas"] == 2
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+from digimapas.templo_inicial.scripturemon.memoria_vetorial import MemoriaVetorial
+
+
+class ColecaoFalsa:
+    """Colecao com a forma de resposta do Chroma (uma lista por consulta)."""
+
+    def __init__(self, distancias):
+        self.distancias = distancias
+        self.atualizacoes = []
+
+    def query(self, query_texts, n_results, include=None):
+        n = min(n_results, len(self.distancias))
+        return {
+            "ids": [[f"id{i}" for i in range(n)] for _ in query_texts],
+            "documents": [[f"doc {i}" for i in range(n)] for _ in query_texts],
+            "metadatas": [[{"importancia": 0.9, "mencoes": 2}] * n for _ in query_texts],
+            "distances": [self.distancias[:n] for _ in query_texts],
+        }
+
+    def update(self, ids, metadatas):
+        self.atualizacoes.append((ids, metadatas))
+
+
+def _memoria(distancias):
+    memoria = MemoriaVetorial.__new__(MemoriaVetorial)
+    memoria.digimon_id = "teste"
+    memoria.collection = ColecaoFalsa(distancias)
+    return memoria
+
+
+def test_similaridade_continua_sendo_a_distancia_do_chroma():
+    resultado = _memoria([0.05, 0.7]).buscar_contexto("Agumon no templo", k=2)
+
+    # Menor e mais parecido: memoria_universal compara com 1 - threshold
+    assert [r["similaridade"] for r in resultado] == [0.05, 0.7]
+    assert [r["distancia"] for r in resultado] == [0.05, 0.7]
+    assert [r["cosseno"] for r in resultado] == pytest.approx([0.95, 0.3])
+    assert resultado[0]["documento"] == resultado[0]["conteudo"] == "doc 0"
+    assert resultado[0]["importancia"] == 0.9 and resultado[0]["mencoes"] == 2
+
+
+def test_busca_em_lote_devolve_uma_lista_por_consulta():
+    memoria = _memoria([0.1, 0.2, 0.3])
+    lotes = memoria.buscar_contexto_lote(["a", "b"], k=2)
+    assert len(lotes) == 2 and all(len(lote) == 2 for lote in lotes)
+    assert memoria.buscar_contexto_lote([], k=2) == []
+
+    memoria.atualizar_metadata("id0", {"mencoes": 3})
+    assert memoria.collection.atualizacoes == [(["id0"], [{"mencoes": 3}])]
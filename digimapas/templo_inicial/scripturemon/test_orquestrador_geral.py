@@ -0,0 +1,327 @@
+import asyncio
+import pickle
+import threading
+import time
+
+from digimapas.templo_inicial.scripturemon.orquestrador_geral import Evento, OrquestradorGeral, TipoEvento
+
+
+class Consciencia:
+    def __init__(self):
+        self.percebido = []
+
+    def perceive(self, percepcao):
+        self.percebido.append(percepcao)
+
+
+class Agente:
+    """Agente sincrono que anota a ordem de execucao e devolve acoes fixas."""
+
+    def __init__(self, nome, registro, espera=0.0, acoes=None):
+        self.nome = nome
+        self.registro = registro
+        self.espera = espera
+        self.acoes = acoes or []
+        self.consciencia = Consciencia()
+
+    def viver(self):
+        self.registro.append(self.nome)
+        if self.espera:
+            time.sleep(self.espera)
+        return list(self.acoes)
+
+
+def _orquestrador(**config):
+    return OrquestradorGeral({**OrquestradorGeral._config_padrao(), **config})
+
+
+def test_divida_de_orcamento_faz_o_agente_pular_ticks():
+    registro = []
+    orquestrador = _orquestrador(orcamento_agente=0.02, tick_rate=0)
+    for nome in ("lento", "rapido"):
+        orquestrador.adicionar_agente(nome, Agente(nome, registro))
+
+    # Estourou 0.05 s alem do orcamento: paga um orcamento por tick pulado
+    orquestrador._cobrar_orcamento("lento", 0.07)
+    assert orquestrador.stats['estouros_agente'] == 1
+
+    execucoes = []
+    for _ in range(5):
+        registro.clear()
+        orquestrador._executar_ciclo_sync()
+        execucoes.append(list(registro))
+
+    assert execucoes[:3] == [["rapido"]] * 3
+    assert execucoes[3:] == [["lento", "rapido"]] * 2
+    assert orquestrador.stats['agentes_adiados'] == 3
+    assert orquestrador._divida_agentes["lento"] == 0.0
+
+
+def test_agentes_fora_da_janela_abrem_o_tick_seguinte():
+    registro = []
+    orquestrador = _orquestrador(orcamento_agente=1.0, tick_rate=0.1, fracao_agentes=0.5)
+    orquestrador.adicionar_agente("a", Agente("a", registro, espera=0.08))
+    orquestrador.adicionar_agente("b", Agente("b", registro))
+    orquestrador.adicionar_agente("c", Agente("c", registro))
+
+    orquestrador._executar_ciclo_sync(inicio_tick=time.monotonic())
+    assert registro == ["a"]
+    assert orquestrador._ordem_agentes == ["b", "c"]
+    assert orquestrador.stats['agentes_adiados'] == 2
+
+    registro.clear()
+    orquestrador.agentes["a"].espera = 0.0
+    orquestrador._executar_ciclo_sync(inicio_tick=time.monotonic())
+    assert registro == ["b", "c", "a"]
+    assert orquestrador.stats['estouros_agente'] == 0
+
+
+def test_agente_atrasado_no_modo_async_aplica_acoes_no_tick_seguinte():
+    registro = []
+    orquestrador = _orquestrador(orcamento_agente=0.02)
+    orquestrador.adicionar_agente(
+        "lento", Agente("lento", registro, espera=0.15, acoes=[{'tipo': 'mover', 'destino': 'templo'}])
+    )
+    aplicacoes = []
+    processar_acoes = orquestrador._processar_acoes
+
+    def registrar(nome, acoes):
+        aplicacoes.append((nome, threading.get_ident(), orquestrador.tempo_mundo))
+        processar_acoes(nome, acoes)
+
+    orquestrador._processar_acoes = registrar
+
+    async def rodar():
+        await orquestrador._executar_ciclo_async()
+        assert orquestrador.stats['estouros_agente'] == 1
+        # O agente termina durante o intervalo, mas nao mexe no mundo fora do event loop
+        await asyncio.sleep(0.3)
+        assert aplicacoes == []
+        assert orquestrador.localizacoes["lento"] == "praca_central"
+
+        await orquestrador._executar_ciclo_async()
+
+    asyncio.run(rodar())
+    orquestrador.parar()
+
+    assert aplicacoes == [("lento", threading.get_ident(), 1)]
+    assert orquestrador.localizacoes["lento"] == "templo"
+    assert "lento" in orquestrador.mapa_mundo["templo"]['agentes_presentes']
+    # No segundo tick o agente voltou a rodar, agora em dia com o orcamento
+    assert registro == ["lento", "lento"]
+
+
+class AgenteVersionado(Agente):
+    """Agente com versao_estado: so muda de estado quando ``muda`` e verdadeiro."""
+
+    def __init__(self, nome, registro, muda=True):
+        super().__init__(nome, registro)
+        self.muda = muda
+        self.memoria = []
+        self.versao_estado = 0
+        self.serializacoes = 0
+
+    def viver(self):
+        acoes = super().viver()
+        if self.muda:
+            self.memoria.append(f"lembranca {len(self.memoria)}")
+            self.versao_estado += 1
+        return acoes
+
+    def serializar_estado(self):
+        self.serializacoes += 1
+        return {'memoria': list(self.memoria), 'versao': self.versao_estado}
+
+    def restaurar_estado(self, estado):
+        self.memoria = list(estado['memoria'])
+        self.versao_estado = estado['versao']
+
+
+def test_checkpoint_incremental_so_serializa_agentes_alterados_e_restaura(tmp_path):
+    diretorio = str(tmp_path)
+    orquestrador = _orquestrador(tick_rate=0)
+    registro = []
+    orquestrador.adicionar_agente("muda", AgenteVersionado("muda", registro))
+    orquestrador.adicionar_agente("fixo", AgenteVersionado("fixo", registro, muda=False))
+    for _ in range(3):
+        orquestrador._executar_ciclo_sync()
+    assert orquestrador.checkpoint(diretorio, bloquear=True)
+
+    for _ in range(3):
+        orquestrador._executar_ciclo_sync()
+    orquestrador._processar_movimento("muda", "templo")
+    assert orquestrador.checkpoint(diretorio, bloquear=True)
+
+    # "fixo" viveu seis vezes, mas so foi serializado no primeiro checkpoint
+    assert orquestrador.agentes["fixo"].serializacoes == 1
+    assert orquestrador.agentes["muda"].serializacoes == 2
+    metricas = orquestrador.gravador_checkpoint.metricas()
+    assert metricas['checkpoints_gravados'] == 2 and not metricas['ultimo_completo']
+    orquestrador.parar()
+
+    restaurado = _orquestrador(tick_rate=0)
+    restaurado.adicionar_agente("muda", AgenteVersionado("muda", []))
+    restaurado.adicionar_agente("fixo", AgenteVersionado("fixo", [], muda=False))
+    assert restaurado.restaurar_checkpoint(diretorio)
+
+    assert restaurado.tempo_mundo == 6
+    assert restaurado.agentes["muda"].memoria == [f"lembranca {i}" for i in range(6)]
+    assert restaurado.agentes["muda"].versao_estado == 6
+    assert restaurado.agentes["fixo"].memoria == []
+    assert restaurado.localizacoes == {"muda": "templo", "fixo": "praca_central"}
+    assert restaurado.mapa_mundo["templo"]['agentes_presentes'] == {"muda"}
+    restaurado.parar()
+
+
+def _eventos_percebidos(orquestrador, nome):
+    return [p['conteudo'] for p in orquestrador._coletar_percepcoes(nome) if p['tipo'] == 'evento']
+
+
+def test_eventos_chegam_pelo_buffer_do_local_com_cursor_por_agente():
+    orquestrador = _orquestrador(tick_rate=0, capacidade_buffer_eventos=4)
+    registro = []
+    for nome in ("a", "b", "c"):
+        orquestrador.adicionar_agente(nome, Agente(nome, registro))
+    orquestrador._processar_movimento("c", "templo")
+    orquestrador._processar_eventos_sync()
+    for nome in ("a", "b", "c"):
+        orquestrador._coletar_percepcoes(nome)
+
+    orquestrador._processar_evento(Evento(TipoEvento.LOCAL, "a cantou", origem="a"))
+    orquestrador._processar_evento(Evento(TipoEvento.GLOBAL, "eclipse", origem="sistema"))
+    assert _eventos_percebidos(orquestrador, "a") == ["eclipse"]
+    assert _eventos_percebidos(orquestrador, "b") == ["a cantou", "eclipse"]
+    assert _eventos_percebidos(orquestrador, "c") == ["eclipse"]
+    assert _eventos_percebidos(orquestrador, "b") == []
+
+    # Recem-chegado nao recebe o historico do local
+    orquestrador._processar_evento(Evento(TipoEvento.LOCAL, "sino do templo", metadata={'local': 'templo'}))
+    orquestrador._processar_movimento("b", "templo")
+    orquestrador._processar_eventos_sync()
+    assert "sino do templo" not in _eventos_percebidos(orquestrador, "b")
+    assert _eventos_percebidos(orquestrador, "c") == ["sino do templo", "b moveu-se para templo"]
+
+    # Leitor atrasado: so os ultimos 4 eventos, o resto entra nas estatisticas
+    for i in range(10):
+        orquestrador._processar_evento(Evento(TipoEvento.LOCAL, f"eco {i}", metadata={'local': 'templo'}))
+    assert _eventos_percebidos(orquestrador, "c") == [f"eco {i}" for i in range(6, 10)]
+    assert orquestrador.stats['eventos_perdidos_buffer'] == 6
+    orquestrador.parar()
+
+
+class AgenteAsync:
+    """Agente so assincrono: espera o "LLM" dentro dos limites compartilhados."""
+
+    def __init__(self, nome, espera, ativos, chamadas=1):
+        self.nome = nome
+        self.espera = espera
+        self.ativos = ativos
+        self.chamadas = chamadas
+        self.percepcoes = []
+        self.threads = set()
+
+    async def _chamar_llm(self):
+        async with self.limites.llm():
+            self.ativos['agora'] += 1
+            self.ativos['maximo'] = max(self.ativos['maximo'], self.ativos['agora'])
+            await asyncio.sleep(self.espera)
+            self.ativos['agora'] -= 1
+
+    async def viver_async(self, percepcoes):
+        self.percepcoes.append(percepcoes)
+        self.threads.add(threading.get_ident())
+        await asyncio.gather(*(self._chamar_llm() for _ in range(self.chamadas)))
+        return [{'tipo': 'falar', 'mensagem': f"{self.nome} pensou"}]
+
+
+def test_agentes_async_vivem_no_event_loop_dentro_dos_limites():
+    orquestrador = _orquestrador(orcamento_agente=5.0, max_llm_concorrentes=2)
+    ativos = {'agora': 0, 'maximo': 0}
+    for i in range(6):
+        orquestrador.adicionar_agente(f"async{i}", AgenteAsync(f"async{i}", 0.05, ativos))
+    registro = []
+    orquestrador.adicionar_agente("sync", Agente("sync", registro, acoes=[{'tipo': 'mover', 'destino': 'templo'}]))
+    assert all(orquestrador.agentes[f"async{i}"].limites is orquestrador.limites for i in range(6))
+    assert not hasattr(orquestrador.agentes["sync"], 'limites')
+
+    async def rodar():
+        inicio = time.monotonic()
+        await orquestrador._executar_ciclo_async()
+        while orquestrador._tarefas_agentes:
+            await asyncio.sleep(0.01)
+            orquestrador._aplicar_agentes_concluidos()
+        return time.monotonic() - inicio, threading.get_ident()
+
+    duracao, thread_loop = asyncio.run(rodar())
+    orquestrador.parar()
+
+    # Seis esperas de 0.05 s, duas por vez: ~0.15 s, sem uma thread por agente
+    assert ativos['maximo'] == 2 and duracao < 0.3
+    assert orquestrador.limites.estatisticas()['llm_esperas'] > 0
+    agente = orquestrador.agentes["async0"]
+    assert agente.threads == {thread_loop}
+    assert any(p['tipo'] == 'ambiente' for p in agente.percepcoes[0])
+    assert registro == ["sync"] and orquestrador.localizacoes["sync"] == "templo"
+
+
+def test_agente_so_async_roda_no_modo_sync_e_limites_viajam_em_pickle():
+    orquestrador = _orquestrador(tick_rate=0, max_llm_concorrentes=1)
+    ativos = {'agora': 0, 'maximo': 0}
+    # Chamadas em paralelo disputam o semaforo; cada ciclo roda num asyncio.run novo
+    orquestrador.adicionar_agente("async", AgenteAsync("async", 0.01, ativos, chamadas=3))
+    orquestrador._executar_ciclo_sync()
+    orquestrador._executar_ciclo_sync()
+    orquestrador.parar()
+    assert len(orquestrador.agentes["async"].percepcoes) == 2
+    assert ativos['maximo'] == 1 and orquestrador.limites.estatisticas()['llm_esperas'] == 4
+    assert orquestrador.stats['interacoes_agentes'] == 2
+
+    copia = pickle.loads(pickle.dumps(orquestrador.limites))
+    assert copia.max_llm == 1 and copia.estatisticas()['llm_em_uso'] == 0
+
+
+def _mensagens(orquestrador, nome):
+    return [(p['emissor'], p['conteudo']) for p in orquestrador._coletar_percepcoes(nome) if p['tipo'] == 'mensagem']
+
+
+def test_fala_e_difundida_uma_vez_para_as_caixas_do_local():
+    orquestrador = _orquestrador(tick_rate=0, capacidade_caixa_mensagens=2)
+    for nome in ("a", "b", "c", "longe"):
+        orquestrador.adicionar_agente(nome, Agente(nome, []))
+    orquestrador._processar_movimento("longe", "templo")
+
+    orquestrador._processar_acoes("a", [{'tipo': 'falar', 'mensagem': "ola"}] * 3)
+    # Uma unica Mensagem, compartilhada pelas caixas de quem ouviu
+    fala_b = orquestrador.caixas_mensagens["b"]._fila[0]
+    assert fala_b is orquestrador.caixas_mensagens["c"]._fila[0]
+    assert len(orquestrador.caixas_mensagens["b"]) == 1
+    assert len(orquestrador.caixas_mensagens["a"]) == 0 and len(orquestrador.caixas_mensagens["longe"]) == 0
+    assert orquestrador.stats['mensagens_agrupadas'] == 4
+
+    # A conversao em percepcao so acontece no passo do receptor
+    assert _mensagens(orquestrador, "b") == [("a", "ola")]
+    assert _mensagens(orquestrador, "b") == []
+    assert orquestrador.stats['mensagens_entregues'] == 1
+
+    # Num tick novo a mesma fala volta a ser difundida; as caixas (2 lugares) transbordam
+    for fala in ("ola", "de novo", "mais uma"):
+        orquestrador._atualizar_mundo_sync()
+        orquestrador._processar_acoes("a", [{'tipo': 'falar', 'mensagem': fala}])
+    assert orquestrador.stats['mensagens_descartadas'] == 1 + 2
+    assert _mensagens(orquestrador, "c") == [("a", "de novo"), ("a", "mais uma")]
+    orquestrador.parar()
+
+
+def test_tick_nao_espera_pela_propria_fila_cheia():
+    orquestrador = _orquestrador(tick_rate=0, capacidade_fila_eventos=1, politica_fila_eventos='bloquear')
+    orquestrador.adicionar_agente("a", Agente("a", []))
+    orquestrador._processar_eventos_sync()
+    assert orquestrador.adicionar_evento(Evento(TipoEvento.LOCAL, "passos", origem="a"))
+
+    # O movimento gera um evento 'local' com a faixa cheia: recusado na hora
+    inicio = time.monotonic()
+    assert orquestrador._processar_movimento("a", "templo")
+    assert time.monotonic() - inicio < 0.5
+    assert orquestrador.fila_eventos.metricas()['local']['descartados'] == 1
+    assert orquestrador.localizacoes["a"] == "templo"
+    orquestrador.parar()